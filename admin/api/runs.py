@@ -0,0 +1,27 @@
+# admin/api/runs.py
+from flask import request, jsonify
+from admin.api import admin_api_bp
+from admin.api.common import ok
+from admin.errors import Unprocessable
+# from admin.permissions import require_scopes
+from admin.services.run_trace_service import RunTraceService
+
+svc = RunTraceService()
+
+@admin_api_bp.get("/runs")
+# @require_scopes("admin.runs.read")
+def list_runs():
+    limit = max(1, min(request.args.get("limit", default=50, type=int), 200))
+    status = (request.args.get("status") or "").strip() or None
+    return ok(svc.recent_runs(limit=limit, status=status))
+
+@admin_api_bp.get("/runs/<int:run_id>/trace")
+# @require_scopes("admin.runs.read")
+def run_trace(run_id: int):
+    fmt = (request.args.get("format") or "waterfall").lower()
+    if fmt == "otlp":
+        # raw OTLP/JSON body so it can be POSTed to a collector's /v1/traces as-is
+        return jsonify(svc.otlp(run_id))
+    if fmt != "waterfall":
+        raise Unprocessable("format must be waterfall or otlp")
+    return ok(svc.waterfall(run_id))
@@ -56,6 +56,7 @@ from datetime import datetime
 from flask import request
 from admin.api import admin_api_bp
 from admin.api.common import ok, parse_pagination, parse_sort
+from admin.errors import Unprocessable
 # from admin.permissions import require_scopes
 from admin.services.scan_service import ScanService
 
@@ -93,13 +94,19 @@ def list_scans():
     start = datetime.fromisoformat(start_s) if start_s else None
     end   = datetime.fromisoformat(end_s)   if end_s else None
 
+    # ?cursor= (meta.next_cursor of the previous page) replaces ?page= for scanned_at sorts
+    cursor = request.args.get("cursor") or None
+
     print('list scans 1')
-    items, total = svc.list_scans(
-        page=page, per_page=per_page, q=q, tool=tool, status=status, user=user,
-        start=start, end=end, sort_field=sort_field, is_desc=is_desc,
-    )
+    try:
+        items, total, next_cursor = svc.list_scans(
+            page=page, per_page=per_page, q=q, tool=tool, status=status, user=user,
+            start=start, end=end, sort_field=sort_field, is_desc=is_desc, cursor=cursor,
+        )
+    except ValueError as e:
+        raise Unprocessable(str(e))
     print('list scans 1')
-    return ok(items, meta={"page": page, "per_page": per_page, "total": total})
+    return ok(items, meta={"page": page, "per_page": per_page, "total": total, "next_cursor": next_cursor})
     
 @admin_api_bp.get("/scans/<int:scan_id>")
 # @require_scopes("admin.scans.read")
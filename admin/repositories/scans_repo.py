@@ -321,15 +321,36 @@
 
 # admin/repositories/scans_repo.py
 from __future__ import annotations
+import base64, time
 from datetime import datetime
 from typing import List, Dict, Optional, Tuple
 
-from sqlalchemy import func, select, and_, or_, desc, asc, literal
+from sqlalchemy import func, select, and_, or_, desc, asc, literal, tuple_, String
 from sqlalchemy.orm import aliased
 
 from admin.repositories import BaseRepo
-from tools.models import ToolScanHistory, ScanDiagnostics
-from auth.models import User, UserIPLog  # adjust if your module name differs
+from tools.models import ToolScanHistory, ScanDiagnostics, Tool
+from auth.models import User, UserLastLocation  # adjust if your module name differs
+
+# list_scans totals: {filter key: (monotonic time, count)}; exact counts of a
+# large filtered join are the slowest part of a page, and paging does not need
+# them to the row
+_TOTAL_CACHE: Dict[tuple, Tuple[float, int]] = {}
+_TOTAL_TTL = 60.0  # seconds
+_TOTAL_CACHE_MAX = 256
+
+def encode_cursor(scanned_at: datetime, scan_id: int) -> str:
+    raw = f"{scanned_at.isoformat()}|{scan_id}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    """(scanned_at, id) of the last row of the previous page; ValueError if malformed."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        at, scan_id = raw.rsplit("|", 1)
+        return datetime.fromisoformat(at), int(scan_id)
+    except (ValueError, UnicodeDecodeError) as e:
+        raise ValueError("invalid cursor") from e
 
 class ScansRepo(BaseRepo):
     # ---- counts / series ----
@@ -418,17 +439,26 @@ class ScansRepo(BaseRepo):
         end: Optional[datetime],
         sort_field: str,
         is_desc: bool,
-    ) -> Tuple[List[Dict], int]:
-
+        cursor: Optional[str] = None,
+    ) -> Tuple[List[Dict], int, Optional[str]]:
+        """
+        One page of scans, the total (cached for _TOTAL_TTL per filter set) and
+        the cursor of the next page. Sorted by scanned_at, pages are keyset
+        pages on (scanned_at, id): pass the previous page's next_cursor instead
+        of a page number and the query seeks on ix_tool_scan_history_scanned_id
+        instead of skipping (page - 1) * per_page rows. Other sorts use OFFSET.
+        """
         ts, d = ToolScanHistory, ScanDiagnostics
-        u = aliased(User)
-        ul = aliased(UserIPLog)
+        u, t = aliased(User), aliased(Tool)
+        loc = UserLastLocation
 
         filters = []
+        needs_user = needs_tool = False
         if start and end:
             filters.append(and_(ts.scanned_at >= start, ts.scanned_at < end))
         if tool:
-            filters.append(ts.tool == tool)
+            # through tool_id so ix_tool_scan_history_tool_scanned applies
+            filters.append(ts.tool_id.in_(select(Tool.id).where(Tool.slug == tool)))
         if status:
             s = status.strip().lower()
             if s in ("success", "ok", "passed"):
@@ -439,29 +469,38 @@ class ScansRepo(BaseRepo):
             if user.isdigit():
                 filters.append(ts.user_id == int(user))
             else:
+                needs_user = True
                 filters.append(or_(u.email.ilike(f"%{user}%"), u.username.ilike(f"%{user}%"), u.name.ilike(f"%{user}%")))
         if q:
+            needs_tool = True
             filters.append(
                 or_(
-                    ts.tool.ilike(f"%{q}%"),
+                    t.slug.ilike(f"%{q}%"),
                     ts.command.ilike(f"%{q}%"),
-                    ts.parameters.cast(str).ilike(f"%{q}%"),
+                    ts.parameters.cast(String).ilike(f"%{q}%"),
                     ts.filename_by_user.ilike(f"%{q}%"),
                 )
             )
+        where = and_(*filters) if filters else literal(True)
 
-        # "Last known location": join to the most recent UserIPLog for that user.
-        sub_last_ip = (
-            select(ul.user_id, func.max(ul.created_at).label("mx"))
-            .group_by(ul.user_id)
-        ).subquery()
-        ul2 = aliased(UserIPLog)
+        sort_map = {
+            "created_at": ts.scanned_at,
+            "scanned_at": ts.scanned_at,
+            "tool": t.slug,
+            "status": ts.scan_success_state,
+            "duration": d.execution_ms,
+            "user": u.username,
+        }
+        col = sort_map.get(sort_field or "scanned_at", ts.scanned_at)
+        keyset = col is ts.scanned_at
+        direction = desc if is_desc else asc
+        order_by = [direction(col), direction(ts.id)]
 
-        base = (
+        page_q = (
             select(
                 ts.id.label("id"),
                 ts.scanned_at.label("scanned_at"),
-                ts.tool.label("tool"),
+                t.slug.label("tool"),
                 ts.parameters.label("parameters"),
                 ts.command.label("command"),
                 ts.scan_success_state.label("success"),
@@ -471,44 +510,42 @@ class ScansRepo(BaseRepo):
                 d.execution_ms.label("execution_ms"),
                 d.status.label("diag_status"),
                 d.error_reason.label("error_reason"),
-                ul2.ip.label("ip"),
-                ul2.geo_city.label("geo_city"),
-                ul2.geo_country.label("geo_country"),
+                loc.ip.label("ip"),
+                loc.geo_city.label("geo_city"),
+                loc.geo_country.label("geo_country"),
             )
             .select_from(ts)
             .join(u, u.id == ts.user_id, isouter=True)
+            .join(t, t.id == ts.tool_id, isouter=True)
             .join(d, d.scan_id == ts.id, isouter=True)
-            .join(sub_last_ip, sub_last_ip.c.user_id == ts.user_id, isouter=True)
-            .join(
-                ul2,
-                and_(ul2.user_id == ts.user_id, ul2.created_at == sub_last_ip.c.mx),
-                isouter=True,
-            )
-            .where(and_(*filters) if filters else literal(True))
+            # "Last known location": one row per user, kept current on UserIPLog insert
+            .join(loc, loc.user_id == ts.user_id, isouter=True)
+            .where(where)
         )
-
-        sort_map = {
-            "created_at": ts.scanned_at,
-            "scanned_at": ts.scanned_at,
-            "tool": ts.tool,
-            "status": ts.scan_success_state,
-            "duration": d.execution_ms,
-            "user": u.username,
-        }
-        col = sort_map.get(sort_field or "scanned_at", ts.scanned_at)
-        order_by = desc(col) if is_desc else asc(col)
-
-        total = int(self.session.execute(select(func.count()).select_from(base.subquery())).scalar() or 0)
-        rows = self.session.execute(base.order_by(order_by).limit(per_page).offset((page - 1) * per_page)).all()
+        if keyset and cursor:
+            at, last_id = decode_cursor(cursor)
+            # row-value comparison: seeks ix_tool_scan_history_scanned_id on Postgres and SQLite
+            key = tuple_(ts.scanned_at, ts.id)
+            page_q = page_q.where(key < tuple_(at, last_id) if is_desc else key > tuple_(at, last_id))
+        elif page > 1:
+            page_q = page_q.offset((page - 1) * per_page)
+        # one extra row tells whether there is a next page without counting
+        rows = self.session.execute(page_q.order_by(*order_by).limit(per_page + 1)).all()
+        more = len(rows) > per_page
+        rows = rows[:per_page]
+        next_cursor = encode_cursor(rows[-1].scanned_at, rows[-1].id) if (keyset and more and rows) else None
+
+        key = (q, tool, status, user, start, end)
+        total = self._cached_total(key, where, u=u if needs_user else None, t=t if needs_tool else None)
 
         items: List[Dict] = []
         for r in rows:
             # derive display target from parameters
             params = r.parameters or {}
             target = None
-            for key in ("target","domain","url","host","ip","file","query"):
-                if key in params and params[key]:
-                    target = str(params[key]); break
+            for k in ("target","domain","url","host","ip","file","query"):
+                if k in params and params[k]:
+                    target = str(params[k]); break
 
             status_str = (
                 (r.diag_status.value if r.diag_status is not None else None)
@@ -531,7 +568,24 @@ class ScansRepo(BaseRepo):
                 },
             })
 
-        return items, total
+        return items, total, next_cursor
+
+    def _cached_total(self, key: tuple, where, *, u=None, t=None) -> int:
+        """count(*) of the filtered scans, joining only what the filters reference."""
+        hit = _TOTAL_CACHE.get(key)
+        if hit is not None and time.monotonic() - hit[0] < _TOTAL_TTL:
+            return hit[1]
+        ts = ToolScanHistory
+        q = select(func.count()).select_from(ts)
+        if u is not None:
+            q = q.join(u, u.id == ts.user_id, isouter=True)
+        if t is not None:
+            q = q.join(t, t.id == ts.tool_id, isouter=True)
+        total = int(self.session.execute(q.where(where)).scalar() or 0)
+        if len(_TOTAL_CACHE) >= _TOTAL_CACHE_MAX:
+            _TOTAL_CACHE.clear()
+        _TOTAL_CACHE[key] = (time.monotonic(), total)
+        return total
 
     def scan_detail(self, scan_id: int) -> Optional[Dict]:
         ts, d, u = ToolScanHistory, ScanDiagnostics, User
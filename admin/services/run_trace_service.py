@@ -0,0 +1,40 @@
+# admin/services/run_trace_service.py
+from __future__ import annotations
+from typing import Any, Dict, List, Optional
+
+from admin.services import BaseService
+from tools.models import WorkflowRun, WorkflowRunStatus
+from tools.tracing import waterfall, to_otlp
+
+
+class RunTraceService(BaseService):
+    """
+    Per-step phase traces for the admin Runs page (waterfall + OTLP/JSON export).
+    """
+
+    def recent_runs(self, limit: int = 50, status: Optional[str] = None) -> List[Dict[str, Any]]:
+        q = self.session.query(WorkflowRun)
+        if status and status.upper() in WorkflowRunStatus.__members__:
+            q = q.filter(WorkflowRun.status == WorkflowRunStatus[status.upper()])
+        rows = q.order_by(WorkflowRun.id.desc()).limit(limit).all()
+        out = []
+        for r in rows:
+            out.append({
+                "id": r.id,
+                "workflow_id": r.workflow_id,
+                "user_id": r.user_id,
+                "status": r.status.name if r.status else None,
+                "total_steps": r.total_steps,
+                "started_at": r.started_at.isoformat() if r.started_at else None,
+                "finished_at": r.finished_at.isoformat() if r.finished_at else None,
+            })
+        return out
+
+    def _run(self, run_id: int) -> WorkflowRun:
+        return self.ensure_found(self.session.get(WorkflowRun, run_id), message="Run not found")
+
+    def waterfall(self, run_id: int) -> Dict[str, Any]:
+        return waterfall(self._run(run_id))
+
+    def otlp(self, run_id: int) -> Dict[str, Any]:
+        return to_otlp([self._run(run_id)])
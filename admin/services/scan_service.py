@@ -244,12 +244,13 @@ class ScanService(BaseService):
         end: Optional[datetime],
         sort_field: str,
         is_desc: bool,
+        cursor: Optional[str] = None,
     ):
         return self.repo.list_scans(
             page=page, per_page=per_page,
             q=q, tool=tool, status=status, user=user,
             start=start, end=end,
-            sort_field=sort_field, is_desc=is_desc,
+            sort_field=sort_field, is_desc=is_desc, cursor=cursor,
         )
 
     def scan_detail(self, scan_id: int) -> Dict[str, Any]:
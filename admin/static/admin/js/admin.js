@@ -102,6 +102,7 @@ async function boot() {
     "/admin/analytics": "analytics",
     "/admin/users": "users",
     "/admin/scans": "scans",
+    "/admin/runs": "runs",
     "/admin/tools": "tools",
     "/admin/blogs": "blogs",
     "/admin/admins": "admins",
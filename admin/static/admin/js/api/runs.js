@@ -0,0 +1,19 @@
+import { getJSON } from "../lib/http.js";
+
+export async function listRuns(params = {}, { signal } = {}) {
+  const u = new URLSearchParams();
+  for (const [k, v] of Object.entries(params || {})) {
+    if (v !== undefined && v !== null && v !== "") u.set(k, v);
+  }
+  return getJSON(`/runs?${u.toString()}`, { signal })
+    .then(r => r.data);
+}
+
+export async function getRunTrace(id, { signal } = {}) {
+  return getJSON(`/runs/${encodeURIComponent(id)}/trace`, { signal })
+    .then(r => r.data);
+}
+
+export function runTraceOtlpUrl(id) {
+  return `/admin/api/runs/${encodeURIComponent(id)}/trace?format=otlp`;
+}
@@ -0,0 +1,119 @@
+import { setHeader, onRefresh } from "../lib/state.js";
+import { el } from "../lib/dom.js";
+import { ago } from "../lib/format.js";
+import { listRuns, getRunTrace, runTraceOtlpUrl } from "../api/runs.js";
+import { makeTable } from "../components/table.js";
+import { toast } from "../components/toast.js";
+
+// one colour per phase (order matches tools.tracing.PHASES)
+const PHASE_COLORS = {
+  advance:        "#6b7280",
+  queue_wait:     "#9ca3af",
+  policy_load:    "#a78bfa",
+  ingest:         "#60a5fa",
+  exec:           "#34d399",
+  stage_artifact: "#fbbf24",
+  persist:        "#f97316",
+  aggregate:      "#f472b6",
+  publish:        "#22d3ee",
+};
+
+function fmtMs(ms) {
+  if (ms == null) return "—";
+  if (ms < 1000) return `${Math.round(ms)} ms`;
+  return `${(ms / 1000).toFixed(2)} s`;
+}
+
+function legend(phases) {
+  return el("div", { class: "trace-legend" },
+    ...phases.map(p => el("span", { class: "trace-legend-item" },
+      el("i", { style: `background:${PHASE_COLORS[p] || "#888"}` }), p)));
+}
+
+function waterfallRows(trace) {
+  const total = Math.max(trace.duration_ms || 0, 1);
+  return trace.steps.map(step => {
+    const lane = el("div", { class: "trace-lane" },
+      ...step.spans.map(sp => {
+        const left = (100 * sp.start_ms) / total;
+        const width = Math.max((100 * sp.duration_ms) / total, 0.2);
+        const label = `${sp.name}: ${fmtMs(sp.duration_ms)}${sp.count ? ` (×${sp.count})` : ""}`;
+        return el("div", {
+          class: "trace-bar",
+          title: label,
+          style: `left:${left}%;width:${width}%;background:${PHASE_COLORS[sp.name] || "#888"}`,
+        });
+      }));
+    return el("div", { class: "trace-row" },
+      el("div", { class: "trace-label" },
+        el("div", {}, `#${step.step_index} ${step.tool || "—"}`),
+        el("div", { class: "user-subtle" }, `${step.status || "—"} · ${fmtMs(step.total_ms)}`)),
+      lane);
+  });
+}
+
+export default function mountRuns(root) {
+  setHeader("Runs", "Per-step phase timings (queue, ingest, exec, persist…)");
+
+  const listCard = el("div", { class: "panel data-card" });
+  const listHeader = el("div", { class: "card-header" },
+    el("div", { class: "card-title" }, "Recent Runs"));
+  const tableShell = el("div", { class: "table-wrap" });
+  listCard.replaceChildren(listHeader, tableShell);
+
+  const traceCard = el("div", { class: "panel data-card" });
+  const traceTitle = el("div", { class: "card-title" }, "Waterfall");
+  const traceActions = el("div", { class: "card-actions" });
+  const traceBody = el("div", { class: "trace-body" }, "Pick a run to see its trace.");
+  traceCard.replaceChildren(el("div", { class: "card-header" }, traceTitle, traceActions), traceBody);
+
+  root.replaceChildren(traceCard, listCard);
+
+  const table = makeTable({
+    className: "data-table",
+    columns: [
+      { key: "id",          label: "Run",      width: "12%" },
+      { key: "workflow_id", label: "Workflow", width: "14%" },
+      { key: "user_id",     label: "User",     width: "14%" },
+      { key: "status",      label: "Status",   width: "20%" },
+      { key: "total_steps", label: "Steps",    width: "10%" },
+      { key: "started_at",  label: "Started",  width: "30%", render: row => row.started_at ? ago(row.started_at) : "—" },
+    ],
+    onRowClick(row) { showTrace(row.id); },
+  });
+  tableShell.replaceChildren(table.el);
+
+  async function loadRuns() {
+    try {
+      table.setRows(await listRuns({ limit: 50 }));
+    } catch (e) {
+      toast?.error?.("Failed to load runs");
+    }
+  }
+
+  async function showTrace(id) {
+    history.replaceState({}, "", `/admin/runs?run=${encodeURIComponent(id)}`);
+    traceTitle.textContent = `Waterfall · run #${id}`;
+    traceActions.replaceChildren(
+      el("a", { class: "admin-button secondary", href: runTraceOtlpUrl(id), download: `run-${id}-otlp.json` }, "Export OTLP/JSON"));
+    traceBody.replaceChildren("Loading…");
+    try {
+      const trace = await getRunTrace(id);
+      if (!trace.steps.some(s => s.spans.length)) {
+        traceBody.replaceChildren("No trace recorded for this run yet.");
+        return;
+      }
+      traceBody.replaceChildren(
+        legend(trace.phases),
+        el("div", { class: "user-subtle" }, `${trace.status} · ${fmtMs(trace.duration_ms)} end to end`),
+        ...waterfallRows(trace));
+    } catch (e) {
+      traceBody.replaceChildren("Failed to load trace.");
+    }
+  }
+
+  loadRuns();
+  const initial = new URLSearchParams(location.search).get("run");
+  if (initial) showTrace(initial);
+  return onRefresh(loadRuns);
+}
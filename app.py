@@ -66,8 +66,6 @@ def create_app():
         EXTERNAL_BASE_URL="https://hackr.gg",
         FEATURE_HELP=os.getenv("FEATURE_HELP", "0") == "1",
 
-        CELERY_QUEUE="tools_default",
-
         SUPPORT_SOLO_MODE=True,
         # Support attachments (Task 8)
         SUPPORT_UPLOAD_DIR=os.environ.get("SUPPORT_UPLOAD_DIR", "./var/support_uploads"),
@@ -133,9 +131,7 @@ def create_app():
     app.config.setdefault('CELERY_BROKER_URL', os.getenv('CELERY_BROKER_URL', 'redis://127.0.0.1:6379/0'))
     app.config.setdefault('CELERY_RESULT_BACKEND', os.getenv('CELERY_RESULT_BACKEND', 'redis://127.0.0.1:6379/1'))
     app.config.setdefault('CELERY_TIMEZONE', os.getenv('CELERY_TIMEZONE', 'UTC'))
-    app.config.setdefault('CELERY_TASK_ROUTES', {
-        'tools.tasks.*': {'queue': 'tools_default'}
-    })
+    # queues and routes live in celery_app (TASK_ROUTES / WORKER_PROFILES)
 
     os.makedirs(app.config['UPLOAD_INPUT_FOLDER'],  exist_ok=True)
     os.makedirs(app.config['UPLOAD_OUTPUT_FOLDER'], exist_ok=True)
@@ -106,5 +106,20 @@ def purge_expired(dry: bool):
         db.session.commit()
         click.echo("Done.")
 
+@auth_bp.cli.command("rebuild-last-location")
+def rebuild_last_location():
+    """
+    Recompute user_last_location from user_ip_logs (run once after creating the
+    table; new logs keep it current on insert).
+    Usage:
+        flask auth rebuild-last-location
+    """
+    from extensions import db
+    from .models import UserLastLocation
+
+    n = UserLastLocation.rebuild(db.session)
+    db.session.commit()
+    click.echo(f"Rebuilt last location for {n} users.")
+
 
 from . import oauth_routes, local_routes
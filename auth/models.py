@@ -6,7 +6,8 @@ from sqlalchemy import Table, Column, Integer, ForeignKey, String, UniqueConstra
 from sqlalchemy.orm import relationship
 from extensions import db, bcrypt
 from sqlalchemy.ext.hybrid import hybrid_property
-from sqlalchemy import exists, select, and_, or_, not_
+from sqlalchemy import exists, select, and_, or_, not_, event
+from sqlalchemy.exc import IntegrityError
 
 utcnow = lambda: datetime.now(timezone.utc)
 
@@ -265,6 +266,58 @@ class UserIPLog(db.Model):
     def __repr__(self):
         return f"<UserIPLog user={self.user_id} ip={self.ip} at={self.created_at:%Y-%m-%d %H:%M:%S}>"
 
+class UserLastLocation(db.Model):
+    """
+    The newest UserIPLog row per user, maintained on insert (below), so listings
+    join one row by primary key instead of aggregating the whole log.
+    Backfill with `flask auth rebuild-last-location`.
+    """
+    __tablename__ = "user_last_location"
+
+    user_id     = db.Column(db.Integer, db.ForeignKey('users.id', ondelete='CASCADE'), primary_key=True)
+    ip          = db.Column(db.String(64), nullable=False)
+    geo_city    = db.Column(db.String(128))
+    geo_country = db.Column(db.String(128))
+    seen_at     = db.Column(db.DateTime(timezone=True), nullable=False)
+
+    @staticmethod
+    def rebuild(session) -> int:
+        """Recompute every row from user_ip_logs; returns the number of users."""
+        ul = UserIPLog
+        newest = (select(ul.user_id, db.func.max(ul.created_at).label("mx"))
+                  .group_by(ul.user_id).subquery())
+        rows = session.execute(
+            select(ul.user_id, ul.ip, ul.geo_city, ul.geo_country, ul.created_at)
+            .join(newest, and_(newest.c.user_id == ul.user_id, newest.c.mx == ul.created_at))
+            .order_by(ul.user_id, ul.id.desc())
+        ).all()
+        latest = {}
+        for r in rows:  # ties on created_at: the highest id wins
+            latest.setdefault(r.user_id, {"user_id": r.user_id, "ip": r.ip, "geo_city": r.geo_city,
+                                          "geo_country": r.geo_country, "seen_at": r.created_at})
+        session.execute(UserLastLocation.__table__.delete())
+        if latest:
+            session.execute(UserLastLocation.__table__.insert(), list(latest.values()))
+        return len(latest)
+
+@event.listens_for(UserIPLog, "after_insert")
+def _ip_log_after_insert(mapper, connection, target: UserIPLog):
+    t = UserLastLocation.__table__
+    seen_at = target.created_at or utcnow()
+    vals = {"ip": target.ip, "geo_city": target.geo_city, "geo_country": target.geo_country, "seen_at": seen_at}
+    res = connection.execute(t.update()
+                             .where(t.c.user_id == target.user_id, t.c.seen_at <= seen_at)
+                             .values(**vals))
+    if res.rowcount:
+        return
+    if connection.execute(select(t.c.user_id).where(t.c.user_id == target.user_id)).first() is not None:
+        return  # the stored location is newer (logs written out of order)
+    try:
+        with connection.begin_nested():
+            connection.execute(t.insert().values(user_id=target.user_id, **vals))
+    except IntegrityError:
+        pass  # a concurrent first log of this user inserted the row
+
 class UserScopeGrant(db.Model, TimestampMixin):
     __tablename__ = "user_scope_grants"
     __table_args__ = (
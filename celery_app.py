@@ -1,6 +1,7 @@
 from celery import Celery
 import os, sys, pathlib, importlib, importlib.util
 from celery.schedules import crontab
+from celery.signals import worker_process_init, worker_process_shutdown
 
 # ── Robust project root locator ───────────────────────────────────────────
 def _find_project_root():
@@ -33,23 +34,30 @@ def _find_project_root():
 
 PROJECT_ROOT = _find_project_root()
 
-# Make sure the root is importable
-if str(PROJECT_ROOT) not in sys.path:
-    sys.path.insert(0, str(PROJECT_ROOT))
+# Make sure the root (and its parent, for sibling imports) is importable — once, at import.
+# Forked pool children inherit sys.path; subprocesses inherit PYTHONPATH.
+for _i, _p in enumerate((str(PROJECT_ROOT), str(PROJECT_ROOT.parent))):
+    if _p not in sys.path:
+        sys.path.insert(_i, _p)
+_pp = [p for p in os.environ.get("PYTHONPATH", "").split(os.pathsep) if p]
+os.environ["PYTHONPATH"] = os.pathsep.join(
+    [str(PROJECT_ROOT), str(PROJECT_ROOT.parent)] + [p for p in _pp if p not in (str(PROJECT_ROOT), str(PROJECT_ROOT.parent))]
+)
 
-# Debug prints so we see exactly what Celery is using
-try:
-    print(">> PROJECT_ROOT =", PROJECT_ROOT)
-    print(">> sys.path[0:3] =", sys.path[0:3])
-    print(">> has app.py?", (PROJECT_ROOT / "app.py").exists())
-    print(">> has auth folder?", (PROJECT_ROOT / "auth").exists())
+# Debug prints so we see exactly what Celery is using (CELERY_DEBUG_PATHS=1)
+if os.getenv("CELERY_DEBUG_PATHS", "0") == "1":
     try:
-        listing = [p.name for p in PROJECT_ROOT.iterdir()]
+        print(">> PROJECT_ROOT =", PROJECT_ROOT)
+        print(">> sys.path[0:3] =", sys.path[0:3])
+        print(">> has app.py?", (PROJECT_ROOT / "app.py").exists())
+        print(">> has auth folder?", (PROJECT_ROOT / "auth").exists())
+        try:
+            listing = [p.name for p in PROJECT_ROOT.iterdir()]
+        except Exception:
+            listing = []
+        print(">> ls(PROJECT_ROOT) =", listing[:20])
     except Exception:
-        listing = []
-    print(">> ls(PROJECT_ROOT) =", listing[:20])
-except Exception:
-    pass
+        pass
 
 # You can override where the factory lives if you ever move it (e.g., wsgi:create_app)
 FLASK_FACTORY = os.getenv("FLASK_FACTORY", "app:create_app")
@@ -101,8 +109,9 @@ celery.conf.update(
     timezone=os.getenv('CELERY_TIMEZONE', 'UTC'),
     enable_utc=True,
     task_ignore_result=False,
-    worker_max_tasks_per_child=100,
     broker_connection_retry_on_startup=True,
+    # children build the Flask app and warm caches in worker_process_init
+    worker_proc_alive_timeout=float(os.getenv("CELERY_PROC_ALIVE_TIMEOUT", "30")),
 )
 celery.conf.beat_schedule = {
     "reconcile-zombies-every-10m": {
@@ -130,41 +139,124 @@ celery.conf.beat_schedule.update({
     },
 })
 
-celery.conf.task_default_queue = "tools_default"
-celery.conf.task_queues = (Queue("tools_default", routing_key="tools_default"),)
-celery.conf.task_default_exchange = "tools_default"
-celery.conf.task_default_routing_key = "tools_default"
-celery.conf.task_routes = {"tools.tasks.*": {"queue": "tools_default"}}
+# ── Queues / worker classes ──────────────────────────────────────────────
+# tools_control : coordination (advance_run, start_run, advance_campaign, reconcile_zombies, promotion).
+#                 Short DB-only tasks; a dedicated pool keeps them in milliseconds
+#                 while scans saturate the other workers.
+# tools_light   : run_step for light tools (passive enum, DNS, probing).
+# tools_heavy   : run_step for heavy tools (port scans, crawlers); one task at a time
+#                 per process, acked after completion so a lost worker re-delivers it.
+# tools_default : everything else (support/account housekeeping, prune_history).
+# A tool's class comes from its '__policy.worker' field (see tools.policies.worker_class).
+QUEUE_CONTROL, QUEUE_LIGHT, QUEUE_HEAVY, QUEUE_DEFAULT = "tools_control", "tools_light", "tools_heavy", "tools_default"
+TOOL_QUEUES = {"light": QUEUE_LIGHT, "heavy": QUEUE_HEAVY}
+ALL_QUEUES = (QUEUE_CONTROL, QUEUE_LIGHT, QUEUE_HEAVY, QUEUE_DEFAULT)
+
+TASK_ROUTES = {
+    "tools.tasks.advance_run": {"queue": QUEUE_CONTROL},
+    "tools.tasks.start_run": {"queue": QUEUE_CONTROL},
+    "tools.tasks.advance_campaign": {"queue": QUEUE_CONTROL},
+    "tools.tasks.reconcile_zombies": {"queue": QUEUE_CONTROL},
+    "tools.tasks.ping": {"queue": QUEUE_CONTROL},
+    "tools.tasks.run_step": {"queue": QUEUE_LIGHT},  # advance_run overrides per tool class
+    "tools.tasks.*": {"queue": QUEUE_DEFAULT},
+}
+
+# Launch profiles (one worker process group per class):
+#
+#   TOOLS_WORKER_PROFILE=control celery -A celery_app.celery worker -n control@%h -Q tools_control -c 4
+#   TOOLS_WORKER_PROFILE=light   celery -A celery_app.celery worker -n light@%h   -Q tools_light,tools_default -c 8
+#   TOOLS_WORKER_PROFILE=heavy   celery -A celery_app.celery worker -n heavy@%h   -Q tools_heavy -c 2
+#
+# Without a profile a single worker consumes every queue (development).
+WORKER_PROFILES = {
+    # never recycled: coordinator processes are cheap and must not restart mid-burst
+    "control": {"prefetch": 4, "acks_late": False, "max_tasks_per_child": None},
+    "light":   {"prefetch": 1, "acks_late": False, "max_tasks_per_child": 200},
+    # one reserved message per process; recycle often to hand back adapter memory
+    "heavy":   {"prefetch": 1, "acks_late": True,  "max_tasks_per_child": 25},
+}
+WORKER_PROFILE = os.getenv("TOOLS_WORKER_PROFILE", "").strip().lower()
+_profile = WORKER_PROFILES.get(WORKER_PROFILE, {"prefetch": 1, "acks_late": False, "max_tasks_per_child": 100})
+
+celery.conf.task_default_queue = QUEUE_DEFAULT
+celery.conf.task_queues = tuple(Queue(q, routing_key=q) for q in ALL_QUEUES)
+celery.conf.task_default_exchange = QUEUE_DEFAULT
+celery.conf.task_default_routing_key = QUEUE_DEFAULT
+celery.conf.task_routes = TASK_ROUTES
+celery.conf.update(
+    worker_prefetch_multiplier=_profile["prefetch"],
+    task_acks_late=_profile["acks_late"],
+    # with acks_late a task killed with its worker goes back to the queue instead of vanishing
+    task_reject_on_worker_lost=_profile["acks_late"],
+    worker_max_tasks_per_child=_profile["max_tasks_per_child"],
+    # unacked (acks_late) messages are re-delivered after this; must exceed the longest step
+    broker_transport_options={"visibility_timeout": int(os.getenv("CELERY_VISIBILITY_TIMEOUT", str(6 * 3600)))},
+)
+
+# ── Flask app context for tasks ──────────────────────────────────────────
+# Each prefork child builds the Flask app once in worker_process_init, warms the
+# adapter registry / policy cache / DB pool, and keeps one app context pushed
+# for its whole life; tasks then only pay for a session cleanup. Outside a
+# prefork child (solo/threads pools, eager calls, beat) the app is built on
+# first use and a context is pushed per call.
+_flask_app = None
+_worker_ctx = None
+
+def get_flask_app():
+    global _flask_app
+    if _flask_app is None:
+        _flask_app = _load_flask_app()
+    return _flask_app
+
+def _warm(app) -> None:
+    from extensions import db
+    from tools.models import Tool
+    from tools.policies import get_effective_policy
+    from tools.alltools.registry import warm
+    with db.engine.connect():
+        pass  # first pooled connection
+    slugs = [t.slug for t in Tool.query.filter_by(enabled=True).all()]
+    warm(slugs)
+    for slug in slugs:
+        get_effective_policy(slug)
+    db.session.remove()
+
+@worker_process_init.connect
+def _init_worker_process(**_):
+    global _worker_ctx
+    app = get_flask_app()
+    _worker_ctx = app.app_context()
+    _worker_ctx.push()
+    try:
+        _warm(app)
+    except Exception as e:  # a cold cache is slower, not broken
+        print(">> worker warm-up failed:", repr(e))
+
+@worker_process_shutdown.connect
+def _shutdown_worker_process(**_):
+    global _worker_ctx
+    if _worker_ctx is not None:
+        try:
+            _worker_ctx.pop()
+        except Exception:
+            pass
+        _worker_ctx = None
 
 # Ensure every Celery task runs inside Flask app context
 class AppContextTask(celery.Task):
-    _flask_app = None
-
     def __call__(self, *args, **kwargs):
-        # 🔧 FORCE the project root into sys.path at runtime (child process safe)
-        try:
-            before = sys.path[:3]
-            if str(PROJECT_ROOT) not in sys.path:
-                sys.path.insert(0, str(PROJECT_ROOT))
-            # (optional but helpful) also add parent in case you import siblings
-            if str(PROJECT_ROOT.parent) not in sys.path:
-                sys.path.insert(1, str(PROJECT_ROOT.parent))
-            # keep env in sync for any sub-processes the task may spawn
-            os.environ["PYTHONPATH"] = os.pathsep.join(
-                [str(PROJECT_ROOT), str(PROJECT_ROOT.parent), os.environ.get("PYTHONPATH", "")]
-            )
-            importlib.invalidate_caches()
-            after = sys.path[:3]
-            print(">> sys.path before:", before)
-            print(">> sys.path after:",  after)
-        except Exception as e:
-            print(">> sys.path inject error:", repr(e))
-
-        if self._flask_app is None:
-            # This now succeeds because 'app' and its imports ('auth', 'tools', …) are resolvable
-            self._flask_app = _load_flask_app()
-
-        with self._flask_app.app_context():
+        # the process-wide context is only visible on the thread that pushed it;
+        # threaded pools and tasks run from helper threads need their own
+        from flask import has_app_context
+        if _worker_ctx is not None and has_app_context():
+            try:
+                return self.run(*args, **kwargs)
+            finally:
+                # what popping a per-task context used to do: no session leaks into the next task
+                from extensions import db
+                db.session.remove()
+        with get_flask_app().app_context():
             return self.run(*args, **kwargs)
 
 
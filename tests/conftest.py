@@ -0,0 +1,28 @@
+import os, sys, tempfile
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+_DB = os.path.join(tempfile.mkdtemp(prefix="tools_tests_"), "app.db")
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{_DB}")
+
+
+@pytest.fixture(scope="session")
+def app():
+    import app as app_mod
+    flask_app = app_mod.create_app()
+    flask_app.config.update(TESTING=True, ARTIFACTS_DIR=os.path.join(os.path.dirname(_DB), "artifacts"))
+    return flask_app
+
+
+@pytest.fixture
+def db(app):
+    from extensions import db as _db
+    from tools import runner
+    with app.app_context():
+        _db.create_all()
+        runner._PLANS.clear()
+        yield _db
+        _db.session.remove()
+        _db.drop_all()
@@ -0,0 +1,44 @@
+from tools import campaigns
+from tools.models import CampaignStatus, Tool, WorkflowDefinition
+
+SEEDS = [f"s{i}.test" for i in range(10)]
+
+
+def _workflow(db, slug="subfinder"):
+    db.session.add(Tool(slug="subfinder", name="subfinder", enabled=True))
+    wf = WorkflowDefinition(title="wf", version=1,
+                            graph_json={"nodes": [{"id": "a", "tool_slug": slug, "config": {}}], "edges": []})
+    db.session.add(wf); db.session.commit()
+    return wf
+
+def _quota(used):
+    return lambda kind, user_id, limit: (used < limit, used)
+
+
+def test_run_quota_holds_campaign_and_says_why(db, monkeypatch):
+    monkeypatch.setattr(campaigns, "quota_allowed", _quota(campaigns.DEFAULT_CAMPAIGN_RUN_QUOTA - 2))
+    camp = campaigns.create_campaign(_workflow(db), 1, SEEDS, concurrency=5)
+    assert len(campaigns.fill_campaign(camp.id)) == 2
+    out = campaigns.serialize_campaign(camp, progress=False)
+    assert out["status"] == "RUNNING"
+    assert out["waiting_reason"] == campaigns.WAITING_RUN_QUOTA
+
+def test_user_cap_holds_campaign_and_says_why(db, monkeypatch):
+    monkeypatch.setattr(campaigns, "quota_allowed", _quota(0))
+    monkeypatch.setattr(campaigns, "CAMPAIGN_MAX_ACTIVE_PER_USER", 3)
+    wf = _workflow(db)
+    first = campaigns.create_campaign(wf, 1, SEEDS, concurrency=2)
+    second = campaigns.create_campaign(wf, 1, SEEDS, concurrency=2)
+    assert len(campaigns.fill_campaign(first.id)) == 2
+    assert campaigns.serialize_campaign(first, progress=False)["waiting_reason"] is None
+    assert len(campaigns.fill_campaign(second.id)) == 1
+    assert campaigns.serialize_campaign(second, progress=False)["waiting_reason"] == campaigns.WAITING_USER_CAP
+
+def test_invalid_plan_pauses_with_reason(db, monkeypatch):
+    monkeypatch.setattr(campaigns, "quota_allowed", _quota(0))
+    camp = campaigns.create_campaign(_workflow(db, slug="missing"), 1, SEEDS, concurrency=2)
+    assert campaigns.fill_campaign(camp.id) == []
+    out = campaigns.serialize_campaign(camp, progress=False)
+    assert out["status"] == "PAUSED"
+    assert out["paused_reason"].startswith(campaigns.PAUSED_PLAN_INVALID + ": step 1 (missing)")
+    assert out["waiting_reason"] is None
@@ -0,0 +1,27 @@
+from tools.alltools.tools._common import read_targets
+from tools.chunking import split
+
+
+def test_batches_hold_size_targets_over_all_buckets():
+    typed = {"domains": [f"d{i}.test" for i in range(100)], "hosts": [f"h{i}.test" for i in range(100)]}
+    batches = split(typed, 50)
+    assert len(batches) == 4
+    for b in batches:
+        # what the adapter keeps after merging its buckets under its own cap
+        kept, _ = read_targets(b, accept_keys=("urls", "hosts", "domains"), cap=50)
+        assert len(kept) == sum(len(v) for v in b.values()) == 50
+
+def test_every_target_lands_in_exactly_one_batch():
+    typed = {"urls": [f"https://u{i}.test/" for i in range(37)],
+             "hosts": [f"h{i}.test" for i in range(20)] + ["shared.test"],
+             "domains": [f"d{i}.test" for i in range(64)] + ["shared.test", "d0.test"]}
+    batches = split(typed, 25)
+    flat = [v for b in batches for vals in b.values() for v in vals]
+    expected = list(dict.fromkeys(v for vals in typed.values() for v in vals))
+    assert flat == expected
+    assert all(sum(len(v) for v in b.values()) <= 25 for b in batches)
+    # a repeat keeps the bucket it was first seen in
+    assert [k for b in batches for k, vals in b.items() if "shared.test" in vals] == ["hosts"]
+
+def test_empty_input_has_no_batches():
+    assert split({"domains": [], "hosts": []}, 10) == []
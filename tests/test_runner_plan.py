@@ -0,0 +1,59 @@
+import pytest
+
+from tools.models import Tool, ToolConfigField, ToolConfigFieldType, WorkflowDefinition, WorkflowRunStep
+from tools import runner
+
+# the editor's default node config
+EMPTY = {"input_method": "manual", "value": ""}
+
+
+def _tool(db, slug):
+    t = Tool(slug=slug, name=slug, enabled=True)
+    db.session.add(t); db.session.flush()
+    db.session.add(ToolConfigField(tool_id=t.id, name="input_method", label="Input Source",
+                                   type=ToolConfigFieldType.SELECT, default="manual",
+                                   choices=[{"value": "manual"}, {"value": "file"}]))
+    db.session.add(ToolConfigField(tool_id=t.id, name="value", label="Value / Domain",
+                                   type=ToolConfigFieldType.STRING))
+    db.session.add(ToolConfigField(tool_id=t.id, name="threads", label="Threads",
+                                   type=ToolConfigFieldType.INTEGER, default=5))
+    return t
+
+def _workflow(db, *nodes):
+    graph = {"nodes": [{"id": f"n{i}", "tool_slug": slug, "config": dict(cfg)} for i, (slug, cfg) in enumerate(nodes)],
+             "edges": [{"from": f"n{i}", "to": f"n{i + 1}"} for i in range(len(nodes) - 1)]}
+    wf = WorkflowDefinition(title="wf", graph_json=graph, version=1)
+    db.session.add(wf); db.session.commit()
+    return wf
+
+
+def test_chain_downstream_step_takes_input_from_upstream(db):
+    _tool(db, "subfinder"); _tool(db, "dnsx")
+    wf = _workflow(db, ("subfinder", {"input_method": "manual", "value": "example.com"}), ("dnsx", EMPTY))
+    run = runner.create_run_from_definition(wf.id, None)
+    assert WorkflowRunStep.query.filter_by(run_id=run.id).count() == 2
+
+def test_first_step_without_input_is_rejected(db):
+    _tool(db, "subfinder"); _tool(db, "dnsx")
+    wf = _workflow(db, ("subfinder", EMPTY), ("dnsx", EMPTY))
+    with pytest.raises(runner.PlanError) as e:
+        runner.create_run_from_definition(wf.id, None)
+    assert e.value.errors == ["step 1 (subfinder): Provide a value or choose File input"]
+
+def test_schema_errors_still_reject_downstream_steps(db):
+    _tool(db, "subfinder"); _tool(db, "dnsx")
+    wf = _workflow(db, ("subfinder", {"value": "example.com"}), ("dnsx", {**EMPTY, "threads": "x"}),
+                   ("nope", EMPTY))
+    with pytest.raises(runner.PlanError) as e:
+        runner.create_run_from_definition(wf.id, None)
+    assert e.value.errors == ["step 2 (dnsx): 'Threads' must be a integer",
+                              "step 3 (nope): tool disabled or missing"]
+
+def test_campaign_seed_replaces_empty_first_step(db):
+    _tool(db, "subfinder")
+    wf = _workflow(db, ("subfinder", EMPTY))
+    runs = runner.create_runs_for_seeds(wf, None, ["a.com", "b.com"])
+    db.session.commit()
+    assert [r.seed for r in runs] == ["a.com", "b.com"]
+    step = WorkflowRunStep.query.filter_by(run_id=runs[0].id).one()
+    assert step.input_manifest["value"] == "a.com"
@@ -38,6 +38,7 @@ def seed_tools():
         # Recon
         {"slug":"subfinder",         "name":"subfinder",         "type":"recon",     "time":"~30s", "desc":"Passive subdomain discovery",        "cat":"recon"},
         {"slug":"dnsx",              "name":"dnsx",              "type":"recon",     "time":"~10s", "desc":"DNS probe & resolve",                 "cat":"recon"},
+        {"slug":"dnsx-native",       "name":"dnsx (native)",     "type":"recon",     "time":"~5s",  "desc":"In-process DNS resolve (no binary)",   "cat":"recon"},
         {"slug":"httpx",             "name":"httpx",             "type":"recon",     "time":"~15s", "desc":"Probe web services",                  "cat":"recon"},
         {"slug":"gau",               "name":"gau",               "type":"recon",     "time":"~20s", "desc":"Fetch archived URLs",                  "cat":"recon"},
         {"slug":"gospider",          "name":"gospider",          "type":"recon",     "time":"~40s", "desc":"Fast web spidering",                   "cat":"recon"},
@@ -187,6 +188,7 @@ def seed_settings():
     set_setting("MAX_UPLOAD_BYTES", 2_000_000)   # 2 MB
     set_setting("DAILY_SCAN_QUOTA", 200)
     set_setting("DAILY_RUN_QUOTA", 50)
+    set_setting("DAILY_CAMPAIGN_RUN_QUOTA", 2000)  # runs created by campaigns (tools.campaigns)
     set_setting("SCAN_RATE_LIMIT", "5/minute")
     set_setting("RUN_RATE_LIMIT", "10/minute")  # used if you DB-drive runs limiter
     set_setting("UPLOAD_RETENTION_DAYS", 7)
@@ -226,4 +228,87 @@ def cleanup_uploads(days: int | None):
                 pass
     click.echo(f"Removed {removed} old upload(s) (> {days} days)")
 
+def _slim_with_policy_ref(params: dict) -> dict:
+    """Old rows embed the whole _policy; snapshot it so the slim form can reference an id."""
+    from .manifests import slim_parameters, is_slim
+    from .policies import snapshot_policy_id
+    if not isinstance(params, dict) or is_slim(params):
+        return params
+    pol = params.get("_policy")
+    if isinstance(pol, dict) and pol and not params.get("_policy_id"):
+        params = {**params, "_policy_id": snapshot_policy_id(params.get("tool_slug") or "", pol)}
+    return slim_parameters(params)
+
+@tools_bp.cli.command("slim-manifests")
+@click.option("--batch", type=int, default=500, help="Rows per transaction")
+@click.option("--dry-run", is_flag=True, help="Report reclaimable bytes without writing")
+def slim_manifests(batch: int, dry_run: bool):
+    """Backfill ToolScanHistory.parameters and step output manifests to the slim schema."""
+    from .models import ToolScanHistory, WorkflowRunStep
+    from .manifests import json_size, is_slim
+
+    def _walk(model, get, put):
+        last_id, rows_changed, before, after = 0, 0, 0, 0
+        while True:
+            rows = (model.query.filter(model.id > last_id)
+                    .order_by(model.id.asc()).limit(batch).all())
+            if not rows:
+                break
+            for row in rows:
+                last_id = row.id
+                cur = get(row)
+                if not isinstance(cur, dict) or is_slim(cur):
+                    continue
+                new = _slim_with_policy_ref(cur)
+                before += json_size(cur); after += json_size(new)
+                rows_changed += 1
+                if not dry_run:
+                    put(row, new)
+            if dry_run:
+                db.session.rollback()
+            else:
+                db.session.commit()
+            db.session.expunge_all()
+        return rows_changed, before, after
+
+    def _put_scan(row, new):
+        row.parameters = new
+
+    def _get_step(row):
+        return (row.output_manifest or {}).get("parameters") if isinstance(row.output_manifest, dict) else None
+
+    def _put_step(row, new):
+        row.output_manifest = {**row.output_manifest, "parameters": new}
+
+    for label, model, get, put in (
+        ("tool_scan_history.parameters", ToolScanHistory, lambda r: r.parameters, _put_scan),
+        ("workflow_run_steps.output_manifest.parameters", WorkflowRunStep, _get_step, _put_step),
+    ):
+        n, b, a = _walk(model, get, put)
+        verb = "would rewrite" if dry_run else "rewrote"
+        click.echo(f"{label}: {verb} {n} row(s), {b} -> {a} bytes ({b - a} reclaimed)")
+
+@tools_bp.cli.command("manifest-sizes")
+@click.option("--limit", type=int, default=0, help="Only sample the newest N rows per table (0 = all)")
+def manifest_sizes(limit: int):
+    """Print power-of-two size histograms of stored manifests (run before/after slim-manifests)."""
+    from .models import ToolScanHistory, WorkflowRunStep
+    from .manifests import json_size, size_histogram
+
+    def _report(label, query, get):
+        if limit:
+            query = query.limit(limit)
+        sizes = [json_size(get(r)) for r in query.yield_per(500)]
+        total = sum(sizes)
+        click.echo(f"{label}: rows={len(sizes)} total={total}B avg={(total // len(sizes)) if sizes else 0}B")
+        for ub, cnt in size_histogram(sizes):
+            click.echo(f"  <= {ub:>10}B  {cnt:>8}  {'#' * min(60, cnt)}")
+
+    _report("tool_scan_history.parameters",
+            ToolScanHistory.query.order_by(ToolScanHistory.id.desc()),
+            lambda r: r.parameters)
+    _report("workflow_run_steps.output_manifest",
+            WorkflowRunStep.query.order_by(WorkflowRunStep.id.desc()),
+            lambda r: r.output_manifest)
+
 from . import routes
\ No newline at end of file
@@ -1,15 +1,10 @@
 from __future__ import annotations
-import os, re, time, tempfile
+import os, time, tempfile
 from pathlib import Path
 from typing import Dict, List, Iterable
 
-# Simple validators for classifying lines
-URL_RE    = re.compile(r'(?i)^(?:https?://)[^\s]+$')
-IPV4_RE   = re.compile(r'^(?:\d{1,3}\.){3}\d{1,3}$')
-DOMAIN_RE = re.compile(
-    r'^(?=.{1,253}$)(?!-)(?:[A-Za-z0-9-]{1,63}\.)+[A-Za-z]{2,63}\.?$'
-)
-PORT_RE   = re.compile(r'^(.+?):(\d{1,5})$')  # host:port
+from tools.manifests import slim_parameters
+from tools.utils.line_classifier import classify, kind_of, url_path
 
 def _uniq(seq: Iterable[str]) -> List[str]:
     seen, out = set(), []
@@ -35,47 +30,31 @@ def write_lines(work_dir: str, slug: str, kind: str, lines: Iterable[str]) -> st
     return str(path)
 
 def split_typed(lines: Iterable[str]) -> Dict[str, List[str]]:
-    """Classify generic CLI line outputs into typed buckets."""
-    urls, ips, domains, hosts, ports, endpoints = [], [], [], [], [], []
-    for raw in lines:
-        s = raw.strip()
-        if not s:
-            continue
-        if URL_RE.match(s):
-            urls.append(s)
-            # attempt to derive endpoint path
-            try:
-                if '/' in s[8:]:
-                    endpoints.append("/" + s.split('://', 1)[1].split('/', 1)[1])
-            except Exception:
-                pass
-            continue
-        if PORT_RE.match(s):
-            ports.append(s)
-            host = s.split(':', 1)[0]
-            if IPV4_RE.match(host) or DOMAIN_RE.match(host):
-                hosts.append(host)
-            continue
-        if IPV4_RE.match(s):
-            ips.append(s)
-            hosts.append(s)
-            continue
-        if DOMAIN_RE.match(s):
+    """Classify generic CLI line outputs into typed buckets (tools.utils.line_classifier), input order kept."""
+    out = {k: [] for k in ("urls", "ips", "domains", "hosts", "ports", "endpoints")}
+    urls, ips, domains, hosts, ports, endpoints = (out[k].append for k in out)
+    for kind, s in classify(lines):
+        if kind == "url":
+            urls(s)
+            p = url_path(s)
+            if p:
+                endpoints(p)
+        elif kind in ("ipv4", "ipv6"):
+            ips(s); hosts(s)
+        elif kind == "domain":
             d = s.lower()
-            domains.append(d)
-            hosts.append(d)
-            continue
-        if s.startswith('/'):
-            endpoints.append(s)
-
-    return {
-        "urls": _uniq(urls),
-        "ips": _uniq(ips),
-        "domains": _uniq(domains),
-        "hosts": _uniq(hosts),
-        "ports": _uniq(ports),
-        "endpoints": _uniq(endpoints),
-    }
+            domains(d); hosts(d)
+        elif kind == "hostport":
+            ports(s)
+            # the host of a host:port line counts as a host when it is an ip or a domain
+            h = s.rsplit(":", 1)[0]
+            if h.startswith("["):
+                hosts(h[1:-1])
+            elif kind_of(h) in ("ipv4", "domain"):
+                hosts(h.lower())
+        elif kind == "path":
+            endpoints(s)
+    return {k: list(dict.fromkeys(v)) for k, v in out.items()}
 
 def finalize_manifest(
     *, slug: str, options: Dict, command_str: str, started_at: float, stdout: str,
@@ -109,7 +88,7 @@ def finalize_manifest(
         "message": "Scan completed successfully.",
         "output": stdout,
         "command": command_str,
-        "parameters": {k: v for k, v in (options or {}).items() if k != "work_dir"},
+        "parameters": slim_parameters(options),
         "execution_ms": exec_ms,
         "output_file": output_file,
     }
@@ -0,0 +1,294 @@
+# tools/alltools/engines/dns_resolve.py
+"""
+In-process async DNS resolver (dnsx-style) speaking plain UDP DNS.
+
+- batched A/AAAA queries over one socket per upstream resolver
+- configurable resolver list, per-query timeout and retries (rotating resolvers)
+- TTL-respecting answer cache shared by every step/run in the worker process
+- wildcard detection per parent zone (random-label probe), cached as well
+"""
+from __future__ import annotations
+import asyncio, ipaddress, os, random, secrets, struct, time
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Optional, Tuple
+
+QTYPE_A, QTYPE_CNAME, QTYPE_AAAA = 1, 5, 28
+RCODE_NOERROR, RCODE_NXDOMAIN = 0, 3
+DEFAULT_RESOLVERS = ("1.1.1.1", "8.8.8.8")
+NEGATIVE_TTL = 60
+CACHE_MAX_ENTRIES = 200_000
+
+
+# ---------- wire format ----------
+
+def build_query(qid: int, name: str, qtype: int) -> bytes:
+    header = struct.pack("!HHHHHH", qid, 0x0100, 1, 0, 0, 0)  # RD=1
+    qname = b"".join(bytes([len(l)]) + l for l in (p.encode("idna") for p in name.strip(".").split(".") if p)) + b"\x00"
+    return header + qname + struct.pack("!HH", qtype, 1)
+
+def _read_name(buf: bytes, off: int) -> Tuple[str, int]:
+    labels, jumped, end, hops = [], False, off, 0
+    while True:
+        if off >= len(buf):
+            raise ValueError("truncated name")
+        ln = buf[off]
+        if ln & 0xC0 == 0xC0:
+            ptr = ((ln & 0x3F) << 8) | buf[off + 1]
+            if not jumped:
+                end = off + 2
+            off, jumped, hops = ptr, True, hops + 1
+            if hops > 32:
+                raise ValueError("compression loop")
+            continue
+        if ln == 0:
+            if not jumped:
+                end = off + 1
+            return ".".join(labels), end
+        labels.append(buf[off + 1: off + 1 + ln].decode("ascii", "ignore"))
+        off += 1 + ln
+
+def parse_response(buf: bytes) -> Tuple[int, int, List[Tuple[int, str, int]]]:
+    """-> (qid, rcode, [(rtype, value, ttl), ...]) for A/AAAA/CNAME answers."""
+    qid, flags, qd, an, _, _ = struct.unpack("!HHHHHH", buf[:12])
+    off = 12
+    for _ in range(qd):
+        _, off = _read_name(buf, off)
+        off += 4
+    answers: List[Tuple[int, str, int]] = []
+    for _ in range(an):
+        _, off = _read_name(buf, off)
+        rtype, _, ttl, rdlen = struct.unpack("!HHIH", buf[off: off + 10])
+        off += 10
+        rdata = buf[off: off + rdlen]
+        if rtype == QTYPE_A and rdlen == 4:
+            answers.append((rtype, str(ipaddress.IPv4Address(rdata)), ttl))
+        elif rtype == QTYPE_AAAA and rdlen == 16:
+            answers.append((rtype, str(ipaddress.IPv6Address(rdata)), ttl))
+        elif rtype == QTYPE_CNAME:
+            answers.append((rtype, _read_name(buf, off)[0], ttl))
+        off += rdlen
+    return qid, flags & 0x000F, answers
+
+
+# ---------- shared caches ----------
+
+class TTLCache:
+    """Process-wide answer cache; entries expire at their record TTL."""
+
+    def __init__(self, max_entries: int = CACHE_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._d: Dict[Tuple[str, int], Tuple[float, int, list]] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, name: str, qtype: int):
+        k = (name, qtype)
+        v = self._d.get(k)
+        if v is None or v[0] < time.monotonic():
+            if v is not None:
+                self._d.pop(k, None)
+            self.misses += 1
+            return None
+        self.hits += 1
+        return v[1], v[2]
+
+    def put(self, name: str, qtype: int, rcode: int, answers: list) -> None:
+        ttl = min((a[2] for a in answers), default=NEGATIVE_TTL) if answers else NEGATIVE_TTL
+        if ttl <= 0:
+            return
+        if len(self._d) >= self.max_entries:
+            self._d.pop(next(iter(self._d)))
+        self._d[(name, qtype)] = (time.monotonic() + ttl, rcode, answers)
+
+    def clear(self) -> None:
+        self._d.clear()
+        self.hits = self.misses = 0
+
+ANSWER_CACHE = TTLCache()
+WILDCARD_CACHE: Dict[str, Tuple[float, frozenset]] = {}  # parent zone -> (expires, wildcard IPs)
+
+
+# ---------- transport ----------
+
+class _UdpClient(asyncio.DatagramProtocol):
+    def __init__(self):
+        self.transport = None
+        self.pending: Dict[int, asyncio.Future] = {}
+
+    def connection_made(self, transport):
+        self.transport = transport
+
+    def datagram_received(self, data, addr):
+        if len(data) < 12:
+            return
+        fut = self.pending.pop(struct.unpack("!H", data[:2])[0], None)
+        if fut and not fut.done():
+            fut.set_result(data)
+
+    def error_received(self, exc):
+        pass
+
+    def new_id(self) -> int:
+        while True:
+            qid = random.getrandbits(16)
+            if qid not in self.pending:
+                return qid
+
+
+def parse_resolvers(spec) -> List[Tuple[str, int]]:
+    if not spec:
+        spec = os.environ.get("DNS_RESOLVERS") or _system_resolvers() or ",".join(DEFAULT_RESOLVERS)
+    items = spec if isinstance(spec, (list, tuple)) else str(spec).replace(";", ",").split(",")
+    out: List[Tuple[str, int]] = []
+    for it in items:
+        it = str(it).strip()
+        if not it:
+            continue
+        host, _, port = it.rpartition(":") if it.count(":") == 1 else (it, "", "")
+        out.append((host or it, int(port) if port.isdigit() else 53))
+    return out
+
+def _system_resolvers() -> str:
+    try:
+        with open("/etc/resolv.conf", "r", encoding="utf-8") as fh:
+            ns = [ln.split()[1] for ln in fh if ln.startswith("nameserver") and len(ln.split()) > 1]
+        return ",".join(n for n in ns if ":" not in n)  # v4 only here
+    except Exception:
+        return ""
+
+
+@dataclass
+class DnsRecord:
+    name: str
+    a: List[str] = field(default_factory=list)
+    aaaa: List[str] = field(default_factory=list)
+    cname: List[str] = field(default_factory=list)
+    rcode: Optional[int] = None
+    wildcard: bool = False
+    error: Optional[str] = None
+
+    @property
+    def resolved(self) -> bool:
+        return bool(self.a or self.aaaa)
+
+    def to_dict(self) -> dict:
+        d = {"name": self.name}
+        for k in ("a", "aaaa", "cname"):
+            if getattr(self, k):
+                d[k] = getattr(self, k)
+        if self.wildcard:
+            d["wildcard"] = True
+        if self.error:
+            d["error"] = self.error
+        return d
+
+
+class AsyncResolver:
+    def __init__(self, resolvers=None, *, timeout_s: float = 2.0, retries: int = 2,
+                 concurrency: int = 500, wildcard_filter: bool = True,
+                 cache: Optional[TTLCache] = None):
+        self.resolvers = parse_resolvers(resolvers)
+        self.timeout_s = timeout_s
+        self.retries = max(0, retries)
+        self.sem = asyncio.Semaphore(max(1, concurrency))
+        self.wildcard_filter = wildcard_filter
+        self.cache = cache if cache is not None else ANSWER_CACHE
+        self._clients: List[_UdpClient] = []
+        self._rr = 0
+        self._wc_inflight: Dict[str, asyncio.Future] = {}
+        self.sent = 0
+
+    async def open(self):
+        loop = asyncio.get_running_loop()
+        for host, port in self.resolvers:
+            _, proto = await loop.create_datagram_endpoint(_UdpClient, remote_addr=(host, port))
+            self._clients.append(proto)
+
+    def close(self):
+        for c in self._clients:
+            if c.transport:
+                c.transport.close()
+        self._clients.clear()
+
+    async def query(self, name: str, qtype: int) -> Tuple[int, list]:
+        cached = self.cache.get(name, qtype)
+        if cached is not None:
+            return cached
+        last_err: Optional[Exception] = None
+        async with self.sem:
+            for _ in range(self.retries + 1):
+                client = self._clients[self._rr % len(self._clients)]
+                self._rr += 1
+                qid = client.new_id()
+                fut = asyncio.get_running_loop().create_future()
+                client.pending[qid] = fut
+                client.transport.sendto(build_query(qid, name, qtype))
+                self.sent += 1
+                try:
+                    data = await asyncio.wait_for(fut, self.timeout_s)
+                    _, rcode, answers = parse_response(data)
+                    self.cache.put(name, qtype, rcode, answers)
+                    return rcode, answers
+                except (asyncio.TimeoutError, ValueError, struct.error) as e:
+                    client.pending.pop(qid, None)
+                    last_err = e
+        raise TimeoutError(f"no answer for {name} ({type(last_err).__name__})")
+
+    async def _wildcard_ips(self, parent: str) -> frozenset:
+        hit = WILDCARD_CACHE.get(parent)
+        if hit and hit[0] > time.monotonic():
+            return hit[1]
+        # one probe per parent zone even when many siblings resolve at once
+        task = self._wc_inflight.get(parent)
+        if task is None:
+            task = self._wc_inflight[parent] = asyncio.ensure_future(self._probe_wildcard(parent))
+            task.add_done_callback(lambda _t: self._wc_inflight.pop(parent, None))
+        return await asyncio.shield(task)
+
+    async def _probe_wildcard(self, parent: str) -> frozenset:
+        probe = f"{secrets.token_hex(6)}.{parent}"
+        try:
+            _, answers = await self.query(probe, QTYPE_A)
+        except TimeoutError:
+            answers = []
+        ips = frozenset(v for t, v, _ in answers if t == QTYPE_A)
+        ttl = min((a[2] for a in answers), default=NEGATIVE_TTL) if answers else NEGATIVE_TTL
+        WILDCARD_CACHE[parent] = (time.monotonic() + max(ttl, 1), ips)
+        return ips
+
+    async def resolve(self, name: str) -> DnsRecord:
+        name = name.strip().rstrip(".").lower()
+        rec = DnsRecord(name=name)
+        try:
+            (rc4, ans4), (rc6, ans6) = await asyncio.gather(self.query(name, QTYPE_A), self.query(name, QTYPE_AAAA))
+        except TimeoutError as e:
+            rec.error = str(e)
+            return rec
+        rec.rcode = rc4 if rc4 != RCODE_NOERROR else rc6
+        for t, v, _ in ans4 + ans6:
+            bucket = rec.a if t == QTYPE_A else rec.aaaa if t == QTYPE_AAAA else rec.cname
+            if v not in bucket:
+                bucket.append(v)
+        if self.wildcard_filter and rec.a and name.count(".") >= 2:
+            wc = await self._wildcard_ips(name.split(".", 1)[1])
+            rec.wildcard = bool(wc) and set(rec.a) <= wc
+        return rec
+
+    async def resolve_many(self, names: Iterable[str]) -> List[DnsRecord]:
+        if not self._clients:
+            await self.open()
+        try:
+            return await asyncio.gather(*(self.resolve(n) for n in names))
+        finally:
+            self.close()
+
+
+def resolve(names: Iterable[str], **kw) -> List[DnsRecord]:
+    """Synchronous entry point for adapters."""
+    names = [n for n in (names or []) if (n or "").strip()]
+    if not names:
+        return []
+
+    async def _go():
+        return await AsyncResolver(**kw).resolve_many(names)
+    return asyncio.run(_go())
@@ -0,0 +1,294 @@
+# tools/alltools/engines/http_probe.py
+"""
+In-process HTTP liveness prober (httpx-style) built on asyncio streams.
+
+- keep-alive connection pool per (scheme, host, port)
+- global + per-host concurrency limits
+- HEAD first, GET fallback (405/501/odd replies) or when a title is wanted
+- extracts status, title, content-length, server, content-type
+
+No third-party HTTP client: stays usable on workers without the
+ProjectDiscovery binary and without extra wheels.
+"""
+from __future__ import annotations
+import asyncio, re, ssl, time
+from dataclasses import dataclass, asdict, field
+from typing import Dict, Iterable, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+TITLE_RE = re.compile(rb"<title[^>]*>(.*?)</title>", re.IGNORECASE | re.DOTALL)
+HEAD_FALLBACK_STATUSES = {400, 403, 405, 501}
+MAX_HEADER_BYTES = 64 * 1024
+USER_AGENT = "hackr-probe/1.0"
+
+@dataclass
+class ProbeResult:
+    url: str
+    status: Optional[int] = None
+    title: Optional[str] = None
+    content_length: Optional[int] = None
+    content_type: Optional[str] = None
+    server: Optional[str] = None
+    location: Optional[str] = None
+    method: str = "HEAD"
+    elapsed_ms: int = 0
+    error: Optional[str] = None
+
+    @property
+    def alive(self) -> bool:
+        return self.status is not None
+
+    def to_dict(self) -> dict:
+        return {k: v for k, v in asdict(self).items() if v is not None}
+
+@dataclass
+class _Conn:
+    reader: asyncio.StreamReader
+    writer: asyncio.StreamWriter
+
+@dataclass
+class _Origin:
+    scheme: str
+    host: str
+    port: int
+    idle: List[_Conn] = field(default_factory=list)
+
+    @property
+    def key(self) -> Tuple[str, str, int]:
+        return (self.scheme, self.host, self.port)
+
+
+class ConnectionPool:
+    """Tiny keep-alive pool; connections are only reused after a fully-read response."""
+
+    def __init__(self, *, connect_timeout: float, resolve: Optional[Dict[str, str]] = None,
+                 max_idle_per_origin: int = 4):
+        self.connect_timeout = connect_timeout
+        self.resolve = resolve or {}
+        self.max_idle = max_idle_per_origin
+        self._origins: Dict[Tuple[str, str, int], _Origin] = {}
+        self._ssl = ssl.create_default_context()
+        self._ssl.check_hostname = False
+        self._ssl.verify_mode = ssl.CERT_NONE
+        self.opened = 0
+        self.reused = 0
+
+    def _origin(self, scheme: str, host: str, port: int) -> _Origin:
+        k = (scheme, host, port)
+        o = self._origins.get(k)
+        if o is None:
+            o = self._origins[k] = _Origin(scheme, host, port)
+        return o
+
+    async def acquire(self, scheme: str, host: str, port: int) -> Tuple[_Origin, _Conn]:
+        o = self._origin(scheme, host, port)
+        while o.idle:
+            c = o.idle.pop()
+            if not c.writer.is_closing() and not c.reader.at_eof():
+                self.reused += 1
+                return o, c
+            c.writer.close()
+        addr = self.resolve.get(host, host)
+        kw = {"ssl": self._ssl, "server_hostname": host} if scheme == "https" else {}
+        r, w = await asyncio.wait_for(asyncio.open_connection(addr, port, **kw), self.connect_timeout)
+        self.opened += 1
+        return o, _Conn(r, w)
+
+    def release(self, o: _Origin, c: _Conn, reusable: bool) -> None:
+        if reusable and len(o.idle) < self.max_idle and not c.writer.is_closing():
+            o.idle.append(c)
+        else:
+            c.writer.close()
+
+    async def close(self) -> None:
+        for o in self._origins.values():
+            for c in o.idle:
+                c.writer.close()
+            o.idle.clear()
+
+
+async def _read_head(reader: asyncio.StreamReader) -> Tuple[str, int, Dict[str, str]]:
+    raw = await reader.readuntil(b"\r\n\r\n")
+    if len(raw) > MAX_HEADER_BYTES:
+        raise ValueError("response header too large")
+    lines = raw.decode("latin-1").split("\r\n")
+    parts = lines[0].split(" ", 2)
+    if len(parts) < 2 or not parts[0].startswith("HTTP/"):
+        raise ValueError(f"bad status line: {lines[0][:80]!r}")
+    status = int(parts[1])
+    headers: Dict[str, str] = {}
+    for ln in lines[1:]:
+        if not ln:
+            continue
+        k, _, v = ln.partition(":")
+        headers[k.strip().lower()] = v.strip()
+    return parts[0], status, headers
+
+def _keep_alive(version: str, headers: Dict[str, str]) -> bool:
+    """HTTP/1.1 connections persist unless closed; HTTP/1.0 ones only on request."""
+    conn = headers.get("connection", "").lower()
+    return "keep-alive" in conn if version == "HTTP/1.0" else "close" not in conn
+
+def _bodiless(method: str, status: int) -> bool:
+    return method == "HEAD" or 100 <= status < 200 or status in (204, 304)
+
+async def _read_body(reader: asyncio.StreamReader, headers: Dict[str, str], limit: int,
+                     keep_alive: bool) -> Tuple[bytes, bool]:
+    """
+    Returns (body_prefix, fully_read). Stops at 'limit' bytes (connection then not reusable).
+    Call only for responses that have a body (see _bodiless).
+    """
+    if headers.get("transfer-encoding", "").lower() == "chunked":
+        buf = bytearray()
+        while True:
+            size_ln = await reader.readline()
+            size = int(size_ln.split(b";", 1)[0].strip() or b"0", 16)
+            if size == 0:
+                await reader.readline()  # trailing CRLF (no trailers expected)
+                return bytes(buf), True
+            chunk = await reader.readexactly(size)
+            await reader.readexactly(2)
+            buf.extend(chunk)
+            if len(buf) >= limit:
+                return bytes(buf[:limit]), False
+    cl = headers.get("content-length")
+    if cl is not None and cl.isdigit():
+        n = int(cl)
+        if n <= limit:
+            return await reader.readexactly(n), True
+        return await reader.readexactly(limit), False
+    if keep_alive:
+        # no framing on a persistent connection: nothing marks the end, so don't wait for one
+        return b"", False
+    # no framing, connection: close -> the body runs to EOF
+    buf = bytearray()
+    while len(buf) < limit:
+        chunk = await reader.read(limit - len(buf))
+        if not chunk:
+            return bytes(buf), True
+        buf.extend(chunk)
+    return bytes(buf), False
+
+
+class HttpProber:
+    def __init__(self, *, concurrency: int = 100, per_host: int = 4, timeout_s: float = 10.0,
+                 want_title: bool = True, max_body: int = 64 * 1024,
+                 resolve: Optional[Dict[str, str]] = None):
+        self.sem = asyncio.Semaphore(max(1, concurrency))
+        self.per_host = max(1, per_host)
+        self.timeout_s = timeout_s
+        self.want_title = want_title
+        self.max_body = max_body
+        self.pool = ConnectionPool(connect_timeout=timeout_s, resolve=resolve)
+        self._host_sems: Dict[str, asyncio.Semaphore] = {}
+
+    def _host_sem(self, host: str) -> asyncio.Semaphore:
+        s = self._host_sems.get(host)
+        if s is None:
+            s = self._host_sems[host] = asyncio.Semaphore(self.per_host)
+        return s
+
+    async def _request(self, method: str, scheme: str, host: str, port: int, path: str) -> Tuple[int, Dict[str, str], bytes]:
+        origin, conn = await self.pool.acquire(scheme, host, port)
+        reusable = False
+        try:
+            default_port = 443 if scheme == "https" else 80
+            host_hdr = host if port == default_port else f"{host}:{port}"
+            req = (f"{method} {path} HTTP/1.1\r\nHost: {host_hdr}\r\nUser-Agent: {USER_AGENT}\r\n"
+                   f"Accept: */*\r\nConnection: keep-alive\r\n\r\n").encode("latin-1")
+            conn.writer.write(req)
+            await conn.writer.drain()
+            version, status, headers = await _read_head(conn.reader)
+            while 100 <= status < 200 and status != 101:  # interim (100 Continue, 103 Early Hints)
+                version, status, headers = await _read_head(conn.reader)
+            keep_alive = _keep_alive(version, headers) and status != 101
+            if _bodiless(method, status):
+                body, full = b"", True
+            else:
+                body, full = await _read_body(conn.reader, headers, self.max_body, keep_alive)
+            reusable = full and keep_alive
+            return status, headers, body
+        finally:
+            self.pool.release(origin, conn, reusable)
+
+    async def probe_url(self, url: str) -> ProbeResult:
+        sp = urlsplit(url)
+        scheme = (sp.scheme or "http").lower()
+        host = sp.hostname or ""
+        port = sp.port or (443 if scheme == "https" else 80)
+        path = (sp.path or "/") + (f"?{sp.query}" if sp.query else "")
+        res = ProbeResult(url=url)
+        t0 = time.monotonic()
+        async with self._host_sem(host), self.sem:
+            try:
+                try:
+                    status, headers, body = await asyncio.wait_for(
+                        self._request("HEAD", scheme, host, port, path), self.timeout_s)
+                except (asyncio.IncompleteReadError, ConnectionError, ValueError):
+                    status, headers, body = None, {}, b""
+                ctype = headers.get("content-type", "")
+                need_get = (status is None or status in HEAD_FALLBACK_STATUSES
+                            or (self.want_title and "html" in ctype.lower()))
+                if need_get:
+                    res.method = "GET"
+                    status, headers, body = await asyncio.wait_for(
+                        self._request("GET", scheme, host, port, path), self.timeout_s)
+                res.status = status
+                res.content_type = headers.get("content-type")
+                res.server = headers.get("server")
+                res.location = headers.get("location")
+                cl = headers.get("content-length")
+                res.content_length = int(cl) if cl and cl.isdigit() else (len(body) if res.method == "GET" and body else None)
+                m = TITLE_RE.search(body or b"")
+                if m:
+                    res.title = re.sub(r"\s+", " ", m.group(1).decode("utf-8", "ignore")).strip()[:256] or None
+            except asyncio.TimeoutError:
+                res.error = "timeout"
+            except Exception as e:  # refused, TLS, DNS, bad framing...
+                res.error = type(e).__name__
+        res.elapsed_ms = int((time.monotonic() - t0) * 1000)
+        return res
+
+    async def probe_many(self, urls: Iterable[str]) -> List[ProbeResult]:
+        try:
+            return await asyncio.gather(*(self.probe_url(u) for u in urls))
+        finally:
+            await self.pool.close()
+
+
+def expand_targets(targets: Iterable[str]) -> List[List[str]]:
+    """
+    URLs are probed as-is; bare hosts/host:port try https first, then http
+    (same default as the httpx binary). Returns candidate groups per target.
+    """
+    groups: List[List[str]] = []
+    for t in targets:
+        t = (t or "").strip()
+        if not t:
+            continue
+        if "://" in t:
+            groups.append([t])
+        else:
+            groups.append([f"https://{t}", f"http://{t}"])
+    return groups
+
+async def _probe_groups(groups: List[List[str]], **kw) -> List[ProbeResult]:
+    prober = HttpProber(**kw)
+    try:
+        firsts = await asyncio.gather(*(prober.probe_url(g[0]) for g in groups))
+        retry = [(i, g[1]) for i, g in enumerate(groups) if len(g) > 1 and not firsts[i].alive]
+        if retry:
+            seconds = await asyncio.gather(*(prober.probe_url(u) for _, u in retry))
+            for (i, _), r in zip(retry, seconds):
+                if r.alive:
+                    firsts[i] = r
+        return list(firsts)
+    finally:
+        await prober.pool.close()
+
+def probe(targets: Iterable[str], **kw) -> List[ProbeResult]:
+    """Synchronous entry point for adapters (one event loop per call)."""
+    groups = expand_targets(targets)
+    if not groups:
+        return []
+    return asyncio.run(_probe_groups(groups, **kw))
@@ -0,0 +1,46 @@
+# tools/alltools/registry.py
+"""
+Slug -> adapter module registry.
+
+Most slugs map 1:1 onto tools.alltools.tools.<slug with '-' -> '_'>; ALIASES
+lets a slug point at another implementation (e.g. a native engine standing
+in for a binary wrapper) without touching callers.
+"""
+from __future__ import annotations
+from importlib import import_module
+from types import ModuleType
+from typing import Dict, Iterable
+
+ADAPTER_PACKAGE = "tools.alltools.tools"
+
+# slug -> module name inside ADAPTER_PACKAGE (only where it differs from the default)
+ALIASES: Dict[str, str] = {
+    "dnsx-native": "dnsx_native",
+}
+
+_LOADED: Dict[str, ModuleType] = {}
+
+def module_name(slug: str) -> str:
+    slug = (slug or "").strip().lower()
+    return ALIASES.get(slug) or slug.replace("-", "_")
+
+def load_adapter(slug: str) -> ModuleType:
+    mod = _LOADED.get(slug)
+    if mod is None:
+        mod = _LOADED[slug] = import_module(f"{ADAPTER_PACKAGE}.{module_name(slug)}")
+    return mod
+
+def register(slug: str, module: str) -> None:
+    ALIASES[slug] = module
+    _LOADED.pop(slug, None)
+
+def warm(slugs: Iterable[str]) -> int:
+    """Import adapters ahead of the first task (worker start-up); returns how many loaded."""
+    n = 0
+    for slug in slugs:
+        try:
+            load_adapter(slug)
+            n += 1
+        except Exception:
+            pass  # a broken adapter fails its own steps, not the worker
+    return n
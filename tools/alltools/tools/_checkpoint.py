@@ -0,0 +1,136 @@
+# tools/alltools/tools/_checkpoint.py
+"""
+Resumable progress for long-running adapters.
+
+A checkpoint lives next to the output file it describes, in the step's work
+dir (.<output>.ckpt). It is a journal: a header line with a key over the tool,
+its parameters and the full target list, then one line per unit of finished
+work ({"t": [targets], "o": output offset}). Appending a line is O(1), and a
+torn last line (the worker died mid-write) is ignored on load.
+
+A retried or redelivered step attempt has the same work dir. If the key
+still matches, the adapter truncates its output file back to the last
+recorded offset, keeps everything before it, and runs only the targets not
+listed yet. Checkpoints are only kept for explicit work dirs (workflow
+steps), never for the shared fallback dir of ad-hoc scans.
+"""
+from __future__ import annotations
+import hashlib, json, os
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional
+
+# runtime keys that do not change what a tool produces (a retry may raise the timeout)
+_VOLATILE = {"work_dir", "file_path", "input_method", "value", "tool_slug", "checkpoint", "options", "timeout_s"}
+
+
+def _key(slug: str, options: dict, targets: Iterable[str]) -> str:
+    params = {k: v for k, v in sorted(options.items())
+              if not k.startswith("_") and k not in _VOLATILE and isinstance(v, (str, int, float, bool))}
+    blob = json.dumps([slug, params, sorted(set(targets))], separators=(",", ":"), default=str)
+    return hashlib.sha1(blob.encode("utf-8", "ignore")).hexdigest()
+
+
+class Checkpoint:
+    def __init__(self, output_path: str, key: str):
+        self.output_path = str(output_path)
+        out = Path(output_path)
+        self.path = out.with_name(f".{out.name}.ckpt")
+        self.key = key
+        self.done: Dict[str, None] = {}   # ordered set of finished targets
+        self.offset = 0
+        self.attempt = 1
+        self.skipped = 0                  # targets this attempt did not have to run
+        self.kept = 0                     # output bytes carried over from earlier attempts
+        self.resumed = False
+        self._fh = None
+        self._load()
+
+    @classmethod
+    def for_options(cls, options: dict, slug: str, targets: List[str], output_path: str) -> Optional["Checkpoint"]:
+        """None for ad-hoc scans (no explicit work_dir) or when the step sets checkpoint: false."""
+        if not options.get("work_dir") or options.get("checkpoint") is False:
+            return None
+        return cls(output_path, _key(slug, options, targets))
+
+    def _load(self) -> None:
+        try:
+            with open(self.path, "r", encoding="utf-8") as fh:
+                lines = fh.read().split("\n")
+        except (FileNotFoundError, OSError):
+            return
+        try:
+            head = json.loads(lines[0])
+        except ValueError:
+            return
+        if head.get("key") != self.key:
+            return  # different inputs or parameters: start over
+        done: Dict[str, None] = {}
+        offset = 0
+        for ln in lines[1:]:
+            try:
+                rec = json.loads(ln)
+            except ValueError:
+                break  # torn write; everything before it is valid
+            done.update(dict.fromkeys(rec.get("t") or []))
+            offset = int(rec.get("o") or 0)
+        try:
+            size = os.path.getsize(self.output_path)
+        except OSError:
+            size = -1
+        if size < offset:
+            return  # output was removed or cut short; its records cannot be trusted
+        self.done, self.offset = done, offset
+        self.resumed = bool(done)
+        self.attempt = int(head.get("attempt") or 1) + 1
+
+    def pending(self, targets: List[str]) -> List[str]:
+        rest = [t for t in targets if t not in self.done]
+        self.skipped = len(targets) - len(rest)
+        return rest
+
+    def restore(self, feed=None) -> int:
+        """Cut the output file back to the checkpointed offset and start a new journal; returns bytes kept."""
+        out = Path(self.output_path)
+        out.parent.mkdir(parents=True, exist_ok=True)
+        with open(out, "ab") as fh:
+            fh.truncate(self.offset)
+        self.kept = self.offset
+        if feed and self.offset:
+            with open(out, "rb") as fh:
+                left = self.offset
+                while left > 0:
+                    chunk = fh.read(min(1 << 16, left))
+                    if not chunk:
+                        break
+                    feed(chunk); left -= len(chunk)
+        self._fh = open(self.path, "w", encoding="utf-8")
+        self._write({"key": self.key, "attempt": self.attempt})
+        if self.done:
+            self._write({"t": list(self.done), "o": self.offset})
+        return self.offset
+
+    def _write(self, rec: dict) -> None:
+        self._fh.write(json.dumps(rec, separators=(",", ":")) + "\n")
+        self._fh.flush()
+
+    def record(self, targets: List[str], offset: int) -> None:
+        """`targets` are finished and the output file up to `offset` holds everything they printed."""
+        self.done.update(dict.fromkeys(targets))
+        self.offset = offset
+        if self._fh is not None:
+            self._write({"t": list(targets), "o": offset})
+
+    def clear(self) -> None:
+        """All targets finished: nothing left to resume."""
+        self.close()
+        try: os.unlink(self.path)
+        except OSError: pass
+
+    def close(self) -> None:
+        if self._fh is not None:
+            self._fh.close()
+            self._fh = None
+
+    def summary(self) -> Dict[str, Any]:
+        return {"resumed": self.resumed, "attempt": self.attempt,
+                "targets_skipped": self.skipped, "bytes_kept": self.kept}
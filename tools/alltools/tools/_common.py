@@ -1,10 +1,15 @@
 # tools/alltools/tools/_common.py
 from __future__ import annotations
-import os, sys, shutil, time, re, subprocess
+import os, sys, shutil, time, re, subprocess, signal, socket, threading, json, contextvars, tempfile
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor, as_completed, CancelledError
 from pathlib import Path
-from typing import List, Tuple, Iterable, Dict, Any, Optional
+from typing import List, Tuple, Iterable, Dict, Any, Optional, Callable
 
 import redis
+from tools.manifests import slim_parameters
+from ._sandbox import DEFAULT_SANDBOX, StepCgroup, make_preexec, reap
+from ._checkpoint import Checkpoint
 _redis_client = None
 
 def ops_redis():
@@ -20,6 +25,9 @@ RUN_START_DEDUP_TTL      = int(os.environ.get("RUN_START_DEDUP_TTL", "10"))  # s
 def dedupe_run_key(user_id, workflow_id):
     return f"tools:dedupe:run:{user_id}:{workflow_id}"
 
+def dedupe_campaign_key(user_id, workflow_id):
+    return f"tools:dedupe:campaign:{user_id}:{workflow_id}"
+
 def active_runs_key(user_id):
     return f"tools:active_runs:{user_id}"
 
@@ -195,19 +203,641 @@ def read_targets(options: dict,
         return (merge_dedupe(parts, cap), "value")
     return ([], "empty")
 
-def run_cmd(args: List[str], timeout_s: int, cwd: Optional[Path] = None, env: Optional[Dict[str, str]] = None) -> Tuple[int, str, int]:
+# ---- Cooperative cancellation ----
+# Every tool runs in its own session (process group), so a signal to the group
+# also reaches grandchildren (shell wrappers, helper processes). run_step opens
+# a ProcScope per step; run_cmd registers each pgid there (and in Redis, so the
+# cancel endpoint can signal groups on the same host right away). The scope
+# watches the run's cancel flag; once set, run_cmd sends SIGTERM to its group,
+# waits CANCEL_GRACE_S, then SIGKILLs and raises Canceled with the partial output.
+CANCEL_GRACE_S  = float(os.environ.get("CANCEL_GRACE_S", "2"))
+CANCEL_POLL_S   = float(os.environ.get("CANCEL_POLL_S", "0.5"))
+_POSIX = os.name == "posix"
+_TERM = signal.SIGTERM if _POSIX else getattr(signal, "CTRL_BREAK_EVENT", signal.SIGTERM)
+_KILL = signal.SIGKILL if _POSIX else signal.SIGTERM
+
+def cancel_key(run_id) -> str:
+    return f"tools:cancel:run:{run_id}"
+
+def run_procs_key(run_id) -> str:
+    return f"tools:procs:run:{run_id}"
+
+class Canceled(ValidationError):
+    """Raised by run_cmd when the step's run was canceled; carries the output read so far."""
+    def __init__(self, partial: str = "", detail: Optional[str] = None):
+        super().__init__("Canceled", "CANCELED", detail)
+        self.partial = partial or ""
+        self.output = None  # CmdOutput spool, when the command got that far
+
+def signal_group(pgid: int, sig) -> bool:
+    try:
+        if _POSIX:
+            os.killpg(int(pgid), sig)
+        else:
+            os.kill(int(pgid), sig)
+        return True
+    except (ProcessLookupError, PermissionError, OSError):
+        return False
+
+class ProcScope:
+    """Process groups launched on behalf of one workflow step."""
+    def __init__(self, run_id=None, step_index=None, *, grace_s: float = CANCEL_GRACE_S,
+                 sandbox: Optional[Dict[str, Any]] = None):
+        self.run_id, self.step_index, self.grace_s = run_id, step_index, grace_s
+        self.sandbox = dict(sandbox or DEFAULT_SANDBOX)
+        self.pgids: set = set()
+        self.cancelled = threading.Event()
+        self.signals: Dict[str, int] = {}
+        self.usage: Dict[str, float] = {"commands": 0, "cpu_seconds": 0.0, "peak_rss_kb": 0}
+        self._cgroup: Optional[StepCgroup] = None
+        self._cgroup_tried = False
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._watcher: Optional[threading.Thread] = None
+        # called with (spool path, bytes) for everything a command prints (tools.streaming publishers)
+        self.tap: Optional[Callable[[str, bytes], None]] = None
+
+    # resource accounting (rusage of every reaped command; cgroup when delegated)
+    def cgroup(self) -> Optional[StepCgroup]:
+        with self._lock:
+            if not self._cgroup_tried:
+                self._cgroup_tried = True
+                name = f"run{self.run_id}-step{self.step_index}-{os.getpid()}"
+                self._cgroup = StepCgroup.create(name, self.sandbox)
+            return self._cgroup
+
+    def add_usage(self, rusage: Optional[Dict[str, float]]) -> None:
+        with self._lock:
+            self.usage["commands"] += 1
+            if rusage:
+                self.usage["cpu_seconds"] = round(self.usage["cpu_seconds"] + rusage.get("cpu_seconds", 0.0), 3)
+                self.usage["peak_rss_kb"] = max(self.usage["peak_rss_kb"], rusage.get("peak_rss_kb", 0))
+
+    def resources(self) -> Dict[str, Any]:
+        """Step manifest block: CPU seconds, peak RSS and the limits that applied."""
+        out: Dict[str, Any] = {
+            "commands": int(self.usage["commands"]),
+            "cpu_seconds": self.usage["cpu_seconds"],
+            "peak_rss_mb": round(self.usage["peak_rss_kb"] / 1024, 1),
+            "limits": {k: v for k, v in self.sandbox.items() if v},
+        }
+        if self._cgroup is not None:
+            out["cgroup"] = self._cgroup.stats()
+        return out
+
+    # registration (Redis mirror is best-effort; local bookkeeping is what run_cmd relies on)
+    def register(self, pgid: int) -> None:
+        with self._lock:
+            self.pgids.add(pgid)
+        if self.run_id is None:
+            return
+        try:
+            r = ops_redis(); k = run_procs_key(self.run_id)
+            pipe = r.pipeline()
+            pipe.hset(k, str(pgid), json.dumps({"host": socket.gethostname(), "step": self.step_index}))
+            pipe.expire(k, 6 * 3600)
+            pipe.execute()
+        except Exception:
+            pass
+
+    def unregister(self, pgid: int) -> None:
+        with self._lock:
+            self.pgids.discard(pgid)
+        if self.run_id is None:
+            return
+        try:
+            ops_redis().hdel(run_procs_key(self.run_id), str(pgid))
+        except Exception:
+            pass
+
+    def note_signal(self, name: str) -> None:
+        with self._lock:
+            self.signals[name] = self.signals.get(name, 0) + 1
+
+    def cancel(self) -> None:
+        self.cancelled.set()
+
+    def _watch(self) -> None:
+        while not self._stop.wait(CANCEL_POLL_S):
+            try:
+                if ops_redis().exists(cancel_key(self.run_id)):
+                    self.cancel()
+                    return
+            except Exception:
+                pass
+
+    def start(self) -> "ProcScope":
+        if self.run_id is not None:
+            try:
+                if ops_redis().exists(cancel_key(self.run_id)):
+                    self.cancel()
+            except Exception:
+                pass
+            self._watcher = threading.Thread(target=self._watch, name=f"cancel-watch-{self.run_id}", daemon=True)
+            self._watcher.start()
+        return self
+
+    def close(self) -> None:
+        self._stop.set()
+        # nothing launched by this step may outlive it
+        for pgid in list(self.pgids):
+            signal_group(pgid, _KILL)
+            self.unregister(pgid)
+        if self._cgroup is not None:
+            self._cgroup.close()
+
+_proc_scope: contextvars.ContextVar[Optional[ProcScope]] = contextvars.ContextVar("proc_scope", default=None)
+
+def current_proc_scope() -> Optional[ProcScope]:
+    return _proc_scope.get()
+
+@contextmanager
+def proc_scope(run_id=None, step_index=None, *, grace_s: float = CANCEL_GRACE_S,
+               sandbox: Optional[Dict[str, Any]] = None):
+    scope = ProcScope(run_id, step_index, grace_s=grace_s, sandbox=sandbox).start()
+    token = _proc_scope.set(scope)
+    try:
+        yield scope
+    finally:
+        _proc_scope.reset(token)
+        scope.close()
+
+def request_cancel(run_id, ttl_seconds: int = 3600) -> Dict[str, int]:
+    """
+    Flag a run as canceled for its workers and SIGTERM any of its process groups
+    that live on this host. Returns {"local": n, "remote": n} registered groups.
+    """
+    r = ops_redis()
+    r.set(cancel_key(run_id), "1", ex=ttl_seconds)
+    host = socket.gethostname()
+    local = remote = 0
+    for pgid, meta in (r.hgetall(run_procs_key(run_id)) or {}).items():
+        try:
+            info = json.loads(meta)
+        except Exception:
+            info = {}
+        if info.get("host") == host:
+            local += 1 if signal_group(int(pgid), _TERM) else 0
+        else:
+            remote += 1
+    return {"local": local, "remote": remote}
+
+def clear_cancel(run_id) -> None:
+    try:
+        ops_redis().delete(cancel_key(run_id))
+    except Exception:
+        pass
+
+# ---- Bounded output spooling ----
+# Tool stdout+stderr goes straight to a file in the work dir; memory only ever
+# holds a fixed head/tail for previews (raw_output, manifests). Adapters parse
+# the spool with CmdOutput.iter_lines(). Limits come from the tool's io policy
+# (max_output_bytes / max_line_bytes); crossing one stops the process group and
+# raises OutputLimit.
+SPOOL_HEAD_BYTES = 32_000
+SPOOL_TAIL_BYTES = 32_000
+DEFAULT_OUTPUT_LIMITS = {"max_output_bytes": 64_000_000, "max_line_bytes": 1_000_000}
+
+def output_limits(policy: Optional[dict]) -> Dict[str, int]:
+    io = (policy or {}).get("io_policy") or {}
+    out = dict(DEFAULT_OUTPUT_LIMITS)
+    for k in out:
+        try:
+            if io.get(k):
+                out[k] = int(io[k])
+        except (TypeError, ValueError):
+            pass
+    return out
+
+class CmdOutput:
+    """What a command printed: spool file path, counters and a bounded head/tail."""
+    def __init__(self, path: str):
+        self.path = str(path)
+        self.rc: Optional[int] = None
+        self.ms = 0
+        self.bytes = 0
+        self.lines = 0
+        self.longest_line = 0
+        self.limit_hit: Optional[str] = None
+        self.rusage: Dict[str, float] = {}
+        self._head = bytearray()
+        self._tail = bytearray()
+        self._cur_line = 0
+
+    def _feed(self, chunk: bytes) -> None:
+        self.bytes += len(chunk)
+        parts = chunk.split(b"\n")
+        if len(parts) == 1:
+            self._cur_line += len(chunk)
+        else:
+            self.lines += len(parts) - 1
+            self.longest_line = max(self.longest_line, self._cur_line + len(parts[0]),
+                                    *(len(p) for p in parts[1:-1]))
+            self._cur_line = len(parts[-1])
+        self.longest_line = max(self.longest_line, self._cur_line)
+        if len(self._head) < SPOOL_HEAD_BYTES:
+            self._head += chunk[:SPOOL_HEAD_BYTES - len(self._head)]
+        self._tail += chunk[-SPOOL_TAIL_BYTES:]
+        if len(self._tail) > SPOOL_TAIL_BYTES:
+            del self._tail[:len(self._tail) - SPOOL_TAIL_BYTES]
+
+    @property
+    def truncated(self) -> bool:
+        return self.bytes > SPOOL_HEAD_BYTES + SPOOL_TAIL_BYTES
+
+    def preview(self) -> str:
+        """Whole output when small, else head + marker + tail."""
+        if not self.truncated:
+            if self.bytes <= len(self._head):
+                return self._head.decode("utf-8", "ignore")
+            # head and tail overlap: rebuild from the tail end
+            return (self._head + self._tail[len(self._tail) - (self.bytes - len(self._head)):]).decode("utf-8", "ignore")
+        skipped = self.bytes - len(self._head) - len(self._tail)
+        return (self._head.decode("utf-8", "ignore")
+                + f"\n... [{skipped} bytes omitted, full output in {os.path.basename(self.path)}] ...\n"
+                + self._tail.decode("utf-8", "ignore"))
+
+    def iter_lines(self) -> Iterable[str]:
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, "r", encoding="utf-8", errors="ignore") as fh:
+            for ln in fh:
+                yield ln.rstrip("\r\n")
+
+    def text(self) -> str:
+        if not os.path.exists(self.path):
+            return ""
+        with open(self.path, "r", encoding="utf-8", errors="ignore") as fh:
+            return fh.read()
+
+    def append_file(self, src: str, fh) -> None:
+        """Stream another spool into this one (run_per_target merge)."""
+        with open(src, "rb") as s:
+            last = b""
+            while True:
+                chunk = s.read(1 << 16)
+                if not chunk:
+                    break
+                fh.write(chunk); self._feed(chunk); last = chunk
+            if last and not last.endswith(b"\n"):
+                fh.write(b"\n"); self._feed(b"\n")
+
+    def summary(self) -> Dict[str, Any]:
+        out = {"bytes": self.bytes, "lines": self.lines, "truncated_preview": self.truncated,
+               "file": os.path.basename(self.path)}
+        if self.rusage:
+            out["cpu_seconds"] = self.rusage.get("cpu_seconds")
+            out["peak_rss_mb"] = round(self.rusage.get("peak_rss_kb", 0) / 1024, 1)
+        if self.limit_hit:
+            out["limit_hit"] = self.limit_hit
+        return out
+
+class OutputLimit(ValidationError):
+    """A tool printed more than its policy allows; the process group was stopped."""
+    def __init__(self, output: CmdOutput, detail: Optional[str] = None):
+        super().__init__("Tool output exceeded the configured limit", "OUTPUT_LIMIT", detail)
+        self.output = output
+        self.partial = output.preview()
+
+def _pump(stream, fh, res: CmdOutput, limits: Dict[str, int], hit: threading.Event,
+          tap: Optional[Callable[[str, bytes], None]] = None) -> None:
+    max_bytes, max_line = limits["max_output_bytes"], limits["max_line_bytes"]
+    read = getattr(stream, "read1", stream.read)
+    try:
+        while True:
+            chunk = read(1 << 16)
+            if not chunk:
+                break
+            if res.limit_hit:
+                continue  # drain until the group is stopped
+            room = max_bytes - res.bytes
+            if len(chunk) > room:
+                chunk, res.limit_hit = chunk[:max(room, 0)], f"max_output_bytes={max_bytes}"
+            fh.write(chunk)
+            res._feed(chunk)
+            if tap is not None:
+                try:
+                    tap(res.path, chunk)
+                except Exception:
+                    pass  # a publisher problem must not stop the tool
+            if not res.limit_hit and res.longest_line > max_line:
+                res.limit_hit = f"max_line_bytes={max_line}"
+            if res.limit_hit:
+                hit.set()
+    except (OSError, ValueError):
+        pass
+    finally:
+        fh.flush()
+
+def _poll(proc: subprocess.Popen, res: CmdOutput, *, block: bool = False) -> Optional[int]:
+    """Popen.poll()/wait() via wait4 so the child's rusage lands on res."""
+    ru = reap(proc, block=block)
+    if ru:
+        res.rusage = ru
+    return proc.returncode
+
+def _wait(proc: subprocess.Popen, res: CmdOutput, timeout: float) -> bool:
+    deadline = time.monotonic() + timeout
+    while _poll(proc, res) is None:
+        if time.monotonic() >= deadline:
+            return False
+        time.sleep(0.02)
+    return True
+
+def _stop_group(proc: subprocess.Popen, res: CmdOutput, scope: Optional[ProcScope], grace_s: float) -> None:
+    """SIGTERM the group, SIGKILL after grace_s."""
+    pgid = proc.pid
+    signal_group(pgid, _TERM)
+    if scope: scope.note_signal("SIGTERM")
+    if not _wait(proc, res, max(0.05, grace_s)):
+        signal_group(pgid, _KILL)
+        if scope: scope.note_signal("SIGKILL")
+        proc.kill()
+        _poll(proc, res, block=True)
+    # the leader is gone; make sure stragglers holding the pipe go too
+    signal_group(pgid, _KILL)
+
+def spool_cmd(args: List[str], timeout_s: int, spool_path, *, cwd: Optional[Path] = None,
+              env: Optional[Dict[str, str]] = None, limits: Optional[Dict[str, int]] = None) -> CmdOutput:
+    """
+    Run args in its own session with stdout+stderr spooled to spool_path.
+    Raises ValidationError(TIMEOUT), OutputLimit or Canceled (all stop the whole group).
+    """
     if not args or not args[0]:
         raise ValidationError("Executable not resolved", "NOT_INSTALLED", "args[0] missing")
+    scope = current_proc_scope()
+    if scope and scope.cancelled.is_set():
+        raise Canceled("", "canceled before launch")
+    limits = {**DEFAULT_OUTPUT_LIMITS, **(limits or {})}
+    res = CmdOutput(spool_path)
     t0 = now_ms()
-    try:
-        res = subprocess.run(
-            args, text=True,
-            stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
-            timeout=timeout_s, cwd=str(cwd) if cwd else None, env=env
+    if _POSIX:
+        cg = scope.cgroup() if scope else None
+        preexec = make_preexec(scope.sandbox if scope else DEFAULT_SANDBOX, timeout_s=timeout_s,
+                               cgroup_fd=cg.procs_fd if cg else None)
+        launch = {"start_new_session": True, "preexec_fn": preexec}
+    else:
+        launch = {"creationflags": subprocess.CREATE_NEW_PROCESS_GROUP}
+    with open(res.path, "wb") as fh:
+        proc = subprocess.Popen(
+            args, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, stdin=subprocess.DEVNULL,
+            cwd=str(cwd) if cwd else None, env=env, **launch
         )
-        return res.returncode, (res.stdout or ""), now_ms() - t0
-    except subprocess.TimeoutExpired as e:
-        raise ValidationError("Timed out while running the tool", "TIMEOUT", str(e))
+        if scope: scope.register(proc.pid)
+        hit = threading.Event()
+        reader = threading.Thread(target=_pump, args=(proc.stdout, fh, res, limits, hit, scope.tap if scope else None),
+                                  daemon=True)
+        reader.start()
+        deadline = time.monotonic() + timeout_s
+        stop: Optional[ValidationError] = None
+        try:
+            # wait for exit *and* EOF (grandchildren may hold the pipe), checking limits/cancel/timeout
+            while _poll(proc, res) is None or reader.is_alive():
+                reader.join(timeout=min(CANCEL_POLL_S, max(0.01, deadline - time.monotonic())))
+                if hit.is_set():
+                    _stop_group(proc, res, scope, 0.5)
+                    stop = OutputLimit(res, res.limit_hit)
+                elif scope and scope.cancelled.is_set():
+                    _stop_group(proc, res, scope, scope.grace_s)
+                    stop = Canceled("", f"stopped after {now_ms() - t0} ms")
+                elif time.monotonic() >= deadline and (_poll(proc, res) is None or reader.is_alive()):
+                    _stop_group(proc, res, scope, 0.5)
+                    stop = ValidationError("Timed out while running the tool", "TIMEOUT",
+                                           f"{args[0]} exceeded {timeout_s}s")
+                if stop is not None:
+                    break
+        finally:
+            if _poll(proc, res) is None:
+                _stop_group(proc, res, scope, 0)
+            reader.join(timeout=2)
+            try: proc.stdout.close()
+            except Exception: pass
+            if scope: scope.unregister(proc.pid)
+    res.rc, res.ms = proc.returncode, now_ms() - t0
+    if scope: scope.add_usage(res.rusage)
+    if stop is None and res.limit_hit:
+        stop = OutputLimit(res, res.limit_hit)
+    if isinstance(stop, Canceled):
+        stop.output, stop.partial = res, res.preview()
+    if stop is not None:
+        raise stop
+    return res
+
+def run_cmd(args: List[str], timeout_s: int, cwd: Optional[Path] = None, env: Optional[Dict[str, str]] = None,
+            *, limits: Optional[Dict[str, int]] = None) -> Tuple[int, str, int]:
+    """
+    Compatibility wrapper: spool to a temp file, return (rc, text, ms).
+    The text is bounded by limits['max_output_bytes']; prefer spool_cmd for big outputs.
+    """
+    fd, tmp = tempfile.mkstemp(prefix=".spool-", suffix=".out", dir=str(cwd) if cwd else None)
+    os.close(fd)
+    try:
+        res = spool_cmd(args, timeout_s, tmp, cwd=cwd, env=env, limits=limits)
+        return res.rc, res.text(), res.ms
+    finally:
+        try: os.unlink(tmp)
+        except OSError: pass
+
+def run_per_target(targets: List[str],
+                   build_args: Callable[[str], List[str]],
+                   *,
+                   timeout_s: int,
+                   concurrency: int = 4,
+                   cwd: Optional[Path] = None,
+                   env: Optional[Dict[str, str]] = None,
+                   on_output: Optional[Callable[[str, str], None]] = None,
+                   spool_path=None,
+                   limits: Optional[Dict[str, int]] = None,
+                   checkpoint: Optional[Checkpoint] = None) -> Dict[str, Any]:
+    """
+    Bounded-concurrency fan-out for one-target-per-invocation tools.
+    Runs build_args(target) per target (each with its own timeout) and merges
+    outputs in completion order. A failing target never sinks the others:
+    returns {"results": {target: {rc, output, ms}}, "ok": [...], "failed": [...], "merged": str}.
+    With spool_path, per-target outputs are streamed into that file instead of
+    memory: "merged" is then a preview and "spool" the merged CmdOutput.
+    With a checkpoint (needs spool_path) every successful target is recorded
+    as it is merged; targets an earlier attempt finished are not run again and
+    their output is kept. "checkpoint" in the result describes the resume.
+    """
+    targets = merge_dedupe(targets)
+    results: Dict[str, Dict[str, Any]] = {}
+    failed: List[Dict[str, Any]] = []
+    ok: List[str] = []
+    merged: List[str] = []
+    if not spool_path:
+        checkpoint = None
+    if not targets:
+        return {"results": results, "ok": ok, "failed": failed, "merged": ""}
+
+    spool_dir = Path(spool_path).parent / f".{Path(spool_path).name}.parts" if spool_path else None
+    if spool_dir:
+        spool_dir.mkdir(parents=True, exist_ok=True)
+    merged_out = CmdOutput(spool_path) if spool_path else None
+    if checkpoint is not None:
+        checkpoint.restore(merged_out._feed)
+        ok.extend(t for t in targets if t in checkpoint.done)
+        targets = checkpoint.pending(targets)
+        merged_fh = open(spool_path, "ab")
+    else:
+        merged_fh = open(spool_path, "wb") if spool_path else None
+
+    def _one(i: int, t: str):
+        if spool_dir:
+            res = spool_cmd(build_args(t), timeout_s, spool_dir / f"{i:05d}.out", cwd=cwd, env=env, limits=limits)
+            return res.rc, res, res.ms
+        return run_cmd(build_args(t), timeout_s=timeout_s, cwd=cwd, env=env, limits=limits)
+
+    def _collect(out) -> None:
+        if isinstance(out, CmdOutput):
+            merged_out.append_file(out.path, merged_fh)
+            try: os.unlink(out.path)
+            except OSError: pass
+        elif out:
+            merged.append(out if out.endswith("\n") else out + "\n")
+
+    workers = max(1, min(int(concurrency or 1), len(targets)))
+    canceled: Optional[Canceled] = None
+    try:
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="tgt") as pool:
+            # copy_context: the step's ProcScope must follow each target into its thread
+            futs = {pool.submit(contextvars.copy_context().run, _one, i, t): t for i, t in enumerate(targets)}
+            for fut in as_completed(futs):
+                t = futs[fut]
+                try:
+                    rc, out, ms = fut.result()
+                except Canceled as c:
+                    if canceled is None:
+                        canceled = c
+                        for f in futs:
+                            f.cancel()
+                    _collect((getattr(c, "output", None) if spool_dir else None) or c.partial)
+                    continue
+                except CancelledError:
+                    continue
+                except OutputLimit as ol:
+                    failed.append({"target": t, "reason": ol.reason, "detail": ol.detail})
+                    _collect(ol.output if spool_dir else ol.partial)
+                    continue
+                except ValidationError as ve:
+                    failed.append({"target": t, "reason": ve.reason, "detail": ve.detail})
+                    continue
+                except Exception as e:
+                    failed.append({"target": t, "reason": "OTHER", "detail": repr(e)})
+                    continue
+                text = out.preview() if isinstance(out, CmdOutput) else (out or "")
+                results[t] = {"rc": rc, "output": text, "ms": ms}
+                if rc != 0:
+                    failed.append({"target": t, "reason": "OTHER", "detail": f"exit={rc}"})
+                else:
+                    ok.append(t)
+                if on_output and text:
+                    on_output(t, text)
+                _collect(out)
+                if checkpoint is not None and rc == 0:
+                    merged_fh.flush()
+                    checkpoint.record([t], merged_fh.tell())
+    finally:
+        if merged_fh:
+            merged_fh.close()
+            try: spool_dir.rmdir()
+            except OSError: pass
+        if checkpoint is not None:
+            checkpoint.close()
+    if checkpoint is not None and canceled is None and not failed:
+        checkpoint.clear()
+    if canceled is not None:
+        partial = merged_out.preview() if merged_out else "".join(merged)
+        c = Canceled(partial, f"{len(ok)}/{len(targets)} targets finished before cancel")
+        c.output = merged_out
+        raise c
+    if merged_out:
+        out = {"results": results, "ok": ok, "failed": failed, "merged": merged_out.preview(), "spool": merged_out}
+        if checkpoint is not None:
+            out["checkpoint"] = checkpoint.summary()
+        return out
+    return {"results": results, "ok": ok, "failed": failed, "merged": "".join(merged)}
+
+def run_batches(targets: List[str],
+                build_args: Callable[[List[str]], List[str]],
+                *,
+                batch_size: int,
+                timeout_s: int,
+                spool_path,
+                cwd: Optional[Path] = None,
+                env: Optional[Dict[str, str]] = None,
+                limits: Optional[Dict[str, int]] = None,
+                checkpoint: Optional[Checkpoint] = None) -> CmdOutput:
+    """
+    For list-input tools: one invocation per batch of targets, in order, all
+    output appended to spool_path. timeout_s and the output limit apply to
+    the whole call, as for a single spool_cmd. With a checkpoint each finished
+    batch is recorded, and the targets of batches an earlier attempt finished
+    are skipped (their output is kept). Without one there is a single batch.
+    Raises like spool_cmd; the exception's output is then the merged spool.
+    """
+    targets = merge_dedupe(targets)
+    limits = {**DEFAULT_OUTPUT_LIMITS, **(limits or {})}
+    merged = CmdOutput(spool_path)
+    if checkpoint is not None:
+        checkpoint.restore(merged._feed)
+        pending = checkpoint.pending(targets)
+    else:
+        pending, batch_size = targets, max(1, len(targets))
+    part = Path(spool_path).with_name(f".{Path(spool_path).name}.batch")
+    deadline = time.monotonic() + timeout_s
+    t0 = now_ms()
+    merged.rc = 0
+    try:
+        with open(spool_path, "ab" if checkpoint is not None else "wb") as fh:
+            for i in range(0, len(pending), max(1, batch_size)):
+                batch = pending[i:i + batch_size]
+                left = deadline - time.monotonic()
+                if left <= 0:
+                    raise ValidationError("Timed out while running the tool", "TIMEOUT",
+                                          f"{len(pending) - i} targets left after {timeout_s}s")
+                budget = {**limits, "max_output_bytes": max(1, limits["max_output_bytes"] - merged.bytes)}
+                try:
+                    res = spool_cmd(build_args(batch), max(1, int(left)), part, cwd=cwd, env=env, limits=budget)
+                except (Canceled, OutputLimit) as e:
+                    if getattr(e, "output", None) is not None and os.path.isfile(part):
+                        merged.append_file(str(part), fh)
+                    merged.limit_hit = getattr(e.output, "limit_hit", None) if e.output is not None else None
+                    e.output, e.partial = merged, merged.preview()
+                    raise
+                except ValidationError as e:
+                    if e.reason == "TIMEOUT":
+                        e.detail = f"exceeded {timeout_s}s with {len(pending) - i} targets left"
+                    raise
+                merged.append_file(str(part), fh)
+                for k, v in (res.rusage or {}).items():
+                    merged.rusage[k] = max(merged.rusage.get(k, 0), v) if k == "peak_rss_kb" else merged.rusage.get(k, 0) + v
+                if res.rc:
+                    merged.rc = res.rc
+                elif checkpoint is not None:
+                    fh.flush()
+                    checkpoint.record(batch, fh.tell())
+    finally:
+        try: os.unlink(part)
+        except OSError: pass
+        if checkpoint is not None:
+            checkpoint.close()
+    merged.ms = now_ms() - t0
+    if checkpoint is not None and merged.rc == 0:
+        checkpoint.clear()
+    return merged
+
+def per_target_summary(targets: List[str], fan: Dict[str, Any]) -> Dict[str, Any]:
+    """Manifest fields describing a run_per_target() fan-out."""
+    failed = fan.get("failed") or []
+    out = {
+        "targets_total": len(merge_dedupe(targets)),
+        "targets_failed": failed[:50],
+        "partial": bool(failed) and len(failed) < len(merge_dedupe(targets)),
+    }
+    if fan.get("checkpoint"):
+        out["checkpoint"] = fan["checkpoint"]
+    return out
 
 def finalize(status: str,
              message: str,
@@ -218,15 +848,17 @@ def finalize(status: str,
              output_file: Optional[str] = None,
              error_reason: Optional[str] = None,
              error_detail: Optional[str] = None,
+             extra: Optional[Dict[str, Any]] = None,
              **buckets) -> dict:
     """
     Standardize manifest shape. Buckets are lists keyed by BUCKET_KEYS.
-    Adds counts{} and optional error_reason/error_detail.
+    Adds counts{} and optional error_reason/error_detail; 'extra' is merged
+    in verbatim (adapter-specific metadata).
     """
     out: Dict[str, Any] = {
         "status": status,
         "message": message,
-        "parameters": {k: options.get(k) for k in sorted(options.keys())},
+        "parameters": slim_parameters(options),
         "command": command,
         "execution_ms": max(0, now_ms() - t0_ms),
         "output": raw_out or "",
@@ -247,6 +879,8 @@ def finalize(status: str,
             counts[k] = len(uniq)
     if counts:
         out["counts"] = counts
+    if extra:
+        out.update(extra)
     return out
 
 
@@ -0,0 +1,223 @@
+# tools/alltools/tools/_sandbox.py
+"""
+Resource isolation for tool subprocesses (POSIX; no-ops elsewhere).
+
+spool_cmd launches every tool through preexec(): RLIMIT_AS / RLIMIT_NOFILE /
+RLIMIT_CPU, nice and ionice are applied in the child before exec. When a
+delegated cgroup v2 subtree is writable (TOOLS_CGROUP_ROOT, default
+/sys/fs/cgroup/hackr-tools) each step also gets its own child cgroup with
+cpu.max / memory.max from the tool's sandbox policy, and the child joins it
+before exec so every grandchild is accounted too.
+
+Limits come from the hidden '__policy.sandbox' field (see tools.policies);
+0 / None means "not limited". The preexec hook runs between fork and exec in
+a threaded worker, so it only touches values resolved in the parent.
+"""
+from __future__ import annotations
+import ctypes, os, platform, re
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+DEFAULT_SANDBOX: Dict[str, Any] = {
+    "address_space_mb": 8192,   # RLIMIT_AS; Go scanners reserve a lot of virtual memory
+    "nofile": 4096,             # RLIMIT_NOFILE
+    "cpu_seconds": 0,           # RLIMIT_CPU; 0 = timeout_s x CPU count
+    "nice": 10,
+    "ionice_class": 2,          # 1 realtime, 2 best-effort, 3 idle; 0 = leave alone
+    "ionice_level": 7,
+    "cgroup_cpu_pct": 0,        # cpu.max as % of one CPU (200 = two CPUs); 0 = no cap
+    "cgroup_memory_mb": 0,      # memory.max; 0 = no cap
+}
+
+CGROUP_ROOT = os.environ.get("TOOLS_CGROUP_ROOT", "/sys/fs/cgroup/hackr-tools")
+
+# ioprio_set(2) has no libc wrapper
+_IOPRIO_SYSCALL = {"x86_64": 251, "amd64": 251, "aarch64": 30, "arm64": 30, "i386": 289, "i686": 289,
+                   "armv7l": 314, "ppc64le": 273, "s390x": 283}.get(platform.machine().lower())
+try:
+    _libc = ctypes.CDLL(None, use_errno=True) if _IOPRIO_SYSCALL and os.name == "posix" else None
+    _syscall = _libc.syscall if _libc is not None else None
+except (OSError, AttributeError):
+    _syscall = None
+
+
+def _int(v, default: int = 0) -> int:
+    try:
+        return int(v)
+    except (TypeError, ValueError):
+        return default
+
+def sandbox_limits(policy: Optional[dict]) -> Dict[str, Any]:
+    """Effective sandbox settings for a tool policy (defaults filled in)."""
+    sb = (policy or {}).get("sandbox") or {}
+    return {k: (sb.get(k) if sb.get(k) is not None else v) for k, v in DEFAULT_SANDBOX.items()}
+
+
+def make_preexec(limits: Dict[str, Any], *, timeout_s: int, cgroup_fd: Optional[int] = None) -> Optional[Callable[[], None]]:
+    """Build the preexec_fn for one launch; None when there is nothing to apply."""
+    if os.name != "posix" or resource is None:
+        return None
+    rl = []
+    as_mb = _int(limits.get("address_space_mb"))
+    if as_mb > 0:
+        rl.append((resource.RLIMIT_AS, as_mb * 1024 * 1024))
+    nofile = _int(limits.get("nofile"))
+    if nofile > 0:
+        rl.append((resource.RLIMIT_NOFILE, nofile))
+    cpu_s = _int(limits.get("cpu_seconds")) or max(1, int(timeout_s)) * (os.cpu_count() or 1)
+    rl.append((resource.RLIMIT_CPU, cpu_s))
+    # never raise a limit above the worker's own hard limit (that needs privileges)
+    resolved = []
+    for what, soft in rl:
+        cur_soft, cur_hard = resource.getrlimit(what)
+        if cur_hard != resource.RLIM_INFINITY:
+            soft = min(soft, cur_hard)
+        # RLIMIT_CPU: SIGXCPU at soft, SIGKILL at hard; give it a few seconds to exit
+        hard = soft + 5 if what == resource.RLIMIT_CPU else soft
+        if cur_hard != resource.RLIM_INFINITY:
+            hard = min(hard, cur_hard)
+        resolved.append((what, (soft, hard)))
+    nice = _int(limits.get("nice"))
+    io_cls, io_lvl = _int(limits.get("ionice_class")), _int(limits.get("ionice_level"))
+    ioprio = ((io_cls & 0x7) << 13) | (io_lvl & 0x7) if io_cls and _syscall else 0
+    syscall_nr = _IOPRIO_SYSCALL
+
+    def _preexec() -> None:
+        if cgroup_fd is not None:
+            try:
+                os.write(cgroup_fd, b"0")  # "0" = the writing process
+            except OSError:
+                pass
+        for what, pair in resolved:
+            try:
+                resource.setrlimit(what, pair)
+            except (ValueError, OSError):
+                pass
+        if nice > 0:
+            try:
+                os.nice(nice)
+            except OSError:
+                pass
+        if ioprio:
+            _syscall(syscall_nr, 1, 0, ioprio)  # IOPRIO_WHO_PROCESS, self
+
+    return _preexec
+
+
+# ---------- cgroup v2 ----------
+
+def cgroup_available(root: str = CGROUP_ROOT) -> bool:
+    p = Path(root)
+    return (p / "cgroup.controllers").exists() and os.access(str(p), os.W_OK)
+
+
+class StepCgroup:
+    """One cgroup v2 child per step under the delegated root; removed on close()."""
+
+    def __init__(self, name: str, *, cpu_pct: int = 0, memory_mb: int = 0, root: str = CGROUP_ROOT):
+        self.path = Path(root) / re.sub(r"[^A-Za-z0-9_.-]", "_", name)
+        self.cpu_pct, self.memory_mb = int(cpu_pct or 0), int(memory_mb or 0)
+        self._procs_fd: Optional[int] = None
+
+    @classmethod
+    def create(cls, name: str, limits: Dict[str, Any], root: str = CGROUP_ROOT) -> Optional["StepCgroup"]:
+        if os.name != "posix" or not cgroup_available(root):
+            return None
+        cg = cls(name, cpu_pct=_int(limits.get("cgroup_cpu_pct")), memory_mb=_int(limits.get("cgroup_memory_mb")), root=root)
+        try:
+            _enable_controllers(Path(root))
+            cg.path.mkdir(exist_ok=True)
+            if cg.cpu_pct > 0:
+                period = 100_000
+                (cg.path / "cpu.max").write_text(f"{period * cg.cpu_pct // 100} {period}")
+            if cg.memory_mb > 0:
+                (cg.path / "memory.max").write_text(str(cg.memory_mb * 1024 * 1024))
+                if (cg.path / "memory.swap.max").exists():
+                    (cg.path / "memory.swap.max").write_text("0")
+            cg._procs_fd = os.open(str(cg.path / "cgroup.procs"), os.O_WRONLY)
+        except OSError:
+            cg.close()
+            return None
+        return cg
+
+    @property
+    def procs_fd(self) -> Optional[int]:
+        return self._procs_fd
+
+    def stats(self) -> Dict[str, Any]:
+        out: Dict[str, Any] = {"path": str(self.path)}
+        try:
+            for ln in (self.path / "cpu.stat").read_text().splitlines():
+                k, _, v = ln.partition(" ")
+                if k == "usage_usec":
+                    out["cpu_seconds"] = round(int(v) / 1e6, 3)
+        except OSError:
+            pass
+        try:
+            out["memory_peak_mb"] = round(int((self.path / "memory.peak").read_text().strip()) / 1048576, 1)
+        except (OSError, ValueError):
+            pass  # memory.peak needs Linux 5.19+
+        try:
+            events = dict(ln.split() for ln in (self.path / "memory.events").read_text().splitlines() if ln.strip())
+            if int(events.get("oom_kill", 0)):
+                out["oom_kills"] = int(events["oom_kill"])
+        except (OSError, ValueError):
+            pass
+        return out
+
+    def close(self) -> None:
+        if self._procs_fd is not None:
+            try:
+                os.close(self._procs_fd)
+            except OSError:
+                pass
+            self._procs_fd = None
+        try:
+            # anything still inside gets killed first; rmdir only works on an empty group
+            if (self.path / "cgroup.kill").exists():
+                (self.path / "cgroup.kill").write_text("1")
+            self.path.rmdir()
+        except OSError:
+            pass
+
+
+def _enable_controllers(root: Path) -> None:
+    try:
+        have = set((root / "cgroup.controllers").read_text().split())
+        want = [f"+{c}" for c in ("cpu", "memory") if c in have]
+        if want:
+            (root / "cgroup.subtree_control").write_text(" ".join(want))
+    except OSError:
+        pass
+
+
+# ---------- accounting ----------
+
+def reap(proc, *, block: bool = False) -> Optional[Dict[str, float]]:
+    """
+    wait4() the child of a Popen so its rusage is kept (Popen.wait would drop it).
+    Returns {"cpu_seconds", "peak_rss_kb"} once the child was reaped, else None.
+    Grandchildren count once their own parent has waited for them. preexec_fn
+    makes Popen fork rather than vfork, so ru_maxrss starts at the worker's own
+    RSS until exec; cgroup memory.peak is the exact figure where available.
+    """
+    if proc.returncode is not None:
+        return None
+    if not hasattr(os, "wait4"):
+        if (proc.wait() if block else proc.poll()) is None:
+            return None
+        return {}
+    try:
+        pid, status, ru = os.wait4(proc.pid, 0 if block else os.WNOHANG)
+    except ChildProcessError:
+        proc.poll()
+        return {}
+    if pid == 0:
+        return None
+    proc.returncode = os.waitstatus_to_exitcode(status)
+    return {"cpu_seconds": round(ru.ru_utime + ru.ru_stime, 3), "peak_rss_kb": int(ru.ru_maxrss)}
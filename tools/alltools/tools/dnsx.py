@@ -4,11 +4,12 @@ from pathlib import Path
 import os, re
 from ._common import (
     resolve_bin, ensure_work_dir, read_targets, classify_domains,
-    run_cmd, write_output_file, finalize, ValidationError, IPV4_RE, IPV6_RE
+    spool_cmd, output_limits, finalize, ValidationError, IPV4_RE, IPV6_RE
 )
 from tools.policies import get_effective_policy, clamp_from_constraints
 
 HARD_TIMEOUT = 300
+ENGINES = ("auto", "binary", "native")
 
 def run_scan(options: dict) -> dict:
     t0 = int(os.times().elapsed * 1000) if hasattr(os, "times") else 0
@@ -17,20 +18,28 @@ def run_scan(options: dict) -> dict:
     policy = options.get("_policy") or get_effective_policy(slug)
     ipol   = policy.get("input_policy", {})
     rcons  = policy.get("runtime_constraints", {})
-    exe    = resolve_bin("dnsx", "dnsx.exe")
-    if not exe:
+    engine = str(options.get("engine") or "auto").lower()
+    if engine not in ENGINES:
+        raise ValidationError(f"engine must be one of {', '.join(ENGINES)}", "INVALID_PARAMS", f"got {engine!r}")
+    exe    = resolve_bin("dnsx", "dnsx.exe") if engine != "native" else None
+    if not exe and engine == "binary":
         return finalize("error","dnsx not installed or not on PATH",options,"dnsx",t0,"",error_reason="NOT_INSTALLED")
 
     raw_targets,_ = read_targets(options, accept_keys=tuple(ipol.get("accepts") or ("domains","hosts")), file_max_bytes=ipol.get("file_max_bytes",200_000), cap=ipol.get("max_targets",50))
     if not raw_targets:
         raise ValidationError("At least one domain/host is required.","INVALID_PARAMS","no input")
-    valid, invalid = classify_domains(raw_targets)  # treat as hostnames where possible
+    valid, invalid, _ = classify_domains(raw_targets)  # treat as hostnames where possible
     if invalid and not valid:
         raise ValidationError("No valid domains/hosts.","INVALID_PARAMS",", ".join(invalid[:10]))
 
     timeout_s = min(clamp_from_constraints(options,"timeout_s", rcons.get("timeout_s"), default=30, kind="int") or 30, HARD_TIMEOUT)
     threads   = clamp_from_constraints(options,"threads",   rcons.get("threads"),   default=50, kind="int") or 50
 
+    # 'auto' falls back to the in-process resolver when the binary is missing
+    if not exe:
+        from .dnsx_native import run_native
+        return run_native(options, valid, work_dir, t0, timeout_s=timeout_s, threads=threads)
+
     args = [exe, "-silent", "-resp", "-retry", "2", "-t", str(threads), "-timeout", str(timeout_s)]
     if len(valid) <= 5:
         for d in valid: args += ["-d", d]
@@ -38,14 +47,17 @@ def run_scan(options: dict) -> dict:
         fp = Path(work_dir)/"dnsx_targets.txt"; fp.write_text("\n".join(valid), "utf-8")
         args += ["-l", str(fp)]
 
-    rc, out, ms = run_cmd(args, timeout_s=timeout_s, cwd=work_dir)
-    outfile = write_output_file(work_dir, "dnsx_output.txt", out or "")
-    lines = [(ln or "").strip() for ln in (out or "").splitlines() if ln.strip()]
+    outfile = str(Path(work_dir)/"dnsx_output.txt")
+    res = spool_cmd(args, timeout_s, outfile, cwd=work_dir, limits=output_limits(policy))
+    rc = res.rc
 
     ips = []
     doms = []
     ip_re = re.compile(rf"(?:{IPV4_RE.pattern})|(?:{IPV6_RE.pattern})", re.I)
-    for ln in lines:
+    for ln in res.iter_lines():
+        ln = ln.strip()
+        if not ln:
+            continue
         # dnsx often prints "sub.example.com [A] 1.2.3.4" or tab-separated
         parts = re.split(r"\s+", ln)
         if parts:
@@ -56,5 +68,6 @@ def run_scan(options: dict) -> dict:
     good, _, _ = classify_domains(doms)
     status = "ok" if rc == 0 else "error"
     msg = f"Resolved {len(good)} names, {len(ips)} IPs" if rc == 0 else f"dnsx error (exit={rc})"
-    return finalize(status, msg, options, " ".join(args), t0, out, output_file=outfile,
-                    domains=good, ips=ips, error_reason=None if rc==0 else "OTHER")
+    return finalize(status, msg, options, " ".join(args), t0, res.preview(), output_file=outfile,
+                    domains=good, ips=ips, error_reason=None if rc==0 else "OTHER",
+                    extra={"engine": "binary", "output_stats": res.summary()})
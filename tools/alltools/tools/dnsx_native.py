@@ -0,0 +1,64 @@
+# tools/alltools/tools/dnsx_native.py
+from __future__ import annotations
+import os
+from ._common import (
+    ensure_work_dir, read_targets, classify_domains, write_output_file, finalize, ValidationError
+)
+from tools.policies import get_effective_policy, clamp_from_constraints
+
+HARD_TIMEOUT = 30
+MAX_RECORDS_IN_MANIFEST = 5000
+
+def run_native(options: dict, valid: list, work_dir, t0: int, *, timeout_s: int, threads: int) -> dict:
+    """Resolve with the in-process asyncio engine; shared by dnsx (engine=native) and dnsx-native."""
+    from tools.alltools.engines.dns_resolve import resolve, ANSWER_CACHE
+    retries   = clamp_from_constraints(options, "retries", {"min": 0, "max": 5}, default=2, kind="int")
+    wildcard  = bool(options.get("wildcard_filter", True))
+    resolvers = options.get("resolvers") or None
+    hits0, miss0 = ANSWER_CACHE.hits, ANSWER_CACHE.misses
+
+    records = resolve(valid, resolvers=resolvers, timeout_s=min(timeout_s, HARD_TIMEOUT),
+                      retries=retries,
+                      concurrency=threads, wildcard_filter=wildcard)
+
+    alive = [r for r in records if r.resolved and not r.wildcard]
+    domains, ips, lines = [], {}, []
+    for r in alive:
+        domains.append(r.name)
+        ips.update(dict.fromkeys(r.a + r.aaaa))
+        lines.append(r.name + "".join(f" [{t.upper()}] {v}" for t in ("cname", "a", "aaaa") for v in getattr(r, t)))
+    out = "\n".join(lines)
+    outfile = write_output_file(work_dir, "dnsx_output.txt", out)
+
+    wildcards = sum(1 for r in records if r.wildcard)
+    errors = sum(1 for r in records if r.error)
+    status = "ok" if alive or errors < len(records) else "error"
+    msg = f"Resolved {len(domains)} names, {len(ips)} IPs" + (f" ({wildcards} wildcard dropped)" if wildcards else "")
+    return finalize(status, msg, options, f"(native) dns_resolve threads={threads} retries={retries}",
+                    t0, out, output_file=outfile, domains=domains, ips=list(ips),
+                    error_reason=None if status == "ok" else "TIMEOUT",
+                    error_detail=None if status == "ok" else f"{errors} names unanswered",
+                    extra={"engine": "native",
+                           "dns_records": [r.to_dict() for r in alive[:MAX_RECORDS_IN_MANIFEST]],
+                           "wildcards_dropped": wildcards,
+                           "resolve_errors": errors,
+                           "cache": {"hits": ANSWER_CACHE.hits - hits0, "misses": ANSWER_CACHE.misses - miss0}})
+
+def run_scan(options: dict) -> dict:
+    t0 = int(os.times().elapsed * 1000) if hasattr(os, "times") else 0
+    work_dir = ensure_work_dir(options)
+    slug   = options.get("tool_slug", "dnsx-native")
+    policy = options.get("_policy") or get_effective_policy(slug)
+    ipol   = policy.get("input_policy", {})
+    rcons  = policy.get("runtime_constraints", {})
+
+    raw_targets,_ = read_targets(options, accept_keys=tuple(ipol.get("accepts") or ("domains","hosts")), file_max_bytes=ipol.get("file_max_bytes",200_000), cap=ipol.get("max_targets",5000))
+    if not raw_targets:
+        raise ValidationError("At least one domain/host is required.","INVALID_PARAMS","no input")
+    valid, invalid, _ = classify_domains(raw_targets)
+    if invalid and not valid:
+        raise ValidationError("No valid domains/hosts.","INVALID_PARAMS",", ".join(invalid[:10]))
+
+    timeout_s = min(clamp_from_constraints(options,"timeout_s", rcons.get("timeout_s"), default=3, kind="int") or 3, HARD_TIMEOUT)
+    threads   = clamp_from_constraints(options,"threads",   rcons.get("threads"),   default=500, kind="int") or 500
+    return run_native(options, valid, work_dir, t0, timeout_s=timeout_s, threads=threads)
@@ -1,32 +1,47 @@
 # tools/alltools/tools/gau.py
 from __future__ import annotations
-import os, subprocess, shlex
-from ._common import ensure_work_dir, read_targets, write_output_file, finalize, ValidationError, URL_RE, resolve_bin
+import os
+from ._common import (
+    ensure_work_dir, read_targets, finalize, ValidationError, URL_RE, resolve_bin,
+    run_per_target, per_target_summary, output_limits, Checkpoint
+)
+from tools.policies import get_effective_policy, clamp_from_constraints
+
+HARD_TIMEOUT = 600
 
 def run_scan(options: dict) -> dict:
     t0 = int(os.times().elapsed*1000) if hasattr(os,"times") else 0
     work_dir = ensure_work_dir(options)
-    slug="gau"
+    slug = options.get("tool_slug", "gau")
+    policy = options.get("_policy") or get_effective_policy(slug)
+    rcons = policy.get("runtime_constraints", {})
     exe = resolve_bin("gau","gau.exe")
     if not exe:
         return finalize("error","gau not installed",options,"gau",t0,"",error_reason="NOT_INSTALLED")
 
     raw,_ = read_targets(options, accept_keys=("domains","hosts"), cap=100)
     if not raw: raise ValidationError("At least one domain is required.","INVALID_PARAMS","no input")
-    domain = raw[0]
     subs = bool(options.get("subs", True))
+    timeout_s   = min(clamp_from_constraints(options,"timeout_s",   rcons.get("timeout_s"),   default=120, kind="int") or 120, HARD_TIMEOUT)
+    concurrency = clamp_from_constraints(options,"concurrency", rcons.get("concurrency") or {"min": 1, "max": 16}, default=4, kind="int") or 4
+
+    # one gau process per domain (gau only takes a single target per invocation)
+    def _args(domain: str):
+        return [exe, domain] + (["--subs"] if subs else [])
 
-    # echo domain | gau [-subs]
-    cmd = f'echo {shlex.quote(domain)} | "{exe}"' + (" -subs" if subs else "")
-    try:
-        res = subprocess.run(cmd, shell=True, capture_output=True, text=True, cwd=str(work_dir))
-        out = (res.stdout or "")
-        rc = res.returncode
-    except Exception as e:
-        return finalize("error","Failed to execute gau",options,"gau",t0,str(e),error_reason="OTHER",error_detail=repr(e))
+    outfile = os.path.join(str(work_dir), "gau_output.txt")
+    fan = run_per_target(raw, _args, timeout_s=timeout_s, concurrency=concurrency, cwd=work_dir,
+                         spool_path=outfile, limits=output_limits(policy),
+                         checkpoint=Checkpoint.for_options(options, slug, raw, outfile))
+    out = fan["merged"]
+    urls = [m.group(0) for ln in fan["spool"].iter_lines() for m in URL_RE.finditer(ln)]
 
-    outfile = write_output_file(work_dir, "gau_output.txt", out or "")
-    urls = [m.group(0) for m in URL_RE.finditer(out or "")]
-    status="ok" if rc==0 else "error"
-    return finalize(status, f"{len(urls)} URLs", options, cmd, t0, out, output_file=outfile,
-                    urls=urls, error_reason=None if rc==0 else "OTHER")
+    summary = per_target_summary(raw, fan)
+    ok_targets = len(fan["ok"])
+    status = "ok" if ok_targets > 0 else "error"
+    msg = f"{len(urls)} URLs from {ok_targets}/{summary['targets_total']} domains"
+    first_fail = (fan["failed"] or [{}])[0]
+    return finalize(status, msg, options, " ".join(_args("<domain>")), t0, out, output_file=outfile,
+                    urls=urls, extra={**summary, "output_stats": fan["spool"].summary()},
+                    error_reason=None if status == "ok" else (first_fail.get("reason") or "OTHER"),
+                    error_detail=None if status == "ok" else first_fail.get("detail"))
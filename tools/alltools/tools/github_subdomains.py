@@ -1,51 +1,41 @@
 # tools/alltools/tools/github_subdomains.py
 from __future__ import annotations
-import os, re, time, json
-from pathlib import Path
+import os, re
 from ._common import (
-    resolve_bin, ensure_work_dir, read_targets, run_cmd, write_output_file,
-    finalize, ValidationError, classify_domains
+    resolve_bin, ensure_work_dir, read_targets, write_output_file,
+    finalize, ValidationError, classify_domains, run_per_target, per_target_summary
 )
-import subprocess
 
 HARD_TIMEOUT=300
 
-def _fallback_github_api(dom: str, token: str, work_dir: Path, t0: int, options: dict):
+def _fallback_args(token: str):
     """
     Very small fallback: uses 'gh api' if installed OR curl via subprocess.
-    Searches code for the domain string and extracts subdomains by regex.
+    Searches code for the domain string; subdomains are regex-extracted afterwards.
+    Returns a per-domain args builder, or None when neither client exists.
     """
+    headers = f"Authorization: token {token}"
     # Prefer gh if available
     gh = resolve_bin("gh","gh.exe")
-    headers = f"Authorization: token {token}"
-    q = f'"{dom}" in:file'  # keep this mild
-    urls=[]
     if gh:
-        cmd = [gh, "api", "-H", headers, "/search/code", "-f", f"q={q}", "-f", "per_page=50"]
-        rc,out,ms = run_cmd(cmd, timeout_s=HARD_TIMEOUT, cwd=work_dir)
-        if rc==0:
-            try:
-                data = json.loads(out)
-                for item in data.get("items", []):
-                    # pull_text_url if present; otherwise skip
-                    pass
-            except: pass
-        raw = out or ""
-    else:
-        # curl fallback
-        curl = resolve_bin("curl","curl.exe")
-        if not curl:
-            return finalize("error","Neither github-subdomains nor 'gh' nor 'curl' available",
-                            options,"github-subdomains",t0,"",error_reason="NOT_INSTALLED")
-        api = f"https://api.github.com/search/code?q={dom}+in:file&per_page=50"
-        rc,out,ms = run_cmd([curl,"-s","-H",headers,api], timeout_s=HARD_TIMEOUT, cwd=work_dir)
-        raw = out or ""
+        return lambda dom: [gh, "api", "-H", headers, "/search/code",
+                            "-f", f'q="{dom}" in:file', "-f", "per_page=50"]
+    # curl fallback
+    curl = resolve_bin("curl","curl.exe")
+    if curl:
+        return lambda dom: [curl, "-s", "-H", headers,
+                            f"https://api.github.com/search/code?q={dom}+in:file&per_page=50"]
+    return None
 
-    # very light regex just to get subdomains
-    sub_re = re.compile(rf"(?:[a-z0-9-]+\.)+{re.escape(dom)}", re.I)
-    candidates = list(dict.fromkeys(sub_re.findall(raw)))
-    good, bad = classify_domains(candidates)
-    return finalize("ok", f"{len(good)} candidates (API fallback)", options, "github-api", t0, raw, domains=good)
+def _extract(dom: str, text: str, via_api: bool):
+    if via_api:
+        # very light regex just to get subdomains
+        sub_re = re.compile(rf"(?:[a-z0-9-]+\.)+{re.escape(dom)}", re.I)
+        candidates = list(dict.fromkeys(sub_re.findall(text or "")))
+    else:
+        candidates = [(ln or "").strip() for ln in (text or "").splitlines() if ln.strip()]
+    good, _, _ = classify_domains(candidates)
+    return good
 
 def run_scan(options: dict) -> dict:
     t0 = int(os.times().elapsed*1000) if hasattr(os,"times") else 0
@@ -57,19 +47,29 @@ def run_scan(options: dict) -> dict:
 
     raw,_ = read_targets(options, accept_keys=("domains",), cap=5)
     if not raw: raise ValidationError("At least one root domain is required.","INVALID_PARAMS","no input")
-    dom = raw[0]
 
-    # Try the popular CLI if present
+    # Try the popular CLI if present, else the tiny API helper
     exe = resolve_bin("github-subdomains","github-subdomains.exe")
-    if exe:
-        args = [exe, "-d", dom, "-t", token]
-        rc,out,ms = run_cmd(args, timeout_s=HARD_TIMEOUT, cwd=work_dir)
-        outfile = write_output_file(work_dir, "github_subdomains_output.txt", out or "")
-        lines = [(ln or "").strip() for ln in (out or "").splitlines() if ln.strip()]
-        good,_ = classify_domains(lines)
-        status="ok" if rc==0 else "error"
-        return finalize(status, f"{len(good)} subdomains", options, " ".join(args), t0, out, output_file=outfile,
-                        domains=good, error_reason=None if rc==0 else "OTHER")
+    via_api = not exe
+    build = (lambda dom: [exe, "-d", dom, "-t", token]) if exe else _fallback_args(token)
+    if build is None:
+        return finalize("error","Neither github-subdomains nor 'gh' nor 'curl' available",
+                        options,"github-subdomains",t0,"",error_reason="NOT_INSTALLED")
+
+    # one invocation per root domain, fanned out (GitHub search is per-query anyway)
+    fan = run_per_target(raw, build, timeout_s=HARD_TIMEOUT, concurrency=min(3, len(raw)), cwd=work_dir)
+    out = fan["merged"]
+    outfile = write_output_file(work_dir, "github_subdomains_output.txt", out or "")
+
+    good = []
+    for dom, res in fan["results"].items():
+        good.extend(_extract(dom, res.get("output"), via_api))
 
-    # Fallback to tiny API helper
-    return _fallback_github_api(dom, token, work_dir, t0, options)
+    status = "ok" if fan["ok"] else "error"
+    cmd = "github-api" if via_api else f"{exe} -d <domain> -t ***"
+    msg = f"{len(good)} {'candidates (API fallback)' if via_api else 'subdomains'}"
+    first_fail = (fan["failed"] or [{}])[0]
+    return finalize(status, msg, options, cmd, t0, out, output_file=outfile,
+                    domains=good, extra=per_target_summary(raw, fan),
+                    error_reason=None if status == "ok" else (first_fail.get("reason") or "OTHER"),
+                    error_detail=None if status == "ok" else first_fail.get("detail"))
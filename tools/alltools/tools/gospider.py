@@ -2,7 +2,7 @@
 from __future__ import annotations
 from pathlib import Path
 import os
-from ._common import resolve_bin, ensure_work_dir, read_targets, run_cmd, write_output_file, finalize, ValidationError, URL_RE
+from ._common import resolve_bin, ensure_work_dir, read_targets, spool_cmd, output_limits, finalize, ValidationError, URL_RE
 from tools.policies import get_effective_policy, clamp_from_constraints
 
 def run_scan(options: dict) -> dict:
@@ -26,9 +26,9 @@ def run_scan(options: dict) -> dict:
     fp.write_text("\n".join(raw), "utf-8")
 
     args = [exe, "-S", str(fp), "-d", str(depth), "-c", str(threads), "-q"]
-    rc, out, ms = run_cmd(args, timeout_s=timeout_s, cwd=work_dir)
-    outfile = write_output_file(work_dir, "gospider_output.txt", out or "")
-    urls = [m.group(0) for m in URL_RE.finditer(out or "")]
-    status="ok" if rc==0 else "error"
-    return finalize(status, f"{len(urls)} URLs", options, " ".join(args), t0, out, output_file=outfile,
-                    urls=urls, error_reason=None if rc==0 else "OTHER")
+    outfile = str(Path(work_dir)/"gospider_output.txt")
+    res = spool_cmd(args, timeout_s, outfile, cwd=work_dir, limits=output_limits(policy))
+    urls = [m.group(0) for ln in res.iter_lines() for m in URL_RE.finditer(ln)]
+    status="ok" if res.rc==0 else "error"
+    return finalize(status, f"{len(urls)} URLs", options, " ".join(args), t0, res.preview(), output_file=outfile,
+                    urls=urls, error_reason=None if res.rc==0 else "OTHER", extra={"output_stats": res.summary()})
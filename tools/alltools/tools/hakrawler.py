@@ -1,7 +1,10 @@
 # tools/alltools/tools/hakrawler.py
 from __future__ import annotations
 import os
-from ._common import resolve_bin, ensure_work_dir, read_targets, run_cmd, write_output_file, finalize, ValidationError, URL_RE
+from ._common import (
+    resolve_bin, ensure_work_dir, read_targets, finalize, ValidationError, URL_RE,
+    run_per_target, per_target_summary, output_limits, Checkpoint
+)
 from tools.policies import get_effective_policy, clamp_from_constraints
 
 def run_scan(options: dict) -> dict:
@@ -16,15 +19,24 @@ def run_scan(options: dict) -> dict:
 
     raw,_ = read_targets(options, accept_keys=tuple(ipol.get("accepts") or ("urls","domains")), cap=50)
     if not raw: raise ValidationError("At least one URL/domain is required.","INVALID_PARAMS","no input")
-    target = raw[0]  # see note above
 
     depth = clamp_from_constraints(options,"depth", None, default=2, kind="int") or 2
     timeout_s = clamp_from_constraints(options,"timeout_s", None, default=60, kind="int") or 60
+    concurrency = clamp_from_constraints(options,"concurrency", {"min": 1, "max": 16}, default=4, kind="int") or 4
 
-    args = [exe, "-url", target, "-depth", str(depth), "-plain"]
-    rc, out, ms = run_cmd(args, timeout_s=timeout_s, cwd=work_dir)
-    outfile = write_output_file(work_dir, "hakrawler_output.txt", out or "")
-    urls = [m.group(0) for m in URL_RE.finditer(out or "")]
-    status="ok" if rc==0 else "error"
-    return finalize(status, f"{len(urls)} URLs", options, " ".join(args), t0, out, output_file=outfile,
-                    urls=urls, error_reason=None if rc==0 else "OTHER")
+    # -url takes a single target, so crawl each one in its own process
+    def _args(target: str):
+        return [exe, "-url", target, "-depth", str(depth), "-plain"]
+
+    outfile = os.path.join(str(work_dir), "hakrawler_output.txt")
+    fan = run_per_target(raw, _args, timeout_s=timeout_s, concurrency=concurrency, cwd=work_dir,
+                         spool_path=outfile, limits=output_limits(policy),
+                         checkpoint=Checkpoint.for_options(options, slug, raw, outfile))
+    out = fan["merged"]
+    urls = [m.group(0) for ln in fan["spool"].iter_lines() for m in URL_RE.finditer(ln)]
+    status = "ok" if fan["ok"] else "error"
+    first_fail = (fan["failed"] or [{}])[0]
+    return finalize(status, f"{len(urls)} URLs", options, " ".join(_args("<url>")), t0, out, output_file=outfile,
+                    urls=urls, extra={**per_target_summary(raw, fan), "output_stats": fan["spool"].summary()},
+                    error_reason=None if status == "ok" else (first_fail.get("reason") or "OTHER"),
+                    error_detail=None if status == "ok" else first_fail.get("detail"))
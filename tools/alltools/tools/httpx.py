@@ -1,14 +1,44 @@
 # tools/alltools/tools/httpx.py
 from __future__ import annotations
 from pathlib import Path
+from urllib.parse import urlsplit
 import os
 from ._common import (
-    resolve_bin, ensure_work_dir, read_targets, run_cmd, write_output_file,
+    resolve_bin, ensure_work_dir, read_targets, spool_cmd, output_limits, write_output_file,
     finalize, ValidationError, URL_RE
 )
 from tools.policies import get_effective_policy, clamp_from_constraints
 
 HARD_TIMEOUT=300
+ENGINES = ("auto", "binary", "native")
+
+def _meta_suffix(r) -> str:
+    """httpx CLI style: [status] [title] [length] [content-type] [server] [-> location]"""
+    parts = [r.status, r.title, r.content_length, r.content_type, r.server,
+             f"-> {r.location}" if r.location else None]
+    return "".join(f" [{p}]" for p in parts if p not in (None, ""))
+
+def _run_native(options: dict, raw: list, work_dir, t0: int, *, timeout_s: int, threads: int) -> dict:
+    """Probe with the in-process asyncio engine (no binary, no stdout re-parsing)."""
+    from tools.alltools.engines.http_probe import probe
+    per_host = clamp_from_constraints(options, "per_host", {"min": 1, "max": 32}, default=4, kind="int") or 4
+    want_title = bool(options.get("title", True))
+    results = probe(raw, concurrency=threads, per_host=per_host, timeout_s=timeout_s, want_title=want_title)
+
+    alive = [r for r in results if r.alive]
+    urls, services, lines = [], [], []
+    for r in alive:
+        sp = urlsplit(r.url)
+        port = sp.port or (443 if sp.scheme == "https" else 80)
+        urls.append(r.url)
+        services.append(f"{sp.hostname}:{port}")
+        lines.append(r.url + _meta_suffix(r))
+    out = "\n".join(lines)
+    # per-host metadata lives in the output file (artifact), not in the step manifest
+    outfile = write_output_file(work_dir, "httpx_output.txt", out)
+    return finalize("ok", f"{len(urls)} alive", options, f"(native) http_probe threads={threads} per_host={per_host}",
+                    t0, out, output_file=outfile, urls=urls, services=services,
+                    extra={"engine": "native", "probe_errors": sum(1 for r in results if r.error)})
 
 def run_scan(options: dict) -> dict:
     t0 = int(os.times().elapsed*1000) if hasattr(os,"times") else 0
@@ -17,8 +47,12 @@ def run_scan(options: dict) -> dict:
     policy = options.get("_policy") or get_effective_policy(slug)
     ipol = policy.get("input_policy",{})
     rcons = policy.get("runtime_constraints",{})
-    exe = resolve_bin("httpx","httpx.exe")
-    if not exe:
+
+    engine = str(options.get("engine") or "auto").lower()
+    if engine not in ENGINES:
+        raise ValidationError(f"engine must be one of {', '.join(ENGINES)}", "INVALID_PARAMS", f"got {engine!r}")
+    exe = resolve_bin("httpx","httpx.exe") if engine != "native" else None
+    if not exe and engine == "binary":
         return finalize("error","httpx not installed",options,"httpx",t0,"",error_reason="NOT_INSTALLED")
 
     raw,_ = read_targets(options, accept_keys=tuple(ipol.get("accepts") or ("urls","hosts","domains")),
@@ -29,6 +63,17 @@ def run_scan(options: dict) -> dict:
     threads   = clamp_from_constraints(options,"threads",   rcons.get("threads"),   default=50, kind="int") or 50
     follow    = bool(options.get("follow_redirects", False))
 
+    # 'auto' falls back to the native engine when the binary is missing, unless an
+    # option needs the binary (the native engine does not follow redirects)
+    if not exe:
+        if follow and engine == "native":
+            raise ValidationError("follow_redirects is not supported by the native engine", "INVALID_PARAMS",
+                                  "use engine=binary or auto with httpx installed")
+        if follow:
+            return finalize("error", "httpx not installed (needed for follow_redirects)", options, "httpx", t0, "",
+                            error_reason="NOT_INSTALLED")
+        return _run_native(options, raw, work_dir, t0, timeout_s=timeout_s, threads=threads)
+
     args = [exe, "-silent", "-nc", "-t", str(threads), "-timeout", str(timeout_s)]
     if follow: args.append("-follow-redirects")
 
@@ -39,9 +84,10 @@ def run_scan(options: dict) -> dict:
         fp = Path(work_dir)/"httpx_targets.txt"; fp.write_text("\n".join(raw), "utf-8")
         args += ["-l", str(fp)]
 
-    rc, out, ms = run_cmd(args, timeout_s=timeout_s, cwd=work_dir)
-    outfile = write_output_file(work_dir, "httpx_output.txt", out or "")
-    urls = [m.group(0) for m in URL_RE.finditer(out or "")]
-    status = "ok" if rc==0 else "error"
-    return finalize(status, f"{len(urls)} alive", options, " ".join(args), t0, out, output_file=outfile,
-                    urls=urls, error_reason=None if rc==0 else "OTHER")
+    outfile = str(Path(work_dir)/"httpx_output.txt")
+    res = spool_cmd(args, timeout_s, outfile, cwd=work_dir, limits=output_limits(policy))
+    urls = [m.group(0) for ln in res.iter_lines() for m in URL_RE.finditer(ln)]
+    status = "ok" if res.rc==0 else "error"
+    return finalize(status, f"{len(urls)} alive", options, " ".join(args), t0, res.preview(), output_file=outfile,
+                    urls=urls, error_reason=None if res.rc==0 else "OTHER",
+                    extra={"engine": "binary", "output_stats": res.summary()})
@@ -3,12 +3,13 @@ from __future__ import annotations
 from pathlib import Path
 import os
 from ._common import (
-    resolve_bin, ensure_work_dir, read_targets, run_cmd, write_output_file,
-    finalize, ValidationError, URL_RE
+    resolve_bin, ensure_work_dir, read_targets, run_batches, output_limits,
+    finalize, ValidationError, URL_RE, Checkpoint
 )
 from tools.policies import get_effective_policy, clamp_from_constraints
 
 HARD_TIMEOUT=600
+CHECKPOINT_BATCH=int(os.environ.get("KATANA_CHECKPOINT_BATCH", "25"))  # targets crawled between checkpoints
 
 def run_scan(options: dict) -> dict:
     t0 = int(os.times().elapsed*1000) if hasattr(os,"times") else 0
@@ -29,16 +30,27 @@ def run_scan(options: dict) -> dict:
     threads   = clamp_from_constraints(options,"threads",   rcons.get("threads"),   default=10, kind="int") or 10
     depth     = clamp_from_constraints(options,"depth",     rcons.get("depth"),     default=2, kind="int") or 2
 
-    args = [exe, "-silent", "-nc", "-timeout", str(timeout_s), "-t", str(threads), "-d", str(depth)]
-    if len(raw) <= 5:
-        for u in raw: args += ["-u", u]
-    else:
-        fp = Path(work_dir)/"katana_targets.txt"; fp.write_text("\n".join(raw), "utf-8")
-        args += ["-list", str(fp)]
+    cmd: list = []
+    base = [exe, "-silent", "-nc", "-timeout", str(timeout_s), "-t", str(threads), "-d", str(depth)]
+    def _args(batch):
+        args = list(base)
+        if len(batch) <= 5:
+            for u in batch: args += ["-u", u]
+        else:
+            fp = Path(work_dir)/"katana_targets.txt"; fp.write_text("\n".join(batch), "utf-8")
+            args += ["-list", str(fp)]
+        cmd[:] = args
+        return args
 
-    rc, out, ms = run_cmd(args, timeout_s=timeout_s, cwd=work_dir)
-    outfile = write_output_file(work_dir, "katana_output.txt", out or "")
-    urls = [m.group(0) for m in URL_RE.finditer(out or "")]
-    status = "ok" if rc==0 else "error"
-    return finalize(status, f"{len(urls)} URLs", options, " ".join(args), t0, out, output_file=outfile,
-                    urls=urls, error_reason=None if rc==0 else "OTHER")
+    # long crawls go in batches so a retry resumes after the last finished one
+    outfile = str(Path(work_dir)/"katana_output.txt")
+    ckpt = Checkpoint.for_options(options, slug, raw, outfile)
+    res = run_batches(raw, _args, batch_size=CHECKPOINT_BATCH, timeout_s=timeout_s, spool_path=outfile,
+                      cwd=work_dir, limits=output_limits(policy), checkpoint=ckpt)
+    urls = [m.group(0) for ln in res.iter_lines() for m in URL_RE.finditer(ln)]
+    status = "ok" if res.rc==0 else "error"
+    extra = {"output_stats": res.summary()}
+    if ckpt is not None:
+        extra["checkpoint"] = ckpt.summary()
+    return finalize(status, f"{len(urls)} URLs", options, " ".join(cmd or base), t0, res.preview(), output_file=outfile,
+                    urls=urls, error_reason=None if res.rc==0 else "OTHER", extra=extra)
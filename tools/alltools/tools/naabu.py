@@ -3,7 +3,7 @@ from __future__ import annotations
 from pathlib import Path
 import os, re
 from ._common import (
-    resolve_bin, ensure_work_dir, read_targets, run_cmd, write_output_file,
+    resolve_bin, ensure_work_dir, read_targets, spool_cmd, output_limits,
     finalize, ValidationError, IPV4_RE
 )
 from tools.policies import get_effective_policy, clamp_from_constraints
@@ -38,12 +38,13 @@ def run_scan(options: dict) -> dict:
         fp = Path(work_dir)/"naabu_targets.txt"; fp.write_text("\n".join(raw), "utf-8")
         args += ["-l", str(fp)]
 
-    rc, out, ms = run_cmd(args, timeout_s=timeout_s, cwd=work_dir)
-    outfile = write_output_file(work_dir, "naabu_output.txt", out or "")
+    outfile = str(Path(work_dir)/"naabu_output.txt")
+    res = spool_cmd(args, timeout_s, outfile, cwd=work_dir, limits=output_limits(policy))
+    rc = res.rc
     # format usually host:port
     services = []
     ports = set()
-    for ln in (out or "").splitlines():
+    for ln in res.iter_lines():
         ln = ln.strip()
         if not ln or ":" not in ln: continue
         services.append(ln)
@@ -53,5 +54,6 @@ def run_scan(options: dict) -> dict:
         except: pass
 
     status = "ok" if rc==0 else "error"
-    return finalize(status, f"{len(services)} open services", options, " ".join(args), t0, out, output_file=outfile,
-                    services=services, ports=[str(p) for p in sorted(ports)], error_reason=None if rc==0 else "OTHER")
+    return finalize(status, f"{len(services)} open services", options, " ".join(args), t0, res.preview(), output_file=outfile,
+                    services=services, ports=[str(p) for p in sorted(ports)], error_reason=None if rc==0 else "OTHER",
+                    extra={"output_stats": res.summary()})
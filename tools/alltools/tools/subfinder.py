@@ -3,7 +3,7 @@ import os
 from pathlib import Path
 from ._common import (
     resolve_bin, ensure_work_dir, read_targets, classify_domains,
-    run_cmd, write_output_file, finalize, ValidationError, now_ms,  # <-- add now_ms
+    spool_cmd, output_limits, finalize, ValidationError, Canceled, now_ms,  # <-- add now_ms
 )
 from tools.policies import get_effective_policy, clamp_from_constraints
 
@@ -83,13 +83,14 @@ def run_scan(options: dict) -> dict:
             args += ["-dL", str(targets_txt)]
 
         # 5) Execute
-        rc, out, ms = run_cmd(args, timeout_s=timeout_s, cwd=work_dir)
+        outfile = str(Path(work_dir) / "subfinder_output.txt")
+        res = spool_cmd(args, timeout_s, outfile, cwd=work_dir, limits=output_limits(policy))
+        rc, out = res.rc, res.preview()
 
-        # 6) Parse + persist
-        lines = [ln.strip() for ln in (out or "").splitlines() if ln.strip()]
+        # 6) Parse (the spool file is the persisted output)
+        lines = [ln.strip() for ln in res.iter_lines() if ln.strip()]
         tmp = classify_domains(lines)
         got_valid = tmp[0] if isinstance(tmp, (list, tuple)) else []
-        outfile = write_output_file(work_dir, "subfinder_output.txt", out or "")
 
         if rc != 0:
             return finalize(
@@ -104,12 +105,16 @@ def run_scan(options: dict) -> dict:
             f"Found {len(got_valid)} subdomains",
             options, " ".join(args), t0, out,
             output_file=outfile,
-            domains=got_valid
+            domains=got_valid,
+            extra={"output_stats": res.summary()}
         )
 
+    except Canceled:
+        raise
     except ValidationError as ve:
         return finalize(
-            "error", ve.message, options, "subfinder", t0, raw_out="",
+            "error", ve.message, options, "subfinder", t0, raw_out=getattr(ve, "partial", ""),
+            output_file=getattr(getattr(ve, "output", None), "path", None),
             error_reason=ve.reason, error_detail=ve.detail
         )
     except Exception as e:
@@ -0,0 +1,2 @@
+# tools/bench: local, network-free benchmark harnesses for the tools engine.
+# Run modules directly, e.g. `python -m tools.bench.http_probe --hosts 2000`.
@@ -0,0 +1,59 @@
+# tools/bench/classify.py
+"""
+Throughput of the shared line classifier and the three callers built on it.
+
+    python -m tools.bench.classify --lines 1000000
+"""
+from __future__ import annotations
+import argparse, json, random, time
+from collections import Counter
+
+from tools.alltools._manifest_utils import split_typed
+from tools.ingest import _categorize_lines_to_accepted
+from tools.utils.domain_classification import classify_lines
+from tools.utils.line_classifier import classify
+
+# (weight, line factory): roughly what recon tools print
+MIX = (
+    (30, lambda i: f"https://h{i}.bench.test/p/{i}?q=1"),
+    (35, lambda i: f"s{i}.bench.test"),
+    (15, lambda i: f"10.{(i >> 16) & 255}.{(i >> 8) & 255}.{i & 255}"),
+    (10, lambda i: f"h{i}.bench.test:8443"),
+    (5, lambda i: f"/api/v{i % 3}/item/{i}"),
+    (3, lambda i: "not a target"),
+    (2, lambda i: f"2001:db8::{i & 0xffff:x}"),
+)
+
+
+def make_lines(n: int, seed: int = 1) -> list:
+    rnd = random.Random(seed)
+    weights, makers = zip(*MIX)
+    return [rnd.choices(makers, weights)[0](i) for i in range(n)]
+
+def _time(fn, lines) -> dict:
+    t0 = time.perf_counter()
+    fn(lines)
+    wall = time.perf_counter() - t0
+    return {"wall_s": round(wall, 3), "lines_per_s": round(len(lines) / wall) if wall else None}
+
+def run(n: int) -> dict:
+    lines = make_lines(n)
+    return {
+        "lines": n,
+        "kinds": dict(Counter(k for k, _ in classify(lines))),
+        "classify": _time(classify, lines),
+        "ingest_categorize": _time(lambda ls: _categorize_lines_to_accepted(ls, ["urls", "domains", "hosts", "ips"]), lines),
+        "split_typed": _time(split_typed, lines),
+        "classify_lines": _time(classify_lines, lines),
+    }
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__)
+    ap.add_argument("--lines", type=int, default=1_000_000)
+    a = ap.parse_args(argv)
+    print(json.dumps(run(a.lines), indent=2))
+
+
+if __name__ == "__main__":
+    main()
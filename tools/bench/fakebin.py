@@ -0,0 +1,145 @@
+# tools/bench/fakebin.py
+"""
+Deterministic stand-ins for the ProjectDiscovery binaries used by the
+pipeline benchmark. Each accepts the same flags our adapters pass and writes
+output lines derived only from its inputs, so runs are reproducible.
+
+    python tools/bench/fakebin.py subfinder -silent -d example.com
+
+Knobs (environment, so they survive the adapter's argv):
+    FAKEBIN_LINES       lines per input target (default 100)
+    FAKEBIN_RATE        max lines/s per process, 0 = unthrottled (default 0)
+    FAKEBIN_LINE_BYTES  pad each line to about this many bytes (default 0)
+    FAKEBIN_ALIVE_PCT   % of httpx/naabu inputs reported alive/open (default 100)
+    FAKEBIN_EXIT        exit code to finish with (default 0)
+
+install(dir) writes tiny shims named subfinder/httpx/naabu/katana into dir;
+prepend dir to PATH and resolve_bin() picks them up.
+"""
+from __future__ import annotations
+import argparse, hashlib, os, stat, sys, time
+from pathlib import Path
+from typing import Iterator, List
+
+NAMES = ("subfinder", "httpx", "naabu", "katana")
+DEFAULT_PORTS = (80, 443, 8080, 8443)
+
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        return int(os.environ.get(name, default))
+    except ValueError:
+        return default
+
+def _keep(value: str, pct: int) -> bool:
+    if pct >= 100:
+        return True
+    return int(hashlib.sha1(value.encode()).hexdigest()[:4], 16) % 100 < pct
+
+def _read_list(path: str) -> List[str]:
+    with open(path, "r", encoding="utf-8", errors="ignore") as fh:
+        return [ln.strip() for ln in fh if ln.strip()]
+
+def _pad_domain(name: str, size: int) -> str:
+    # extra labels in front keep the line a valid hostname (<= 253 chars)
+    size = min(size, 253)
+    while len(name) + 2 <= size:
+        take = min(63, size - len(name) - 1)
+        name = ("p" * take) + "." + name
+    return name
+
+def _pad_url(url: str, size: int) -> str:
+    gap = size - len(url) - 5
+    return f"{url}?pad={'x' * gap}" if gap > 0 else url
+
+
+def _subfinder(a, n: int, pad: int) -> Iterator[str]:
+    doms = list(a.d or []) + (_read_list(a.dL) if a.dL else [])
+    for d in doms:
+        for i in range(n):
+            yield _pad_domain(f"s{i:06d}.{d}", pad) if pad else f"s{i:06d}.{d}"
+
+def _httpx(a, n: int, pad: int) -> Iterator[str]:
+    alive = _env_int("FAKEBIN_ALIVE_PCT", 100)
+    for t in list(a.u or []) + (_read_list(a.l) if a.l else []):
+        if not _keep(t, alive):
+            continue
+        url = t if "://" in t else f"https://{t}"
+        yield f"{_pad_url(url, pad) if pad else url} [200] [fake]"
+
+def _naabu(a, n: int, pad: int) -> Iterator[str]:
+    alive = _env_int("FAKEBIN_ALIVE_PCT", 100)
+    ports: List[int] = []
+    for part in (a.p or "").split(","):
+        part = part.strip()
+        if "-" in part:
+            lo, hi = part.split("-", 1)
+            ports.extend(range(int(lo), int(hi) + 1))
+        elif part.isdigit():
+            ports.append(int(part))
+    ports = ports or list(DEFAULT_PORTS)
+    for h in list(a.host or []) + (_read_list(a.l) if a.l else []):
+        for p in ports:
+            if _keep(f"{h}:{p}", alive):
+                yield f"{h}:{p}"
+
+def _katana(a, n: int, pad: int) -> Iterator[str]:
+    for u in list(a.u or []) + (_read_list(a.list) if a.list else []):
+        base = (u if "://" in u else f"https://{u}").rstrip("/")
+        for i in range(n):
+            url = f"{base}/p/{i}"
+            yield _pad_url(url, pad) if pad else url
+
+GENERATORS = {"subfinder": _subfinder, "httpx": _httpx, "naabu": _naabu, "katana": _katana}
+
+
+def _parser(name: str) -> argparse.ArgumentParser:
+    ap = argparse.ArgumentParser(prog=name, add_help=False)
+    if name == "subfinder":
+        ap.add_argument("-d", action="append"); ap.add_argument("-dL")
+    elif name == "httpx":
+        ap.add_argument("-u", action="append"); ap.add_argument("-l")
+    elif name == "naabu":
+        ap.add_argument("-host", action="append"); ap.add_argument("-l"); ap.add_argument("-p")
+    elif name == "katana":
+        ap.add_argument("-u", action="append"); ap.add_argument("-list"); ap.add_argument("-d")
+    return ap
+
+def main(argv=None) -> int:
+    argv = list(sys.argv[1:] if argv is None else argv)
+    if not argv or argv[0] not in GENERATORS:
+        print(f"usage: fakebin {{{','.join(NAMES)}}} [tool flags]", file=sys.stderr)
+        return 2
+    name = argv.pop(0)
+    a, _ = _parser(name).parse_known_args(argv)
+    n, rate, pad = _env_int("FAKEBIN_LINES", 100), _env_int("FAKEBIN_RATE", 0), _env_int("FAKEBIN_LINE_BYTES", 0)
+
+    out = sys.stdout
+    t0, emitted = time.monotonic(), 0
+    for line in GENERATORS[name](a, n, pad):
+        out.write(line + "\n")
+        emitted += 1
+        if rate and emitted % 64 == 0:
+            ahead = emitted / rate - (time.monotonic() - t0)
+            if ahead > 0:
+                out.flush()
+                time.sleep(ahead)
+    out.flush()
+    return _env_int("FAKEBIN_EXIT", 0)
+
+
+def install(bin_dir, names=NAMES) -> Path:
+    """Write executable shims for `names` into bin_dir and return it."""
+    bin_dir = Path(bin_dir)
+    bin_dir.mkdir(parents=True, exist_ok=True)
+    # run this file directly: importing the 'tools' package would boot the whole app
+    script = Path(__file__).resolve()
+    for name in names:
+        p = bin_dir / name
+        p.write_text(f'#!/bin/sh\nexec "{sys.executable}" "{script}" {name} "$@"\n', encoding="utf-8")
+        p.chmod(p.stat().st_mode | stat.S_IXUSR | stat.S_IXGRP | stat.S_IXOTH)
+    return bin_dir
+
+
+if __name__ == "__main__":
+    sys.exit(main())
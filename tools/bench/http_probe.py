@@ -0,0 +1,51 @@
+# tools/bench/http_probe.py
+"""
+Benchmark the native HTTP prober against a loopback server with N virtual hosts.
+
+    python -m tools.bench.http_probe --hosts 5000 --concurrency 200
+"""
+from __future__ import annotations
+import argparse, asyncio, json, statistics, time
+
+from tools.alltools.engines.http_probe import expand_targets, _probe_groups
+from tools.bench.stubs import VHostHttpServer
+
+
+def run(hosts: int, concurrency: int, per_host: int, no_head: bool, dead_every: int) -> dict:
+    with VHostHttpServer(head_allowed=not no_head) as srv:
+        names = [f"vh{i}.{'dead.' if dead_every and i % dead_every == 0 else ''}bench.local" for i in range(hosts)]
+        resolve = {n: "127.0.0.1" for n in names}
+        targets = [f"http://{n}:{srv.port}/" for n in names]
+        t0 = time.perf_counter()
+        results = asyncio.run(_probe_groups(expand_targets(targets), concurrency=concurrency,
+                                            per_host=per_host, timeout_s=5, resolve=resolve))
+        wall = time.perf_counter() - t0
+        lat = sorted(r.elapsed_ms for r in results)
+        alive = sum(1 for r in results if r.alive)
+        return {
+            "hosts": hosts,
+            "alive": alive,
+            "errors": sum(1 for r in results if r.error),
+            "wall_s": round(wall, 3),
+            "probes_per_s": round(hosts / wall, 1) if wall else None,
+            "p50_ms": lat[len(lat) // 2] if lat else None,
+            "p95_ms": lat[int(len(lat) * 0.95) - 1] if lat else None,
+            "mean_ms": round(statistics.mean(lat), 2) if lat else None,
+            "server_requests": srv.requests,
+            "titles_ok": sum(1 for r in results if r.alive and r.title and r.title.startswith("vh")),
+        }
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__)
+    ap.add_argument("--hosts", type=int, default=2000)
+    ap.add_argument("--concurrency", type=int, default=200)
+    ap.add_argument("--per-host", type=int, default=4)
+    ap.add_argument("--no-head", action="store_true", help="server answers 405 to HEAD (exercise GET fallback)")
+    ap.add_argument("--dead-every", type=int, default=0, help="every Nth vhost drops the connection")
+    a = ap.parse_args(argv)
+    print(json.dumps(run(a.hosts, a.concurrency, a.per_host, a.no_head, a.dead_every), indent=2))
+
+
+if __name__ == "__main__":
+    main()
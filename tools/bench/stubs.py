@@ -0,0 +1,181 @@
+# tools/bench/stubs.py
+"""
+Loopback stub servers used by the benchmarks (no external network needed).
+Each stub runs its own asyncio loop in a daemon thread; use as a context manager.
+"""
+from __future__ import annotations
+import asyncio, ipaddress, struct, threading
+from typing import Dict, List, Optional
+
+
+class _LoopThread:
+    def __init__(self):
+        self.loop = asyncio.new_event_loop()
+        self._t = threading.Thread(target=self.loop.run_forever, daemon=True)
+
+    def start(self):
+        self._t.start()
+
+    def call(self, coro, timeout: float = 10.0):
+        return asyncio.run_coroutine_threadsafe(coro, self.loop).result(timeout)
+
+    def stop(self):
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self._t.join(timeout=5)
+
+
+class VHostHttpServer:
+    """
+    Keep-alive HTTP/1.1 server answering for any Host header with a tiny HTML
+    page whose <title> echoes the virtual host. Hosts ending in '.dead.' close
+    the connection without replying; HEAD can be disabled to exercise the GET fallback.
+    """
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, *, head_allowed: bool = True,
+                 body_pad: int = 0):
+        self.host, self.port = host, port
+        self.head_allowed = head_allowed
+        self.body_pad = body_pad
+        self.requests = 0
+        self._lt: Optional[_LoopThread] = None
+        self._server = None
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            while True:
+                try:
+                    head = await reader.readuntil(b"\r\n\r\n")
+                except (asyncio.IncompleteReadError, ConnectionError):
+                    break
+                self.requests += 1
+                lines = head.decode("latin-1").split("\r\n")
+                method = lines[0].split(" ", 1)[0]
+                vhost = next((l.split(":", 1)[1].strip() for l in lines[1:] if l.lower().startswith("host:")), "")
+                vhost = vhost.split(":", 1)[0]
+                if ".dead." in f".{vhost}.":
+                    break
+                if method == "HEAD" and not self.head_allowed:
+                    writer.write(b"HTTP/1.1 405 Method Not Allowed\r\nContent-Length: 0\r\n\r\n")
+                    await writer.drain()
+                    continue
+                body = (f"<html><head><title>{vhost}</title></head><body>"
+                        + ("x" * self.body_pad) + "</body></html>").encode()
+                hdr = (f"HTTP/1.1 200 OK\r\nServer: bench-stub\r\nContent-Type: text/html\r\n"
+                       f"Content-Length: {len(body)}\r\n\r\n").encode()
+                writer.write(hdr if method == "HEAD" else hdr + body)
+                await writer.drain()
+        finally:
+            writer.close()
+
+    def __enter__(self):
+        self._lt = _LoopThread(); self._lt.start()
+
+        async def _start():
+            return await asyncio.start_server(self._handle, self.host, self.port, backlog=4096)
+        self._server = self._lt.call(_start())
+        self.port = self._server.sockets[0].getsockname()[1]
+        return self
+
+    def __exit__(self, *exc):
+        async def _stop():
+            self._server.close()
+        try:
+            self._lt.call(_stop())
+        finally:
+            self._lt.stop()
+
+
+def _encode_name(name: str) -> bytes:
+    return b"".join(bytes([len(l)]) + l.encode() for l in name.strip(".").split(".") if l) + b"\x00"
+
+
+class StubDnsServer:
+    """
+    Authoritative-style UDP DNS stub for A/AAAA/CNAME.
+
+    records:   {"www.example.test": {"a": [...], "aaaa": [...], "cname": "edge.example.test"}}
+    wildcards: {"wild.example.test": ["10.9.9.9"]}  -> any *.wild.example.test answers these
+    drop_every: silently ignore every Nth query (exercise client retries)
+    Unknown names get NXDOMAIN.
+    """
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, *, records: Optional[Dict[str, dict]] = None,
+                 wildcards: Optional[Dict[str, List[str]]] = None, ttl: int = 300, drop_every: int = 0):
+        self.host, self.port = host, port
+        self.records = {k.lower().rstrip("."): v for k, v in (records or {}).items()}
+        self.wildcards = {k.lower().rstrip("."): v for k, v in (wildcards or {}).items()}
+        self.ttl = ttl
+        self.drop_every = drop_every
+        self.queries = 0
+        self._lt: Optional[_LoopThread] = None
+        self._transport = None
+
+    def _lookup(self, name: str) -> Optional[dict]:
+        if name in self.records:
+            return self.records[name]
+        parts = name.split(".")
+        for i in range(1, len(parts) - 1):
+            ips = self.wildcards.get(".".join(parts[i:]))
+            if ips is not None:
+                return {"a": ips}
+        return None
+
+    def answer(self, data: bytes) -> Optional[bytes]:
+        self.queries += 1
+        if self.drop_every and self.queries % self.drop_every == 0:
+            return None
+        qid, _, _, _, _, _ = struct.unpack("!HHHHHH", data[:12])
+        off, labels = 12, []
+        while data[off]:
+            labels.append(data[off + 1: off + 1 + data[off]].decode())
+            off += 1 + data[off]
+        qtype = struct.unpack("!H", data[off + 1: off + 3])[0]
+        question = data[12: off + 5]
+        name = ".".join(labels).lower()
+
+        rrs: List[bytes] = []
+        owner, rec = b"\xc0\x0c", self._lookup(name)
+        if rec and rec.get("cname"):
+            target = rec["cname"].lower().rstrip(".")
+            rdata = _encode_name(target)
+            rrs.append(owner + struct.pack("!HHIH", 5, 1, self.ttl, len(rdata)) + rdata)
+            owner, rec = _encode_name(target), self._lookup(target) or {}
+        if rec is not None:
+            key, size = ("a", 4) if qtype == 1 else ("aaaa", 16) if qtype == 28 else (None, 0)
+            for ip in (rec.get(key) or []) if key else []:
+                raw = ipaddress.ip_address(ip).packed
+                rrs.append(owner + struct.pack("!HHIH", qtype, 1, self.ttl, size) + raw)
+        flags = 0x8180 | (3 if rec is None else 0)
+        return struct.pack("!HHHHHH", qid, flags, 1, len(rrs), 0, 0) + question + b"".join(rrs)
+
+    def __enter__(self):
+        self._lt = _LoopThread(); self._lt.start()
+        outer = self
+
+        class _Proto(asyncio.DatagramProtocol):
+            def connection_made(self, transport):
+                self.transport = transport
+
+            def datagram_received(self, data, addr):
+                try:
+                    resp = outer.answer(data)
+                except Exception:
+                    resp = None
+                if resp:
+                    self.transport.sendto(resp, addr)
+
+        async def _start():
+            loop = asyncio.get_running_loop()
+            tr, _ = await loop.create_datagram_endpoint(_Proto, local_addr=(self.host, self.port))
+            return tr
+        self._transport = self._lt.call(_start())
+        self.port = self._transport.get_extra_info("sockname")[1]
+        return self
+
+    @property
+    def address(self) -> str:
+        return f"{self.host}:{self.port}"
+
+    def __exit__(self, *exc):
+        self._lt.loop.call_soon_threadsafe(self._transport.close)
+        self._lt.stop()
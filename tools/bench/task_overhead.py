@@ -0,0 +1,103 @@
+# tools/bench/task_overhead.py
+"""
+Per-task overhead of AppContextTask: the old per-call path (sys.path/PYTHONPATH
+rewrite, importlib.invalidate_caches, debug prints, lazy app, one app context
+per task) against the worker_process_init path (app built once, one context
+per child, session cleanup per task).
+
+    python -m tools.bench.task_overhead --calls 5000
+"""
+from __future__ import annotations
+import argparse, contextlib, importlib, io, json, os, statistics, sys, time
+
+import celery_app
+from celery_app import celery, PROJECT_ROOT, AppContextTask
+
+
+def _legacy_call(holder: dict, task, *args, **kwargs):
+    """AppContextTask.__call__ as it was before the worker_process_init hook."""
+    try:
+        before = sys.path[:3]
+        if str(PROJECT_ROOT) not in sys.path:
+            sys.path.insert(0, str(PROJECT_ROOT))
+        if str(PROJECT_ROOT.parent) not in sys.path:
+            sys.path.insert(1, str(PROJECT_ROOT.parent))
+        os.environ["PYTHONPATH"] = os.pathsep.join(
+            [str(PROJECT_ROOT), str(PROJECT_ROOT.parent), os.environ.get("PYTHONPATH", "")]
+        )
+        importlib.invalidate_caches()
+        after = sys.path[:3]
+        print(">> sys.path before:", before)
+        print(">> sys.path after:", after)
+    except Exception as e:
+        print(">> sys.path inject error:", repr(e))
+    if holder.get("app") is None:
+        holder["app"] = celery_app._load_flask_app()
+    with holder["app"].app_context():
+        return task.run(*args, **kwargs)
+
+
+def _touch_db():
+    from extensions import db
+    from sqlalchemy import text
+    db.session.execute(text("SELECT 1"))
+
+
+def _time(fn, calls: int) -> dict:
+    lat = []
+    for _ in range(calls):
+        t = time.perf_counter()
+        fn()
+        lat.append((time.perf_counter() - t) * 1e6)
+    lat.sort()
+    return {"mean_us": round(statistics.mean(lat), 1),
+            "p50_us": round(lat[len(lat) // 2], 1),
+            "p95_us": round(lat[int(len(lat) * 0.95) - 1], 1) if len(lat) > 1 else round(lat[0], 1)}
+
+
+def run(calls: int, touch_db: bool) -> dict:
+    body = _touch_db if touch_db else (lambda: None)
+
+    @celery.task(name="tools.bench.task_overhead.noop", base=AppContextTask)
+    def noop():
+        body()
+
+    sink = io.StringIO()
+    out = {"calls": calls, "touch_db": touch_db, "python_path_entries_before": len(sys.path)}
+    with contextlib.redirect_stdout(sink):
+        # old path: the first task pays for the app build
+        holder: dict = {}
+        t = time.perf_counter()
+        _legacy_call(holder, noop)
+        out["legacy_first_task_ms"] = round((time.perf_counter() - t) * 1000, 1)
+        out["legacy"] = _time(lambda: _legacy_call(holder, noop), calls)
+
+        # new path: worker_process_init does the build + warm-up before any task
+        celery_app._flask_app = None
+        t = time.perf_counter()
+        celery_app._init_worker_process()
+        out["init_hook_ms"] = round((time.perf_counter() - t) * 1000, 1)
+        t = time.perf_counter()
+        noop()
+        out["first_task_ms"] = round((time.perf_counter() - t) * 1000, 1)
+        out["current"] = _time(noop, calls)
+        celery_app._shutdown_worker_process()
+
+        # solo/threads pools and eager calls: cached app, one context per call
+        out["fallback"] = _time(noop, calls)
+    out["debug_bytes_printed_per_legacy_task"] = len(sink.getvalue()) // (calls + 1) if calls else 0
+    out["python_path_entries_after"] = len(sys.path)
+    out["speedup_mean"] = round(out["legacy"]["mean_us"] / out["current"]["mean_us"], 1) if out["current"]["mean_us"] else None
+    return out
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__)
+    ap.add_argument("--calls", type=int, default=2000)
+    ap.add_argument("--touch-db", action="store_true", help="task body runs SELECT 1 through db.session")
+    a = ap.parse_args(argv)
+    print(json.dumps(run(a.calls, a.touch_db), indent=2))
+
+
+if __name__ == "__main__":
+    main()
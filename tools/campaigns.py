@@ -0,0 +1,282 @@
+# tools/campaigns.py
+"""
+Campaigns: one workflow over a long seed list.
+
+The seed file is normalized once into ARTIFACTS_DIR/campaigns/<id>/seeds.txt.
+fill_campaign() is the campaign's admission step: under a row lock it counts
+the campaign's active runs, turns the next free slots' worth of seeds into
+runs (shared compiled plan, one INSERT per batch) and returns their ids for
+the caller to dispatch. It runs when the campaign starts and whenever one of
+its runs leaves the active set, so at most `concurrency` runs are in flight
+and runs for seeds far down the list don't exist until they are needed.
+
+Campaign runs have their own daily budget, DAILY_CAMPAIGN_RUN_QUOTA (an app
+setting, sized for seed lists rather than for clicks; interactive runs keep
+DAILY_RUN_QUOTA), and the user's campaign runs in flight (over all of their
+campaigns) stay under CAMPAIGN_MAX_ACTIVE_PER_USER. A campaign that hits
+either limit waits with the limit in `status_reason`; reconcile_zombies re-runs
+the fill, so it picks up again once runs finish or the quota day rolls over.
+A paused campaign records why in the same field.
+"""
+from __future__ import annotations
+import json, os, re
+from datetime import datetime, timezone
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from flask import current_app
+from sqlalchemy import func, or_
+
+from extensions import db
+from tools.models import (
+    CampaignStatus, WorkflowCampaign, WorkflowDefinition, WorkflowRun, WorkflowRunStatus,
+)
+from tools.runner import PlanError, create_runs_for_seeds
+from tools.settings import get_setting, quota_allowed, quota_incr
+from tools import metrics
+
+utcnow = lambda: datetime.now(timezone.utc)
+
+CAMPAIGN_MAX_SEEDS = int(os.environ.get("CAMPAIGN_MAX_SEEDS", "10000"))
+CAMPAIGN_MAX_CONCURRENCY = int(os.environ.get("CAMPAIGN_MAX_CONCURRENCY", "20"))
+CAMPAIGN_MAX_ACTIVE_PER_USER = int(os.environ.get("CAMPAIGN_MAX_ACTIVE_PER_USER", "20"))
+CAMPAIGN_FILL_BATCH = 100  # runs created per fill at most
+DEFAULT_CAMPAIGN_RUN_QUOTA = 2000
+
+# WorkflowCampaign.status_reason values
+WAITING_USER_CAP = "user_active_cap"
+WAITING_RUN_QUOTA = "daily_campaign_run_quota"
+PAUSED_BY_USER = "paused_by_user"
+PAUSED_PLAN_INVALID = "plan_invalid"
+ACTIVE_RUN_STATES = (WorkflowRunStatus.QUEUED, WorkflowRunStatus.RUNNING, WorkflowRunStatus.PAUSED)
+FINISHED_RUN_STATES = (WorkflowRunStatus.COMPLETED, WorkflowRunStatus.FAILED, WorkflowRunStatus.CANCELED)
+EXPORT_BUCKETS = ("domains", "hosts", "ips", "ports", "services", "urls", "endpoints", "findings")
+
+_SEED_SPLIT = re.compile(r"[\s,]+")
+
+
+def _campaign_dir(campaign_id: int) -> str:
+    base = current_app.config.get("ARTIFACTS_DIR", os.path.join("instance", "tools_artifacts"))
+    return os.path.join(base, "campaigns", str(campaign_id))
+
+def normalize_seeds(lines: Iterable[str], limit: int = CAMPAIGN_MAX_SEEDS) -> Tuple[List[str], int]:
+    """Split, strip, drop comments and duplicates (order kept). Returns (seeds, dropped_over_limit)."""
+    seen, out, over = set(), [], 0
+    for ln in lines:
+        ln = (ln or "").split("#", 1)[0]
+        for s in _SEED_SPLIT.split(ln.strip()):
+            s = s.strip().strip(".").lower() if "://" not in s else s.strip()
+            if not s or s in seen or len(s) > 255:
+                continue
+            seen.add(s)
+            if len(out) >= limit:
+                over += 1
+                continue
+            out.append(s)
+    return out, over
+
+def create_campaign(wf: WorkflowDefinition, user_id: Optional[int], seeds: List[str], *,
+                    concurrency: int, title: Optional[str] = None) -> WorkflowCampaign:
+    camp = WorkflowCampaign(
+        workflow_id=wf.id, user_id=user_id, title=(title or f"{wf.title} campaign")[:150],
+        status=CampaignStatus.QUEUED, concurrency=max(1, min(int(concurrency or 1), CAMPAIGN_MAX_CONCURRENCY)),
+        seeds_path="", total_seeds=len(seeds),
+    )
+    db.session.add(camp); db.session.flush()
+    d = _campaign_dir(camp.id)
+    os.makedirs(d, exist_ok=True)
+    camp.seeds_path = os.path.join(d, "seeds.txt")
+    with open(camp.seeds_path, "w", encoding="utf-8") as fh:
+        for s in seeds:
+            fh.write(s + "\n")
+    db.session.commit()
+    return camp
+
+def _read_seeds(path: str, offset: int, n: int) -> Tuple[List[str], int]:
+    out = []
+    with open(path, "rb") as fh:
+        fh.seek(offset)
+        while len(out) < n:
+            ln = fh.readline()
+            if not ln:
+                break
+            s = ln.decode("utf-8", "ignore").strip()
+            if s:
+                out.append(s)
+        return out, fh.tell()
+
+def _active_runs(campaign_id: int) -> int:
+    return (db.session.query(func.count(WorkflowRun.id))
+            .filter(WorkflowRun.campaign_id == campaign_id, WorkflowRun.status.in_(ACTIVE_RUN_STATES))
+            .scalar() or 0)
+
+def _user_active_campaign_runs(user_id: Optional[int]) -> int:
+    return (db.session.query(func.count(WorkflowRun.id))
+            .filter(WorkflowRun.user_id == user_id, WorkflowRun.campaign_id.isnot(None),
+                    WorkflowRun.status.in_(ACTIVE_RUN_STATES))
+            .scalar() or 0)
+
+def run_quota_left(user_id: Optional[int]) -> Optional[int]:
+    """Campaign runs the user may still start today; None when the quota store is unreachable."""
+    limit = int(get_setting("DAILY_CAMPAIGN_RUN_QUOTA", DEFAULT_CAMPAIGN_RUN_QUOTA, int))
+    try:
+        _, used = quota_allowed("campaign_run", user_id, limit)
+    except Exception:
+        return None
+    return max(limit - used, 0)
+
+def _lock_user_campaigns(campaign_id: int) -> Optional[WorkflowCampaign]:
+    """
+    Lock the campaign together with the user's other live campaigns (id order, so
+    concurrent fills can't deadlock). Fills for one user then run one at a time
+    and the per-user cap can't be overshot by two campaigns filling at once.
+    """
+    uid = db.session.query(WorkflowCampaign.user_id).filter_by(id=campaign_id).scalar()
+    live = WorkflowCampaign.status.in_((CampaignStatus.QUEUED, CampaignStatus.RUNNING))
+    q = db.session.query(WorkflowCampaign).filter(
+        or_(WorkflowCampaign.id == campaign_id, live & (WorkflowCampaign.user_id == uid))
+        if uid is not None else WorkflowCampaign.id == campaign_id
+    )
+    locked = {c.id: c for c in q.order_by(WorkflowCampaign.id).with_for_update()}
+    return locked.get(campaign_id)
+
+def fill_campaign(campaign_id: int) -> List[int]:
+    """Create runs for free slots; returns the new run ids (caller enqueues advance_run)."""
+    camp = _lock_user_campaigns(campaign_id)
+    if not camp or camp.status not in (CampaignStatus.QUEUED, CampaignStatus.RUNNING):
+        db.session.rollback()
+        return []
+    active = _active_runs(camp.id)
+    slots = min(max(camp.concurrency - active, 0), CAMPAIGN_FILL_BATCH)
+    reason = None
+    if slots:
+        user_cap = int(get_setting("CAMPAIGN_MAX_ACTIVE_PER_USER", CAMPAIGN_MAX_ACTIVE_PER_USER, int))
+        allowed = max(user_cap - _user_active_campaign_runs(camp.user_id), 0)
+        if allowed < slots:
+            metrics.ADMISSION_REJECTIONS.inc(source="campaign")
+            slots, reason = allowed, WAITING_USER_CAP
+    if slots:
+        quota_left = run_quota_left(camp.user_id)
+        if quota_left is not None and quota_left < slots:
+            metrics.QUOTA_REJECTIONS.inc(kind="campaign_run")
+            slots, reason = quota_left, WAITING_RUN_QUOTA
+    new_ids: List[int] = []
+    if slots and camp.runs_created < camp.total_seeds:
+        seeds, offset = _read_seeds(camp.seeds_path, camp.seed_offset, slots)
+        wf = db.session.get(WorkflowDefinition, camp.workflow_id)
+        try:
+            runs = create_runs_for_seeds(wf, camp.user_id, seeds, campaign_id=camp.id) if wf else []
+        except PlanError as e:
+            # the workflow stopped validating since the campaign started: hold it until it is fixed and resumed
+            camp.status = CampaignStatus.PAUSED
+            camp.status_reason = f"{PAUSED_PLAN_INVALID}: {e}"[:255]
+            db.session.commit()
+            return []
+        camp.seed_offset = offset
+        camp.runs_created += len(runs)
+        if not seeds:
+            camp.total_seeds = camp.runs_created  # file shorter than recorded (edited/truncated)
+        new_ids = [r.id for r in runs]
+        active += len(runs)
+    if camp.status == CampaignStatus.QUEUED:
+        camp.status, camp.started_at = CampaignStatus.RUNNING, camp.started_at or utcnow()
+    camp.status_reason = reason if camp.runs_created < camp.total_seeds else None
+    if active == 0 and camp.runs_created >= camp.total_seeds:
+        camp.status, camp.finished_at = CampaignStatus.COMPLETED, utcnow()
+    db.session.commit()
+    if new_ids:
+        try:
+            quota_incr("campaign_run", camp.user_id, by=len(new_ids))
+        except Exception:
+            pass
+    return new_ids
+
+def campaign_progress(camp: WorkflowCampaign) -> Dict:
+    """Counts by run status, overall percentage and item totals, from two aggregate queries."""
+    by_status = dict(
+        db.session.query(WorkflowRun.status, func.count(WorkflowRun.id))
+        .filter(WorkflowRun.campaign_id == camp.id).group_by(WorkflowRun.status).all()
+    )
+    active_pct = (db.session.query(func.coalesce(func.sum(WorkflowRun.progress_pct), 0.0))
+                  .filter(WorkflowRun.campaign_id == camp.id, WorkflowRun.status.in_(ACTIVE_RUN_STATES))
+                  .scalar() or 0.0)
+    finished = sum(by_status.get(s, 0) for s in FINISHED_RUN_STATES)
+    total = camp.total_seeds or 0
+    pct = round(100.0 * (finished + active_pct / 100.0) / total, 1) if total else 100.0
+    return {
+        "total_seeds": total,
+        "runs_created": camp.runs_created,
+        "pending_seeds": max(total - camp.runs_created, 0),
+        "runs": {s.name: n for s, n in by_status.items()},
+        "finished": finished,
+        "progress_pct": min(pct, 100.0),
+    }
+
+def serialize_campaign(camp: WorkflowCampaign, *, progress: bool = True) -> Dict:
+    out = {
+        "id": camp.id,
+        "workflow_id": camp.workflow_id,
+        "user_id": camp.user_id,
+        "title": camp.title,
+        "status": camp.status.name if camp.status else None,
+        "concurrency": camp.concurrency,
+        "total_seeds": camp.total_seeds,
+        "runs_created": camp.runs_created,
+        "waiting_reason": camp.status_reason if camp.status in (CampaignStatus.QUEUED, CampaignStatus.RUNNING) else None,
+        "paused_reason": camp.status_reason if camp.status == CampaignStatus.PAUSED else None,
+        "created_at": camp.created_at.isoformat() if camp.created_at else None,
+        "started_at": camp.started_at.isoformat() if camp.started_at else None,
+        "finished_at": camp.finished_at.isoformat() if camp.finished_at else None,
+    }
+    if progress:
+        out["progress"] = campaign_progress(camp)
+    return out
+
+def iter_campaign_export(camp: WorkflowCampaign, buckets: Iterable[str], fmt: str = "ndjson",
+                         batch: int = 200) -> Iterator[str]:
+    """
+    Merged, de-duplicated items over all of the campaign's runs, streamed.
+    'txt' yields one value per line; 'ndjson' adds the bucket and the first seed it came from.
+    """
+    buckets = [b for b in buckets if b in EXPORT_BUCKETS] or list(EXPORT_BUCKETS)
+    seen = {b: set() for b in buckets}
+    q = (db.session.query(WorkflowRun.seed, WorkflowRun.run_manifest)
+         .filter(WorkflowRun.campaign_id == camp.id)
+         .order_by(WorkflowRun.id)
+         .execution_options(yield_per=batch))
+    for seed, manifest in q:
+        bks = ((manifest or {}).get("buckets") or {})
+        for b in buckets:
+            for v in (bks.get(b) or {}).get("items") or []:
+                if v in seen[b]:
+                    continue
+                seen[b].add(v)
+                if fmt == "txt":
+                    yield f"{v}\n"
+                else:
+                    yield json.dumps({"bucket": b, "value": v, "seed": seed}, separators=(",", ":")) + "\n"
+
+def cancel_campaign(camp: WorkflowCampaign) -> int:
+    """Stop creating runs and cancel the in-flight ones; returns how many runs were canceled."""
+    from celery_app import celery
+    from tools.alltools.tools._common import request_cancel
+    from tools.models import WorkflowStepStatus
+    camp.status, camp.finished_at, camp.status_reason = CampaignStatus.CANCELED, utcnow(), None
+    active = (WorkflowRun.query
+              .filter(WorkflowRun.campaign_id == camp.id, WorkflowRun.status.in_(ACTIVE_RUN_STATES))
+              .all())
+    for run in active:
+        try:
+            request_cancel(run.id)
+        except Exception:
+            pass  # no Redis: the revoke below still stops the step
+        for s in run.steps:
+            if s.status == WorkflowStepStatus.RUNNING and s.celery_task_id:
+                try:
+                    celery.control.revoke(s.celery_task_id)
+                except Exception:
+                    pass
+            if s.status in (WorkflowStepStatus.QUEUED, WorkflowStepStatus.RUNNING):
+                s.status, s.finished_at = WorkflowStepStatus.CANCELED, s.finished_at or utcnow()
+        run.status, run.finished_at = WorkflowRunStatus.CANCELED, run.finished_at or utcnow()
+    db.session.commit()
+    return len(active)
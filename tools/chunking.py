@@ -0,0 +1,214 @@
+# tools/chunking.py
+"""
+Auto-chunking of step inputs larger than the tool's per-invocation cap.
+
+By default ingest cuts every bucket to input_policy.max_targets. With
+chunking "auto" (input_policy.chunking, or the node option `chunking`),
+ingest keeps up to max_targets x max_batches items per bucket. run_step then
+runs the adapter once per batch of max_targets targets, counted over all
+accepted buckets together (adapters merge them before applying their cap),
+sequentially or up to `chunk_concurrency` at a time, and merges the batches
+into one step result. Each invocation stays within the limit the tool's
+policy was sized for.
+
+At most max_batches batches run, and every batch after the first counts
+against the user's daily "batch" quota (DAILY_BATCH_QUOTA). Batches past
+either limit are skipped. Skipped batches and anything cut by the cap are reported on the step
+(output["chunking"], output["input_capped"]) instead of disappearing.
+"""
+from __future__ import annotations
+import contextvars, os, shutil
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from tools.alltools.tools._common import BUCKET_KEYS, Canceled, finalize, merge_dedupe, now_ms
+from tools.settings import get_setting, quota_allowed, quota_incr
+
+CHUNK_KEY = "_chunking"         # ingest -> run_step hand-off inside the adapter options
+CAPPED_KEY = "_input_capped"    # items per bucket ingest cut at the cap
+DEFAULT_MAX_BATCHES = 20
+MAX_CONCURRENCY = 4
+LOCAL_INPUT_KEYS = ("value", "input_method", "file_path")
+OUTPUT_TAIL_BYTES = 64_000
+
+
+def _int(v, default: int) -> int:
+    try:
+        return int(v)
+    except (TypeError, ValueError):
+        return default
+
+def settings_for(node_opts: dict, ipol: dict) -> Optional[dict]:
+    """{"size", "max_batches", "concurrency"} when the step chunks its input, else None."""
+    mode = str(node_opts.get("chunking") or ipol.get("chunking") or "off").lower()
+    size = _int(ipol.get("max_targets", 50), 0)
+    if mode != "auto" or size <= 0:
+        return None
+    ceiling = max(1, _int(get_setting("CHUNK_MAX_BATCHES", 100, int), 100))
+    max_batches = _int(node_opts.get("max_batches") or ipol.get("max_batches"), DEFAULT_MAX_BATCHES)
+    concurrency = _int(node_opts.get("chunk_concurrency") or ipol.get("chunk_concurrency"), 1)
+    return {"size": size, "max_batches": min(max(1, max_batches), ceiling),
+            "concurrency": min(max(1, concurrency), MAX_CONCURRENCY)}
+
+def split(typed: Dict[str, List[str]], size: int) -> List[Dict[str, List[str]]]:
+    """
+    All buckets' items as one list (bucket order, repeats across buckets dropped
+    as read_targets drops them) cut into batches of `size`; a batch keeps its
+    items under their buckets. Adapters merge the buckets they accept and cap
+    the result at max_targets, so sizing per bucket would lose items.
+    """
+    seen, flat = set(), []
+    for k, vals in typed.items():
+        for v in vals:
+            v = str(v).strip()
+            if v and v not in seen:
+                seen.add(v)
+                flat.append((k, v))
+    out = []
+    for i in range(0, len(flat), size):
+        batch: Dict[str, List[str]] = {}
+        for k, v in flat[i:i + size]:
+            batch.setdefault(k, []).append(v)
+        out.append(batch)
+    return out
+
+def batches_for(options: dict, cfg: Optional[dict]) -> List[Dict[str, List[str]]]:
+    """The step's injected targets (after incremental narrowing) split into batches; [] = run once as usual."""
+    if not cfg:
+        return []
+    typed = {k: list(options[k]) for k in cfg.get("accepts") or () if isinstance(options.get(k), list)}
+    batches = split(typed, cfg["size"])
+    return batches if len(batches) > 1 else []
+
+def grant(user_id, wanted: int) -> int:
+    """How many of `wanted` batches may run: the first is free, the others use the daily batch quota."""
+    if wanted <= 1 or user_id is None:
+        return wanted
+    limit = _int(get_setting("DAILY_BATCH_QUOTA", 500, int), 500)
+    try:
+        _, used = quota_allowed("batch", user_id, limit)
+        n = min(wanted, 1 + max(0, limit - used))
+        if n > 1:
+            quota_incr("batch", user_id, by=n - 1)
+        return n
+    except Exception:
+        return wanted  # quota store unreachable: don't fail the step over it
+
+
+class BatchMerger:
+    """Folds per-batch adapter results (in batch order) into one adapter-shaped result."""
+
+    def __init__(self, slug: str, step_dir: Path, name: str = "batched"):
+        self.slug = slug
+        self.out_path = Path(step_dir) / f"{slug}_{name}_output.txt"
+        self.buckets: Dict[str, List[str]] = {}
+        self.outputs: List[str] = []
+        self.batches: List[dict] = []
+        self.targets: Dict[str, List[str]] = {}
+        self.failed: Optional[dict] = None
+        try: self.out_path.unlink()  # left over from an earlier attempt
+        except OSError: pass
+
+    @staticmethod
+    def batch_options(options: dict, batch: Dict[str, List[str]], accepts, work_dir: Path) -> dict:
+        # manual / file inputs were already folded into the typed lists; each batch sees only its own slice
+        opts = {k: v for k, v in options.items() if k not in accepts and k not in LOCAL_INPUT_KEYS}
+        opts.update(batch)
+        work_dir.mkdir(parents=True, exist_ok=True)
+        opts["work_dir"] = str(work_dir)
+        return opts
+
+    def add(self, batch: Dict[str, List[str]], res: dict, ms: int) -> None:
+        res = res or {}
+        self.batches.append({"targets": sum(len(v) for v in batch.values()), "status": res.get("status"), "ms": ms})
+        for k, vals in batch.items():
+            self.targets.setdefault(k, []).extend(vals)
+        for k in BUCKET_KEYS:
+            if isinstance(res.get(k), list) and res[k]:
+                self.buckets[k] = merge_dedupe((self.buckets.get(k) or []) + res[k])
+        of = res.get("output_file")
+        if of and os.path.isfile(of):
+            with open(self.out_path, "ab") as dst, open(of, "rb") as src:
+                shutil.copyfileobj(src, dst)
+        if res.get("output"):
+            self.outputs.append(res["output"])
+        if res.get("status") not in ("success", "ok") and self.failed is None:
+            self.failed = res
+
+    @property
+    def output(self) -> str:
+        return "\n".join(self.outputs)[-OUTPUT_TAIL_BYTES:]
+
+    def result(self, options: dict, accepts, t0: int, command: str, extra: dict) -> dict:
+        """ok unless every batch failed; a batch failure is reported like a failed fan-out target."""
+        opts = {**{k: v for k, v in options.items() if k not in accepts and k not in LOCAL_INPUT_KEYS},
+                **self.targets}
+        output_file = str(self.out_path) if self.out_path.exists() else None
+        bad = [i for i, b in enumerate(self.batches) if b["status"] not in ("success", "ok")]
+        if self.failed is not None and len(bad) == len(self.batches):
+            f = self.failed
+            return finalize(f.get("status") or "error", f.get("message") or "all batches failed", opts,
+                            f.get("command") or command, t0, self.output, output_file=output_file,
+                            error_reason=f.get("error_reason"), error_detail=f.get("error_detail"),
+                            extra=extra, **self.buckets)
+        total = sum(len(v) for v in self.buckets.values())
+        msg = f"{total} items from {len(self.batches)} batch(es)" + (f", {len(bad)} failed" if bad else "")
+        return finalize("ok", msg, opts, command, t0, self.output, output_file=output_file,
+                        extra={**extra, **({"partial": True, "batches_failed": bad[:50]} if bad else {})},
+                        **self.buckets)
+
+
+def run(adapter, options: dict, cfg: dict, batches: List[Dict[str, List[str]]], *,
+        slug: str, step_dir: Path, user_id=None) -> Tuple[dict, Dict[str, List[str]]]:
+    """
+    Run `adapter` once per batch (cfg["concurrency"] at a time) and merge the
+    results. Returns (result, targets of the batches that ran).
+    """
+    t0 = now_ms()
+    accepts = list(cfg.get("accepts") or ())
+    # ingest caps each bucket at size x max_batches, so several buckets together can split into more
+    limit = min(len(batches), cfg.get("max_batches") or len(batches))
+    allowed = grant(user_id, limit)
+    todo, skipped = batches[:allowed], batches[allowed:]
+    merger = BatchMerger(slug, step_dir)
+
+    def _one(i: int, batch: Dict[str, List[str]]) -> Tuple[dict, int]:
+        t = now_ms()
+        opts = BatchMerger.batch_options(options, batch, accepts, Path(step_dir) / f"batch_{i:04d}")
+        try:
+            res = adapter.run_scan(opts) or {}
+        except Canceled:
+            raise
+        except Exception as e:  # one bad batch does not sink the others
+            res = {"status": "error", "message": str(e), "error_reason": getattr(e, "reason", None) or "OTHER",
+                   "error_detail": getattr(e, "detail", None)}
+        return res, now_ms() - t
+
+    if cfg.get("concurrency", 1) <= 1 or len(todo) <= 1:
+        for i, batch in enumerate(todo):
+            res, ms = _one(i, batch)
+            merger.add(batch, res, ms)
+    else:
+        with ThreadPoolExecutor(max_workers=min(cfg["concurrency"], len(todo)), thread_name_prefix="chunk") as pool:
+            # copy_context: the step's ProcScope must follow each batch into its thread
+            futs = [pool.submit(contextvars.copy_context().run, _one, i, b) for i, b in enumerate(todo)]
+            done: List[Tuple[dict, int]] = []
+            canceled: Optional[Canceled] = None
+            for f in futs:  # merge in batch order
+                try:
+                    done.append(f.result())
+                except Canceled as c:
+                    canceled = canceled or c
+            if canceled is not None:
+                raise canceled
+            for batch, (res, ms) in zip(todo, done):
+                merger.add(batch, res, ms)
+
+    stats = {"batch_size": cfg["size"], "batches_total": len(batches), "batches_run": len(todo),
+             "batches_skipped": len(skipped), "concurrency": cfg.get("concurrency", 1), "batches": merger.batches}
+    if skipped:
+        stats["skipped_reason"] = "DAILY_BATCH_QUOTA" if allowed < limit else "max_batches"
+        stats["targets_skipped"] = sum(len(v) for b in skipped for v in b.values())
+    result = merger.result(options, accepts, t0, f"{slug} ({len(todo)} batches of {cfg['size']})", {"chunking": stats})
+    return result, merger.targets
@@ -0,0 +1,129 @@
+# tools/diffs.py
+"""
+Server-side diff of two runs' result buckets.
+
+Each bucket is reduced to a sorted array of 64-bit item hashes; added /
+removed / common counts come from one merge walk over the two arrays and
+identical buckets are recognised by their fingerprint without walking at all.
+Summaries of two finished runs are stored in run_diffs and reused until either
+run's manifest changes (a retry re-aggregates it). Item pages are sorted by
+value and addressed with a value cursor, so clients fetch only what they show.
+"""
+from __future__ import annotations
+import bisect, hashlib, json
+from array import array
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from sqlalchemy.exc import IntegrityError
+
+from extensions import db
+from tools.manifests import TARGET_KEYS
+from tools.models import RunDiff, WorkflowRun, WorkflowRunStatus
+
+CHANGES = ("added", "removed", "common")
+FINISHED = (WorkflowRunStatus.COMPLETED, WorkflowRunStatus.FAILED, WorkflowRunStatus.CANCELED)
+DIFF_VERSION = 1
+
+
+def bucket_items(run: WorkflowRun, bucket: str) -> List[str]:
+    return (((run.run_manifest or {}).get("buckets") or {}).get(bucket) or {}).get("items") or []
+
+def _h64(v: str) -> int:
+    return int.from_bytes(hashlib.blake2b(v.encode("utf-8", "ignore"), digest_size=8).digest(), "big", signed=True)
+
+def hashed_set(items: List[str]) -> array:
+    """Sorted, de-duplicated 64-bit hashes of a bucket (8 bytes per item)."""
+    return array("q", sorted({_h64(v) for v in items}))
+
+def fingerprint(hs: array) -> str:
+    return hashlib.sha256(hs.tobytes()).hexdigest()[:16]
+
+def merge_counts(a: array, b: array) -> Tuple[int, int, int]:
+    """(only_in_a, only_in_b, common) by walking two sorted hash arrays."""
+    i = j = common = 0
+    na, nb = len(a), len(b)
+    while i < na and j < nb:
+        x, y = a[i], b[j]
+        if x == y:
+            common += 1; i += 1; j += 1
+        elif x < y:
+            i += 1
+        else:
+            j += 1
+    return na - common, nb - common, common
+
+def _manifest_key(run: WorkflowRun) -> str:
+    """Changes whenever the run-level manifest is re-aggregated."""
+    return f"{(run.run_manifest or {}).get('last_updated') or ''}|{run.status.name if run.status else ''}"
+
+def compute_summary(a: WorkflowRun, b: WorkflowRun) -> Dict:
+    buckets: Dict[str, Dict] = {}
+    for k in TARGET_KEYS:
+        ia, ib = bucket_items(a, k), bucket_items(b, k)
+        if not ia and not ib:
+            continue
+        ha, hb = hashed_set(ia), hashed_set(ib)
+        fa, fb = fingerprint(ha), fingerprint(hb)
+        if fa == fb:
+            removed, added, common = 0, 0, len(ha)
+        else:
+            removed, added, common = merge_counts(ha, hb)
+        buckets[k] = {"a": len(ha), "b": len(hb), "added": added, "removed": removed, "common": common,
+                      "fingerprint_a": fa, "fingerprint_b": fb}
+    return {
+        "v": DIFF_VERSION,
+        "run_a": a.id, "run_b": b.id,
+        "changed": any(x["added"] or x["removed"] for x in buckets.values()),
+        "buckets": buckets,
+    }
+
+def diff_summary(a: WorkflowRun, b: WorkflowRun) -> Dict:
+    """Per-bucket counts, from run_diffs when both runs are finished and unchanged since."""
+    cacheable = a.status in FINISHED and b.status in FINISHED
+    key_a, key_b = _manifest_key(a), _manifest_key(b)
+    row = RunDiff.query.filter_by(run_a_id=a.id, run_b_id=b.id).first() if cacheable else None
+    if row is not None and row.key_a == key_a and row.key_b == key_b and (row.summary or {}).get("v") == DIFF_VERSION:
+        return {**row.summary, "cached": True}
+    summary = compute_summary(a, b)
+    if cacheable:
+        if row is None:
+            try:
+                with db.session.begin_nested():
+                    db.session.add(RunDiff(run_a_id=a.id, run_b_id=b.id, key_a=key_a, key_b=key_b, summary=summary))
+            except IntegrityError:
+                pass  # a concurrent request stored it first
+        else:
+            row.key_a, row.key_b, row.summary = key_a, key_b, summary
+        db.session.commit()
+    return {**summary, "cached": False}
+
+def diff_values(old: List[str], new: List[str]) -> Tuple[List[str], List[str]]:
+    """(added, removed) in their original order."""
+    old_set, new_set = set(old), set(new)
+    return [v for v in new if v not in old_set], [v for v in old if v not in new_set]
+
+def _sorted_change(a: WorkflowRun, b: WorkflowRun, bucket: str, change: str) -> List[str]:
+    ia, ib = set(bucket_items(a, bucket)), set(bucket_items(b, bucket))
+    if change == "added":
+        vals = ib - ia
+    elif change == "removed":
+        vals = ia - ib
+    else:
+        vals = ia & ib
+    return sorted(vals)
+
+def diff_page(a: WorkflowRun, b: WorkflowRun, bucket: str, change: str, *,
+              cursor: Optional[str] = None, limit: int = 500) -> Dict:
+    """One page of added/removed/common values, sorted; `next_cursor` continues after the last one."""
+    vals = _sorted_change(a, b, bucket, change)
+    start = bisect.bisect_right(vals, cursor) if cursor else 0
+    page = vals[start:start + limit]
+    more = start + limit < len(vals)
+    return {"bucket": bucket, "change": change, "total": len(vals), "items": page,
+            "next_cursor": page[-1] if (page and more) else None}
+
+def iter_diff_ndjson(a: WorkflowRun, b: WorkflowRun, buckets: List[str], changes: List[str]) -> Iterator[str]:
+    for k in buckets:
+        for change in changes:
+            for v in _sorted_change(a, b, k, change):
+                yield json.dumps({"bucket": k, "change": change, "value": v}, separators=(",", ":")) + "\n"
@@ -0,0 +1,157 @@
+# tools/exports.py
+"""
+Run result exports: NDJSON, CSV, or a zip with one <bucket>.txt per bucket.
+
+Every format is produced by a generator that emits small chunks as it walks
+the run's buckets, so nothing proportional to the export is held in memory
+(the zip is written through a non-seekable sink, entries use data descriptors).
+
+Exports of finished runs are also written to ARTIFACTS_DIR/<run_id>/exports/
+while they stream (tee), keyed by format, bucket selection and the run's
+manifest version. Later downloads of the same export are served from that
+file, which gives Content-Length, ETag and Range (resumable downloads).
+"""
+from __future__ import annotations
+import csv, hashlib, io, itertools, json, os, uuid, zipfile
+from typing import Iterable, Iterator, List, Optional
+
+from flask import current_app
+
+from tools.manifests import TARGET_KEYS
+from tools.models import WorkflowRunStatus
+from tools.results import Provenance
+
+FORMATS = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv",
+    "zip": "application/zip",
+}
+FINISHED = (WorkflowRunStatus.COMPLETED, WorkflowRunStatus.FAILED, WorkflowRunStatus.CANCELED)
+CHUNK_BYTES = 64 * 1024
+CSV_HEADER = ("bucket", "value", "steps", "tools")
+
+
+def _buckets(manifest: Optional[dict], buckets: Iterable[str]):
+    """(bucket, value, sources) in bucket order, then discovery order."""
+    m = manifest or {}
+    bks = m.get("buckets") or {}
+    for b in buckets:
+        prov = Provenance(m, b)
+        for v in (bks.get(b) or {}).get("items") or []:
+            yield b, v, prov.sources(v)
+
+def _batched(lines: Iterator[str]) -> Iterator[bytes]:
+    """Join small lines into ~CHUNK_BYTES writes."""
+    buf, size = [], 0
+    for ln in lines:
+        buf.append(ln); size += len(ln)
+        if size >= CHUNK_BYTES:
+            yield "".join(buf).encode("utf-8"); buf, size = [], 0
+    if buf:
+        yield "".join(buf).encode("utf-8")
+
+def iter_ndjson(manifest: Optional[dict], buckets: List[str]) -> Iterator[bytes]:
+    def lines():
+        for b, v, src in _buckets(manifest, buckets):
+            yield json.dumps({"bucket": b, "value": v,
+                              "steps": sorted({s.get("step") for s in src if s.get("step") is not None}),
+                              "tools": sorted({s.get("tool") for s in src if s.get("tool")})},
+                             separators=(",", ":")) + "\n"
+    return _batched(lines())
+
+def iter_csv(manifest: Optional[dict], buckets: List[str]) -> Iterator[bytes]:
+    def lines():
+        line = io.StringIO()
+        w = csv.writer(line)
+        rows = ((b, v, " ".join(str(s) for s in sorted({x.get("step") for x in src if x.get("step") is not None})),
+                 " ".join(sorted({x.get("tool") for x in src if x.get("tool")})))
+                for b, v, src in _buckets(manifest, buckets))
+        for r in itertools.chain((CSV_HEADER,), rows):
+            w.writerow(r)
+            yield line.getvalue()
+            line.seek(0); line.truncate()
+    return _batched(lines())
+
+
+class _Sink:
+    """Write-only, non-seekable file object; zipfile streams into it and we drain it."""
+
+    def __init__(self):
+        self.parts: List[bytes] = []
+        self.size = 0
+
+    def write(self, b) -> int:
+        self.parts.append(bytes(b))
+        self.size += len(b)
+        return len(b)
+
+    def flush(self):
+        pass
+
+    def drain(self) -> bytes:
+        out, self.parts, self.size = b"".join(self.parts), [], 0
+        return out
+
+def iter_zip(manifest: Optional[dict], buckets: List[str]) -> Iterator[bytes]:
+    m = manifest or {}
+    sink = _Sink()
+    with zipfile.ZipFile(sink, "w", compression=zipfile.ZIP_DEFLATED) as zf:
+        for b in buckets:
+            items = ((m.get("buckets") or {}).get(b) or {}).get("items") or []
+            if not items:
+                continue
+            with zf.open(f"{b}.txt", "w", force_zip64=True) as fh:
+                for chunk in _batched(f"{v}\n" for v in items):
+                    fh.write(chunk)
+                    if sink.size >= CHUNK_BYTES:
+                        yield sink.drain()
+            yield sink.drain()
+    tail = sink.drain()
+    if tail:
+        yield tail
+
+_GENERATORS = {"ndjson": iter_ndjson, "csv": iter_csv, "zip": iter_zip}
+
+def generate(manifest: Optional[dict], fmt: str, buckets: List[str]) -> Iterator[bytes]:
+    return _GENERATORS[fmt](manifest, buckets)
+
+def select_buckets(raw: Optional[str]) -> List[str]:
+    want = [b.strip() for b in (raw or "").split(",") if b.strip()]
+    return [b for b in TARGET_KEYS if b in want] or list(TARGET_KEYS)
+
+
+# ---------- precomputed exports of finished runs ----------
+
+def export_path(run, fmt: str, buckets: List[str]) -> str:
+    key = hashlib.sha1(json.dumps([fmt, buckets, (run.run_manifest or {}).get("last_updated"),
+                                   run.status.name if run.status else None]).encode()).hexdigest()[:16]
+    base = current_app.config.get("ARTIFACTS_DIR", os.path.join(current_app.instance_path, "tools_artifacts"))
+    return os.path.join(base, str(run.id), "exports", f"results-{key}.{fmt}")
+
+def cacheable(run) -> bool:
+    return run.status in FINISHED
+
+def tee(chunks: Iterator[bytes], path: str) -> Iterator[bytes]:
+    """Yield chunks while writing them to `path`; the file only appears once complete."""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = f"{path}.{uuid.uuid4().hex[:8]}.part"
+    ok = False
+    try:
+        with open(tmp, "wb") as fh:
+            for c in chunks:
+                fh.write(c)
+                yield c
+        os.replace(tmp, path)
+        ok = True
+    finally:
+        if not ok:  # client went away or the generator failed
+            try: os.remove(tmp)
+            except OSError: pass
+
+def materialize(run, fmt: str, buckets: List[str]) -> str:
+    """Write the export file (if missing) and return its path."""
+    path = export_path(run, fmt, buckets)
+    if not os.path.isfile(path):
+        for _ in tee(generate(run.run_manifest, fmt, buckets), path):
+            pass
+    return path
@@ -0,0 +1,325 @@
+# tools/incremental.py
+"""
+Incremental re-scan mode (WorkflowDefinition.incremental).
+
+Each step's ingested targets are hashed and looked up in StepTargetResult
+under the step's scope. Targets whose cached result is younger than the
+workflow's TTL are taken out of the adapter's input; the adapter only sees
+the delta (new + expired targets) and its output is attributed back to those
+targets by host. The cached items of the unchanged targets are then merged
+into the step result, so downstream steps and the run summary see the full
+set as if everything had been scanned.
+
+Output that cannot be tied to a single target (e.g. IPs resolved for a batch
+of domains) goes to the scope's shared row. Once that row is older than the
+TTL the step rescans all of its targets and rebuilds it, which bounds how
+long items that only came from removed targets can linger.
+"""
+from __future__ import annotations
+import hashlib, json, os, re
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import insert, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm.attributes import flag_modified
+
+from extensions import db
+from tools import ingest
+from tools.alltools.tools._common import finalize, merge_dedupe, now_ms
+from tools.diffs import diff_values
+from tools.manifests import TARGET_KEYS, slim_parameters
+from tools.models import StepTargetResult, WorkflowRun, WorkflowRunStatus
+
+utcnow = lambda: datetime.now(timezone.utc)
+
+INCREMENTAL_TTL_S = int(os.environ.get("INCREMENTAL_TTL_S", str(24 * 3600)))
+INCREMENTAL_RETENTION_DAYS = int(os.environ.get("INCREMENTAL_RETENTION_DAYS", "14"))
+SHARED = "*"            # target_hash of the per-scope row for unattributed output
+CHANGES_SAMPLE = 200    # new/removed items listed per bucket in the run summary
+REMOVED_SAMPLE = 20     # removed targets listed per step
+_IN_CHUNK = 500
+
+# Options that name the targets rather than how the tool runs; kept out of the scope
+_TARGET_PARAMS = ("value", "value_ref", "file_path", "input_method", "targets", "upstream", "work_dir")
+_URL_HOST = re.compile(r"[a-z][a-z0-9+.-]*://\[?([^/\s:?#\]]+)", re.IGNORECASE)
+
+
+def target_hash(bucket: str, value: str) -> str:
+    return hashlib.sha1(f"{bucket}\x00{value}".encode("utf-8", "ignore")).hexdigest()
+
+def ttl_for(wf) -> int:
+    return wf.incremental_ttl_s if wf.incremental_ttl_s is not None else INCREMENTAL_TTL_S
+
+def step_scope(run, step, slug: str, options: dict) -> str:
+    """Cache key of a step: same workflow, user, position, tool and non-target parameters."""
+    params = {k: v for k, v in slim_parameters(options).items() if k not in _TARGET_PARAMS}
+    key = {"wf": run.workflow_id, "user": run.user_id, "step": step.step_index, "tool": slug, "params": params}
+    return hashlib.sha256(json.dumps(key, sort_keys=True, separators=(",", ":"), default=str).encode()).hexdigest()
+
+def _eq(col, v):
+    return col.is_(None) if v is None else col == v
+
+def baseline_run_id(run) -> Optional[int]:
+    """Latest earlier COMPLETED run of the same workflow for the same user (and campaign seed)."""
+    return (db.session.query(WorkflowRun.id)
+            .filter(WorkflowRun.workflow_id == run.workflow_id, _eq(WorkflowRun.user_id, run.user_id),
+                    _eq(WorkflowRun.seed, run.seed), WorkflowRun.status == WorkflowRunStatus.COMPLETED,
+                    WorkflowRun.id < run.id)
+            .order_by(WorkflowRun.id.desc()).limit(1).scalar())
+
+def _aware(dt: datetime) -> datetime:
+    return dt.replace(tzinfo=timezone.utc) if dt.tzinfo is None else dt  # SQLite drops the tz
+
+def _chunks(seq: List, n: int = _IN_CHUNK):
+    for i in range(0, len(seq), n):
+        yield seq[i:i + n]
+
+
+# ---------- attribution ----------
+
+def host_of(value: str) -> str:
+    s = (value or "").strip().lower()
+    m = _URL_HOST.search(s)
+    if m:
+        return m.group(1).strip(".")
+    s = s.split()[0] if s else ""  # "host [A] [1.2.3.4]"-style lines
+    s = s.split("/", 1)[0]
+    if s.count(":") == 1:          # host:port (IPv6 has more colons)
+        s = s.split(":", 1)[0]
+    return s.strip(".")
+
+def _owners(host: str, by_host: Dict[str, List[str]]) -> Optional[List[str]]:
+    """Target hashes whose host is `host` or one of its parent domains."""
+    while host:
+        if host in by_host:
+            return by_host[host]
+        _, dot, host = host.partition(".")
+        if not dot:
+            break
+    return None
+
+def attribute(targets: Dict[str, Tuple[str, str]], result: dict) -> Tuple[Dict[str, Dict[str, List[str]]], Dict[str, List[str]]]:
+    """Split a result's buckets per target hash; returns (per_target, unattributed)."""
+    per: Dict[str, Dict[str, List[str]]] = {h: {} for h in targets}
+    shared: Dict[str, List[str]] = {}
+    only = next(iter(targets)) if len(targets) == 1 else None
+    by_host: Dict[str, List[str]] = {}
+    if only is None:
+        for h, (_, v) in targets.items():
+            by_host.setdefault(host_of(v), []).append(h)
+    for k in TARGET_KEYS:
+        for item in result.get(k) or []:
+            item = str(item)
+            if only is not None:
+                per[only].setdefault(k, []).append(item)
+                continue
+            owners = _owners(host_of(item), by_host)
+            if owners:
+                for h in owners:
+                    per[h].setdefault(k, []).append(item)
+            else:
+                shared.setdefault(k, []).append(item)
+    return per, shared
+
+
+# ---------- per step ----------
+
+class IncrementalStep:
+    """One step's incremental bookkeeping, from prepare() to merge()."""
+
+    def __init__(self, run, scope: str, ttl_s: int, targets: Dict[str, Tuple[str, str]]):
+        self.run = run
+        self.scope = scope
+        self.ttl_s = ttl_s
+        self.targets = targets                    # hash -> (bucket, value), ingest order
+        self.rows: Dict[str, StepTargetResult] = {}
+        self.shared: Optional[StepTargetResult] = None
+        self.fresh: set = set()
+        self.delta: List[str] = list(targets)
+        self.full = False
+
+    def load(self) -> None:
+        hashes = list(self.targets) + [SHARED]
+        for chunk in _chunks(hashes):
+            for r in (StepTargetResult.query
+                      .filter(StepTargetResult.scope == self.scope, StepTargetResult.target_hash.in_(chunk))):
+                self.rows[r.target_hash] = r
+        self.shared = self.rows.pop(SHARED, None)
+        cutoff = utcnow() - timedelta(seconds=max(0, self.ttl_s))
+        self.full = self.shared is not None and _aware(self.shared.scanned_at) < cutoff
+        if not self.full:
+            self.fresh = {h for h, r in self.rows.items() if _aware(r.scanned_at) >= cutoff}
+        self.delta = [h for h in self.targets if h not in self.fresh]
+
+    def narrow(self, options: dict, step_dir: Path) -> None:
+        """Restrict the adapter's injected lists (and ingest's inbox file) to the delta."""
+        keep, order = set(self.delta), []
+        for k in TARGET_KEYS:
+            vals = options.get(k)
+            if not isinstance(vals, list):
+                continue
+            vals = [v for v in vals if target_hash(k, str(v).strip()) in keep]
+            if vals:
+                options[k] = vals
+                order.append(k)
+            else:
+                options.pop(k, None)
+        fp = options.get("file_path")
+        if fp and Path(fp).parent == Path(step_dir) and Path(fp).name.startswith("inbox_"):
+            im, fp = ingest.materialize_inbox_if_needed(Path(step_dir), order, options)
+            if im and fp:
+                options["input_method"], options["file_path"] = im, fp
+
+    @property
+    def skip_adapter(self) -> bool:
+        return not self.delta
+
+    def cached_result(self, options: dict) -> dict:
+        """Adapter-shaped result for a step whose targets are all cached."""
+        return finalize("success", f"All {len(self.targets)} targets cached within TTL; tool not executed",
+                        options, "(incremental: not executed)", now_ms(), "")
+
+    def _store(self, result: dict) -> None:
+        per, shared = attribute({h: self.targets[h] for h in self.delta}, result)
+        # per-target fan-outs report targets that failed; keep their previous result (if any)
+        failed = {f.get("target") for f in result.get("targets_failed") or [] if isinstance(f, dict)}
+        now, run_id = utcnow(), self.run.id
+        new_rows = []
+        for h in self.delta:
+            bucket, value = self.targets[h]
+            if value in failed:
+                continue
+            r = self.rows.get(h)
+            if r is not None:
+                r.items, r.scanned_at, r.last_run_id = per.get(h) or {}, now, run_id
+            else:
+                new_rows.append({"scope": self.scope, "target_hash": h, "bucket": bucket, "target": value[:512],
+                                 "items": per.get(h) or {}, "scanned_at": now, "last_run_id": run_id})
+        if new_rows:
+            try:
+                with db.session.begin_nested():
+                    for chunk in _chunks(new_rows):
+                        db.session.execute(insert(StepTargetResult), chunk)
+            except IntegrityError:
+                # a concurrent run of the same scope stored some of these first; overwrite row by row
+                for row in new_rows:
+                    r = StepTargetResult.query.filter_by(scope=self.scope, target_hash=row["target_hash"]).first()
+                    if r is None:
+                        db.session.add(StepTargetResult(**row))
+                    else:
+                        r.items, r.scanned_at, r.last_run_id = row["items"], now, run_id
+        if self.shared is None:
+            if shared:
+                db.session.add(StepTargetResult(scope=self.scope, target_hash=SHARED, items=shared,
+                                                scanned_at=now, last_run_id=run_id))
+        elif self.full:
+            self.shared.items, self.shared.scanned_at, self.shared.last_run_id = shared, now, run_id
+        elif shared:
+            items = dict(self.shared.items or {})
+            for k, vals in shared.items():
+                items[k] = merge_dedupe((items.get(k) or []) + vals)
+            self.shared.items, self.shared.last_run_id = items, run_id
+            flag_modified(self.shared, "items")
+
+    def _removed_targets(self) -> List[str]:
+        base_id = baseline_run_id(self.run)
+        if not base_id:
+            return []
+        q = (db.session.query(StepTargetResult.target_hash, StepTargetResult.target)
+             .filter(StepTargetResult.scope == self.scope, StepTargetResult.last_run_id == base_id,
+                     StepTargetResult.target_hash != SHARED))
+        return [t for h, t in q if h not in self.targets]
+
+    def merge(self, result: dict) -> dict:
+        """Cache the delta's output, fold the cached items in and add result['incremental']."""
+        ok = result.get("status") in ("success", "ok")
+        removed = self._removed_targets()
+        if ok:
+            if self.delta:
+                self._store(result)
+            cached = [self.rows[h].items or {} for h in self.fresh]
+            if self.shared is not None and not self.full:
+                cached.append(self.shared.items or {})
+            counts = dict(result.get("counts") or {})
+            for k in TARGET_KEYS:
+                extra = [v for items in cached for v in (items.get(k) or [])]
+                if extra:
+                    result[k] = merge_dedupe(list(result.get(k) or []) + extra)
+                    counts[k] = len(result[k])
+            if counts:
+                result["counts"] = counts
+            fresh_ids = [self.rows[h].id for h in self.fresh]
+            for chunk in _chunks(fresh_ids):
+                db.session.execute(update(StepTargetResult).where(StepTargetResult.id.in_(chunk))
+                                   .values(last_run_id=self.run.id).execution_options(synchronize_session=False))
+        result["incremental"] = {
+            "targets": len(self.targets),
+            "reused": len(self.fresh) if ok else 0,
+            "scanned": len(self.delta),
+            "new_targets": sum(1 for h in self.delta if h not in self.rows),
+            "expired_targets": sum(1 for h in self.delta if h in self.rows),
+            "removed_targets": len(removed),
+            "removed_sample": removed[:REMOVED_SAMPLE],
+            "full_rescan": self.full,
+            "ttl_s": self.ttl_s,
+        }
+        return result
+
+
+def prepare(run, step, slug: str, options: dict, step_dir: Path) -> Optional[IncrementalStep]:
+    """
+    For steps of incremental workflows: load cached per-target results and narrow
+    `options` to the targets that need scanning. None when the mode is off or the
+    step has no typed targets (then it runs exactly as before).
+    """
+    wf = run.workflow
+    if not wf or not wf.incremental:
+        return None
+    targets: Dict[str, Tuple[str, str]] = {}
+    for k in TARGET_KEYS:
+        vals = options.get(k)
+        if isinstance(vals, list):
+            for v in vals:
+                v = str(v).strip()
+                if v:
+                    targets.setdefault(target_hash(k, v), (k, v))
+    if not targets:
+        return None
+    inc = IncrementalStep(run, step_scope(run, step, slug, options), ttl_for(wf), targets)
+    inc.load()
+    inc.narrow(options, step_dir)
+    return inc
+
+
+# ---------- per run ----------
+
+def record_changes(run) -> Optional[dict]:
+    """run_manifest['changes']: items new / gone since the baseline run, per bucket."""
+    if not run.workflow or not run.workflow.incremental:
+        return None
+    base_id = baseline_run_id(run)
+    base = db.session.get(WorkflowRun, base_id) if base_id else None
+    cur_b = ((run.run_manifest or {}).get("buckets") or {})
+    base_b = (((base.run_manifest if base else None) or {}).get("buckets") or {})
+    changes: Dict[str, object] = {"baseline_run_id": base_id, "buckets": {}}
+    for k in TARGET_KEYS:
+        now_items = (cur_b.get(k) or {}).get("items") or []
+        old_items = (base_b.get(k) or {}).get("items") or []
+        new, gone = diff_values(old_items, now_items)
+        if new or gone:
+            changes["buckets"][k] = {"new_count": len(new), "removed_count": len(gone),
+                                     "new": new[:CHANGES_SAMPLE], "removed": gone[:CHANGES_SAMPLE]}
+    manifest = dict(run.run_manifest or {})
+    manifest["changes"] = changes
+    run.run_manifest = manifest
+    flag_modified(run, "run_manifest")
+    return changes
+
+def prune(retention_days: int = INCREMENTAL_RETENTION_DAYS) -> int:
+    """Drop cached target results nobody has rescanned for `retention_days`."""
+    cutoff = utcnow() - timedelta(days=retention_days)
+    n = (db.session.query(StepTargetResult).filter(StepTargetResult.scanned_at < cutoff)
+         .delete(synchronize_session=False))
+    return n or 0
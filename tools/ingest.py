@@ -6,9 +6,9 @@ from typing import Dict, List, Iterable, Optional, Tuple
 from urllib.parse import urlsplit, urlunsplit
 
 from tools.policies import get_effective_policy
-from tools.alltools.tools._common import (
-    URL_RE, IPV4_RE, IPV6_RE, ValidationError
-)
+from tools import chunking, metrics, inventory
+from tools.alltools.tools._common import ValidationError
+from tools.utils.line_classifier import classify
 
 # ---------- small utilities ----------
 
@@ -49,30 +49,31 @@ def _normalize_url(u: str) -> str:
     except Exception:
         return s
 
+# line kind -> accepted buckets it may go to, best first; anything left over falls
+# back to domains, then hosts, where the adapter's own validation reports it
+_KIND_BUCKETS = {
+    "url": ("urls",),
+    "ipv4": ("ips", "hosts"),
+    "ipv6": ("ips", "hosts"),
+    "hostport": ("ports", "hosts"),
+    "path": ("endpoints",),
+    "domain": (),
+    "other": (),
+}
+
 def _categorize_lines_to_accepted(lines: List[str], accept_order: List[str]) -> Dict[str, List[str]]:
     """
-    Heuristic: put each line into the first accepted bucket it clearly matches.
-    Priority: urls -> domains -> hosts -> ips
+    Put each line into the first accepted bucket its kind maps to
+    (tools.utils.line_classifier), else into domains, else hosts. Lines keep
+    their input order within a bucket.
     """
     buckets: Dict[str, List[str]] = {k: [] for k in accept_order}
-    for raw in (lines or []):
-        s = (raw or "").strip()
-        if not s:
-            continue
-        # URL?
-        if "urls" in accept_order and URL_RE.search(s):
-            buckets["urls"].append(s); continue
-        # IP?
-        if "ips" in accept_order and (IPV4_RE.search(s) or IPV6_RE.search(s)):
-            buckets["ips"].append(s); continue
-        # Domain/host
-        if "domains" in accept_order:
-            buckets["domains"].append(s)
-        elif "hosts" in accept_order:
-            buckets["hosts"].append(s)
-        else:
-            # If none match, drop (or you could park in a 'raw' list)
-            pass
+    target = {kind: next((k for k in ks + ("domains", "hosts") if k in buckets), None)
+              for kind, ks in _KIND_BUCKETS.items()}
+    for kind, s in classify(lines or []):
+        k = target[kind] if s else None
+        if k is not None:
+            buckets[k].append(s)
     return buckets
 
 def _apply_normalization(typed_map: Dict[str, List[str]]) -> Dict[str, List[str]]:
@@ -221,14 +222,14 @@ def materialize_inbox_if_needed(work_dir: Path, accept_order: List[str], typed_m
 
 # ---------- main entry point ----------
 
-def build_inputs_for_step(run, step, step_dir: Path, app_config: dict, *, slug: str) -> dict:
+def build_inputs_for_step(run, step, step_dir: Path, app_config: dict, *, slug: str, policy: Optional[dict] = None) -> dict:
     """
     Returns a ready 'options' dict for the adapter:
       - includes _policy snapshot, tool_slug, work_dir
       - injects typed arrays for accepted keys (normalized, deduped, capped)
       - OPTIONAL: set input_method/file_path if you want file-based ingestion
     """
-    policy = get_policy_for_step(step, slug)
+    policy = policy or get_policy_for_step(step, slug)
     ipol = (policy.get("input_policy") or {})
     accept_keys: List[str] = list(ipol.get("accepts") or [])
     # Sensible fallback if DB has not yet populated accepts for a tool
@@ -255,11 +256,32 @@ def build_inputs_for_step(run, step, step_dir: Path, app_config: dict, *, slug:
     for k in list(merged_map.keys()):
         merged_map[k] = _dedupe_stable(merged_map[k])
 
-    # 7) cap
+    # 7) skip targets this user already probed with this tool recently (tools.inventory)
+    reused = None
+    node_opts = ((step.input_manifest or {}).get("options") or {})
+    skip_h = inventory.skip_hours(node_opts, ipol)
+    if skip_h and run.user_id is not None:
+        merged_map, reused = inventory.split_recent(run.user_id, slug, merged_map, hours=skip_h)
+        if reused:
+            metrics.INGEST_REUSED.inc(sum(len(v) for v in reused["targets"].values()), tool=slug)
+
+    # 8) cap (per invocation; auto-chunking keeps max_batches invocations' worth, see tools.chunking)
     cap_n = ipol.get("max_targets", 50)
+    chunk = chunking.settings_for(node_opts, ipol)
+    if chunk:
+        cap_n = chunk["size"] * chunk["max_batches"]
+        chunk["accepts"] = accept_keys
+    before = {k: len(v or []) for k, v in merged_map.items()}
     merged_map = _cap_map(merged_map, cap_n)
-
-    # 8) Assemble options for adapter (keep any explicit node fields)
+    capped: Dict[str, int] = {}
+    for k, n in before.items():
+        kept = len(merged_map.get(k) or [])
+        metrics.INGEST_ITEMS.inc(kept, tool=slug, bucket=k)
+        metrics.INGEST_CAPPED.inc(n - kept, tool=slug, bucket=k)
+        if n > kept:
+            capped[k] = n - kept
+
+    # 9) Assemble options for adapter (keep any explicit node fields)
     options: Dict[str, object] = {}
     # start with step.input_manifest and flatten "options" into top-level without overwriting explicit top-level
     if isinstance(step.input_manifest, dict):
@@ -279,6 +301,12 @@ def build_inputs_for_step(run, step, step_dir: Path, app_config: dict, *, slug:
         vals = merged_map.get(k) or []
         if vals:
             options[k] = vals
+    if reused:
+        options[inventory.REUSE_KEY] = reused
+    if chunk:
+        options[chunking.CHUNK_KEY] = chunk
+    if capped:
+        options[chunking.CAPPED_KEY] = {"limit": cap_n, "dropped": capped}
 
     # OPTIONAL: Materialize a file if you want file-based ingestion:
     # (Adapters can also consume the injected typed arrays directly, so this is not mandatory.)
@@ -0,0 +1,220 @@
+# tools/inventory.py
+"""
+Per-user asset inventory.
+
+record_step() runs after every step of a user's run: the step's input targets
+and output items are upserted into user_assets (last_seen), and when the tool
+actually ran, what it produced for each target it was given is stored as that
+asset's UserAssetProbe for the tool (result + hash). Writes are batched per
+chunk of _IN_CHUNK values: one SELECT, one multi-row INSERT for new rows and
+one executemany UPDATE for known ones.
+
+With 'skip_probed_within_h' (node option, or the tool's input policy as the
+default) ingest drops targets the same user already probed with the same tool
+within that many hours (split_recent); their stored results stand in for the
+skipped probes (Reuse.merge).
+"""
+from __future__ import annotations
+import hashlib, json
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import insert, update
+from sqlalchemy.exc import IntegrityError
+
+from extensions import db
+from tools.alltools.tools._common import finalize, merge_dedupe, now_ms
+from tools.incremental import attribute
+from tools.manifests import TARGET_KEYS
+from tools.models import AssetKind, UserAsset, UserAssetProbe
+
+utcnow = lambda: datetime.now(timezone.utc)
+
+KIND_BY_BUCKET = {
+    "domains": AssetKind.HOST, "hosts": AssetKind.HOST, "ips": AssetKind.HOST,
+    "services": AssetKind.SERVICE,   # host:port; bare "ports" carry no host and are not inventoried
+    "urls": AssetKind.URL, "endpoints": AssetKind.URL,
+}
+SKIP_OPTION = "skip_probed_within_h"
+REUSE_KEY = "_inventory_reused"   # ingest -> run_step hand-off inside the adapter options
+_IN_CHUNK = 500
+
+
+def asset_hash(kind: AssetKind, value: str) -> str:
+    return hashlib.sha1(f"{kind.value}:{value}".encode("utf-8", "ignore")).hexdigest()
+
+def result_hash(items: Dict[str, List[str]]) -> str:
+    """Order-insensitive digest of a probe result."""
+    canon = {k: sorted(set(v)) for k, v in (items or {}).items() if v}
+    return hashlib.sha256(json.dumps(canon, sort_keys=True, separators=(",", ":")).encode()).hexdigest()
+
+def _chunks(seq: List, n: int = _IN_CHUNK):
+    for i in range(0, len(seq), n):
+        yield seq[i:i + n]
+
+def _typed(pairs: Iterable[Tuple[str, str]]) -> Dict[str, Tuple[AssetKind, str, str]]:
+    """(bucket, value) pairs -> {asset_hash: (kind, bucket, value)} for inventoried buckets."""
+    out: Dict[str, Tuple[AssetKind, str, str]] = {}
+    for bucket, v in pairs:
+        kind = KIND_BY_BUCKET.get(bucket)
+        v = str(v).strip()
+        if kind and v:
+            out.setdefault(asset_hash(kind, v), (kind, bucket, v))
+    return out
+
+def _pairs(typed_map: Optional[Dict[str, List[str]]]) -> Iterable[Tuple[str, str]]:
+    for k, vals in (typed_map or {}).items():
+        if isinstance(vals, list):
+            for v in vals:
+                yield k, v
+
+
+# ---------- ingest side: skip recently probed targets ----------
+
+def skip_hours(options: dict, input_policy: Optional[dict]) -> float:
+    raw = options.get(SKIP_OPTION, (input_policy or {}).get(SKIP_OPTION))
+    try:
+        return max(float(raw or 0), 0.0)
+    except (TypeError, ValueError):
+        return 0.0
+
+def split_recent(user_id: int, slug: str, typed_map: Dict[str, List[str]], *, hours: float
+                 ) -> Tuple[Dict[str, List[str]], Optional[dict]]:
+    """
+    Remove targets `slug` already probed for this user within `hours`.
+    Returns (remaining typed_map, reuse payload or None).
+    """
+    typed = _typed(_pairs(typed_map))
+    if not typed:
+        return typed_map, None
+    cutoff = utcnow() - timedelta(hours=hours)
+    hits: Dict[str, dict] = {}
+    for chunk in _chunks(list(typed)):
+        q = (db.session.query(UserAsset.value_hash, UserAssetProbe.result)
+             .join(UserAssetProbe, UserAssetProbe.asset_id == UserAsset.id)
+             .filter(UserAsset.user_id == user_id, UserAsset.value_hash.in_(chunk),
+                     UserAssetProbe.tool_slug == slug, UserAssetProbe.probed_at >= cutoff))
+        hits.update({h: (res or {}) for h, res in q})
+    if not hits:
+        return typed_map, None
+    skipped = {(typed[h][1], typed[h][2]) for h in hits}
+    remaining = {k: [v for v in vals if (k, str(v).strip()) not in skipped] for k, vals in typed_map.items()}
+    targets: Dict[str, List[str]] = {}
+    for b, v in sorted(skipped):
+        targets.setdefault(b, []).append(v)
+    items: Dict[str, List[str]] = {}
+    for res in hits.values():
+        for k, vals in res.items():
+            items.setdefault(k, []).extend(vals or [])
+    return remaining, {"hours": hours, "targets": targets, "items": {k: merge_dedupe(v) for k, v in items.items()}}
+
+
+class Reuse:
+    """Stored probe results standing in for the targets ingest skipped."""
+
+    def __init__(self, payload: dict):
+        self.hours = payload.get("hours")
+        self.targets: Dict[str, List[str]] = payload.get("targets") or {}
+        self.items: Dict[str, List[str]] = payload.get("items") or {}
+
+    @classmethod
+    def from_options(cls, options: dict) -> Optional["Reuse"]:
+        payload = options.pop(REUSE_KEY, None)  # never handed to the adapter
+        return cls(payload) if payload else None
+
+    @property
+    def count(self) -> int:
+        return sum(len(v) for v in self.targets.values())
+
+    def cached_result(self, options: dict) -> dict:
+        """Adapter-shaped result for a step whose targets were all probed recently."""
+        return finalize("success", f"All {self.count} targets probed within {self.hours:g}h; results reused",
+                        options, "(inventory: not executed)", now_ms(), "")
+
+    def merge(self, result: dict) -> dict:
+        if result.get("status") in ("success", "ok"):
+            counts = dict(result.get("counts") or {})
+            for k, vals in self.items.items():
+                if vals:
+                    result[k] = merge_dedupe(list(result.get(k) or []) + vals)
+                    counts[k] = len(result[k])
+            if counts:
+                result["counts"] = counts
+        result["inventory"] = {"reused_targets": self.count, "hours": self.hours}
+        return result
+
+
+# ---------- step end: bulk upserts ----------
+
+def _upsert_assets(user_id: int, run_id: int, seen: Dict[str, Tuple[AssetKind, str, str]], now) -> Dict[str, int]:
+    """last_seen for known assets, new rows for the rest; returns {value_hash: asset id}."""
+    ids: Dict[str, int] = {}
+    hashes = list(seen)
+    for chunk in _chunks(hashes):
+        ids.update({h: i for i, h in db.session.query(UserAsset.id, UserAsset.value_hash)
+                    .filter(UserAsset.user_id == user_id, UserAsset.value_hash.in_(chunk))})
+    if ids:
+        db.session.execute(update(UserAsset), [{"id": i, "last_seen": now, "last_run_id": run_id} for i in ids.values()])
+    new = [{"user_id": user_id, "kind": kind, "value": v[:512], "value_hash": h,
+            "first_seen": now, "last_seen": now, "last_run_id": run_id}
+           for h, (kind, _, v) in seen.items() if h not in ids]
+    if new:
+        try:
+            with db.session.begin_nested():
+                for chunk in _chunks(new):
+                    db.session.execute(insert(UserAsset), chunk)
+        except IntegrityError:
+            # another step of this user inserted some of them first
+            for row in new:
+                try:
+                    with db.session.begin_nested():
+                        db.session.execute(insert(UserAsset), [row])
+                except IntegrityError:
+                    pass
+        for chunk in _chunks([r["value_hash"] for r in new]):
+            ids.update({h: i for i, h in db.session.query(UserAsset.id, UserAsset.value_hash)
+                        .filter(UserAsset.user_id == user_id, UserAsset.value_hash.in_(chunk))})
+    return ids
+
+def _upsert_probes(ids: Dict[str, int], slug: str, per: Dict[str, Dict[str, List[str]]], run_id: int, now) -> int:
+    rows = {ids[h]: (items, result_hash(items)) for h, items in per.items() if h in ids}
+    if not rows:
+        return 0
+    existing: Dict[int, int] = {}
+    for chunk in _chunks(list(rows)):
+        existing.update({a: i for i, a in db.session.query(UserAssetProbe.id, UserAssetProbe.asset_id)
+                         .filter(UserAssetProbe.tool_slug == slug, UserAssetProbe.asset_id.in_(chunk))})
+    if existing:
+        db.session.execute(update(UserAssetProbe), [
+            {"id": pid, "probed_at": now, "result": rows[a][0], "result_hash": rows[a][1], "run_id": run_id}
+            for a, pid in existing.items()])
+    new = [{"asset_id": a, "tool_slug": slug, "probed_at": now, "result": items, "result_hash": rh, "run_id": run_id}
+           for a, (items, rh) in rows.items() if a not in existing]
+    for chunk in _chunks(new):
+        db.session.execute(insert(UserAssetProbe), chunk)
+    db.session.execute(update(UserAsset), [
+        {"id": a, "last_probed": now, "probe_tool": slug, "result_hash": rh} for a, (_, rh) in rows.items()])
+    return len(rows)
+
+def record_step(run, slug: str, result: dict, *, inputs: Dict[str, List[str]],
+                probed: Optional[Dict[str, List[str]]] = None) -> Dict[str, int]:
+    """
+    Fold one finished step into its user's inventory. `inputs` are all typed
+    targets the step was given (including skipped ones); `probed` the subset
+    the tool actually ran against (None when it did not run). Caller commits.
+    """
+    if run.user_id is None:
+        return {}
+    now = utcnow()
+    seen = _typed(_pairs(inputs))
+    for k in TARGET_KEYS:
+        seen.update({h: t for h, t in _typed((k, v) for v in result.get(k) or []).items() if h not in seen})
+    ids = _upsert_assets(run.user_id, run.id, seen, now) if seen else {}
+    n_probes = 0
+    if probed and result.get("status") in ("success", "ok"):
+        failed = {f.get("target") for f in result.get("targets_failed") or [] if isinstance(f, dict)}
+        targets = {h: (b, v) for h, (_, b, v) in _typed(_pairs(probed)).items() if v not in failed}
+        if targets:
+            per, _ = attribute(targets, result)
+            n_probes = _upsert_probes(ids, slug, per, run.id, now)
+    return {"assets": len(seen), "probes": n_probes}
@@ -0,0 +1,106 @@
+# tools/manifests.py
+from __future__ import annotations
+import hashlib, json
+from typing import Any, Dict, Iterable, List, Optional
+
+# Bump when the shape of the slim "parameters" block changes.
+MANIFEST_VERSION = 2
+
+# Typed target lists injected by ingest; never echoed verbatim into manifests.
+TARGET_KEYS = ("domains", "hosts", "ips", "ports", "services", "urls", "endpoints", "findings")
+
+# User-facing knobs that are always safe to keep. Tool-specific fields are
+# added from the policy's visible schema_fields at slim time.
+BASE_PARAM_ALLOWLIST = (
+    "tool_slug", "input_method", "value", "file_path", "upstream",
+    "timeout_s", "threads", "depth", "rate", "ports",
+    "subs", "follow_redirects", "all_sources", "silent",
+    "skip_probed_within_h",
+)
+
+# Never persisted even if a schema field carries the name.
+SECRET_MARKERS = ("token", "secret", "password", "api_key", "apikey")
+
+# Manual 'value' above this size is stored as a target reference instead.
+MAX_INLINE_VALUE = 512
+
+
+def _canonical(obj: Any) -> bytes:
+    return json.dumps(obj, sort_keys=True, separators=(",", ":"), default=str).encode("utf-8")
+
+def policy_digest(policy: Optional[dict]) -> Optional[str]:
+    """Stable content hash of a policy snapshot (used as its version key)."""
+    if not policy:
+        return None
+    return hashlib.sha256(_canonical(policy)).hexdigest()
+
+def target_ref(values: Iterable[Any]) -> Dict[str, Any]:
+    """Replace a target list with {count, sha256} over its newline-joined items."""
+    vals = [str(v).strip() for v in (values or []) if str(v).strip()]
+    h = hashlib.sha256("\n".join(vals).encode("utf-8", "ignore")).hexdigest()
+    return {"count": len(vals), "sha256": h}
+
+def _is_secret(name: str) -> bool:
+    n = (name or "").lower()
+    return any(m in n for m in SECRET_MARKERS)
+
+def param_allowlist(policy: Optional[dict]) -> List[str]:
+    names = list(BASE_PARAM_ALLOWLIST)
+    for f in ((policy or {}).get("schema_fields") or []):
+        n = f.get("name") if isinstance(f, dict) else None
+        if n and not n.startswith("__") and n not in names:
+            names.append(n)
+    return [n for n in names if not _is_secret(n)]
+
+def is_slim(params: Any) -> bool:
+    return isinstance(params, dict) and params.get("manifest_v") == MANIFEST_VERSION
+
+def slim_parameters(options: Optional[dict]) -> Dict[str, Any]:
+    """
+    Project adapter options onto the manifest schema:
+      - only allowlisted, user-facing parameters
+      - injected target lists -> {"targets": {key: {count, sha256}}}
+      - policy snapshot -> {"policy_ref": {id, digest}}
+    Idempotent: slim input is returned unchanged.
+    """
+    opts = options or {}
+    if is_slim(opts):
+        return dict(opts)
+
+    policy = opts.get("_policy") if isinstance(opts.get("_policy"), dict) else None
+    out: Dict[str, Any] = {"manifest_v": MANIFEST_VERSION}
+
+    for k in param_allowlist(policy):
+        if k not in opts or opts.get(k) is None:
+            continue
+        v = opts.get(k)
+        if k == "value" and isinstance(v, str) and len(v) > MAX_INLINE_VALUE:
+            out["value_ref"] = target_ref(v.split())
+            continue
+        out[k] = v
+
+    targets = {k: target_ref(opts[k]) for k in TARGET_KEYS if isinstance(opts.get(k), list) and opts.get(k)}
+    if targets:
+        out["targets"] = targets
+
+    pid = opts.get("_policy_id")
+    digest = policy_digest(policy) or opts.get("_policy_digest")
+    if pid or digest:
+        out["policy_ref"] = {"id": pid, "digest": digest}
+    return out
+
+def json_size(obj: Any) -> int:
+    """Encoded size in bytes, as it would land in a JSON column."""
+    if obj is None:
+        return 0
+    return len(_canonical(obj))
+
+def size_histogram(sizes: Iterable[int]) -> List[tuple]:
+    """Power-of-two byte buckets -> [(upper_bound, count), ...] (sparse, ascending)."""
+    buckets: Dict[int, int] = {}
+    for s in sizes:
+        ub = 1
+        while ub < max(1, s):
+            ub <<= 1
+        buckets[ub] = buckets.get(ub, 0) + 1
+    return sorted(buckets.items())
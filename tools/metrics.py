@@ -0,0 +1,264 @@
+# tools/metrics.py
+"""
+Operational metrics for the tools engine, rendered in Prometheus text format.
+
+Every process (gunicorn workers, Celery workers) accumulates deltas in memory
+and flushes them to one Redis hash with a single pipelined HINCRBYFLOAT round
+trip at most every METRICS_FLUSH_INTERVAL seconds (and after each Celery task
+/ at exit). The scrape endpoint reads that hash, so the numbers are the sum
+over all processes and hosts sharing the Redis. Observing is a dict update
+under a lock; the network is touched at most once per flush interval.
+
+Histogram buckets are stored cumulatively, so rendering is a straight read.
+Gauges are summed deltas too (inc/dec), which is what connection counts need.
+"""
+from __future__ import annotations
+import atexit, json, math, os, threading, time
+from typing import Dict, Iterable, List, Optional, Tuple
+
+METRICS_KEY = os.environ.get("METRICS_REDIS_KEY", "tools:metrics:v1")
+FLUSH_INTERVAL = float(os.environ.get("METRICS_FLUSH_INTERVAL", "5"))
+ENABLED = os.environ.get("METRICS_ENABLED", "1").lower() not in ("0", "false", "no")
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+_lock = threading.Lock()
+_pending: Dict[str, float] = {}
+_pid = os.getpid()
+_last_flush = time.monotonic()
+_REGISTRY: Dict[str, "_Metric"] = {}
+
+
+def _field(name: str, labels: Dict[str, str], le: Optional[str] = None) -> str:
+    items = sorted((k, str(v)) for k, v in labels.items())
+    if le is not None:
+        items.append(("le", le))
+    return json.dumps([name, items], separators=(",", ":"))
+
+def _add(*deltas: Tuple[str, float]) -> None:
+    global _pid
+    with _lock:
+        if os.getpid() != _pid:
+            # forked after import (gunicorn preload): the parent's deltas are not ours
+            _pending.clear()
+            _pid = os.getpid()
+        for field, value in deltas:
+            _pending[field] = _pending.get(field, 0.0) + value
+    maybe_flush()
+
+
+class _Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, doc: str, labels: Iterable[str] = ()):
+        self.name, self.doc, self.labels = name, doc, tuple(labels)
+        self._keys: Dict[Tuple[str, ...], str] = {}
+        _REGISTRY[name] = self
+
+    def _key(self, kw: Dict[str, object]) -> str:
+        vals = tuple(str(kw.get(k, "")) for k in self.labels)
+        f = self._keys.get(vals)
+        if f is None:
+            f = self._keys[vals] = _field(self.name, dict(zip(self.labels, vals)))
+        return f
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        if ENABLED and amount:
+            _add((self._key(labels), float(amount)))
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        if ENABLED:
+            _add((self._key(labels), float(amount)))
+
+    def dec(self, amount: float = 1, **labels) -> None:
+        self.inc(-amount, **labels)
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, doc: str, labels: Iterable[str] = (), buckets: Iterable[float] = ()):
+        super().__init__(name, doc, labels)
+        self.buckets = tuple(sorted(buckets))
+        self._fields: Dict[Tuple[str, ...], Tuple[List[str], str, str, str]] = {}
+
+    def _fields_for(self, labels: Dict[str, object]) -> Tuple[List[str], str, str, str]:
+        key = tuple(str(labels.get(k, "")) for k in self.labels)
+        f = self._fields.get(key)
+        if f is None:
+            lab = dict(zip(self.labels, key))
+            f = self._fields[key] = (
+                [_field(self.name + "_bucket", lab, _fmt(b)) for b in self.buckets],
+                _field(self.name + "_bucket", lab, "+Inf"),
+                _field(self.name + "_sum", lab),
+                _field(self.name + "_count", lab),
+            )
+        return f
+
+    def observe(self, value: float, **labels) -> None:
+        if not ENABLED or value is None:
+            return
+        buckets, inf, sum_f, count_f = self._fields_for(labels)
+        deltas = [(f, 1.0) for b, f in zip(self.buckets, buckets) if value <= b]
+        deltas += [(inf, 1.0), (sum_f, float(value)), (count_f, 1.0)]
+        _add(*deltas)
+
+
+# ---------- flushing ----------
+
+def _redis():
+    from tools.alltools.tools._common import ops_redis
+    return ops_redis()
+
+def flush() -> bool:
+    """Push pending deltas to Redis; on failure they stay pending for the next try."""
+    global _last_flush
+    with _lock:
+        if not _pending or os.getpid() != _pid:
+            _last_flush = time.monotonic()
+            return True
+        batch = dict(_pending)
+        _pending.clear()
+        _last_flush = time.monotonic()
+    try:
+        pipe = _redis().pipeline(transaction=False)
+        for f, v in batch.items():
+            pipe.hincrbyfloat(METRICS_KEY, f, v)
+        pipe.execute()
+        return True
+    except Exception:
+        with _lock:
+            for f, v in batch.items():
+                _pending[f] = _pending.get(f, 0.0) + v
+        return False
+
+def maybe_flush() -> None:
+    if time.monotonic() - _last_flush >= FLUSH_INTERVAL:
+        flush()
+
+atexit.register(flush)
+
+
+# ---------- rendering ----------
+
+def _fmt(v: float) -> str:
+    if v == math.inf:
+        return "+Inf"
+    return str(int(v)) if float(v).is_integer() else repr(float(v))
+
+def _escape(v: str) -> str:
+    return v.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _le_key(items: List[list]) -> Tuple:
+    rest = tuple((k, v) for k, v in items if k != "le")
+    le = next((v for k, v in items if k == "le"), None)
+    return rest, (math.inf if le == "+Inf" else float(le)) if le is not None else -1
+
+def snapshot() -> Dict[str, float]:
+    """Merged totals: Redis hash plus anything this process could not flush yet."""
+    flush()
+    data: Dict[str, float] = {}
+    try:
+        for f, v in (_redis().hgetall(METRICS_KEY) or {}).items():
+            data[f if isinstance(f, str) else f.decode()] = float(v)
+    except Exception:
+        pass
+    with _lock:
+        for f, v in _pending.items():
+            data[f] = data.get(f, 0.0) + v
+    return data
+
+def render(extra: Iterable[Tuple[str, str, str, Dict[str, str], float]] = ()) -> str:
+    """
+    Prometheus exposition text. `extra` carries scrape-time samples as
+    (name, kind, help, labels, value), e.g. queue depth read live.
+    """
+    series: Dict[str, List[Tuple[str, List[list], float]]] = {}
+    for f, v in snapshot().items():
+        try:
+            sample, items = json.loads(f)
+        except Exception:
+            continue
+        base = sample
+        for suffix in ("_bucket", "_sum", "_count"):
+            if sample.endswith(suffix) and sample[: -len(suffix)] in _REGISTRY:
+                base = sample[: -len(suffix)]
+        series.setdefault(base, []).append((sample, items, v))
+
+    out: List[str] = []
+    for name in sorted(set(series) | set(_REGISTRY)):
+        m = _REGISTRY.get(name)
+        rows = series.get(name) or []
+        if m is None or not rows:
+            continue
+        out.append(f"# HELP {name} {m.doc}")
+        out.append(f"# TYPE {name} {m.kind}")
+        if isinstance(m, Histogram):
+            # buckets below the smallest observation were never written; quantiles need them all
+            have = {(_le_key(items)[0], _le_key(items)[1]) for s, items, _ in rows if s == name + "_bucket"}
+            for lab in {_le_key(items)[0] for _, items, _ in rows}:
+                for b in m.buckets:
+                    if (lab, float(b)) not in have:
+                        rows.append((name + "_bucket", [list(kv) for kv in lab] + [["le", _fmt(b)]], 0.0))
+        order = {name + "_bucket": 0, name + "_sum": 1, name + "_count": 2}
+        rows.sort(key=lambda r: (_le_key(r[1])[0], order.get(r[0], 0), _le_key(r[1])[1]))
+        for sample, items, v in rows:
+            lab = ",".join(f'{k}="{_escape(val)}"' for k, val in items)
+            out.append(f"{sample}{{{lab}}} {_fmt(v)}" if lab else f"{sample} {_fmt(v)}")
+    seen = set()
+    for name, kind, doc, labels, value in sorted(extra, key=lambda e: e[0]):
+        if name not in seen:
+            seen.add(name)
+            out.append(f"# HELP {name} {doc}")
+            out.append(f"# TYPE {name} {kind}")
+        lab = ",".join(f'{k}="{_escape(str(val))}"' for k, val in sorted(labels.items()))
+        out.append(f"{name}{{{lab}}} {_fmt(value)}" if lab else f"{name} {_fmt(value)}")
+    return "\n".join(out) + "\n"
+
+
+# ---------- the engine's metrics ----------
+
+_SECONDS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600, 1800)
+_BYTES = (1e3, 1e4, 1e5, 1e6, 1e7, 1e8, 1e9)
+
+STEP_DURATION = Histogram("tools_step_duration_seconds",
+                          "Wall time of run_step from pickup to final commit.",
+                          ("tool", "status"), _SECONDS)
+QUEUE_WAIT = Histogram("tools_step_queue_wait_seconds",
+                       "Time a run_step task spent in the broker queue.",
+                       ("tool",), _SECONDS)
+INGEST_ITEMS = Counter("tools_ingest_items_total",
+                       "Typed items handed to adapters after normalize/dedupe/cap.",
+                       ("tool", "bucket"))
+INGEST_CAPPED = Counter("tools_ingest_capped_items_total",
+                        "Typed items dropped by the input policy max_targets cap.",
+                        ("tool", "bucket"))
+INGEST_REUSED = Counter("tools_ingest_reused_targets_total",
+                        "Targets skipped by ingest because the inventory holds a recent probe result.",
+                        ("tool",))
+ARTIFACT_BYTES = Histogram("tools_artifact_bytes",
+                           "Size of staged step artifacts.",
+                           ("tool",), _BYTES)
+SSE_CONNECTIONS = Gauge("tools_sse_connections",
+                        "Open run event streams.")
+ADMISSION_REJECTIONS = Counter("tools_admission_rejections_total",
+                               "Run starts held back by the per-user active run cap.",
+                               ("source",))
+QUOTA_REJECTIONS = Counter("tools_quota_rejections_total",
+                           "Requests answered 429 because a daily quota was exhausted.",
+                           ("kind",))
+CELERY_RETRIES = Counter("tools_celery_task_retries_total",
+                         "Celery task retries.",
+                         ("task",))
+STREAM_CHUNKS = Counter("tools_stream_chunks_total",
+                        "Chunks published by pipelined producer steps.")
+STREAM_BATCHES = Counter("tools_stream_batches_total",
+                         "Adapter calls made by pipelined consumer steps.",
+                         ("tool",))
@@ -47,6 +47,7 @@ class ToolScanHistory(db.Model, PrettyIdMixin):
     __table_args__ = (
         db.Index('ix_tool_scan_history_user_scanned', 'user_id', 'scanned_at'),
         db.Index('ix_tool_scan_history_tool_scanned', 'tool_id', 'scanned_at'),
+        db.Index('ix_tool_scan_history_scanned_id', 'scanned_at', 'id'),  # admin listing keyset
     )
 
 class ScanStatus(enum.Enum):
@@ -59,6 +60,8 @@ class ErrorReason(enum.Enum):
     INVALID_PARAMS      = "INVALID_PARAMS"
     TOO_MANY_DOMAINS    = "TOO_MANY_DOMAINS"
     TIMEOUT             = "TIMEOUT"
+    CANCELED            = "CANCELED"
+    OUTPUT_LIMIT        = "OUTPUT_LIMIT"
     OTHER               = "OTHER"
 
 class ScanDiagnostics(db.Model):
@@ -312,6 +315,22 @@ class UserToolConfig(db.Model):
 
     tool = db.relationship("Tool", lazy="joined")
 
+class ToolPolicySnapshot(db.Model):
+    """
+    Immutable, content-addressed copy of a tool's effective policy.
+    Manifests reference it by id/digest instead of embedding the whole blob.
+    """
+    __tablename__ = "tool_policy_snapshots"
+
+    id         = db.Column(db.Integer, primary_key=True)
+    tool_slug  = db.Column(db.String(64), nullable=False, index=True)
+    digest     = db.Column(db.String(64), nullable=False, unique=True, index=True)  # sha256 of canonical JSON
+    policy     = db.Column(db.JSON, nullable=False, default=dict)
+    created_at = db.Column(db.DateTime(timezone=True), default=utcnow, nullable=False)
+
+    def __repr__(self):
+        return f"<ToolPolicySnapshot {self.tool_slug} {self.digest[:8]}>"
+
 class WorkflowDefinition(db.Model, TimestampMixin, PrettyIdMixin):
     """
     A reusable workflow ("preset") that captures the canvas graph and per-node config.
@@ -329,6 +348,9 @@ class WorkflowDefinition(db.Model, TimestampMixin, PrettyIdMixin):
     is_archived   = db.Column(db.Boolean, nullable=False, default=False, index=True)
     forked_from_id= db.Column(db.Integer, db.ForeignKey("workflow_definitions.id", ondelete="SET NULL"), nullable=True)
     graph_json    = db.Column(db.JSON, nullable=False, default=dict)  # { nodes: [...], edges: [...] }
+    incremental   = db.Column(db.Boolean, nullable=False, default=False)  # steps only scan new/expired targets
+    incremental_ttl_s = db.Column(db.Integer, nullable=True)              # cached per-target results reused this long; None = INCREMENTAL_TTL_S
+    pipelined     = db.Column(db.Boolean, nullable=False, default=False)  # streaming-capable steps start on partial upstream output
 
     runs          = relationship("WorkflowRun", back_populates="workflow", cascade="all, delete-orphan", passive_deletes=True)
     fork_children = relationship("WorkflowDefinition", remote_side=[id])
@@ -338,6 +360,62 @@ class WorkflowDefinition(db.Model, TimestampMixin, PrettyIdMixin):
         Index("ix_workflow_def_shared", "is_shared", "updated_at"),
     )
 
+class WorkflowPlan(db.Model):
+    """
+    A definition's graph compiled for execution (tools.runner.compile_plan):
+    step order, resolved tool ids, policy snapshot ids and validated options.
+    One row per (workflow_id, version); runs are instantiated from it.
+    """
+    __tablename__ = "workflow_plans"
+    __table_args__ = (
+        UniqueConstraint("workflow_id", "version", name="uq_workflow_plan_version"),
+    )
+
+    id          = db.Column(db.Integer, primary_key=True)
+    workflow_id = db.Column(db.Integer, db.ForeignKey("workflow_definitions.id", ondelete="CASCADE"), nullable=False, index=True)
+    version     = db.Column(db.Integer, nullable=False)
+    plan        = db.Column(db.JSON, nullable=False, default=dict)
+    created_at  = db.Column(db.DateTime(timezone=True), default=utcnow, nullable=False)
+
+    def __repr__(self):
+        return f"<WorkflowPlan wf={self.workflow_id} v{self.version}>"
+
+class CampaignStatus(enum.Enum):
+    QUEUED    = "QUEUED"
+    RUNNING   = "RUNNING"
+    PAUSED    = "PAUSED"
+    COMPLETED = "COMPLETED"
+    CANCELED  = "CANCELED"
+
+class WorkflowCampaign(db.Model, TimestampMixin, PrettyIdMixin):
+    """
+    One workflow over many seeds (tools.campaigns). Seeds live in a file under
+    the artifacts dir; runs are created lazily, `concurrency` at a time, and
+    `seed_offset` is the byte offset of the next seed not yet turned into a run.
+    """
+    __tablename__ = "workflow_campaigns"
+    _pretty_prefix = "WC"
+
+    id            = db.Column(db.Integer, primary_key=True)
+    workflow_id   = db.Column(db.Integer, db.ForeignKey("workflow_definitions.id", ondelete="CASCADE"), nullable=False, index=True)
+    user_id       = db.Column(db.Integer, db.ForeignKey("users.id", ondelete="SET NULL"), nullable=True, index=True)
+    title         = db.Column(db.String(150), nullable=True)
+    status        = db.Column(db.Enum(CampaignStatus, name="campaign_status_enum"), nullable=False, default=CampaignStatus.QUEUED, index=True)
+    concurrency   = db.Column(db.Integer, nullable=False, default=5)
+    seeds_path    = db.Column(db.String(512), nullable=False)
+    total_seeds   = db.Column(db.Integer, nullable=False, default=0)
+    seed_offset   = db.Column(db.BigInteger, nullable=False, default=0)
+    runs_created  = db.Column(db.Integer, nullable=False, default=0)
+    status_reason = db.Column(db.String(255), nullable=True)  # why a live campaign waits, or why it was paused
+    started_at    = db.Column(db.DateTime(timezone=True), nullable=True)
+    finished_at   = db.Column(db.DateTime(timezone=True), nullable=True)
+
+    workflow      = relationship("WorkflowDefinition")
+    runs          = relationship("WorkflowRun", backref="campaign", lazy="dynamic", passive_deletes=True)
+
+    def __repr__(self):
+        return f"<WorkflowCampaign {self.id} wf={self.workflow_id} {self.runs_created}/{self.total_seeds}>"
+
 class WorkflowRunStatus(enum.Enum):
     QUEUED    = "QUEUED"
     RUNNING   = "RUNNING"
@@ -361,6 +439,8 @@ class WorkflowRun(db.Model, TimestampMixin, PrettyIdMixin):
     finished_at         = db.Column(db.DateTime(timezone=True), nullable=True, index=True)
     summary_json        = db.Column(db.JSON, nullable=True)
     run_manifest        = db.Column(db.JSON, default=dict)
+    campaign_id         = db.Column(db.Integer, db.ForeignKey("workflow_campaigns.id", ondelete="CASCADE"), nullable=True, index=True)
+    seed                = db.Column(db.String(255), nullable=True)  # campaign runs: the seed fed to step 0
 
     workflow            = relationship("WorkflowDefinition", back_populates="runs")
     steps               = relationship("WorkflowRunStep", back_populates="run",
@@ -400,7 +480,101 @@ class WorkflowRunStep(db.Model, TimestampMixin):
 
     tool_scan_history_id = db.Column(db.Integer, db.ForeignKey("tool_scan_history.id", ondelete="SET NULL"), nullable=True, index=True)
     celery_task_id       = db.Column(db.String(50), nullable=True, index=True)
+    trace                = db.Column(db.JSON, nullable=True)  # compact phase spans (tools.tracing)
     
     run                  = relationship("WorkflowRun", back_populates="steps")
     tool                 = relationship("Tool", passive_deletes=True)
-    tool_scan_history    = relationship("ToolScanHistory", passive_deletes=True)
\ No newline at end of file
+    tool_scan_history    = relationship("ToolScanHistory", passive_deletes=True)
+
+class StepTargetResult(db.Model):
+    """
+    Incremental mode cache (tools.incremental): what one step produced for one
+    input target. `scope` hashes workflow, user, step position, tool and the
+    step's non-target parameters; `target_hash` is the bucket-qualified target
+    ("*" holds output that could not be attributed to a single target).
+    `last_run_id` is the latest run whose input set contained the target.
+    """
+    __tablename__ = "step_target_results"
+    __table_args__ = (
+        UniqueConstraint("scope", "target_hash", name="uq_step_target_result"),
+        Index("ix_step_target_results_scope_run", "scope", "last_run_id"),
+    )
+
+    id          = db.Column(db.Integer, primary_key=True)
+    scope       = db.Column(db.String(64), nullable=False)
+    target_hash = db.Column(db.String(40), nullable=False)
+    bucket      = db.Column(db.String(16), nullable=True)
+    target      = db.Column(db.String(512), nullable=True)
+    items       = db.Column(db.JSON, nullable=False, default=dict)  # {bucket: [values]}
+    scanned_at  = db.Column(db.DateTime(timezone=True), nullable=False, index=True)
+    last_run_id = db.Column(db.Integer, db.ForeignKey("workflow_runs.id", ondelete="SET NULL"), nullable=True)
+
+
+class RunDiff(db.Model):
+    """
+    Cached diff summary of two finished runs (tools.diffs). `key_a` / `key_b`
+    record each run's manifest version when the summary was computed; a
+    mismatch (e.g. the run was retried) means the row is stale.
+    """
+    __tablename__ = "run_diffs"
+    __table_args__ = (
+        UniqueConstraint("run_a_id", "run_b_id", name="uq_run_diff_pair"),
+    )
+
+    id         = db.Column(db.Integer, primary_key=True)
+    run_a_id   = db.Column(db.Integer, db.ForeignKey("workflow_runs.id", ondelete="CASCADE"), nullable=False)
+    run_b_id   = db.Column(db.Integer, db.ForeignKey("workflow_runs.id", ondelete="CASCADE"), nullable=False, index=True)
+    key_a      = db.Column(db.String(64), nullable=False)
+    key_b      = db.Column(db.String(64), nullable=False)
+    summary    = db.Column(db.JSON, nullable=False, default=dict)
+    created_at = db.Column(db.DateTime(timezone=True), nullable=False, default=utcnow)
+
+
+class AssetKind(enum.Enum):
+    HOST    = "HOST"      # domains, hosts, IPs
+    SERVICE = "SERVICE"   # host:port
+    URL     = "URL"       # urls, endpoints
+
+class UserAsset(db.Model):
+    """
+    Per-user asset inventory (tools.inventory): every host, service and URL a
+    user's steps consumed or produced. `last_probed` / `result_hash` mirror the
+    most recent UserAssetProbe of any tool.
+    """
+    __tablename__ = "user_assets"
+    __table_args__ = (
+        UniqueConstraint("user_id", "value_hash", name="uq_user_asset_value"),
+        Index("ix_user_assets_user_kind_seen", "user_id", "kind", "last_seen"),
+        Index("ix_user_assets_user_probed", "user_id", "last_probed"),
+    )
+
+    id          = db.Column(db.Integer, primary_key=True)
+    user_id     = db.Column(db.Integer, db.ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    kind        = db.Column(db.Enum(AssetKind, name="asset_kind_enum"), nullable=False)
+    value       = db.Column(db.String(512), nullable=False)
+    value_hash  = db.Column(db.String(40), nullable=False)   # sha1(kind:value), see inventory.asset_hash
+    first_seen  = db.Column(db.DateTime(timezone=True), nullable=False)
+    last_seen   = db.Column(db.DateTime(timezone=True), nullable=False)
+    last_probed = db.Column(db.DateTime(timezone=True), nullable=True)
+    probe_tool  = db.Column(db.String(64), nullable=True)
+    result_hash = db.Column(db.String(64), nullable=True)
+    last_run_id = db.Column(db.Integer, db.ForeignKey("workflow_runs.id", ondelete="SET NULL"), nullable=True)
+
+    probes      = relationship("UserAssetProbe", back_populates="asset", cascade="all, delete-orphan", passive_deletes=True)
+
+class UserAssetProbe(db.Model):
+    """What one tool last produced when it was run against an asset."""
+    __tablename__ = "user_asset_probes"
+    __table_args__ = (
+        UniqueConstraint("asset_id", "tool_slug", name="uq_user_asset_probe_tool"),
+    )
+
+    id          = db.Column(db.Integer, primary_key=True)
+    asset_id    = db.Column(db.Integer, db.ForeignKey("user_assets.id", ondelete="CASCADE"), nullable=False)
+    tool_slug   = db.Column(db.String(64), nullable=False)
+    probed_at   = db.Column(db.DateTime(timezone=True), nullable=False)
+    result_hash = db.Column(db.String(64), nullable=False)
+    result      = db.Column(db.JSON, nullable=False, default=dict)  # {bucket: [values]}
+    run_id      = db.Column(db.Integer, db.ForeignKey("workflow_runs.id", ondelete="SET NULL"), nullable=True)
+
+    asset       = relationship("UserAsset", back_populates="probes")
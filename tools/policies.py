@@ -2,12 +2,23 @@
 from __future__ import annotations
 from functools import lru_cache
 from typing import Dict, Any, Optional
+from sqlalchemy import event
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
 from extensions import db
 from tools.models import Tool, ToolConfigField, ToolConfigFieldType
+from tools.alltools.tools._sandbox import DEFAULT_SANDBOX
 
 DEFAULT_INPUT   = {"accepts": [], "max_targets": 50, "file_max_bytes": 100_000}
-DEFAULT_IO      = {"consumes": [], "emits": []}
+DEFAULT_IO      = {"consumes": [], "emits": []}  # may also carry max_output_bytes / max_line_bytes (see _common.output_limits)
 DEFAULT_BIN     = {"names": []}
+DEFAULT_WORKER  = {"class": None}  # "light" | "heavy"; None falls back to HEAVY_TOOLS
+
+# Tools that hold a worker for minutes (port scans, crawlers) unless their policy says otherwise
+HEAVY_TOOLS = frozenset({"naabu", "katana", "gospider", "hakrawler"})
+WORKER_CLASSES = ("light", "heavy")
+# Per-target probes that can run on partial input in pipelined workflows unless io_policy.streaming says otherwise
+STREAMING_TOOLS = frozenset({"httpx", "dnsx", "naabu", "katana"})
 
 def _field_map(tool: Tool) -> Dict[str, ToolConfigField]:
     return {f.name: f for f in (tool.config_fields or [])}
@@ -20,6 +31,8 @@ def get_effective_policy(tool_slug: str) -> Dict[str, Any]:
             "input_policy": DEFAULT_INPUT,
             "io_policy": DEFAULT_IO,
             "binaries": DEFAULT_BIN,
+            "sandbox": DEFAULT_SANDBOX,
+            "worker": DEFAULT_WORKER,
             "runtime_constraints": {},
             "schema_fields": [],
         }
@@ -47,15 +60,79 @@ def get_effective_policy(tool_slug: str) -> Dict[str, Any]:
     input_policy = j("__policy.input", DEFAULT_INPUT)
     io_policy    = j("__policy.io",    DEFAULT_IO)
     binaries     = j("__policy.binaries", DEFAULT_BIN)
+    sandbox      = j("__policy.sandbox", DEFAULT_SANDBOX)
+    worker       = j("__policy.worker", DEFAULT_WORKER)
 
     return {
         "input_policy": input_policy,
         "io_policy": io_policy,
         "binaries": binaries,
+        "sandbox": sandbox,
+        "worker": worker,
         "runtime_constraints": runtime_constraints,
         "schema_fields": schema_fields,
     }
 
+def worker_class(tool_slug: str, policy: Optional[Dict[str, Any]] = None) -> str:
+    """'light' or 'heavy': which Celery queue runs this tool's steps."""
+    cls = ((policy or {}).get("worker") or {}).get("class")
+    if cls in WORKER_CLASSES:
+        return cls
+    return "heavy" if tool_slug in HEAVY_TOOLS else "light"
+
+def streams_input(tool_slug: str, policy: Optional[Dict[str, Any]] = None) -> bool:
+    """Whether a step of this tool may consume its upstream chunk by chunk (tools.streaming)."""
+    flag = ((policy or {}).get("io_policy") or {}).get("streaming")
+    if isinstance(flag, bool):
+        return flag
+    return tool_slug in STREAMING_TOOLS
+
+_SNAPSHOT_IDS: Dict[str, int] = {}  # digest -> ToolPolicySnapshot.id, committed rows only (process-local)
+_PENDING_SNAPSHOTS = "tools.policy_snapshots"  # session.info key: rows this transaction inserted
+
+def snapshot_policy_id(tool_slug: str, policy: Dict[str, Any]) -> Optional[int]:
+    """
+    Get-or-create the ToolPolicySnapshot row for this policy content and return its id.
+    Caller owns the transaction: the insert runs in a savepoint, and its id only
+    enters the process cache once that transaction commits (a rolled-back id
+    must not be handed to later plans).
+    """
+    from tools.models import ToolPolicySnapshot
+    from tools.manifests import policy_digest
+    digest = policy_digest(policy)
+    if not digest:
+        return None
+    if digest in _SNAPSHOT_IDS:
+        return _SNAPSHOT_IDS[digest]
+    pending = db.session.info.setdefault(_PENDING_SNAPSHOTS, {})
+    if digest in pending:
+        return pending[digest]
+    row = ToolPolicySnapshot.query.filter_by(digest=digest).first()
+    if row:
+        _SNAPSHOT_IDS[digest] = row.id
+        return row.id
+    try:
+        with db.session.begin_nested():
+            row = ToolPolicySnapshot(tool_slug=tool_slug or "", digest=digest, policy=policy)
+            db.session.add(row)
+        pending[digest] = row.id
+    except IntegrityError:
+        # another worker inserted the same content first; theirs is committed
+        row = ToolPolicySnapshot.query.filter_by(digest=digest).one()
+        _SNAPSHOT_IDS[digest] = row.id
+    return row.id
+
+@event.listens_for(Session, "after_commit")
+def _cache_committed_snapshots(session):
+    if session.in_nested_transaction():
+        return  # savepoint release, not the real commit
+    _SNAPSHOT_IDS.update(session.info.pop(_PENDING_SNAPSHOTS, None) or {})
+
+@event.listens_for(Session, "after_transaction_end")
+def _drop_pending_snapshots(session, transaction):
+    if transaction.parent is None:
+        session.info.pop(_PENDING_SNAPSHOTS, None)
+
 def clamp_from_constraints(options: dict, name: str, constraints: Optional[dict], default: Any=None, *, kind="int"):
     from tools.alltools.tools._common import ValidationError
     raw = options.get(name, default)
@@ -0,0 +1,282 @@
+# tools/results.py
+"""
+Read side of a run's aggregated results (run_manifest buckets + provenance).
+
+Provenance is stored per item as a bitmask of the step indexes that found it
+(bit i = step i); run_manifest["steps"][str(i)]["tool"] is the step -> tool
+table. Masks are decoded into [{step, tool}] only for the items a response
+actually returns, once per distinct mask. Manifests written before the
+bitmask encoding hold the list form and are read as-is.
+
+Bucket item lists are append-only while a run aggregates (tasks._merge_items),
+so a position in the list is a stable cursor: a page ends at index i and the
+next one resumes scanning at i + 1, even while later steps keep appending.
+Filters are applied during that scan; `total` is the match count over the
+whole bucket.
+
+?regex= runs on the stdlib backtracking engine, so it is held to a subset
+that can't blow up: no backreferences, lookarounds or conditionals, no
+quantifier or alternation inside a quantified group, at most
+MAX_REGEX_QUANTIFIERS variable-length quantifiers, and only the first
+MAX_REGEX_SUBJECT characters of a value are searched. That bounds one search to a low-order polynomial in
+a short string. On top of that, a request stops with FilterBudgetExceeded
+once its regex searches have used REGEX_BUDGET_S seconds.
+"""
+from __future__ import annotations
+import re, time
+from typing import Dict, List, Optional, Tuple, Union
+
+from tools.incremental import host_of
+from tools.manifests import TARGET_KEYS
+
+DEFAULT_PAGE = 100
+MAX_PAGE = 1000
+SUMMARY_PAGE = 50       # items per bucket in /summary
+GROUP_ITEMS = 50        # items listed per host group
+MAX_REGEX_LEN = 256
+MAX_REGEX_QUANTIFIERS = 2
+MAX_REGEX_SUBJECT = 1024  # characters of a value a regex sees
+REGEX_BUDGET_S = 2.0      # regex time per request
+
+try:
+    from re import _parser as _sre_parse, _constants as _sre
+except ImportError:  # Python < 3.11
+    import sre_parse as _sre_parse, sre_constants as _sre
+
+_REPEATS = {_sre.MAX_REPEAT, _sre.MIN_REPEAT} | ({_sre.POSSESSIVE_REPEAT} if hasattr(_sre, "POSSESSIVE_REPEAT") else set())
+_FORBIDDEN = {_sre.GROUPREF: "backreferences", _sre.GROUPREF_EXISTS: "conditionals",
+              _sre.ASSERT: "lookarounds", _sre.ASSERT_NOT: "lookarounds"}
+
+
+class FilterBudgetExceeded(ValueError):
+    pass
+
+
+def _check_regex(pattern: str) -> None:
+    """Reject patterns outside the safe subset (see module docstring)."""
+    quantifiers = 0
+
+    def walk(sub, in_repeat: bool) -> None:
+        nonlocal quantifiers
+        for op, av in sub:
+            if op in _FORBIDDEN:
+                raise ValueError(f"regex: {_FORBIDDEN[op]} are not supported")
+            if op in _REPEATS:
+                lo, hi, body = av
+                if lo != hi:
+                    if in_repeat:
+                        raise ValueError("regex: nested quantifiers are not supported")
+                    quantifiers += 1
+                    if quantifiers > MAX_REGEX_QUANTIFIERS:
+                        raise ValueError(f"regex: at most {MAX_REGEX_QUANTIFIERS} quantifiers")
+                walk(body, True)
+            elif op == _sre.SUBPATTERN:
+                walk(av[-1], in_repeat)
+            elif op == _sre.BRANCH:
+                if in_repeat:  # (a|aa)* backtracks exponentially just like (a+)*
+                    raise ValueError("regex: alternation inside a quantified group is not supported")
+                for b in av[1]:
+                    walk(b, in_repeat)
+            elif op == getattr(_sre, "ATOMIC_GROUP", None):
+                walk(av, in_repeat)
+
+    walk(_sre_parse.parse(pattern), False)
+
+
+def legacy_mask(sources: List[dict]) -> int:
+    """Bitmask for the pre-bitmask [{step, tool}] form."""
+    mask = 0
+    for s in sources or []:
+        if isinstance(s, dict) and s.get("step") is not None:
+            mask |= 1 << int(s["step"])
+    return mask
+
+
+class Provenance:
+    """One bucket's provenance, decoded lazily (see module docstring)."""
+
+    def __init__(self, manifest: Optional[dict], bucket: str):
+        m = manifest or {}
+        self.raw: Dict[str, Union[int, List[dict]]] = (m.get("provenance") or {}).get(bucket) or {}
+        self.tools: Dict[int, Optional[str]] = {}
+        for k, s in (m.get("steps") or {}).items():
+            try:
+                self.tools[int(k)] = (s or {}).get("tool")
+            except (TypeError, ValueError):
+                continue
+        self._decoded: Dict[int, List[dict]] = {}
+
+    def mask(self, value: str) -> int:
+        p = self.raw.get(value)
+        if isinstance(p, list):
+            return legacy_mask(p)
+        return int(p or 0)
+
+    def steps_mask(self, step: Optional[int] = None, tool: Optional[str] = None) -> int:
+        """Bits of the steps matching both `step` and `tool` (None = any)."""
+        mask = 0
+        for i, t in self.tools.items():
+            if (step is None or i == step) and (tool is None or t == tool):
+                mask |= 1 << i
+        return mask
+
+    def sources(self, value: str) -> List[dict]:
+        p = self.raw.get(value)
+        if isinstance(p, list):
+            return p
+        mask = int(p or 0)
+        out = self._decoded.get(mask)
+        if out is None:
+            out, i, rest = [], 0, mask
+            while rest:
+                if rest & 1:
+                    out.append({"step": i, "tool": self.tools.get(i)})
+                rest >>= 1; i += 1
+            self._decoded[mask] = out
+        return out
+
+    def page(self, values: List[str]) -> Dict[str, List[dict]]:
+        return {v: self.sources(v) for v in values}
+
+
+class BucketFilter:
+    """prefix / substring (case-insensitive), regex, and provenance (step index / tool slug)."""
+
+    def __init__(self, *, prefix: Optional[str] = None, contains: Optional[str] = None,
+                 regex: Optional[str] = None, step: Optional[int] = None, tool: Optional[str] = None):
+        if regex and len(regex) > MAX_REGEX_LEN:
+            raise ValueError(f"regex longer than {MAX_REGEX_LEN} characters")
+        try:
+            if regex:
+                _check_regex(regex)
+            self.regex = re.compile(regex) if regex else None
+        except re.error as e:
+            raise ValueError(f"invalid regex: {e}")
+        self.prefix = (prefix or "").lower() or None
+        self.contains = (contains or "").lower() or None
+        self.step = step
+        self.tool = tool or None
+        self._want = 0
+        self._regex_left = REGEX_BUDGET_S
+
+    @property
+    def empty(self) -> bool:
+        return not (self.prefix or self.contains or self.regex is not None or self.uses_provenance)
+
+    @property
+    def uses_provenance(self) -> bool:
+        return self.step is not None or self.tool is not None
+
+    def bind(self, prov: Provenance) -> "BucketFilter":
+        """Resolve step / tool to a step bitmask for this bucket's provenance."""
+        if self.uses_provenance:
+            self._want = prov.steps_mask(self.step, self.tool)
+        self._regex_left = REGEX_BUDGET_S
+        return self
+
+    def _search(self, value: str) -> bool:
+        t0 = time.monotonic()
+        hit = self.regex.search(value[:MAX_REGEX_SUBJECT]) is not None
+        self._regex_left -= time.monotonic() - t0
+        if self._regex_left < 0:
+            raise FilterBudgetExceeded("regex filter took too long; narrow the pattern or add a prefix/q filter")
+        return hit
+
+    def __call__(self, value: str, mask: int) -> bool:
+        if self.prefix or self.contains:
+            low = value.lower()
+            if self.prefix and not low.startswith(self.prefix):
+                return False
+            if self.contains and self.contains not in low:
+                return False
+        if self.regex is not None and not self._search(value):
+            return False
+        if self.uses_provenance:
+            return bool(mask & self._want)
+        return True
+
+
+def parse_cursor(raw: Optional[str]) -> int:
+    """Opaque to clients; the list index the previous page ended at (-1 = start)."""
+    if not raw:
+        return -1
+    n = int(raw)
+    if n < -1:
+        raise ValueError("bad cursor")
+    return n
+
+def _bucket(manifest: Optional[dict], bucket: str) -> Tuple[List[str], Provenance]:
+    m = manifest or {}
+    items = ((m.get("buckets") or {}).get(bucket) or {}).get("items") or []
+    return items, Provenance(m, bucket)
+
+def query_bucket(manifest: Optional[dict], bucket: str, flt: Optional[BucketFilter] = None, *,
+                 cursor: int = -1, limit: int = DEFAULT_PAGE, count_only: bool = False) -> dict:
+    items, prov = _bucket(manifest, bucket)
+    flt = (flt or BucketFilter()).bind(prov)
+    out = {"bucket": bucket, "count": len(items)}
+    if flt.empty:
+        # no filter: the page is a slice, nothing else is touched
+        page = items[cursor + 1:cursor + 1 + limit]
+        end = cursor + len(page)
+        out["total"] = len(items)
+        if not count_only:
+            out.update({"items": page, "provenance": prov.page(page),
+                        "next_cursor": str(end) if end + 1 < len(items) else None})
+        return out
+    page: List[str] = []
+    total = after = 0
+    last = cursor
+    for i, v in enumerate(items):
+        if not flt(v, prov.mask(v)):
+            continue
+        total += 1
+        if i > cursor:
+            after += 1
+            if len(page) < limit:
+                page.append(v)
+                last = i
+    out["total"] = total
+    if count_only:
+        return out
+    more = after > len(page)
+    out.update({
+        "items": page,
+        "provenance": prov.page(page),
+        "next_cursor": str(last) if more else None,
+    })
+    return out
+
+def group_by_host(manifest: Optional[dict], bucket: str, flt: Optional[BucketFilter] = None, *,
+                  cursor: int = -1, limit: int = DEFAULT_PAGE, count_only: bool = False,
+                  group_items: int = GROUP_ITEMS) -> dict:
+    """Matches grouped by host, groups in first-seen order; the cursor indexes groups."""
+    items, prov = _bucket(manifest, bucket)
+    flt = (flt or BucketFilter()).bind(prov)
+    groups: Dict[str, List[str]] = {}
+    total = 0
+    for v in items:
+        if flt(v, prov.mask(v)):
+            total += 1
+            groups.setdefault(host_of(v) or "", []).append(v)
+    out = {"bucket": bucket, "count": len(items), "total": total, "groups_total": len(groups)}
+    if count_only:
+        return out
+    hosts = list(groups)[cursor + 1:cursor + 1 + limit]
+    end = cursor + len(hosts)
+    out.update({
+        "groups": [{"host": h, "count": len(groups[h]), "items": groups[h][:group_items]} for h in hosts],
+        "next_cursor": str(end) if end + 1 < len(groups) else None,
+    })
+    return out
+
+def summary_manifest(manifest: Optional[dict], page: int = SUMMARY_PAGE) -> dict:
+    """run_manifest with each bucket cut to its first page and provenance limited to those items."""
+    m = manifest or {}
+    buckets, provenance = {}, {}
+    for k in TARGET_KEYS:
+        res = query_bucket(m, k, limit=page)
+        buckets[k] = {"count": res["count"], "items": res["items"], "next_cursor": res["next_cursor"]}
+        provenance[k] = res["provenance"]
+    return {**{k: v for k, v in m.items() if k not in ("buckets", "provenance")},
+            "buckets": buckets, "provenance": provenance, "last_updated": m.get("last_updated")}
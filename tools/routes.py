@@ -1,9 +1,10 @@
 from datetime import datetime, timezone
 import os
-from flask import current_app, render_template, request, jsonify, abort, Response, send_from_directory, stream_with_context
-from flask_jwt_extended import get_jwt_identity, jwt_required
-from sqlalchemy import or_
-from tools.alltools.tools._common import active_decr
+from flask import current_app, render_template, request, jsonify, abort, Response, send_file, send_from_directory, stream_with_context
+from flask_jwt_extended import get_jwt_identity, jwt_required, verify_jwt_in_request
+from sqlalchemy import func, or_
+from tools.alltools.registry import load_adapter
+from tools.alltools.tools._common import active_decr, request_cancel, clear_cancel, ValidationError
 from tools.models import (
     ToolCategory,
     ToolScanHistory, 
@@ -15,37 +16,35 @@ from tools.models import (
     UserToolConfig,
     WorkflowDefinition, WorkflowRun, WorkflowRunStep,
     WorkflowRunStatus, WorkflowStepStatus,
+    CampaignStatus, WorkflowCampaign,
+    AssetKind, UserAsset, UserAssetProbe,
 )
 from extensions import db, limiter
 from tools.policies import get_effective_policy
 from . import tools_bp
-from importlib import import_module
 from sqlalchemy.orm import joinedload, selectinload
-import json, time
+import hmac, json, time
 from .events import _redis, _chan, publish_run_event
-from .tasks import advance_run
-from .runner import create_run_from_definition
-from celery_app import celery
+from .tasks import advance_run, advance_campaign
+from .campaigns import (
+    CAMPAIGN_MAX_SEEDS, PAUSED_BY_USER, cancel_campaign, create_campaign, iter_campaign_export, normalize_seeds,
+    run_quota_left, serialize_campaign,
+)
+from .runner import PlanError, create_run_from_definition, get_plan_steps
+from celery_app import celery, ALL_QUEUES
+from sqlalchemy.orm.attributes import flag_modified
 from sqlalchemy.exc import IntegrityError
-from .settings import get_setting, get_rate_limit
+from .settings import get_setting, get_rate_limit, quota_allowed, quota_incr
 from .validation import validate_step_input
+from .manifests import slim_parameters
+from .tracing import waterfall, to_otlp
+from . import diffs, exports, results
+from . import metrics
 
 utcnow = lambda: datetime.now(timezone.utc)
 
 from .events import _redis
 
-def _quota_key(kind: str, user_id: int) -> str:
-    today = datetime.utcnow().strftime("%Y%m%d")
-    return f"tools:quota:{today}:{kind}:u{user_id}"
-
-def _quota_allowed(kind: str, user_id: int, limit: int) -> tuple[bool, int]:
-    r = _redis(); cur = int(r.get(_quota_key(kind, user_id)) or 0)
-    return (cur < limit, cur)
-
-def _quota_incr(kind: str, user_id: int, by: int = 1) -> None:
-    r = _redis(); k = _quota_key(kind, user_id)
-    p = r.pipeline(); p.incrby(k, by); p.expire(k, 172800); p.execute()
-
 def _usage_bump(kind: str, user_id: int, tool_id: int | None = None):
     # kind: "scan" | "run" | "error"
     # NOTE: ToolUsageDaily already exists in models.
@@ -161,8 +160,9 @@ def api_scan():
 
     # --- Daily scan quota ---------------------------------------
     scan_limit = int(get_setting("DAILY_SCAN_QUOTA", 200, int))
-    ok, used = _quota_allowed("scan", user_id, scan_limit)
+    ok, used = quota_allowed("scan", user_id, scan_limit)
     if not ok:
+        metrics.QUOTA_REJECTIONS.inc(kind="scan")
         return jsonify({
             "status": "error",
             "message": "Daily scan quota exceeded",
@@ -229,13 +229,14 @@ def api_scan():
     # --- call adapter -------------------------------------------
     start_req = time.time()
     try:
-        if tool == 'debug-echo':
-            adapter = import_module("tools.alltools.tools.debug_echo")
-        else:
-            mod_name = tool.replace('-', '_')
-            adapter = import_module(f"tools.alltools.tools.{mod_name}")
+        adapter = load_adapter(tool)
         result = adapter.run_scan(options) or {}
         success = (result.get("status") in ("success", "ok"))
+    except ValidationError as ve:
+        # TIMEOUT / OUTPUT_LIMIT / INVALID_PARAMS ... keep the reason and whatever was printed
+        result = {"status": "error", "message": ve.message, "error_reason": ve.reason,
+                  "error_detail": ve.detail, "output": getattr(ve, "partial", "")}
+        success = False
     except Exception as e:
         result = {"status": "error", "message": "adapter_crash", "error_reason": "ADAPTER_CRASH", "output": str(e)}
         success = False
@@ -249,7 +250,7 @@ def api_scan():
     scan = ToolScanHistory(
         user_id            = user_id,
         tool_id            = (tool_rec.id if tool_rec else None),
-        parameters         = options,
+        parameters         = slim_parameters(options),
         command            = cmd,
         raw_output         = (result.get('output') or result.get('message') or ''),
         scan_success_state = bool(success),
@@ -289,7 +290,7 @@ def api_scan():
 
     # --- quota increment ----------------------------------------
     try:
-        _quota_incr("scan", user_id, by=1)
+        quota_incr("scan", user_id, by=1)
     except:
         pass
 
@@ -319,6 +320,9 @@ def _serialize_workflow(wf: WorkflowDefinition):
         "is_shared": wf.is_shared,
         "is_archived": wf.is_archived,
         "forked_from_id": wf.forked_from_id,
+        "incremental": bool(wf.incremental),
+        "incremental_ttl_s": wf.incremental_ttl_s,
+        "pipelined": bool(wf.pipelined),
         "graph": wf.graph_json or {},
         "created_at": wf.created_at.isoformat() if wf.created_at else None,
         "updated_at": wf.updated_at.isoformat() if wf.updated_at else None,
@@ -342,6 +346,19 @@ def _validate_graph(graph: dict):
         if not isinstance(e, dict) or "from" not in e or "to" not in e:
             return jsonify({"error":"each edge must include from/to"}), 400
 
+def _parse_incremental_ttl(data: dict):
+    """incremental_ttl_s: seconds >= 0, or null for the INCREMENTAL_TTL_S default."""
+    raw = data.get("incremental_ttl_s")
+    if raw is None or raw == "":
+        return None, None
+    try:
+        ttl = int(raw)
+    except (TypeError, ValueError):
+        return None, (jsonify({"error": "incremental_ttl_s must be an integer (seconds)"}), 400)
+    if ttl < 0:
+        return None, (jsonify({"error": "incremental_ttl_s must be >= 0"}), 400)
+    return ttl, None
+
 @tools_bp.post("/api/workflows")
 @jwt_required()
 # @limiter.limit("15/minute")
@@ -356,6 +373,9 @@ def create_workflow():
     if not title:
         return jsonify({"error": "title is required"}), 400
     err = _validate_graph(graph)
+    if err:
+        return err
+    ttl, err = _parse_incremental_ttl(data)
     if err:
         return err
 
@@ -367,6 +387,9 @@ def create_workflow():
         is_shared=is_shared,
         is_archived=False,
         graph_json=graph,
+        incremental=bool(data.get("incremental") or False),
+        incremental_ttl_s=ttl,
+        pipelined=bool(data.get("pipelined") or False),
     )
     db.session.add(wf)
     db.session.commit()
@@ -444,6 +467,14 @@ def update_workflow(wf_id: int):
         wf.description = (data.get("description") or "").strip() or None
     if "is_shared" in data:
         wf.is_shared = bool(data.get("is_shared"))
+    if "incremental" in data:
+        wf.incremental = bool(data.get("incremental"))
+    if "incremental_ttl_s" in data:
+        ttl, err = _parse_incremental_ttl(data)
+        if err: return err
+        wf.incremental_ttl_s = ttl
+    if "pipelined" in data:
+        wf.pipelined = bool(data.get("pipelined"))
     if "graph" in data:
         graph = data.get("graph") or {}
         err = _validate_graph(graph)
@@ -476,7 +507,10 @@ def clone_workflow(wf_id: int):
         is_shared=False,
         is_archived=False,
         forked_from_id=src.id,
-        graph_json=src.graph_json or {}
+        graph_json=src.graph_json or {},
+        incremental=bool(src.incremental),
+        incremental_ttl_s=src.incremental_ttl_s,
+        pipelined=bool(src.pipelined),
     )
     db.session.add(clone)
     db.session.commit()
@@ -521,6 +555,8 @@ def _serialize_run(run: WorkflowRun):
         "progress_pct": run.progress_pct,
         "started_at": run.started_at.isoformat() if run.started_at else None,
         "finished_at": run.finished_at.isoformat() if run.finished_at else None,
+        "campaign_id": run.campaign_id,
+        "seed": run.seed,
         "steps": [_serialize_step(s) for s in run.steps],
     }
 
@@ -544,6 +580,7 @@ def run_events(run_id: int):
         pubsub = r.pubsub()
         pubsub.subscribe(_chan(run_id))
         last_ping = time.time()
+        metrics.SSE_CONNECTIONS.inc()
         try:
             for msg in pubsub.listen():
                 now = time.time()
@@ -554,6 +591,7 @@ def run_events(run_id: int):
                     continue
                 yield f"event: update\ndata: {msg['data']}\n\n"
         finally:
+            metrics.SSE_CONNECTIONS.dec()
             try: pubsub.close()
             except: pass
 
@@ -566,6 +604,14 @@ def run_events(run_id: int):
 # Runs API (start / get / list / pause / resume / cancel / step detail)
 # ─────────────────────────────────────────────────────────
 
+def _plan_error_response(e: PlanError):
+    return jsonify({
+        "status": "error",
+        "message": "validation_failed",
+        "error_reason": "INVALID_PARAMS",
+        "errors": e.errors,
+    }), 400
+
 @tools_bp.post("/api/workflows/<int:wf_id>/run")
 @jwt_required()
 @limiter.limit(lambda: get_rate_limit("RUN_RATE_LIMIT", "10/minute"))
@@ -581,9 +627,10 @@ def start_run_api(wf_id: int):
 
     # --- Daily run quota (DB) -----------------------------------
     run_limit = int(get_setting("DAILY_RUN_QUOTA", 50, int))
-    ok, used = _quota_allowed("run", user_id, run_limit)
+    ok, used = quota_allowed("run", user_id, run_limit)
     
     if not ok:
+        metrics.QUOTA_REJECTIONS.inc(kind="run")
         return jsonify({
             "status": "error",
             "error": "quota_exceeded",
@@ -600,17 +647,22 @@ def start_run_api(wf_id: int):
     if not r.set(dkey, "1", nx=True, ex=RUN_START_DEDUP_TTL):
         return jsonify({"ok": True, "deduped": True, "message": "Run already starting"}), 202
 
-    run = create_run_from_definition(wf_id, user_id)
+    try:
+        run = create_run_from_definition(wf_id, user_id)
+    except PlanError as e:
+        r.delete(dkey)
+        return _plan_error_response(e)
 
     if active_can_start(user_id):
         active_incr(user_id)
-        queue_name = current_app.config.get("CELERY_QUEUE", "tools_default")
-        advance_run.apply_async(args=[run.id], queue=queue_name)
-    # else leave QUEUED for promoter
+        advance_run.delay(run.id)  # routed to tools_control
+    else:
+        # leave QUEUED for promoter
+        metrics.ADMISSION_REJECTIONS.inc(source="api")
 
     # --- quota increment ----------------------------------------
     try:
-        _quota_incr("run", user_id, by=1)
+        quota_incr("run", user_id, by=1)
     except:
         pass
 
@@ -627,20 +679,315 @@ def start_run_api(wf_id: int):
 
     return jsonify({"run": _serialize_run(run)}), 201
 
+# ─────────────────────────────────────────────────────────
+# Campaigns API (one workflow over a seed list; see tools.campaigns)
+# ─────────────────────────────────────────────────────────
+
+def _campaign_for_user(campaign_id: int):
+    camp = db.session.get(WorkflowCampaign, campaign_id)
+    if not camp:
+        return None, (jsonify({"error": "not found"}), 404)
+    if (camp.user_id is not None) and (not _same_user(camp.user_id, _current_user_id())):
+        return None, (jsonify({"error": "forbidden"}), 403)
+    return camp, None
+
+@tools_bp.post("/api/workflows/<int:wf_id>/campaigns")
+@jwt_required()
+@limiter.limit(lambda: get_rate_limit("CAMPAIGN_RATE_LIMIT", "5/minute"))
+def start_campaign_api(wf_id: int):
+    """
+    Start a campaign. Seeds come from a multipart file ('seeds' or 'file'),
+    a 'seeds' form/JSON field (list or newline/comma separated text).
+    Optional: concurrency, title. Runs are created and charged to the daily
+    campaign run quota as fill_campaign admits them; seeds beyond what is left
+    today wait (see "warnings" and the campaign's waiting_reason).
+    """
+    user_id = _current_user_id()
+    wf = db.session.get(WorkflowDefinition, wf_id)
+    if not wf:
+        return jsonify({"error": "not found"}), 404
+    if (not _same_user(wf.owner_id, user_id)) and not wf.is_shared:
+        return jsonify({"error": "forbidden"}), 403
+
+    max_bytes = int(get_setting("MAX_UPLOAD_BYTES", 2_000_000, int))
+    if (request.content_length or 0) > max_bytes:
+        return jsonify({"status": "error", "message": f"Upload too large (>{max_bytes} bytes)",
+                        "error_reason": "FILE_TOO_LARGE"}), 413
+
+    camp_limit = int(get_setting("DAILY_CAMPAIGN_QUOTA", 5, int))
+    ok, used = quota_allowed("campaign", user_id, camp_limit)
+    if not ok:
+        metrics.QUOTA_REJECTIONS.inc(kind="campaign")
+        return jsonify({"status": "error", "error": "quota_exceeded",
+                        "message": "Daily campaign quota exceeded", "limit": camp_limit, "used": used}), 429
+    # campaign runs are charged to their own daily budget batch by batch (fill_campaign); refuse when none is left
+    runs_left = run_quota_left(user_id)
+    if runs_left == 0:
+        metrics.QUOTA_REJECTIONS.inc(kind="campaign_run")
+        return jsonify({"status": "error", "error": "quota_exceeded",
+                        "message": "Daily campaign run quota exceeded", "runs_left": 0}), 429
+
+    data = request.get_json(silent=True) if request.is_json else request.form
+    data = data or {}
+    upload = request.files.get("seeds") or request.files.get("file") if request.files else None
+    if upload:
+        lines = (ln.decode("utf-8", "ignore") for ln in upload.stream)
+    else:
+        raw = data.get("seeds")
+        lines = raw if isinstance(raw, list) else str(raw or "").splitlines()
+    max_seeds = int(get_setting("CAMPAIGN_MAX_SEEDS", CAMPAIGN_MAX_SEEDS, int))
+    seeds, dropped = normalize_seeds(lines, limit=max_seeds)
+    if not seeds:
+        return jsonify({"status": "error", "error": "no_seeds", "message": "Provide at least one seed"}), 400
+    try:
+        concurrency = int(data.get("concurrency") or get_setting("CAMPAIGN_DEFAULT_CONCURRENCY", 5, int))
+    except (TypeError, ValueError):
+        return jsonify({"status": "error", "error": "invalid_concurrency"}), 400
+
+    try:
+        get_plan_steps(wf, seeded=True)  # refuse a workflow whose steps fail validation before any seed is queued
+    except PlanError as e:
+        return _plan_error_response(e)
+
+    from tools.alltools.tools._common import ops_redis, dedupe_campaign_key, RUN_START_DEDUP_TTL
+
+    # de-dupe burst submits
+    if not ops_redis().set(dedupe_campaign_key(user_id, wf_id), "1", nx=True, ex=RUN_START_DEDUP_TTL):
+        return jsonify({"ok": True, "deduped": True, "message": "Campaign already starting"}), 202
+
+    camp = create_campaign(wf, user_id, seeds, concurrency=concurrency, title=data.get("title"))
+    advance_campaign.delay(camp.id)  # routed to tools_control
+    try:
+        quota_incr("campaign", user_id, by=1)
+    except Exception:
+        pass
+    out = {"campaign": serialize_campaign(camp), "dropped_seeds": dropped}
+    if runs_left is not None and len(seeds) > runs_left:
+        out["warnings"] = [f"{len(seeds)} seeds but {runs_left} campaign runs left today; "
+                           f"the rest start as the daily campaign run quota resets"]
+    return jsonify(out), 201
+
+@tools_bp.get("/api/campaigns")
+@jwt_required()
+def list_campaigns_api():
+    user_id = _current_user_id()
+    page = max(int(request.args.get("page", 1)), 1)
+    per_page = min(max(int(request.args.get("per_page", 20)), 1), 100)
+    status = (request.args.get("status") or "").upper().strip()
+    qry = db.session.query(WorkflowCampaign).filter(WorkflowCampaign.user_id == user_id)
+    if status in CampaignStatus.__members__:
+        qry = qry.filter(WorkflowCampaign.status == CampaignStatus[status])
+    page_obj = qry.order_by(WorkflowCampaign.id.desc()).paginate(page=page, per_page=per_page, error_out=False)
+    return jsonify({
+        "items": [serialize_campaign(c, progress=False) for c in page_obj.items],
+        "page": page_obj.page, "per_page": page_obj.per_page,
+        "total": page_obj.total, "pages": page_obj.pages
+    })
+
+@tools_bp.get("/api/campaigns/<int:campaign_id>")
+@jwt_required()
+def get_campaign_api(campaign_id: int):
+    camp, err = _campaign_for_user(campaign_id)
+    if err: return err
+    return jsonify({"campaign": serialize_campaign(camp)})
+
+@tools_bp.get("/api/campaigns/<int:campaign_id>/runs")
+@jwt_required()
+def list_campaign_runs_api(campaign_id: int):
+    camp, err = _campaign_for_user(campaign_id)
+    if err: return err
+    page = max(int(request.args.get("page", 1)), 1)
+    per_page = min(max(int(request.args.get("per_page", 50)), 1), 200)
+    status = (request.args.get("status") or "").upper().strip()
+    qry = db.session.query(WorkflowRun).filter(WorkflowRun.campaign_id == camp.id)
+    if status in WorkflowRunStatus.__members__:
+        qry = qry.filter(WorkflowRun.status == WorkflowRunStatus[status])
+    page_obj = qry.order_by(WorkflowRun.id.asc()).paginate(page=page, per_page=per_page, error_out=False)
+    return jsonify({
+        "items": [{"id": r.id, "seed": r.seed, "status": r.status.name, "progress_pct": r.progress_pct,
+                   "finished_at": r.finished_at.isoformat() if r.finished_at else None} for r in page_obj.items],
+        "page": page_obj.page, "per_page": page_obj.per_page,
+        "total": page_obj.total, "pages": page_obj.pages
+    })
+
+@tools_bp.post("/api/campaigns/<int:campaign_id>/pause")
+@jwt_required()
+@limiter.limit("15/minute")
+def pause_campaign_api(campaign_id: int):
+    """Stop creating runs; runs already in flight finish normally."""
+    camp, err = _campaign_for_user(campaign_id)
+    if err: return err
+    if camp.status not in (CampaignStatus.QUEUED, CampaignStatus.RUNNING):
+        return jsonify({"error": "campaign is not running"}), 400
+    camp.status, camp.status_reason = CampaignStatus.PAUSED, PAUSED_BY_USER
+    db.session.commit()
+    return jsonify({"campaign": serialize_campaign(camp)})
+
+@tools_bp.post("/api/campaigns/<int:campaign_id>/resume")
+@jwt_required()
+@limiter.limit("15/minute")
+def resume_campaign_api(campaign_id: int):
+    camp, err = _campaign_for_user(campaign_id)
+    if err: return err
+    if camp.status != CampaignStatus.PAUSED:
+        return jsonify({"error": "campaign is not paused"}), 400
+    camp.status, camp.status_reason = CampaignStatus.RUNNING, None
+    db.session.commit()
+    advance_campaign.delay(camp.id)
+    return jsonify({"campaign": serialize_campaign(camp)})
+
+@tools_bp.post("/api/campaigns/<int:campaign_id>/cancel")
+@jwt_required()
+@limiter.limit("15/minute")
+def cancel_campaign_api(campaign_id: int):
+    camp, err = _campaign_for_user(campaign_id)
+    if err: return err
+    if camp.status in (CampaignStatus.COMPLETED, CampaignStatus.CANCELED):
+        return jsonify({"error": "campaign is already finished"}), 400
+    canceled = cancel_campaign(camp)
+    return jsonify({"campaign": serialize_campaign(camp), "canceled_runs": canceled})
+
+@tools_bp.get("/api/campaigns/<int:campaign_id>/export")
+@jwt_required()
+def export_campaign_api(campaign_id: int):
+    """
+    Merged, de-duplicated results of every run in the campaign.
+    ?bucket=domains,urls (default: all)  ?format=ndjson|txt
+    """
+    camp, err = _campaign_for_user(campaign_id)
+    if err: return err
+    fmt = (request.args.get("format") or "ndjson").lower()
+    if fmt not in ("ndjson", "txt"):
+        return jsonify({"error": "format must be ndjson or txt"}), 400
+    buckets = [b.strip() for b in (request.args.get("bucket") or "").split(",") if b.strip()]
+    resp = Response(stream_with_context(iter_campaign_export(camp, buckets, fmt)),
+                    mimetype="application/x-ndjson" if fmt == "ndjson" else "text/plain")
+    resp.headers["Content-Disposition"] = f"attachment; filename=campaign-{camp.id}.{fmt}"
+    resp.headers["Cache-Control"] = "no-cache"
+    return resp
+
+# ─────────────────────────────────────────────────────────
+# Asset inventory API (per user; see tools.inventory)
+# ─────────────────────────────────────────────────────────
+
+_ASSET_SORTS = {
+    "last_seen": UserAsset.last_seen, "first_seen": UserAsset.first_seen,
+    "last_probed": UserAsset.last_probed, "value": UserAsset.value,
+}
+
+def _serialize_asset(a: UserAsset, probes: bool = False):
+    out = {
+        "id": a.id,
+        "kind": a.kind.name if a.kind else None,
+        "value": a.value,
+        "first_seen": a.first_seen.isoformat() if a.first_seen else None,
+        "last_seen": a.last_seen.isoformat() if a.last_seen else None,
+        "last_probed": a.last_probed.isoformat() if a.last_probed else None,
+        "probe_tool": a.probe_tool,
+        "result_hash": a.result_hash,
+        "last_run_id": a.last_run_id,
+    }
+    if probes:
+        out["probes"] = [{
+            "tool": p.tool_slug,
+            "probed_at": p.probed_at.isoformat() if p.probed_at else None,
+            "result_hash": p.result_hash,
+            "result": p.result or {},
+            "run_id": p.run_id,
+        } for p in a.probes]
+    return out
+
+def _iso_arg(name: str):
+    raw = (request.args.get(name) or "").strip()
+    if not raw:
+        return None
+    try:
+        dt = datetime.fromisoformat(raw.replace("Z", "+00:00"))
+    except ValueError:
+        return None
+    return dt if dt.tzinfo else dt.replace(tzinfo=timezone.utc)
+
+@tools_bp.get("/api/inventory")
+@jwt_required()
+def list_inventory_api():
+    """
+    ?kind=host|service|url  ?q=substring  ?probed=true|false  ?tool=httpx
+    ?seen_since=ISO  ?seen_before=ISO  ?sort=last_seen|first_seen|last_probed|value  ?order=desc|asc
+    """
+    user_id = _current_user_id()
+    page = max(int(request.args.get("page", 1)), 1)
+    per_page = min(max(int(request.args.get("per_page", 50)), 1), 200)
+    qry = db.session.query(UserAsset).filter(UserAsset.user_id == user_id)
+
+    kind = (request.args.get("kind") or "").upper().strip()
+    if kind:
+        if kind not in AssetKind.__members__:
+            return jsonify({"error": f"kind must be one of {', '.join(k.lower() for k in AssetKind.__members__)}"}), 400
+        qry = qry.filter(UserAsset.kind == AssetKind[kind])
+    q = (request.args.get("q") or "").strip()
+    if q:
+        qry = qry.filter(UserAsset.value.ilike(f"%{q}%"))
+    probed = (request.args.get("probed") or "").lower()
+    if probed in ("1", "true", "yes"):
+        qry = qry.filter(UserAsset.last_probed.isnot(None))
+    elif probed in ("0", "false", "no"):
+        qry = qry.filter(UserAsset.last_probed.is_(None))
+    tool = (request.args.get("tool") or "").strip()
+    if tool:
+        qry = qry.filter(UserAsset.probes.any(UserAssetProbe.tool_slug == tool))
+    since, before = _iso_arg("seen_since"), _iso_arg("seen_before")
+    if since:
+        qry = qry.filter(UserAsset.last_seen >= since)
+    if before:
+        qry = qry.filter(UserAsset.last_seen < before)
+
+    col = _ASSET_SORTS.get(request.args.get("sort") or "last_seen", UserAsset.last_seen)
+    desc = (request.args.get("order") or "desc").lower() != "asc"
+    qry = qry.order_by(col.desc() if desc else col.asc(), UserAsset.id.desc() if desc else UserAsset.id.asc())
+    page_obj = qry.paginate(page=page, per_page=per_page, error_out=False)
+    return jsonify({
+        "items": [_serialize_asset(a) for a in page_obj.items],
+        "page": page_obj.page, "per_page": page_obj.per_page,
+        "total": page_obj.total, "pages": page_obj.pages
+    })
+
+@tools_bp.get("/api/inventory/summary")
+@jwt_required()
+def inventory_summary_api():
+    user_id = _current_user_id()
+    rows = (db.session.query(UserAsset.kind, func.count(UserAsset.id), func.count(UserAsset.last_probed),
+                             func.max(UserAsset.last_seen))
+            .filter(UserAsset.user_id == user_id).group_by(UserAsset.kind).all())
+    return jsonify({"kinds": {
+        k.name: {"total": n, "probed": p, "last_seen": last.isoformat() if last else None}
+        for k, n, p, last in rows
+    }})
+
+@tools_bp.get("/api/inventory/<int:asset_id>")
+@jwt_required()
+def get_inventory_asset_api(asset_id: int):
+    a = db.session.get(UserAsset, asset_id)
+    if not a:
+        return jsonify({"error": "not found"}), 404
+    if not _same_user(a.user_id, _current_user_id()):
+        return jsonify({"error": "forbidden"}), 403
+    return jsonify({"asset": _serialize_asset(a, probes=True)})
+
 @tools_bp.get("/api/ops/health")
 @jwt_required()
 def ops_health():
     from tools.alltools.tools._common import ops_redis, RUNS_MAX_ACTIVE_PER_USER
     r = ops_redis()
     try:
-        # For Redis broker the main queue list name is usually 'celery'
-        qname = current_app.config.get("CELERY_QUEUE", "tools_default")
-        q_depth = int(r.llen(qname))
+        # Redis broker: each Celery queue is a list named after the queue
+        queues = {q: int(r.llen(q)) for q in ALL_QUEUES}
+        q_depth = sum(queues.values())
     except Exception:
-        q_depth = None
+        queues, q_depth = {}, None
     return jsonify({
     "ok": True,
     "queue_depth": q_depth,
+    "queues": queues,
     "per_user_cap": RUNS_MAX_ACTIVE_PER_USER,
     "settings": {
         "MAX_UPLOAD_BYTES": int(get_setting("MAX_UPLOAD_BYTES", 2_000_000, int)),
@@ -653,6 +1000,35 @@ def ops_health():
 })
 
 
+@tools_bp.get("/api/ops/metrics")
+def ops_metrics():
+    """
+    Prometheus text exposition. Scrapers authenticate with
+    'Authorization: Bearer <METRICS_TOKEN>' when that setting is present;
+    otherwise a normal JWT is required.
+    """
+    token = current_app.config.get("METRICS_TOKEN") or os.environ.get("METRICS_TOKEN")
+    if token:
+        got = request.headers.get("Authorization", "").encode()
+        if not hmac.compare_digest(got, f"Bearer {token}".encode()):
+            return jsonify({"error": "unauthorized"}), 401
+    else:
+        verify_jwt_in_request()
+
+    from tools.alltools.tools._common import ops_redis
+    extra = []
+    try:
+        r = ops_redis()
+        for qname in ALL_QUEUES:
+            extra.append(("tools_queue_depth", "gauge", "Messages waiting in the Celery broker queue.",
+                          {"queue": qname}, int(r.llen(qname))))
+    except Exception:
+        pass
+    resp = Response(metrics.render(extra), content_type=metrics.CONTENT_TYPE)
+    resp.headers["Cache-Control"] = "no-cache"
+    return resp
+
+
 @tools_bp.post("/api/workflows/<int:wf_id>/nodes/<node_id>/config")
 @jwt_required()
 def upsert_node_config(wf_id: int, node_id: str):
@@ -680,6 +1056,8 @@ def upsert_node_config(wf_id: int, node_id: str):
         return jsonify({"error": "node_not_found"}), 404
 
     wf.graph_json = graph
+    flag_modified(wf, "graph_json")
+    wf.version = (wf.version or 1) + 1  # compiled plans are keyed by version
     db.session.commit()
     return jsonify({"ok": True, "workflow": {"id": wf.id}, "node": {"id": node_id, "config": cfg}})
 
@@ -716,6 +1094,19 @@ def get_run_api(run_id: int):
         return jsonify({"error":"forbidden"}), 403
     return jsonify({"run": _serialize_run(run)})
 
+@tools_bp.get("/api/runs/<int:run_id>/trace")
+@jwt_required()
+def get_run_trace_api(run_id: int):
+    """Per-step phase timings; ?format=otlp returns an OTLP/JSON export."""
+    user_id = _current_user_id()
+    run = db.session.get(WorkflowRun, run_id)
+    if not run: return jsonify({"error":"not found"}), 404
+    if (run.user_id is not None) and (not _same_user(run.user_id, user_id)):
+        return jsonify({"error":"forbidden"}), 403
+    if (request.args.get("format") or "").lower() == "otlp":
+        return jsonify(to_otlp([run]))
+    return jsonify({"trace": waterfall(run)})
+
 @tools_bp.get("/api/runs")
 @jwt_required()
 def list_runs_api():
@@ -817,13 +1208,24 @@ def cancel_run_api(run_id: int):
     if run.status in (WorkflowRunStatus.COMPLETED, WorkflowRunStatus.CANCELED):
         return jsonify({"error":"run already finished"}), 400
 
-    # Revoke currently running step if any
-    running_step = next((s for s in run.steps if s.status == WorkflowStepStatus.RUNNING), None)
-    if running_step and running_step.celery_task_id:
-        try:
-            celery.control.revoke(running_step.celery_task_id, terminate=True, signal="SIGTERM")
-        except Exception as e:
-            current_app.logger.warning(f"cancel_run: revoke failed for task {running_step.celery_task_id}: {e}")
+    # Flag the run for its worker and SIGTERM the tool's process group if it runs on this host.
+    # The worker escalates to SIGKILL after the grace period and records partial output.
+    try:
+        request_cancel(run.id)
+        flagged = True
+    except Exception as e:
+        flagged = False
+        current_app.logger.warning(f"cancel_run: could not flag run {run.id}: {e}")
+
+    # Revoke running steps (more than one in pipelined workflows)
+    for running_step in [s for s in run.steps if s.status == WorkflowStepStatus.RUNNING]:
+        if running_step.celery_task_id:
+            try:
+                # terminating the Celery child would orphan the tool's session; only fall back to it
+                # when the worker cannot see the cancel flag
+                celery.control.revoke(running_step.celery_task_id, terminate=not flagged, signal="SIGTERM")
+            except Exception as e:
+                current_app.logger.warning(f"cancel_run: revoke failed for task {running_step.celery_task_id}: {e}")
         # mark it canceled in DB right away
         running_step.status = WorkflowStepStatus.CANCELED
         running_step.finished_at = utcnow()
@@ -836,13 +1238,9 @@ def cancel_run_api(run_id: int):
     run.status = WorkflowRunStatus.CANCELED
     db.session.commit()
 
-    # Free the active slot and promote a queued run if any
-    try:
-        from tools.tasks import _promote_queued
-        active_decr(run.user_id)
-        _promote_queued()
-    except Exception:
-        pass
+    # Free the active slot and promote a queued run (or refill its campaign)
+    from tools.tasks import _release_slot
+    _release_slot(run)
 
     publish_run_event(run.id, "run", {
         "status": run.status.name,
@@ -857,6 +1255,8 @@ def cancel_run_api(run_id: int):
 def retry_run_api(run_id: int):
     """
     Reset a failed/canceled step (and all later steps) to QUEUED, then resume.
+    Adapters that checkpoint (katana, gau, hakrawler) skip the targets the
+    failed attempt finished; see tools/alltools/tools/_checkpoint.py.
     Body: {"step_index": <int>}
     """
     user_id = _current_user_id()
@@ -890,6 +1290,7 @@ def retry_run_api(run_id: int):
 
     run.status = WorkflowRunStatus.QUEUED
     run.current_step_index = step_index
+    clear_cancel(run.id)
     # recompute progress
     done = sum(1 for s in run.steps if s.status == WorkflowStepStatus.COMPLETED)
     total = max(1, run.total_steps or len(run.steps))
@@ -908,27 +1309,138 @@ def retry_run_api(run_id: int):
 @tools_bp.route("/api/runs/<int:run_id>/summary", methods=["GET"])
 @jwt_required()
 def get_run_summary(run_id: int):
+    """Counters plus the first page of each bucket; the rest via /buckets/<bucket>."""
     user_id = _current_user_id()
     run = db.session.get(WorkflowRun, run_id)
     if not run:
         return jsonify({"error":"not found"}), 404
     if (run.user_id is not None) and (not _same_user(run.user_id, user_id)):
         return jsonify({"error":"forbidden"}), 403
-    # Ensure structure even if empty
-    manifest = run.run_manifest or {
-        "buckets": {k: {"count": 0, "items": []} for k in ("domains","hosts","ips","ports","urls","endpoints","findings")},
-        "provenance": {k: {} for k in ("domains","hosts","ips","ports","urls","endpoints","findings")},
-        "steps": {},
-        "last_updated": None,
-    }
-    # Add top-level counters for convenience
+    limit = min(max(int(request.args.get("limit", results.SUMMARY_PAGE)), 0), results.MAX_PAGE)
+    manifest = results.summary_manifest(run.run_manifest, limit)
     counters = {k: manifest["buckets"][k]["count"] for k in manifest["buckets"].keys()}
     return jsonify({
         "run_id": run_id,
         "counters": counters,
+        "changes": manifest.get("changes"),  # incremental workflows: new/removed vs the previous run
         "manifest": manifest,
     })
 
+@tools_bp.get("/api/runs/<int:run_id>/buckets/<bucket>")
+@jwt_required()
+def get_run_bucket(run_id: int, bucket: str):
+    """
+    One page of a result bucket (see tools.results).
+    ?cursor=&limit=  ?prefix= ?q= (substring) ?regex=  ?step=<index> ?tool=<slug>
+    ?group=host (pages over host groups)  ?count_only=1
+    """
+    user_id = _current_user_id()
+    run = db.session.get(WorkflowRun, run_id)
+    if not run:
+        return jsonify({"error":"not found"}), 404
+    if (run.user_id is not None) and (not _same_user(run.user_id, user_id)):
+        return jsonify({"error":"forbidden"}), 403
+    if bucket not in results.TARGET_KEYS:
+        return jsonify({"error": "unknown bucket", "buckets": list(results.TARGET_KEYS)}), 400
+    group = (request.args.get("group") or "").lower()
+    if group not in ("", "host"):
+        return jsonify({"error": "group must be host"}), 400
+    try:
+        step = request.args.get("step")
+        flt = results.BucketFilter(
+            prefix=request.args.get("prefix"), contains=request.args.get("q"),
+            regex=request.args.get("regex"), tool=request.args.get("tool"),
+            step=int(step) if step not in (None, "") else None,
+        )
+        cursor = results.parse_cursor(request.args.get("cursor"))
+        limit = min(max(int(request.args.get("limit", results.DEFAULT_PAGE)), 1), results.MAX_PAGE)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    count_only = (request.args.get("count_only") or "").lower() in ("1", "true", "yes")
+    query = results.group_by_host if group == "host" else results.query_bucket
+    try:
+        page = query(run.run_manifest, bucket, flt, cursor=cursor, limit=limit, count_only=count_only)
+    except results.FilterBudgetExceeded as e:
+        return jsonify({"error": str(e)}), 400
+    return jsonify({"run_id": run.id, "last_updated": (run.run_manifest or {}).get("last_updated"), **page})
+
+@tools_bp.get("/api/runs/<int:run_id>/export")
+@jwt_required()
+def export_run_api(run_id: int):
+    """
+    All results of a run, streamed. ?format=ndjson|csv|zip  ?bucket=domains,urls (default: all)
+    Finished runs are served from a precomputed file once one exists (Content-Length, Range).
+    """
+    user_id = _current_user_id()
+    run = db.session.get(WorkflowRun, run_id)
+    if not run:
+        return jsonify({"error":"not found"}), 404
+    if (run.user_id is not None) and (not _same_user(run.user_id, user_id)):
+        return jsonify({"error":"forbidden"}), 403
+    fmt = (request.args.get("format") or "ndjson").lower()
+    if fmt not in exports.FORMATS:
+        return jsonify({"error": "format must be one of " + ", ".join(exports.FORMATS)}), 400
+    buckets = exports.select_buckets(request.args.get("bucket"))
+    filename = f"run-{run.id}.{fmt}"
+
+    if exports.cacheable(run):
+        path = exports.export_path(run, fmt, buckets)
+        if os.path.isfile(path) or request.range is not None:
+            # resumed download: needs the complete file to honour the byte range
+            path = exports.materialize(run, fmt, buckets)
+            return send_file(path, mimetype=exports.FORMATS[fmt], as_attachment=True,
+                             download_name=filename, conditional=True, etag=True, max_age=300)
+        chunks = exports.tee(exports.generate(run.run_manifest, fmt, buckets), path)
+    else:
+        chunks = exports.generate(run.run_manifest, fmt, buckets)
+    resp = Response(stream_with_context(chunks), mimetype=exports.FORMATS[fmt])
+    resp.headers["Content-Disposition"] = f"attachment; filename={filename}"
+    resp.headers["Cache-Control"] = "no-cache"
+    return resp
+
+@tools_bp.get("/api/runs/<int:run_a>/diff/<int:run_b>")
+@jwt_required()
+def diff_runs_api(run_a: int, run_b: int):
+    """
+    What changed from run A to run B (see tools.diffs).
+    No params: per-bucket added/removed/common counts (cached once both runs finished).
+    ?bucket=urls&change=added|removed|common&cursor=&limit=  one sorted page of values
+    ?format=ndjson[&bucket=a,b][&change=added,removed]       streamed {bucket, change, value} lines
+    """
+    user_id = _current_user_id()
+    runs = []
+    for rid in (run_a, run_b):
+        run = db.session.get(WorkflowRun, rid)
+        if not run:
+            return jsonify({"error": "not found", "run_id": rid}), 404
+        if (run.user_id is not None) and (not _same_user(run.user_id, user_id)):
+            return jsonify({"error": "forbidden"}), 403
+        runs.append(run)
+    a, b = runs
+
+    buckets = [x.strip() for x in (request.args.get("bucket") or "").split(",") if x.strip()]
+    changes = [x.strip() for x in (request.args.get("change") or "").split(",") if x.strip()]
+    bad = [x for x in buckets if x not in diffs.TARGET_KEYS] + [x for x in changes if x not in diffs.CHANGES]
+    if bad:
+        return jsonify({"error": "invalid bucket/change", "values": bad}), 400
+
+    if (request.args.get("format") or "").lower() == "ndjson":
+        gen = diffs.iter_diff_ndjson(a, b, buckets or list(diffs.TARGET_KEYS), changes or ["added", "removed"])
+        resp = Response(stream_with_context(gen), mimetype="application/x-ndjson")
+        resp.headers["Content-Disposition"] = f"attachment; filename=diff-{a.id}-{b.id}.ndjson"
+        resp.headers["Cache-Control"] = "no-cache"
+        return resp
+
+    if buckets:
+        if len(buckets) != 1 or len(changes) > 1:
+            return jsonify({"error": "pages take one bucket and one change"}), 400
+        limit = min(max(int(request.args.get("limit", 500)), 1), 5000)
+        page = diffs.diff_page(a, b, buckets[0], changes[0] if changes else "added",
+                               cursor=request.args.get("cursor") or None, limit=limit)
+        return jsonify({"run_a": a.id, "run_b": b.id, **page})
+
+    return jsonify(diffs.diff_summary(a, b))
+
 def _tool_to_dict_with_schema(t: Tool):
     meta = t.meta_info or {}
     categories = [
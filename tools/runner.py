@@ -1,15 +1,33 @@
 from __future__ import annotations
-from typing import List, Optional
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+from sqlalchemy import insert
+from sqlalchemy.exc import IntegrityError
 from extensions import db
 from .models import (
-    WorkflowDefinition, WorkflowRun, WorkflowRunStep,
-    WorkflowRunStatus, WorkflowStepStatus, Tool
+    WorkflowDefinition, WorkflowPlan, WorkflowRun, WorkflowRunStep,
+    WorkflowRunStatus, WorkflowStepStatus, Tool, ToolPolicySnapshot
 )
 from datetime import datetime, timezone
-from tools.policies import get_effective_policy
+from tools.manifests import policy_digest
+from tools.policies import get_effective_policy, snapshot_policy_id
+from tools.validation import validate_input_source, validate_step_input
 
 utcnow = lambda: datetime.now(timezone.utc)
 
+PLAN_VERSION = 2  # 2: input-source errors kept apart from schema errors
+PLAN_CACHE_SIZE = 256
+# (workflow_id, version) -> (ready-to-insert step rows, schema errors, first-step input errors)
+# (process-local, like get_effective_policy)
+_PLANS: "OrderedDict[Tuple[int, int], Tuple[List[Dict[str, Any]], List[str], List[str]]]" = OrderedDict()
+
+class PlanError(ValueError):
+    """A definition's plan has steps that fail validation; no run is created from it."""
+
+    def __init__(self, errors: List[str]):
+        super().__init__("; ".join(errors))
+        self.errors = errors
+
 def _order_nodes_linear(graph: dict) -> List[str]:
     """
     Given graph {"nodes":[{id,...}], "edges":[{"from":A,"to":B},...]}
@@ -42,57 +60,170 @@ def _order_nodes_linear(graph: dict) -> List[str]:
             order.append(n)
     return order
 
-def create_run_from_definition(workflow_id: int, user_id: Optional[int]) -> WorkflowRun:
-    wf = db.session.get(WorkflowDefinition, workflow_id)
-    if not wf:
-        raise ValueError("workflow not found")
+def _depends_on(graph: dict, order: List[str]) -> Dict[str, List[int]]:
+    pos = {nid: i for i, nid in enumerate(order)}
+    deps: Dict[str, List[int]] = {nid: [] for nid in order}
+    for e in graph.get("edges") or []:
+        a, b = e.get("from"), e.get("to")
+        if a in pos and b in deps:
+            deps[b].append(pos[a])
+    return {k: sorted(v) for k, v in deps.items()}
+
+def compile_plan(wf: WorkflowDefinition) -> dict:
+    """
+    Compile a definition's graph into an execution plan: ordered steps with
+    their DAG predecessors, resolved tool ids, policy snapshot ids/digests and
+    the node options checked against the tool's schema ("errors"). The first
+    step's input-source problems are recorded apart ("input_errors"): a
+    campaign seed replaces that input. Options are stored
+    without the policy blob; instantiation joins it back from the snapshot.
+    """
     graph = wf.graph_json or {"nodes": [], "edges": []}
     order = _order_nodes_linear(graph)
-
-    # slug → Tool
+    id_to_node = {n["id"]: n for n in (graph.get("nodes") or [])}
+    order = [nid for nid in order if nid in id_to_node]
+    deps = _depends_on(graph, order)
+    slugs = {id_to_node[nid].get("tool_slug") or id_to_node[nid].get("slug") for nid in order}
     tools_by_slug = {
-        t.slug: t for t in db.session.query(Tool).filter(Tool.enabled.is_(True)).all()
-    }
+        t.slug: t for t in db.session.query(Tool).filter(Tool.enabled.is_(True), Tool.slug.in_(slugs)).all()
+    } if slugs else {}
 
-    # keep nodes in execution order
-    id_to_node = {n["id"]: n for n in (graph.get("nodes") or [])}
-    ordered_nodes = [id_to_node[nid] for nid in order if nid in id_to_node]
+    steps = []
+    for idx, nid in enumerate(order):
+        node = id_to_node[nid]
+        tool_slug = node.get("tool_slug") or node.get("slug")
+        tool = tools_by_slug.get(tool_slug)
+        options = (node.get("config") or {}).copy()
+        options["tool_slug"] = tool_slug
+        policy = get_effective_policy(tool_slug)
+        steps.append({
+            "index": idx,
+            "node_id": nid,
+            "tool_slug": tool_slug,
+            "tool_id": tool.id if tool else None,
+            "depends_on": deps.get(nid, []),
+            "policy_id": snapshot_policy_id(tool_slug, policy),
+            "policy_digest": policy_digest(policy),
+            "options": options,
+            # steps with an upstream get their targets from it, so only the schema is checked;
+            # the first step's input problems are kept apart (a campaign seed replaces its input)
+            "errors": (validate_step_input(tool, options, input_source=idx > 0 and not deps.get(nid))
+                       if tool else ["tool disabled or missing"]),
+            "input_errors": validate_input_source(tool, options) if tool and idx == 0 else [],
+        })
+    return {"v": PLAN_VERSION, "workflow_id": wf.id, "version": wf.version or 1,
+            "compiled_at": utcnow().isoformat(), "steps": steps}
+
+def _plan_current(plan: dict) -> bool:
+    """A stored plan is stale when a tool's effective policy changed since it was compiled."""
+    if not isinstance(plan, dict) or plan.get("v") != PLAN_VERSION:
+        return False
+    return all(policy_digest(get_effective_policy(s["tool_slug"])) == s.get("policy_digest")
+               for s in plan.get("steps") or [])
+
+def _materialize(plan: dict) -> List[Dict[str, Any]]:
+    """Plan steps -> WorkflowRunStep column values (policy snapshots joined back in one query)."""
+    ids = {s["policy_id"] for s in plan["steps"] if s.get("policy_id")}
+    policies = {row.id: row.policy for row in
+                db.session.query(ToolPolicySnapshot).filter(ToolPolicySnapshot.id.in_(ids)).all()} if ids else {}
+    rows = []
+    for s in plan["steps"]:
+        options = dict(s["options"])
+        options["_policy"] = policies.get(s.get("policy_id")) or get_effective_policy(s["tool_slug"])
+        options["_policy_id"] = s.get("policy_id")
+        rows.append({"step_index": s["index"], "tool_id": s["tool_id"],
+                     "input_manifest": {"options": options}})
+    return rows
+
+def _plan_errors(plan: dict, key: str) -> List[str]:
+    return [f"step {s['index'] + 1} ({s['tool_slug']}): {e}"
+            for s in plan["steps"] for e in s.get(key) or []]
+
+def get_plan_steps(wf: WorkflowDefinition, *, seeded: bool = False) -> List[Dict[str, Any]]:
+    """
+    Step rows for a definition version: process cache, else stored plan, else
+    compile and store. Raises PlanError when a step failed validation; with
+    seeded=True (campaign runs, whose seed is the first step's input) the
+    first step's input-source errors don't count.
+    """
+    key = (wf.id, wf.version or 1)
+    hit = _PLANS.get(key)
+    if hit is not None:
+        _PLANS.move_to_end(key)
+    else:
+        rec = WorkflowPlan.query.filter_by(workflow_id=wf.id, version=key[1]).first()
+        if rec is None or not _plan_current(rec.plan):
+            plan = compile_plan(wf)
+            if rec is not None:
+                rec.plan = plan
+            else:
+                try:
+                    with db.session.begin_nested():
+                        db.session.add(WorkflowPlan(workflow_id=wf.id, version=key[1], plan=plan))
+                except IntegrityError:
+                    pass  # another worker stored the same version first; ours is equivalent
+            db.session.flush()
+        else:
+            plan = rec.plan
+        hit = _PLANS[key] = (_materialize(plan), _plan_errors(plan, "errors"), _plan_errors(plan, "input_errors"))
+        if len(_PLANS) > PLAN_CACHE_SIZE:
+            _PLANS.popitem(last=False)
+    rows, errors, input_errors = hit
+    errors = errors if seeded else errors + input_errors
+    if errors:
+        raise PlanError(errors)
+    return rows
+
+def create_run_from_definition(workflow_id: int, user_id: Optional[int]) -> WorkflowRun:
+    wf = db.session.get(WorkflowDefinition, workflow_id)
+    if not wf:
+        raise ValueError("workflow not found")
+    steps = get_plan_steps(wf)
 
     run = WorkflowRun(
         workflow_id=wf.id,
         user_id=user_id,
         status=WorkflowRunStatus.QUEUED,
         current_step_index=0,
-        total_steps=len(ordered_nodes),
+        total_steps=len(steps),
         progress_pct=0.0,
     )
     db.session.add(run); db.session.flush()
 
-    for idx, node in enumerate(ordered_nodes):
-        # Resolve tool
-        tool_slug = node.get("tool_slug") or node.get("slug")
-        tool = Tool.query.filter_by(slug=tool_slug, enabled=True).first()
-        # Build per-step options (copy node config) and SNAPSHOT policy
-        node_cfg = (node.get("config") or {}).copy()
-        node_cfg["tool_slug"] = tool_slug
-
-        # SNAPSHOT POLICY HERE (from ToolConfigField-derived policies)
-        policy_ss = get_effective_policy(tool_slug)
-        node_cfg["_policy"] = policy_ss
-
-        # Store the snapshot with options in the step's input_manifest (or wherever you keep per-step opts)
-        step = WorkflowRunStep(
-            run_id=run.id,
-            step_index=idx,
-            tool_id=tool.id if tool else None,
-            status=WorkflowStepStatus.QUEUED,
-            input_manifest={"options": node_cfg},  # <--- policy snapshot lives here
-        )
-        db.session.add(step)
-
-    run.total_steps = len(ordered_nodes)
-    run.current_step_index = 0
-    run.progress_pct = 0.0
+    # one multi-row INSERT; the policy snapshot lives in each step's input_manifest options
+    if steps:
+        db.session.execute(insert(WorkflowRunStep), [
+            {**row, "run_id": run.id, "status": WorkflowStepStatus.QUEUED,
+             "input_manifest": {"options": dict(row["input_manifest"]["options"])}}
+            for row in steps
+        ])
 
     db.session.commit()
     return run
+
+def create_runs_for_seeds(wf: WorkflowDefinition, user_id: Optional[int], seeds: List[str], *,
+                          campaign_id: Optional[int] = None) -> List[WorkflowRun]:
+    """
+    Batch variant of create_run_from_definition: one run per seed, all from the
+    same compiled plan, with the seed replacing step 0's manual input. Runs go
+    in as one batched INSERT and all of their steps as one more. Caller commits.
+    """
+    steps = get_plan_steps(wf, seeded=True)
+    runs = [WorkflowRun(workflow_id=wf.id, user_id=user_id, status=WorkflowRunStatus.QUEUED,
+                        current_step_index=0, total_steps=len(steps), progress_pct=0.0,
+                        campaign_id=campaign_id, seed=seed[:255])
+            for seed in seeds]
+    if not runs:
+        return runs
+    db.session.add_all(runs); db.session.flush()
+    if steps:
+        rows = []
+        for run in runs:
+            for row in steps:
+                manifest = {"options": dict(row["input_manifest"]["options"])}
+                if row["step_index"] == 0:
+                    # top-level value/input_method win over the node config in ingest.collect_local_inputs
+                    manifest.update(value=run.seed, input_method="manual")
+                rows.append({**row, "run_id": run.id, "status": WorkflowStepStatus.QUEUED, "input_manifest": manifest})
+        db.session.execute(insert(WorkflowRunStep), rows)
+    return runs
@@ -1,7 +1,9 @@
 from __future__ import annotations
 import time
+from datetime import datetime
 from typing import Any, Callable
 from .models import AppSetting
+from .events import _redis
 from extensions import db
 
 _CACHE: dict[str, tuple[float, str | None]] = {}
@@ -36,3 +38,17 @@ def set_setting(key: str, value: Any) -> None:
 
 def get_rate_limit(key: str, default: str = "5/minute") -> str:
     return str(get_setting(key, default, cast=str))
+
+# ---- daily per-user quotas (Redis counters, kept two days) ----
+
+def quota_key(kind: str, user_id: int) -> str:
+    today = datetime.utcnow().strftime("%Y%m%d")
+    return f"tools:quota:{today}:{kind}:u{user_id}"
+
+def quota_allowed(kind: str, user_id: int, limit: int) -> tuple[bool, int]:
+    r = _redis(); cur = int(r.get(quota_key(kind, user_id)) or 0)
+    return (cur < limit, cur)
+
+def quota_incr(kind: str, user_id: int, by: int = 1) -> None:
+    r = _redis(); k = quota_key(kind, user_id)
+    p = r.pipeline(); p.incrby(k, by); p.expire(k, 172800); p.execute()
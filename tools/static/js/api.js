@@ -26,6 +26,7 @@ export const API = {
     list:    (params = {}) => getJSON(`/tools/api/runs${toQS(params)}`),
     get:     (id) => getJSON(`/tools/api/runs/${id}`),
     summary: (id) => getJSON(`/tools/api/runs/${id}/summary`),
+    bucket:  (id, bucket, params = {}) => getJSON(`/tools/api/runs/${id}/buckets/${bucket}${toQS(params)}`),
     pause:   (id) => postJSON(`/tools/api/runs/${id}/pause`, {}),
     resume:  (id) => postJSON(`/tools/api/runs/${id}/resume`, {}),
     step: (id, step_index) => getJSON(`/tools/api/runs/${id}/steps/${step_index}`),
@@ -340,7 +340,7 @@ export function attachHistory(editor) {
           .slice(0, 50)
           .map((x) => (typeof x === "string" ? x : JSON.stringify(x)));
         sec.innerHTML = `<strong>${k}</strong><br>${preview.join("<br>")}${
-          items.length > 50 ? "<br>…" : ""
+          (v?.count ?? items.length) > preview.length ? "<br>…" : ""
         }`;
         bkt.appendChild(sec);
       });
@@ -355,7 +355,7 @@ editor.openModal = function (title, content) {
           .slice(0, 50)
           .map((x) => (typeof x === "string" ? x : JSON.stringify(x)));
         sec.innerHTML = `<strong>${k}</strong><br>${preview.join("<br>")}${
-          items.length > 50 ? "<br>…" : ""
+          (v?.count ?? items.length) > preview.length ? "<br>…" : ""
         }`;
         out.appendChild(sec);
       });
@@ -0,0 +1,376 @@
+# tools/streaming.py
+"""
+Pipelined step execution.
+
+In a workflow with `pipelined` set, a step whose tool streams its input
+(policies.streams_input) does not wait for its upstream step to finish:
+advance_run dispatches it as soon as the upstream is RUNNING, and it probes
+the upstream's results in batches while enumeration continues.
+
+Transport is a directory of chunk files per producing step attempt
+(TOOLS_WORK_DIR/run_<id>/stream/step_XX_<task>): the producer's ProcScope tap
+sees everything its commands print, the Publisher extracts the buckets the
+tool emits line by line, de-duplicates them and writes numbered chunks
+(000000.json, 000001.json, ...; each renamed into place when complete). When
+the step ends the final result's items that were not streamed yet go out as
+a last chunk, then an END marker carries the step's status. Consumers read
+chunks in order, so items reach them in the order they were discovered.
+Files rather than Redis Streams because Redis is optional here; the work dir
+is already shared by every worker that runs a run's steps.
+
+A consumer whose upstream fails (or whose run fails) goes back to QUEUED with
+no task id, which is where sequential mode would have left it; cancel works
+through the run's cancel flag and the run status, like any step.
+"""
+from __future__ import annotations
+import json, os, re, shutil, threading, time
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from flask import current_app
+
+from celery_app import celery
+from extensions import db
+from tools import ingest, metrics
+from tools.alltools.tools._common import (
+    BUCKET_KEYS, IPV4_RE, IPV6_RE, URL_RE, Canceled, finalize, merge_dedupe, now_ms,
+)
+from tools.models import WorkflowRun, WorkflowRunStatus, WorkflowRunStep, WorkflowStepStatus
+from tools.policies import streams_input
+
+STREAM_CHUNK_ITEMS = int(os.environ.get("STREAM_CHUNK_ITEMS", "200"))      # items per chunk file
+STREAM_LINGER_S    = float(os.environ.get("STREAM_LINGER_S", "0.5"))       # flush a partial chunk after this
+STREAM_BATCH       = int(os.environ.get("STREAM_BATCH_TARGETS", "500"))    # targets per consumer adapter call
+STREAM_BATCH_WAIT_S = float(os.environ.get("STREAM_BATCH_WAIT_S", "2"))    # start a smaller batch after this
+STREAM_POLL_S      = 0.1
+STREAM_DB_POLL_S   = 1.0
+STREAM_STALL_S     = 30.0   # upstream finished in the DB but never wrote END
+OUTPUT_TAIL_BYTES  = 64_000
+LOCAL_INPUT_KEYS   = ("value", "input_method", "file_path")
+
+_HOST_RE = re.compile(r"^(?=.{1,253}$)(?!-)(?:[a-z0-9_-]{1,63}\.)+[a-z]{2,63}$", re.IGNORECASE)
+_SERVICE_RE = re.compile(r"^(?:[a-z0-9_.-]+|\[[0-9a-f:]+\]):\d{1,5}$", re.IGNORECASE)
+EXTRACTABLE = ("domains", "hosts", "ips", "services", "urls", "endpoints")
+
+
+class UpstreamFailed(Exception):
+    """The producing step (or the run) failed while a consumer was streaming from it."""
+
+
+def extract(line: str, emits: Iterable[str]) -> Dict[str, List[str]]:
+    """Typed items in one line of tool output, for the buckets the tool emits."""
+    s = (line or "").strip()
+    if not s:
+        return {}
+    tok = s.split()[0]
+    out: Dict[str, List[str]] = {}
+    for k in emits:
+        if k in ("urls", "endpoints"):
+            vals = URL_RE.findall(s)
+        elif k in ("domains", "hosts"):
+            t = tok.strip(".").lower()
+            vals = [t] if _HOST_RE.match(t) else []
+        elif k == "ips":
+            vals = IPV4_RE.findall(s) or IPV6_RE.findall(s)
+        elif k == "services":
+            vals = [tok] if _SERVICE_RE.match(tok) else []
+        else:
+            vals = []
+        if vals:
+            out[k] = vals
+    return out
+
+
+# ---------- wiring ----------
+
+def pipelined(run) -> bool:
+    wf = run.workflow
+    # incremental runs narrow inputs up front; eager Celery would run a consumer inside its producer
+    return bool(wf and wf.pipelined and not wf.incremental and not celery.conf.task_always_eager)
+
+def _streams(step) -> bool:
+    tool = step.tool
+    return bool(tool) and streams_input(tool.slug, ingest.get_policy_for_step(step, tool.slug))
+
+def upstream_producer(run, step) -> Optional[WorkflowRunStep]:
+    """The single upstream step this step consumes chunk by chunk, or None (sequential input)."""
+    if not pipelined(run):
+        return None
+    ups = ingest.determine_upstreams(run, step)
+    if len(ups) != 1 or not _streams(step):
+        return None
+    return next((s for s in run.steps if s.step_index == ups[0]), None)
+
+def has_consumers(run, step) -> bool:
+    if not pipelined(run):
+        return False
+    return any(s.step_index > step.step_index and ingest.determine_upstreams(run, s) == [step.step_index]
+               and _streams(s) for s in run.steps)
+
+def can_dispatch(run, step, by_index: Dict[int, WorkflowRunStep]) -> bool:
+    """advance_run (pipelined): upstreams done, or a streaming step whose one upstream is running."""
+    ups = [by_index[u] for u in ingest.determine_upstreams(run, step) if u in by_index]
+    if all(u.status == WorkflowStepStatus.COMPLETED for u in ups):
+        return True
+    return len(ups) == 1 and ups[0].status == WorkflowStepStatus.RUNNING and _streams(step)
+
+def stream_dir(run_id: int, producer: WorkflowRunStep) -> Path:
+    base = current_app.config.get("TOOLS_WORK_DIR", current_app.config.get("ARTIFACTS_DIR", "/tmp/hackr_runs"))
+    attempt = (producer.celery_task_id or "direct")[:12]  # a retried producer streams into a fresh dir
+    return Path(base) / f"run_{run_id}" / "stream" / f"step_{producer.step_index:02d}_{attempt}"
+
+def _write_json(path: Path, obj: dict) -> None:
+    tmp = path.with_name(f".{path.name}.tmp")
+    tmp.write_text(json.dumps(obj, separators=(",", ":")), encoding="utf-8")
+    os.replace(tmp, path)
+
+
+# ---------- producer ----------
+
+class Publisher:
+    """Turns a running step's output into ordered, de-duplicated chunk files."""
+
+    def __init__(self, root: Path, emits: Iterable[str]):
+        shutil.rmtree(root, ignore_errors=True)
+        root.mkdir(parents=True, exist_ok=True)
+        self.root = root
+        self.emits = [k for k in emits if k in EXTRACTABLE]
+        self.seq = 0
+        self.items = 0
+        self.closed = False
+        self._lock = threading.Lock()
+        self._rest: Dict[str, bytes] = {}            # unfinished last line per spool
+        self._seen: Dict[str, set] = {}
+        self._buf: Dict[str, List[str]] = {}
+        self._n = 0
+        self._last = time.monotonic()
+
+    @classmethod
+    def for_step(cls, run, step, policy: dict) -> Optional["Publisher"]:
+        if not has_consumers(run, step):
+            return None
+        emits = ((policy or {}).get("io_policy") or {}).get("emits") or []
+        return cls(stream_dir(run.id, step), emits)
+
+    def tap(self, spool: str, chunk: bytes) -> None:
+        if not self.emits:
+            return  # nothing we can parse mid-run; the final result goes out on close
+        with self._lock:
+            if self.closed:
+                return
+            *lines, rest = (self._rest.get(spool, b"") + chunk).split(b"\n")
+            self._rest[spool] = rest
+            for ln in lines:
+                self._add(extract(ln.decode("utf-8", "ignore"), self.emits))
+            if self._n >= STREAM_CHUNK_ITEMS or (self._n and time.monotonic() - self._last >= STREAM_LINGER_S):
+                self._flush()
+
+    def _add(self, typed: Dict[str, List[str]]) -> None:
+        for k, vals in typed.items():
+            seen = self._seen.setdefault(k, set())
+            for v in vals:
+                v = str(v).strip()
+                if v and v not in seen:
+                    seen.add(v)
+                    self._buf.setdefault(k, []).append(v)
+                    self._n += 1
+
+    def _flush(self) -> None:
+        if self._n:
+            _write_json(self.root / f"{self.seq:06d}.json", {"seq": self.seq, "items": self._buf})
+            self.seq += 1
+            self.items += self._n
+            metrics.STREAM_CHUNKS.inc()
+            self._buf, self._n = {}, 0
+        self._last = time.monotonic()
+
+    def close(self, result: Optional[dict] = None, status: str = "error") -> None:
+        """Flush what is left (plus the final result's unseen items) and write END. Idempotent."""
+        with self._lock:
+            if self.closed:
+                return
+            for rest in self._rest.values():
+                if rest.strip():
+                    self._add(extract(rest.decode("utf-8", "ignore"), self.emits))
+            if result is not None:
+                status = result.get("status") or status
+                if status in ("success", "ok"):
+                    self._add({k: result.get(k) for k in BUCKET_KEYS if isinstance(result.get(k), list)})
+            self._flush()
+            _write_json(self.root / "END", {"status": status, "chunks": self.seq, "items": self.items})
+            self.closed = True
+
+
+# ---------- consumer ----------
+
+class _Reader:
+    def __init__(self, root: Path):
+        self.root = root
+        self.seq = 0
+
+    def next(self) -> Optional[dict]:
+        p = self.root / f"{self.seq:06d}.json"
+        try:
+            with open(p, "r", encoding="utf-8") as fh:
+                chunk = json.load(fh)
+        except (FileNotFoundError, ValueError):
+            return None
+        self.seq += 1
+        return chunk
+
+    def end(self) -> Optional[dict]:
+        try:
+            with open(self.root / "END", "r", encoding="utf-8") as fh:
+                return json.load(fh)
+        except (FileNotFoundError, ValueError):
+            return None
+
+
+def _states(run_id: int, producer_id: int) -> Tuple[Optional[WorkflowRunStatus], Optional[WorkflowStepStatus]]:
+    db.session.commit()  # end the read snapshot so other workers' commits are visible
+    rs = db.session.query(WorkflowRun.status).filter(WorkflowRun.id == run_id).scalar()
+    ps = db.session.query(WorkflowRunStep.status).filter(WorkflowRunStep.id == producer_id).scalar()
+    return rs, ps
+
+def consume(run, step, producer: WorkflowRunStep, adapter, options: dict, *, slug: str, policy: dict,
+            step_dir: Path, scope, chunk: Optional[dict] = None) -> Tuple[dict, Dict[str, List[str]]]:
+    """
+    Run `adapter` over the producer's stream in batches of up to STREAM_BATCH
+    targets (a smaller batch once STREAM_BATCH_WAIT_S passed without filling
+    one). With auto-chunking (`chunk`, see tools.chunking) a batch never exceeds
+    the tool's max_targets and the stream is capped at max_targets x max_batches.
+    Returns (merged adapter-shaped result, all consumed targets by bucket).
+    """
+    t0 = now_ms()
+    ipol = policy.get("input_policy") or {}
+    accept = list(ipol.get("accepts") or []) or ["domains", "hosts", "urls", "ips"]
+    cap = ipol.get("max_targets", 50)
+    batch_max = STREAM_BATCH
+    if chunk:
+        cap = chunk["size"] * chunk["max_batches"]
+        batch_max = min(STREAM_BATCH, chunk["size"])
+    run_id, producer_id = run.id, producer.id
+    reader = _Reader(stream_dir(run_id, producer))
+
+    seen: Dict[str, set] = {k: set() for k in accept}
+    consumed: Dict[str, List[str]] = {k: [] for k in accept}
+    pending: Dict[str, List[str]] = {k: [] for k in accept}
+    capped = 0
+
+    def take(typed: Dict[str, List[str]]) -> None:
+        nonlocal capped
+        for k, vals in ingest._apply_normalization({k: v for k, v in typed.items() if k in seen}).items():
+            for v in vals:
+                if not v or v in seen[k]:
+                    continue
+                if cap and cap > 0 and len(seen[k]) >= cap:
+                    capped += 1
+                    continue
+                seen[k].add(v)
+                pending[k].append(v)
+
+    # node-local inputs (manual value / file); global seeds only if nothing arrives at all
+    take(ingest.collect_local_inputs(step, accept))
+
+    merged: Dict[str, List[str]] = {}
+    outputs: List[str] = []
+    out_path = step_dir / f"{slug}_stream_output.txt"
+    batches, failed, chunks = [], None, 0
+    first_batch_ms = None
+    last_batch = time.monotonic()
+    last_db = 0.0
+    ended: Optional[dict] = None
+    stall_since: Optional[float] = None
+
+    def run_batch() -> None:
+        nonlocal failed, first_batch_ms, last_batch
+        batch, room = {}, batch_max  # batch_max counts targets over all buckets, as the adapter's cap does
+        for k, v in pending.items():
+            if v and room > 0:
+                batch[k] = v[:room]
+                room -= len(batch[k])
+        for k in batch:
+            pending[k] = pending[k][len(batch[k]):]
+            consumed[k].extend(batch[k])
+        i = len(batches)
+        bdir = step_dir / f"batch_{i:04d}"
+        bdir.mkdir(parents=True, exist_ok=True)
+        # manual / file inputs were taken above; each batch sees only its injected targets
+        opts = {k: v for k, v in options.items() if k not in accept and k not in LOCAL_INPUT_KEYS}
+        opts.update(batch)
+        opts["work_dir"] = str(bdir)
+        if first_batch_ms is None:
+            first_batch_ms = now_ms() - t0
+        t_batch = now_ms()
+        res = adapter.run_scan(opts) or {}
+        last_batch = time.monotonic()
+        n = sum(len(v) for v in batch.values())
+        batches.append({"targets": n, "status": res.get("status"), "ms": now_ms() - t_batch})
+        metrics.STREAM_BATCHES.inc(tool=slug)
+        for k in BUCKET_KEYS:
+            if isinstance(res.get(k), list) and res.get(k):
+                merged[k] = merge_dedupe((merged.get(k) or []) + res[k])
+        of = res.get("output_file")
+        if of and os.path.isfile(of):
+            with open(out_path, "ab") as dst, open(of, "rb") as src:
+                shutil.copyfileobj(src, dst)
+        if res.get("output"):
+            outputs.append(res["output"])
+        if res.get("status") not in ("success", "ok") and failed is None:
+            failed = res
+
+    while True:
+        if scope.cancelled.is_set():
+            raise Canceled("\n".join(outputs)[-OUTPUT_TAIL_BYTES:], "canceled while streaming")
+        ended = ended or reader.end()     # END first: every chunk before it is already in place
+        chunk = reader.next()
+        if chunk is not None:
+            chunks += 1
+            take(chunk.get("items") or {})
+            if sum(len(v) for v in pending.values()) < batch_max:
+                continue  # keep reading: a full batch may be waiting on disk
+        n = sum(len(v) for v in pending.values())
+        if n and (n >= batch_max or ended is not None or time.monotonic() - last_batch >= STREAM_BATCH_WAIT_S):
+            run_batch()
+            if failed is not None:
+                break
+            continue
+        if ended is not None and chunk is None:
+            if ended.get("status") not in ("success", "ok"):
+                raise UpstreamFailed(f"upstream step {producer.step_index} ended {ended.get('status')}")
+            break
+        if time.monotonic() - last_db >= STREAM_DB_POLL_S:
+            last_db = time.monotonic()
+            rs, ps = _states(run_id, producer_id)
+            if rs == WorkflowRunStatus.CANCELED:
+                raise Canceled("\n".join(outputs)[-OUTPUT_TAIL_BYTES:], "run canceled while streaming")
+            if rs == WorkflowRunStatus.FAILED:
+                raise UpstreamFailed("run failed while streaming")
+            if ps in (WorkflowStepStatus.COMPLETED, WorkflowStepStatus.FAILED,
+                      WorkflowStepStatus.CANCELED, WorkflowStepStatus.SKIPPED):
+                stall_since = stall_since or time.monotonic()
+                if time.monotonic() - stall_since >= STREAM_STALL_S:
+                    raise UpstreamFailed(f"upstream step {producer.step_index} is {ps.name} but never ended its stream")
+        time.sleep(STREAM_POLL_S)
+
+    if not batches:
+        take(ingest.use_global_seed_if_empty({}, accept, current_app.config))
+        run_batch()  # nothing arrived: let the adapter report empty input exactly as in sequential mode
+
+    stats = {"upstream_step": producer.step_index, "chunks": chunks, "batches": batches,
+             "targets": sum(len(v) for v in consumed.values()), "capped": capped,
+             "first_batch_ms": first_batch_ms}
+    all_opts = {**{k: v for k, v in options.items() if k not in accept and k not in LOCAL_INPUT_KEYS}, **{k: v for k, v in consumed.items() if v}}
+    raw_out = "\n".join(outputs)[-OUTPUT_TAIL_BYTES:]
+    output_file = str(out_path) if out_path.exists() else None
+    if failed is not None:
+        result = finalize(failed.get("status") or "error", failed.get("message") or "batch failed", all_opts,
+                          failed.get("command") or slug, t0, raw_out, output_file=output_file,
+                          error_reason=failed.get("error_reason"), error_detail=failed.get("error_detail"),
+                          extra={"pipeline": stats}, **merged)
+    else:
+        total = sum(len(v) for v in merged.values())
+        result = finalize("ok", f"{total} items from {len(batches)} streamed batch(es)", all_opts,
+                          f"{slug} (streamed from step {producer.step_index})", t0, raw_out,
+                          output_file=output_file, extra={"pipeline": stats}, **merged)
+    return result, {k: v for k, v in consumed.items() if v}
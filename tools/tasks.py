@@ -1,21 +1,31 @@
-from importlib import import_module
 import os
 import tempfile
+import time
+import uuid
 from celery.utils.log import get_task_logger
-from celery_app import celery
+from celery_app import celery, TOOL_QUEUES
+from celery.signals import task_retry, task_postrun
 from extensions import db
 from .models import (
-    ErrorReason, ScanDiagnostics, ScanStatus, WorkflowRun, WorkflowRunStatus,
+    CampaignStatus, ErrorReason, ScanDiagnostics, ScanStatus, WorkflowCampaign, WorkflowRun, WorkflowRunStatus,
     WorkflowRunStep, WorkflowStepStatus,
     ToolScanHistory,  # existing audit trail for each tool exec
 )
 from pathlib import Path
 from datetime import datetime, timedelta, timezone
 from .runner import create_run_from_definition
+from .campaigns import fill_campaign
 from flask import current_app
+from sqlalchemy.orm.attributes import flag_modified
 from .events import publish_run_event
-from tools import ingest
-from tools.alltools.tools._common import active_decr, active_incr, active_can_start, ops_redis
+from tools import chunking, ingest, incremental, inventory, results, streaming
+from tools.manifests import slim_parameters
+from tools.tracing import StepTrace
+from tools import metrics
+from tools.policies import worker_class
+from tools.alltools.registry import load_adapter
+from tools.alltools.tools._common import active_decr, active_incr, active_can_start, ops_redis, Canceled, OutputLimit, proc_scope
+from tools.alltools.tools._sandbox import sandbox_limits
 import shutil
 
 utcnow = lambda: datetime.now(timezone.utc)
@@ -30,6 +40,7 @@ def ping(msg='ok'):
 
 @celery.task(name='tools.tasks.advance_run', bind=True)
 def advance_run(self, run_id: int):
+    t_start = time.time() * 1000
     run = db.session.get(WorkflowRun, run_id)
     if not run:
         log.warning(f'advance_run: run {run_id} not found')
@@ -59,40 +70,98 @@ def advance_run(self, run_id: int):
             "current_step_index": run.current_step_index
         })
 
-    # Next step: ONLY QUEUED (no auto-retry of FAILED/CANCELED)
     steps = list(run.steps)  # ordered
+    if streaming.pipelined(run):
+        return _advance_pipelined(run, steps, t_start)
+
+    # Next step: ONLY QUEUED (no auto-retry of FAILED/CANCELED)
     next_step = next((s for s in steps if s.status == WorkflowStepStatus.QUEUED), None)
 
     if not next_step:
-        run.status = WorkflowRunStatus.COMPLETED
-        run.finished_at = utcnow()
-        run.progress_pct = 100.0
-        db.session.commit()
-        publish_run_event(run.id, "run", {
-            "status": run.status.name, "progress_pct": run.progress_pct,
-            "current_step_index": run.current_step_index
-        })
-        log.info(f'advance_run: run {run_id} completed')
-
-        try:
-            active_decr(run.user_id)
-        except Exception:
-            pass
-        # (Optional) try to promote a queued run now; see helper below
-        try:
-            _promote_queued()
-        except Exception:
-            pass
-        return {'status': 'completed'}
+        return _complete_run(run)
 
-    publish_run_event(run.id, "dispatch", {"step_index": next_step.step_index})
-    queue_name = current_app.config.get("CELERY_QUEUE", "tools_default")
-    res = run_step.apply_async(args=[run_id, next_step.step_index], queue=queue_name)
+    res = _dispatch_step(run, next_step, t_start)
     # record Celery task id for cancel/revoke
     next_step.celery_task_id = res.id
     db.session.commit()
     return {'status': 'dispatched', 'task_id': res.id}
 
+def _advance_pipelined(run, steps, t_start: float):
+    """
+    Pipelined workflows (tools.streaming): dispatch every QUEUED step whose
+    upstreams are done, or that streams from a single RUNNING upstream. Several
+    tasks can advance the same run at once, so a step is claimed by setting its
+    celery_task_id with a conditional UPDATE before it is sent.
+    """
+    if run.status != WorkflowRunStatus.RUNNING:
+        return {'status': run.status.name.lower()}
+    by_index = {s.step_index: s for s in steps}
+    sent = []
+    for s in steps:
+        if s.status != WorkflowStepStatus.QUEUED or s.celery_task_id:
+            continue
+        if not streaming.can_dispatch(run, s, by_index):
+            continue
+        task_id = uuid.uuid4().hex
+        claimed = (WorkflowRunStep.query
+                   .filter(WorkflowRunStep.id == s.id, WorkflowRunStep.status == WorkflowStepStatus.QUEUED,
+                           WorkflowRunStep.celery_task_id.is_(None))
+                   .update({WorkflowRunStep.celery_task_id: task_id}, synchronize_session=False))
+        db.session.commit()
+        if claimed:
+            _dispatch_step(run, s, t_start, task_id=task_id)
+            sent.append(task_id)
+    if sent:
+        return {'status': 'dispatched', 'task_ids': sent}
+    if any(s.status == WorkflowStepStatus.RUNNING
+           or (s.status == WorkflowStepStatus.QUEUED and s.celery_task_id) for s in steps):
+        return {'status': 'waiting'}
+    if any(s.status == WorkflowStepStatus.QUEUED for s in steps):
+        log.warning('advance_run: run %s has QUEUED steps whose upstreams will not complete', run.id)
+        return {'status': 'blocked'}
+    return _complete_run(run)
+
+def _dispatch_step(run, step, t_start: float, task_id: str | None = None):
+    queue_name = _step_queue(step)
+    publish_run_event(run.id, "dispatch", {"step_index": step.step_index, "queue": queue_name})
+    now_ms = time.time() * 1000
+    return run_step.apply_async(args=[run.id, step.step_index], queue=queue_name, task_id=task_id,
+                                kwargs={"enqueued_ms": now_ms, "advance_ms": round(now_ms - t_start, 1)})
+
+def _complete_run(run):
+    # conditional: in pipelined runs the last two steps can both advance the run
+    done = (WorkflowRun.query
+            .filter(WorkflowRun.id == run.id, WorkflowRun.status == WorkflowRunStatus.RUNNING)
+            .update({WorkflowRun.status: WorkflowRunStatus.COMPLETED, WorkflowRun.finished_at: utcnow(),
+                     WorkflowRun.progress_pct: 100.0}, synchronize_session=False))
+    db.session.commit()
+    db.session.refresh(run)
+    if not done:
+        return {'status': run.status.name.lower()}
+    try:
+        incremental.record_changes(run)
+    except Exception as e:
+        log.warning("advance_run: change summary failed for run %s: %r", run.id, e)
+    db.session.commit()
+    publish_run_event(run.id, "run", {
+        "status": run.status.name, "progress_pct": run.progress_pct,
+        "current_step_index": run.current_step_index
+    })
+    log.info(f'advance_run: run {run.id} completed')
+
+    _release_slot(run)
+    return {'status': 'completed'}
+
+def _step_queue(step) -> str:
+    """tools_light / tools_heavy from the tool's worker class (policy snapshot first)."""
+    tool = step.tool
+    slug = tool.slug if tool else ""
+    try:
+        policy = ingest.get_policy_for_step(step, slug)
+    except Exception:
+        policy = None
+    return TOOL_QUEUES[worker_class(slug, policy)]
+
 BUCKET_KEYS = ("domains", "hosts", "ips", "ports", "services", "urls", "endpoints", "findings")
 
 
@@ -102,8 +171,8 @@ def _ensure_run_manifest(run):
     """
     base = {
         "buckets": {k: {"count": 0, "items": []} for k in BUCKET_KEYS},
-        "provenance": {k: {} for k in BUCKET_KEYS},   # item -> [ {step, tool} ]
-        "steps": {},                                   # step_index -> summary
+        "provenance": {k: {} for k in BUCKET_KEYS},   # item -> bitmask of step indexes (results.Provenance)
+        "steps": {},                                   # step_index -> summary (its "tool" decodes the bits)
         "last_updated": None,
     }
     return run.run_manifest or base
@@ -124,6 +193,8 @@ def _aggregate_run_manifest(db, run, step_index, tool_slug, step_manifest):
     Merge a step's typed buckets (domains/hosts/ips/ports/urls/endpoints/findings)
     into the run-level summary with provenance.
     """
+    if streaming.pipelined(run):
+        db.session.refresh(run, with_for_update=True)  # steps of a pipelined run can finish together
     manifest = _ensure_run_manifest(run)
     step_counts = {}
 
@@ -141,12 +212,14 @@ def _aggregate_run_manifest(db, run, step_index, tool_slug, step_manifest):
         manifest["buckets"][key] = bucket
         step_counts[key] = len(vals)
 
-        # Provenance: item -> [{step, tool}]
+        # Provenance: item -> step bitmask; an int per item instead of a list of {step, tool}
         prov_map = manifest["provenance"].setdefault(key, {})
+        bit = 1 << int(step_index)
         for v in vals:
-            arr = prov_map.get(v, [])
-            arr.append({"step": int(step_index), "tool": tool_slug})
-            prov_map[v] = arr
+            prev = prov_map.get(v, 0)
+            if isinstance(prev, list):  # run started before the bitmask encoding
+                prev = results.legacy_mask(prev)
+            prov_map[v] = prev | bit
 
     # Record per-step summary
     manifest["steps"][str(step_index)] = {
@@ -155,10 +228,15 @@ def _aggregate_run_manifest(db, run, step_index, tool_slug, step_manifest):
         "execution_ms": step_manifest.get("execution_ms"),
         "status": step_manifest.get("status", "success"),
     }
+    if step_manifest.get("incremental"):
+        manifest["steps"][str(step_index)]["incremental"] = step_manifest["incremental"]
+    if (step_manifest.get("checkpoint") or {}).get("resumed"):
+        manifest["steps"][str(step_index)]["resumed"] = step_manifest["checkpoint"]
     manifest["last_updated"] = datetime.now(timezone.utc).isoformat()
 
-    # Persist on the run row
+    # Persist on the run row (in-place JSON edits are not change-tracked)
     run.run_manifest = manifest
+    flag_modified(run, "run_manifest")
     db.session.add(run)
     db.session.commit()
     return manifest
@@ -181,11 +259,35 @@ def _stage_artifact(run_id: int, step_index: int, slug: str, source_path: str) -
     except Exception:
         # don't fail the run on copy issues
         return None
+    try:
+        metrics.ARTIFACT_BYTES.observe(os.path.getsize(dest), tool=slug)
+    except OSError:
+        pass
     rel = os.path.relpath(dest, os.path.join(base_dir, str(run_id))).replace("\\", "/")
     return rel
 
 @celery.task(name='tools.tasks.run_step', bind=True)
-def run_step(self, run_id: int, step_index: int):
+def run_step(self, run_id: int, step_index: int, enqueued_ms: float | None = None, advance_ms: float | None = None):
+    trace = StepTrace(enqueued_ms=enqueued_ms, advance_ms=advance_ms)
+    with trace.activate():
+        return _run_step(run_id, step_index, trace)
+
+@task_retry.connect
+def _count_task_retry(sender=None, request=None, **kw):
+    metrics.CELERY_RETRIES.inc(task=getattr(sender, "name", None) or getattr(request, "task", ""))
+
+@task_postrun.connect
+def _flush_metrics(**kw):
+    metrics.maybe_flush()
+
+def _observe_step(trace: StepTrace, t_start: float, tool, status) -> None:
+    slug = tool.slug if tool else "unknown"
+    metrics.STEP_DURATION.observe(time.monotonic() - t_start, tool=slug,
+                                  status=status.name if status else "UNKNOWN")
+    if trace.queue_wait_ms is not None:
+        metrics.QUEUE_WAIT.observe(trace.queue_wait_ms / 1000.0, tool=slug)
+
+def _run_step(run_id: int, step_index: int, trace: StepTrace):
     run = db.session.get(WorkflowRun, run_id)
     if not run:
         log.warning(f'run_step: run {run_id} not found')
@@ -196,6 +298,12 @@ def run_step(self, run_id: int, step_index: int):
         log.warning(f'run_step: step {step_index} not found for run {run_id}')
         return {'status': 'not_found'}
 
+    # Heavy steps are acked late: a re-delivered message for a finished step is a no-op
+    if step.status in (WorkflowStepStatus.COMPLETED, WorkflowStepStatus.FAILED,
+                       WorkflowStepStatus.SKIPPED, WorkflowStepStatus.CANCELED):
+        log.info(f'run_step: step {step_index} of run {run_id} already {step.status.name}')
+        return {'status': 'duplicate'}
+
     # If run paused/canceled while we were queued, don't run
     if run.status == WorkflowRunStatus.CANCELED:
         step.status = WorkflowStepStatus.CANCELED
@@ -215,7 +323,16 @@ def run_step(self, run_id: int, step_index: int):
         publish_run_event(run.id, "step", {"step_index": step_index, "status": "QUEUED"})
         return {'status': 'paused'}
 
+    # Pipelined: a consumer dispatched while its upstream ran waits in QUEUED if that upstream failed
+    producer = streaming.upstream_producer(run, step)
+    if producer is not None and producer.status in (WorkflowStepStatus.FAILED, WorkflowStepStatus.CANCELED):
+        step.celery_task_id = None
+        db.session.commit()
+        return {'status': 'upstream_failed'}
+    streamed = producer is not None and producer.status == WorkflowStepStatus.RUNNING
+
     # mark running and publish
+    t_start = time.monotonic()
     step.status = WorkflowStepStatus.RUNNING
     step.started_at = utcnow()
     db.session.commit()
@@ -233,7 +350,10 @@ def run_step(self, run_id: int, step_index: int):
             "progress_pct": run.progress_pct,
             "current_step_index": run.current_step_index
         })
+    if streaming.has_consumers(run, step):
+        advance_run.delay(run.id)  # start the steps that stream from this one
 
+    scope = step_dir = pub = None
     prev_output = {}
     if step_index > 0:
         prev = next((ps for ps in run.steps if ps.step_index == step_index - 1), None)
@@ -245,9 +365,10 @@ def run_step(self, run_id: int, step_index: int):
             raise RuntimeError("tool disabled or missing")
         slug = tool.slug
 
-        # load adapter + prepare options
-        mod_name = slug.replace('-', '_')
-        adapter = import_module(f".alltools.tools.{mod_name}", package="tools")
+        # load adapter + resolve the policy snapshot captured by the runner
+        with trace.span("policy_load"):
+            adapter = load_adapter(slug)
+            policy = ingest.get_policy_for_step(step, slug)
 
         # Create step work dir FIRST (so ingest can write inbox file if needed)
         base = current_app.config.get(
@@ -256,27 +377,74 @@ def run_step(self, run_id: int, step_index: int):
         )
         step_dir = Path(base) / f"run_{run.id}" / f"step_{step_index:02d}_{tool.slug}"
         step_dir.mkdir(parents=True, exist_ok=True)
+        # chunks of this step's output for pipelined consumers
+        pub = streaming.Publisher.for_step(run, step, policy)
 
         # Build options via ingest (DB-driven; upstream + config + seeds; normalize/dedupe/cap)
-        options = ingest.build_inputs_for_step(run, step, step_dir, current_app.config, slug=slug)
-        
-        # Inject the per-step policy snapshot captured by the runner
-        base_opts = ((step.input_manifest or {}).get("options") or {})
-        snap = base_opts.get("_policy")
-        if snap:
-            options["_policy"] = snap
+        with trace.span("ingest"):
+            options = ingest.build_inputs_for_step(run, step, step_dir, current_app.config, slug=slug, policy=policy)
 
         # Always provide tool_slug for adapters that rely on it
         options.setdefault("tool_slug", slug)
         options["work_dir"] = str(step_dir)
-
-        # Execute tool
-        result = adapter.run_scan(options) or {}
+        # never handed to the adapter: auto-chunking settings and what ingest cut at the cap
+        chunk_cfg = options.pop(chunking.CHUNK_KEY, None)
+        capped = options.pop(chunking.CAPPED_KEY, None)
+        # targets ingest skipped because the user's inventory holds a recent probe of them
+        reuse = inventory.Reuse.from_options(options)
+        inputs = {k: list(options[k]) for k in BUCKET_KEYS if isinstance(options.get(k), list)}
+        for k, vals in (reuse.targets.items() if reuse else ()):
+            inputs.setdefault(k, []).extend(vals)
+
+        # Incremental workflows: only new or expired targets reach the adapter
+        with trace.span("incremental"):
+            inc = incremental.prepare(run, step, slug, options, step_dir)
+
+        probed = None
+        if streamed:
+            # consume the upstream's chunks as they arrive, in batches
+            reuse = None
+            with trace.span("exec"), proc_scope(run.id, step_index, sandbox=sandbox_limits(policy)) as scope:
+                scope.tap = pub.tap if pub else None
+                result, probed = streaming.consume(run, step, producer, adapter, options, slug=slug,
+                                                   policy=policy, step_dir=step_dir, scope=scope, chunk=chunk_cfg)
+                result["resources"] = scope.resources()
+            inputs = {k: list(v) for k, v in probed.items()}
+        elif inc is not None and inc.skip_adapter:
+            result = inc.cached_result(options)
+        elif reuse is not None and not any(options.get(k) for k in BUCKET_KEYS):
+            result = reuse.cached_result(options)
+        else:
+            probed = {k: list(options[k]) for k in BUCKET_KEYS if isinstance(options.get(k), list)}
+            batches = chunking.batches_for(options, chunk_cfg)
+            # Execute tool; its processes live in a scope the cancel endpoint can reach
+            with trace.span("exec"), proc_scope(run.id, step_index, sandbox=sandbox_limits(policy)) as scope:
+                scope.tap = pub.tap if pub else None
+                if batches:
+                    result, probed = chunking.run(adapter, options, chunk_cfg, batches, slug=slug,
+                                                  step_dir=step_dir, user_id=run.user_id)
+                else:
+                    result = adapter.run_scan(options) or {}
+                result["resources"] = scope.resources()
+            if scope.cancelled.is_set():
+                # in-process engines don't poll the flag; drop their late result
+                raise Canceled(result.get("output") or "", "adapter finished after cancel")
+        if inc is not None:
+            # cache the delta's output per target and fold in the unchanged targets' results
+            with trace.span("incremental_merge"):
+                inc.merge(result)
+        if reuse is not None:
+            reuse.merge(result)
+        if capped:
+            result["input_capped"] = capped
+        if pub is not None:
+            pub.close(result)
         # Normalize/stage artifact(s) for download
         try:
             of = result.get("output_file")
             if of and os.path.isfile(of):
-                rel = _stage_artifact(run.id, step_index, slug, of)
+                with trace.span("stage_artifact"):
+                    rel = _stage_artifact(run.id, step_index, slug, of)
                 if rel:
                     result["artifact_relpath"] = rel
                     result["download_url"] = f"/tools/api/runs/{run.id}/artifacts/{rel}"
@@ -284,22 +452,34 @@ def run_step(self, run_id: int, step_index: int):
             pass
 
         success = (result.get("status") in ("success","ok"))
+        if (result.get("checkpoint") or {}).get("resumed"):
+            trace.attrs["resumed_targets"] = result["checkpoint"].get("targets_skipped")
 
         # Persist scan + diagnostics
         command_hint = f"{slug} (workflow step {step_index})"
-        scan = _persist_scan_result(db, ToolScanHistory, ScanDiagnostics, ScanStatus, ErrorReason,
-                                    tool=tool, user_id=run.user_id, result=result, command_hint=command_hint)
-
-        step.tool_scan_history_id = scan.id
-        step.output_manifest = result
-        step.status = WorkflowStepStatus.COMPLETED if success else WorkflowStepStatus.FAILED
-        step.finished_at = utcnow()
-        db.session.commit()
+        with trace.span("persist"):
+            scan = _persist_scan_result(db, ToolScanHistory, ScanDiagnostics, ScanStatus, ErrorReason,
+                                        tool=tool, user_id=run.user_id, result=result, command_hint=command_hint)
+
+            step.tool_scan_history_id = scan.id
+            step.output_manifest = result
+            step.status = WorkflowStepStatus.COMPLETED if success else WorkflowStepStatus.FAILED
+            step.finished_at = utcnow()
+            db.session.commit()
         # Update the run-level manifest with typed buckets for the summary panel
         try:
-            _aggregate_run_manifest(db, run, step_index, slug, result)
+            with trace.span("aggregate"):
+                _aggregate_run_manifest(db, run, step_index, slug, result)
         except Exception as e:
             log.warning("aggregate failed for run %s step %s: %r", run.id, step_index, e)
+        # Fold the step into the user's asset inventory (one batch of upserts)
+        try:
+            with trace.span("inventory"):
+                inventory.record_step(run, slug, result, inputs=inputs, probed=probed)
+                db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            log.warning("inventory update failed for run %s step %s: %r", run.id, step_index, e)
 
         # progress
         total = max(1, run.total_steps or len(run.steps))
@@ -309,13 +489,9 @@ def run_step(self, run_id: int, step_index: int):
             run.status = WorkflowRunStatus.FAILED
         run.progress_pct = round(100.0 * done / total, 2)
         db.session.commit()
-        # If the run failed, free the user's active slot and try to promote a queued run
+        # If the run failed, free its active slot and try to promote a queued run
         if not success:
-            try:
-                active_decr(run.user_id)
-                _promote_queued()
-            except Exception:
-                pass
+            _release_slot(run)
         # publish state after commit
         publish_run_event(run.id, "step", {
             "step_index": step_index,
@@ -328,12 +504,60 @@ def run_step(self, run_id: int, step_index: int):
             "progress_pct": run.progress_pct,
             "current_step_index": run.current_step_index
         })
+        step.trace = trace.to_json()
+        db.session.commit()
+        _observe_step(trace, t_start, tool, step.status)
+
+    except streaming.UpstreamFailed as uf:
+        db.session.rollback()
+        db.session.refresh(run)
+        if run.status == WorkflowRunStatus.CANCELED:
+            _record_stopped_step(run, step, step_dir, Canceled("", str(uf)), scope, trace,
+                                 status=WorkflowStepStatus.CANCELED, message="Canceled by user",
+                                 execution_ms=int((time.monotonic() - t_start) * 1000))
+            return {'status': 'canceled'}
+        # back to where sequential mode leaves a step after its upstream failed
+        step.status = WorkflowStepStatus.QUEUED
+        step.started_at = None
+        step.celery_task_id = None
+        db.session.commit()
+        publish_run_event(run.id, "step", {"step_index": step_index, "status": "QUEUED"})
+        log.info(f'run_step: step {step_index} on run {run_id} back to QUEUED ({uf})')
+        return {'status': 'upstream_failed'}
+
+    except Canceled as c:
+        db.session.rollback()
+        _record_stopped_step(run, step, step_dir, c, scope, trace, status=WorkflowStepStatus.CANCELED,
+                             message="Canceled by user",
+                             execution_ms=int((time.monotonic() - t_start) * 1000))
+        _observe_step(trace, t_start, step.tool, step.status)
+        log.info(f'run_step: step {step_index} on run {run_id} canceled ({c.detail})')
+        return {'status': 'canceled'}
+
+    except OutputLimit as ol:
+        db.session.rollback()
+        _record_stopped_step(run, step, step_dir, ol, scope, trace, status=WorkflowStepStatus.FAILED,
+                             message=ol.message,
+                             execution_ms=int((time.monotonic() - t_start) * 1000))
+        _observe_step(trace, t_start, step.tool, step.status)
+        run.status = WorkflowRunStatus.FAILED
+        db.session.commit()
+        _release_slot(run)
+        publish_run_event(run.id, "run", {
+            "status": run.status.name, "progress_pct": run.progress_pct,
+            "current_step_index": run.current_step_index
+        })
+        log.warning(f'run_step: step {step_index} on run {run_id} hit the output limit ({ol.detail})')
+        return {'status': 'failed', 'error': 'OUTPUT_LIMIT'}
 
     except Exception as e:
         db.session.rollback()
         step.status = WorkflowStepStatus.FAILED
         step.finished_at = utcnow()
+        trace.attrs["error"] = type(e).__name__
+        step.trace = trace.to_json()
         db.session.commit()
+        _observe_step(trace, t_start, step.tool, step.status)
         run.status = WorkflowRunStatus.FAILED
         db.session.commit()
         publish_run_event(run.id, "step", {"step_index": step_index, "status": "FAILED"})
@@ -344,6 +568,10 @@ def run_step(self, run_id: int, step_index: int):
         log.exception(f'run_step: failed step {step_index} on run {run_id}: {e}')
         return {'status': 'failed', 'error': str(e)}
 
+    finally:
+        if pub is not None:
+            pub.close()  # no-op after a normal close; tells consumers this attempt ended otherwise
+
     # guard re-advance if paused/canceled right after commit
     db.session.refresh(run)
     if run.status in (WorkflowRunStatus.PAUSED, WorkflowRunStatus.CANCELED):
@@ -355,10 +583,69 @@ def run_step(self, run_id: int, step_index: int):
     return {'status': 'ok' if step.status == WorkflowStepStatus.COMPLETED else 'failed'}
 
 
+PARTIAL_INLINE_BYTES = 64_000
+
+def _record_stopped_step(run, step, step_dir, exc, scope, trace: StepTrace, *,
+                         status, message: str, execution_ms: int) -> None:
+    """
+    Keep what the tool printed before it was stopped (cancel or OUTPUT_LIMIT):
+    the spool file (or partial_output.txt) is staged like any artifact and the
+    manifest inlines a bounded preview plus how much was kept.
+    """
+    partial = exc.partial or ""
+    spool = getattr(exc, "output", None)
+    tool = step.tool
+    slug = tool.slug if tool else "unknown"
+    if spool is not None:
+        kept = {"bytes": spool.bytes, "lines": spool.lines, "inline_bytes": len(partial.encode("utf-8", "ignore"))}
+    else:
+        size = len(partial.encode("utf-8", "ignore"))
+        kept = {"bytes": size, "lines": partial.count("\n") + (1 if partial and not partial.endswith("\n") else 0),
+                "inline_bytes": min(size, PARTIAL_INLINE_BYTES)}
+    result = {
+        "status": "canceled" if status == WorkflowStepStatus.CANCELED else "error",
+        "message": message,
+        "error_reason": exc.reason,
+        "error_detail": exc.detail,
+        "execution_ms": execution_ms,
+        "output": partial[-PARTIAL_INLINE_BYTES:],
+        "partial": True,
+        "partial_output": kept,
+        "stop": {"signals": dict(scope.signals) if scope else {},
+                 "grace_s": scope.grace_s if scope else None},
+    }
+    if scope:
+        result["resources"] = scope.resources()
+    src = spool.path if spool is not None and os.path.isfile(spool.path) else None
+    if not src and partial and step_dir:
+        fp = Path(step_dir) / "partial_output.txt"
+        fp.write_text(partial, encoding="utf-8", errors="ignore")
+        src = str(fp)
+    if src:
+        result["output_file"] = src
+        rel = _stage_artifact(run.id, step.step_index, slug, src)
+        if rel:
+            result["artifact_relpath"] = rel
+            result["download_url"] = f"/tools/api/runs/{run.id}/artifacts/{rel}"
+    if tool:
+        scan = _persist_scan_result(db, ToolScanHistory, ScanDiagnostics, ScanStatus, ErrorReason,
+                                    tool=tool, user_id=run.user_id, result=result,
+                                    command_hint=f"{slug} (workflow step {step.step_index})")
+        step.tool_scan_history_id = scan.id
+    step.output_manifest = result
+    step.status = status
+    step.finished_at = step.finished_at or utcnow()
+    trace.attrs["stopped"] = exc.reason
+    step.trace = trace.to_json()
+    db.session.commit()
+    publish_run_event(run.id, "step", {
+        "step_index": step.step_index, "status": status.name, "error_reason": exc.reason,
+        "partial_output_bytes": kept["bytes"], "tool_scan_history_id": step.tool_scan_history_id,
+    })
+
 def _load_adapter_for_slug(slug: str):
-    """Slug 'github-subdomains' -> module tools.alltools.github_subdomains"""
-    mod_name = slug.replace('-', '_')
-    return import_module(f".alltools.tools.{mod_name}", package="tools")
+    """Slug 'github-subdomains' -> module tools.alltools.tools.github_subdomains (see alltools.registry)"""
+    return load_adapter(slug)
 
 def _prep_options_for_tool(step, prev_output: dict, user_id: int, app_config: dict):
     """
@@ -427,7 +714,7 @@ def _persist_scan_result(db, ToolScanHistory, ScanDiagnostics, ScanStatus, Error
     scan = ToolScanHistory(
         user_id = user_id,
         tool_id = tool.id if tool else None,
-        parameters = result.get("parameters") or {},  # adapters may echo inputs
+        parameters = slim_parameters(result.get("parameters") or {}),  # allowlisted + target refs
         command    = result.get("command") or command_hint,
         raw_output = result.get("output") or result.get("message") or "",
         scan_success_state = bool(success),
@@ -464,13 +751,36 @@ def start_run(self, workflow_id: int, user_id: int | None):
     run = create_run_from_definition(workflow_id, user_id)
     advance_run.delay(run.id)
     return {'run_id': run.id}
+def _release_slot(run) -> None:
+    """
+    A run left the active set. Interactive runs free the user's slot and let the
+    promoter in; campaign runs hand their slot back to the campaign, which
+    refills it with its next seed.
+    """
+    if run.campaign_id:
+        try:
+            advance_campaign.delay(run.campaign_id)
+        except Exception:
+            pass
+        return
+    try:
+        active_decr(run.user_id)
+    except Exception:
+        pass
+    try:
+        _promote_queued()
+    except Exception:
+        pass
+
 def _promote_queued(limit: int = 10):
     """
     Promote oldest QUEUED runs to RUNNING when users are under their cap.
+    Campaign runs are admitted by their campaign (advance_campaign), not here.
     """
     rows = (
         db.session.query(WorkflowRun)
-        .filter(WorkflowRun.status == WorkflowRunStatus.QUEUED)
+        .filter(WorkflowRun.status == WorkflowRunStatus.QUEUED,
+                WorkflowRun.campaign_id.is_(None))
         .order_by(WorkflowRun.created_at.asc())
         .limit(limit)
         .all()
@@ -483,6 +793,8 @@ def _promote_queued(limit: int = 10):
             # Let the coordinator handle status transition and dispatch
             advance_run.delay(run.id)
             promoted += 1
+        else:
+            metrics.ADMISSION_REJECTIONS.inc(source="promoter")
     return promoted
 
 @celery.task(name="tools.tasks.reconcile_zombies")
@@ -500,19 +812,36 @@ def reconcile_zombies():
     for r in zombies:
         r.status = WorkflowRunStatus.FAILED
         r.finished_at = utcnow()
+        # the worker died mid-step: fail the step so it can be retried (and resume from its checkpoint)
+        for s in r.steps:
+            if s.status == WorkflowStepStatus.RUNNING:
+                s.status = WorkflowStepStatus.FAILED
+                s.finished_at = utcnow()
         db.session.add(r)
-        try:
-            active_decr(r.user_id)
-        except Exception:
-            pass
+        if not r.campaign_id:
+            try:
+                active_decr(r.user_id)
+            except Exception:
+                pass
     if zombies:
         db.session.commit()
     try:
         _promote_queued()
     except Exception:
         pass
+    # campaigns refill on run completion; this catches a lost advance_campaign message
+    for (cid,) in db.session.query(WorkflowCampaign.id).filter(WorkflowCampaign.status == CampaignStatus.RUNNING):
+        advance_campaign.delay(cid)
     return {"zombies": len(zombies)}
 
+@celery.task(name="tools.tasks.advance_campaign")
+def advance_campaign(campaign_id: int):
+    """Campaign admission: top the campaign up to its concurrency and dispatch the new runs."""
+    run_ids = fill_campaign(campaign_id)
+    for rid in run_ids:
+        advance_run.delay(rid)
+    return {"campaign_id": campaign_id, "dispatched": len(run_ids)}
+
 @celery.task(name="tools.tasks.prune_history")
 def prune_history():
     """
@@ -535,6 +864,7 @@ def prune_history():
         except Exception:
             pass
         db.session.delete(r); deleted += 1
-    if deleted:
+    pruned = incremental.prune()
+    if deleted or pruned:
         db.session.commit()
-    return {"deleted_runs": deleted}
+    return {"deleted_runs": deleted, "pruned_target_results": pruned}
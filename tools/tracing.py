@@ -0,0 +1,176 @@
+# tools/tracing.py
+"""
+Per-step phase traces for workflow runs.
+
+run_step records spans (queue wait, policy load, ingest, exec, artifact
+staging, persist, aggregate, publish) into a StepTrace and stores its compact
+form on WorkflowRunStep.trace:
+
+    {"v": 1, "t0": <epoch ms>, "spans": [[name, offset_ms, duration_ms(, count)], ...]}
+
+Offsets are relative to t0 (the enqueue time when known). Repeated phases
+such as 'publish' are folded into one span with a count.
+"""
+from __future__ import annotations
+import contextvars, hashlib, time
+from contextlib import contextmanager, nullcontext
+from typing import Any, Dict, Iterable, List, Optional
+
+TRACE_VERSION = 1
+PHASES = ("advance", "queue_wait", "policy_load", "ingest", "exec",
+          "stage_artifact", "persist", "aggregate", "publish")
+FOLDED = {"publish"}
+SERVICE_NAME = "hackr-tools"
+
+_current: contextvars.ContextVar[Optional["StepTrace"]] = contextvars.ContextVar("step_trace", default=None)
+
+def _now_ms() -> float:
+    return time.time() * 1000.0
+
+
+class StepTrace:
+    def __init__(self, *, enqueued_ms: Optional[float] = None, advance_ms: Optional[float] = None):
+        now = _now_ms()
+        self.t0 = min(enqueued_ms - (advance_ms or 0), now) if enqueued_ms else now
+        self.spans: List[list] = []
+        self.attrs: Dict[str, Any] = {}
+        self.queue_wait_ms: Optional[float] = max(now - enqueued_ms, 0.0) if enqueued_ms else None
+        if enqueued_ms:
+            if advance_ms:
+                self.add("advance", enqueued_ms - advance_ms, advance_ms)
+            self.add("queue_wait", enqueued_ms, now - enqueued_ms)
+
+    def add(self, name: str, start_ms: float, dur_ms: float) -> None:
+        off, dur = round(start_ms - self.t0, 1), round(max(dur_ms, 0.0), 1)
+        if name in FOLDED:
+            for s in self.spans:
+                if s[0] == name:
+                    s[2] = round(s[2] + dur, 1)
+                    if len(s) > 3:
+                        s[3] += 1
+                    else:
+                        s.append(2)
+                    return
+        self.spans.append([name, off, dur])
+
+    @contextmanager
+    def span(self, name: str):
+        start = _now_ms()
+        try:
+            yield
+        finally:
+            self.add(name, start, _now_ms() - start)
+
+    @contextmanager
+    def activate(self):
+        token = _current.set(self)
+        try:
+            yield self
+        finally:
+            _current.reset(token)
+
+    def to_json(self) -> dict:
+        out = {"v": TRACE_VERSION, "t0": int(self.t0), "spans": [list(s) for s in self.spans]}
+        if self.attrs:
+            out["attrs"] = dict(self.attrs)
+        return out
+
+
+def current_span(name: str):
+    """Span on the active step trace, or a no-op outside run_step."""
+    tr = _current.get()
+    return tr.span(name) if tr is not None else nullcontext()
+
+
+# ---------- readers / exporters ----------
+
+def waterfall(run) -> dict:
+    """Admin view payload: one row per step with absolute offsets from the run's first span."""
+    steps = sorted(run.steps, key=lambda s: s.step_index)
+    t0s = [s.trace["t0"] for s in steps if isinstance(s.trace, dict) and s.trace.get("t0")]
+    base = min(t0s) if t0s else None
+    rows, end = [], 0.0
+    for s in steps:
+        tr = s.trace if isinstance(s.trace, dict) else {}
+        shift = (tr.get("t0", base) - base) if base is not None and tr else 0
+        spans = []
+        for sp in tr.get("spans") or []:
+            item = {"name": sp[0], "start_ms": round(shift + sp[1], 1), "duration_ms": sp[2]}
+            if len(sp) > 3:
+                item["count"] = sp[3]
+            spans.append(item)
+            end = max(end, item["start_ms"] + item["duration_ms"])
+        rows.append({
+            "step_index": s.step_index,
+            "tool": s.tool.slug if s.tool else None,
+            "status": s.status.name if s.status else None,
+            "spans": spans,
+            "total_ms": round(sum(x["duration_ms"] for x in spans), 1),
+            "attrs": tr.get("attrs") or {},
+        })
+    return {"run_id": run.id, "status": run.status.name if run.status else None,
+            "t0": base, "duration_ms": round(end, 1), "phases": list(PHASES), "steps": rows}
+
+
+def _hex_id(*parts: Any, n: int) -> str:
+    return hashlib.sha256(":".join(str(p) for p in parts).encode()).hexdigest()[:n]
+
+def _attr(key: str, value: Any) -> dict:
+    if isinstance(value, bool):
+        v = {"boolValue": value}
+    elif isinstance(value, int):
+        v = {"intValue": str(value)}
+    elif isinstance(value, float):
+        v = {"doubleValue": value}
+    else:
+        v = {"stringValue": str(value)}
+    return {"key": key, "value": v}
+
+def _nanos(ms: float) -> str:
+    return str(int(ms * 1_000_000))
+
+def to_otlp(runs: Iterable) -> dict:
+    """
+    OTLP/JSON (ExportTraceServiceRequest) for one or more runs:
+    run span -> step spans -> phase spans. Ids are derived from run/step ids,
+    so re-exporting the same run yields the same trace.
+    """
+    spans: List[dict] = []
+    for run in runs:
+        trace_id = _hex_id("run", run.id, n=32)
+        root_id = _hex_id("run", run.id, "root", n=16)
+        run_start, run_end = None, None
+        for s in sorted(run.steps, key=lambda x: x.step_index):
+            tr = s.trace if isinstance(s.trace, dict) else None
+            if not tr or not tr.get("spans"):
+                continue
+            t0 = float(tr["t0"])
+            step_id = _hex_id("run", run.id, "step", s.step_index, n=16)
+            start = t0 + min(sp[1] for sp in tr["spans"])
+            end = t0 + max(sp[1] + sp[2] for sp in tr["spans"])
+            run_start = start if run_start is None else min(run_start, start)
+            run_end = end if run_end is None else max(run_end, end)
+            attrs = [_attr("step.index", s.step_index), _attr("step.status", s.status.name if s.status else "")]
+            if s.tool:
+                attrs.append(_attr("tool.slug", s.tool.slug))
+            attrs += [_attr(f"step.{k}", v) for k, v in (tr.get("attrs") or {}).items()]
+            spans.append({"traceId": trace_id, "spanId": step_id, "parentSpanId": root_id,
+                          "name": f"step {s.step_index}", "kind": 1,
+                          "startTimeUnixNano": _nanos(start), "endTimeUnixNano": _nanos(end),
+                          "attributes": attrs})
+            for i, sp in enumerate(tr["spans"]):
+                ph_attrs = [_attr("phase", sp[0])] + ([_attr("count", sp[3])] if len(sp) > 3 else [])
+                spans.append({"traceId": trace_id, "spanId": _hex_id(step_id, i, sp[0], n=16),
+                              "parentSpanId": step_id, "name": sp[0], "kind": 1,
+                              "startTimeUnixNano": _nanos(t0 + sp[1]),
+                              "endTimeUnixNano": _nanos(t0 + sp[1] + sp[2]),
+                              "attributes": ph_attrs})
+        if run_start is not None:
+            spans.append({"traceId": trace_id, "spanId": root_id, "name": f"run {run.id}", "kind": 1,
+                          "startTimeUnixNano": _nanos(run_start), "endTimeUnixNano": _nanos(run_end),
+                          "attributes": [_attr("run.id", run.id), _attr("workflow.id", run.workflow_id or 0),
+                                         _attr("run.status", run.status.name if run.status else "")]})
+    return {"resourceSpans": [{
+        "resource": {"attributes": [_attr("service.name", SERVICE_NAME)]},
+        "scopeSpans": [{"scope": {"name": "tools.tracing", "version": str(TRACE_VERSION)}, "spans": spans}],
+    }]}
@@ -1,24 +1,27 @@
-import re
+from tools.utils.line_classifier import classify, is_domain, url_netloc
 
-DOMAIN_REGEX = re.compile(
-    r"^(?!-)[A-Za-z0-9-]{1,63}(?<!-)"
-    r"(?:\.(?!-)[A-Za-z0-9-]{1,63}(?<!-))*"
-    r"\.[A-Za-z]{2,63}$"
-)
+def _is_valid(kind: str, s: str) -> bool:
+    if kind == "domain":
+        return True
+    if kind == "url":
+        return is_domain(url_netloc(s) or "")
+    if kind == "other":  # other schemes, "domain/path"
+        host = s.split("://", 1)[-1].split("/", 1)[0]
+        return host != s and is_domain(host)
+    return False
 
 def classify_lines(lines):
+    """
+    (valid, invalid, duplicate count). A line is valid when it is a domain, or
+    a URL / "domain/path" whose host part is one (no port). Lines are compared
+    stripped; the first occurrence is returned as given, in input order.
+    """
+    lines = list(lines)
     seen, valid, invalid, dupes = set(), [], [], 0
-    from urllib.parse import urlparse
-    for l in lines:
-        if l in seen:
+    for line, (kind, s) in zip(lines, classify(lines)):
+        if s in seen:
             dupes += 1
             continue
-        seen.add(l)
-        # strip scheme and path, keep only the hostname
-        parsed = urlparse(l if '://' in l else '//' + l)
-        hostname = parsed.netloc or parsed.path
-        if DOMAIN_REGEX.match(hostname):
-            valid.append(l)
-        else:
-            invalid.append(l)
-    return valid, invalid, dupes
\ No newline at end of file
+        seen.add(s)
+        (valid if s and _is_valid(kind, s) else invalid).append(line)
+    return valid, invalid, dupes
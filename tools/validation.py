@@ -1,7 +1,15 @@
 # validation.py
 from tools.models import ToolConfigFieldType  # add this import
 
-def validate_step_input(tool, manifest: dict) -> list[str]:
+# where a step's targets come from; in a workflow only the first step reads them from its config
+INPUT_SOURCE_FIELDS = ("input_method", "value", "file_path")
+
+def validate_step_input(tool, manifest: dict, *, input_source: bool = True) -> list[str]:
+    """
+    Schema errors for a step's options. input_source=False leaves out the checks
+    on where targets come from (validate_input_source), for steps fed by an
+    upstream step or a campaign seed.
+    """
     errs = []
     mf = manifest or {}
 
@@ -13,20 +21,21 @@ def validate_step_input(tool, manifest: dict) -> list[str]:
 
         # required field
         if f.required and (val is None or (isinstance(val, str) and not val.strip())):
-            errs.append(f"'{f.label}' is required")
+            if input_source or f.name not in INPUT_SOURCE_FIELDS:
+                errs.append(f"'{f.label}' is required")
             continue
 
         # numeric
-        if f.type in (ToolConfigFieldType.integer, ToolConfigFieldType.float) and val is not None:
+        if f.type in (ToolConfigFieldType.INTEGER, ToolConfigFieldType.FLOAT) and val is not None:
             try:
                 # just validate; adapters can cast
-                _ = float(val) if f.type is ToolConfigFieldType.float else int(str(val), 10)
+                _ = float(val) if f.type is ToolConfigFieldType.FLOAT else int(str(val), 10)
             except Exception:
-                kind = "float" if f.type is ToolConfigFieldType.float else "integer"
+                kind = "float" if f.type is ToolConfigFieldType.FLOAT else "integer"
                 errs.append(f"'{f.label}' must be a {kind}")
 
         # boolean
-        if f.type is ToolConfigFieldType.boolean and val is not None:
+        if f.type is ToolConfigFieldType.BOOLEAN and val is not None:
             if isinstance(val, bool):
                 pass
             elif isinstance(val, str) and val.lower() in ("true", "false", "1", "0", "yes", "no"):
@@ -35,9 +44,9 @@ def validate_step_input(tool, manifest: dict) -> list[str]:
                 errs.append(f"'{f.label}' must be true/false")
 
         # select / multiselect choices
-        if f.type in (ToolConfigFieldType.select, ToolConfigFieldType.multiselect) and f.choices:
+        if f.type in (ToolConfigFieldType.SELECT, ToolConfigFieldType.MULTISELECT) and f.choices:
             allowed = {c["value"] for c in (f.choices or [])}
-            if f.type is ToolConfigFieldType.select:
+            if f.type is ToolConfigFieldType.SELECT:
                 if val is not None and val not in allowed:
                     errs.append(f"'{f.label}' must be one of {sorted(allowed)}")
             else:
@@ -46,10 +55,23 @@ def validate_step_input(tool, manifest: dict) -> list[str]:
                 if bad:
                     errs.append(f"'{f.label}' has invalid values: {bad}")
 
+    if input_source:
+        errs.extend(validate_input_source(tool, mf))
+    return errs
+
+def validate_input_source(tool, manifest: dict) -> list[str]:
+    """Required input fields and the manual-value / file-path cross checks."""
+    errs = []
+    mf = manifest or {}
+    for f in (tool.config_fields or []):
+        if f.visible and f.required and f.name in INPUT_SOURCE_FIELDS:
+            val = mf.get(f.name, f.default)
+            if val is None or (isinstance(val, str) and not val.strip()):
+                errs.append(f"'{f.label}' is required")
+
     # cross-field checks
     if mf.get("input_method") == "manual" and not (mf.get("value") or "").strip():
         errs.append("Provide a value or choose File input")
     if mf.get("input_method") == "file" and not (mf.get("file_path") or "").strip():
         errs.append("Select an input file when 'File' is chosen")
-
     return errs